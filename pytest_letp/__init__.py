@@ -2,6 +2,7 @@
 
 Pytest fixtures for letp test session.
 """
+import itertools
 import logging
 import os
 import subprocess
@@ -33,6 +34,9 @@ pytest_plugins = [
     "pytest_session_timeout",
     "pytest_letp_log",
     "pytest_test_report",
+    "pytest_test_duration",
+    "pytest_device_pool",
+    "pytest_metrics",
     "pytest_host"
 ]
 
@@ -43,6 +47,9 @@ __copyright__ = "Copyright (C) Sierra Wireless Inc."
 # List containing tuples of all the tests and their configuration
 test_list = []
 
+# Statistics of the asyncio socket servers, for the JSON report
+_socket_server_reports = []
+
 # Add path to lib folder and build the target file list to exclude
 excluded_list = []
 if "LETP_TESTS" in os.environ:
@@ -296,6 +303,8 @@ def pytest_json_modifyreport(json_report):
     """Merge test_base_reports configs into json report."""
     test_base_reports = TestConfig.default_cfg.test_base_reports
     json_report.update(test_base_reports)
+    if _socket_server_reports:
+        json_report["socket_servers"] = list(_socket_server_reports)
 
 
 @pytest.hookimpl()
@@ -466,9 +475,10 @@ def banner(request):
 
 @pytest.fixture(scope="session")
 def tcp_server(read_config_default):
-    """Create up to 4 TCP servers.
+    """Create the TCP servers.
 
-    It is possible to create up to 4 UDP and 4 TCP servers with LeTP.
+    It is possible to create UDP and TCP servers with LeTP, tcp_1 to
+    tcp_N and udp_1 to udp_N in host.xml.
     The servers will be created at startup and deleted at the end of
     the LeTP session.
 
@@ -476,6 +486,14 @@ def tcp_server(read_config_default):
     indicates used="1". The IP address is optional because by default
     it takes "host/ip_address".
 
+    With the mode attribute (echo, sink, source or measure), the server
+    is a lib.socket_server.AsyncServer for load tests: it handles
+    thousands of connections, with the throughput of each connection,
+    and signals the end of the connections instead of sleeping. Its
+    statistics (serv.get_stats()) are in the JSON report
+    ("socket_servers"). It only keeps the received data (cur_data) with
+    keep_data="1", since a load test may receive a lot of data.
+
     Use the fixture tcp_server or udp_server in your test to get the
     list of the TCP/UDP servers you declared.
 
@@ -494,8 +512,11 @@ def tcp_server(read_config_default):
     assert isinstance(read_config_default, ET.ElementTree)
     serv_list = []
     swilog.debug("start TCP servers")
-    for i in range(1, 5):
-        if read_config_default.find("host/socket_server/tcp_%d" % i).get("used") == "1":
+    for i in itertools.count(1):
+        elem = read_config_default.find("host/socket_server/tcp_%d" % i)
+        if elem is None:
+            break
+        if elem.get("used") == "1":
             ip = read_config_default.findtext("host/socket_server/tcp_%d/addr" % i)
             if ip == "":
                 # Take the Ip address of the host
@@ -506,9 +527,18 @@ def tcp_server(read_config_default):
                 read_config_default.findtext("host/socket_server/tcp_%d/port" % i)
             )
             assert port != "", "TCP/UDP IP server is set but no port"
-            serv = socket_server.get_tcp_server(
-                ip, port, responder=True, max_size=1000000
-            )
+            if elem.get("mode"):
+                serv = socket_server.AsyncServer(
+                    ip,
+                    port,
+                    "tcp",
+                    elem.get("mode"),
+                    keep_data=elem.get("keep_data") == "1",
+                )
+            else:
+                serv = socket_server.get_tcp_server(
+                    ip, port, responder=True, max_size=1000000
+                )
             serv_list.append(serv)
     if len(serv_list) == 0:
         assert 0, (
@@ -519,13 +549,15 @@ def tcp_server(read_config_default):
     yield serv_list
     swilog.debug("TCP servers shutdown!")
     for serv in serv_list:
+        if isinstance(serv, socket_server.AsyncServer):
+            _socket_server_reports.append(serv.get_stats())
         serv.shutdown()
         serv.server_close()
 
 
 @pytest.fixture(scope="session")
 def udp_server(read_config_default):
-    """Create up to 4 UDP servers.
+    """Create the UDP servers.
 
     Similar to pytest_letp.tcp_server.
     """
@@ -534,8 +566,11 @@ def udp_server(read_config_default):
     swilog.debug("start UDP servers")
     assert isinstance(read_config_default, ET.ElementTree)
     serv_list = []
-    for i in range(1, 5):
-        if read_config_default.find("host/socket_server/udp_%d" % i).get("used") == "1":
+    for i in itertools.count(1):
+        elem = read_config_default.find("host/socket_server/udp_%d" % i)
+        if elem is None:
+            break
+        if elem.get("used") == "1":
             ip = read_config_default.findtext("host/socket_server/udp_%d/addr" % i)
             if ip == "":
                 # Take the Ip address of the host
@@ -546,9 +581,18 @@ def udp_server(read_config_default):
                 read_config_default.findtext("host/socket_server/udp_%d/port" % i)
             )
             assert port != "", "TCP/UDP IP server is set but no port"
-            serv = socket_server.get_udp_server(
-                ip, port, responder=True, max_size=1000000
-            )
+            if elem.get("mode"):
+                serv = socket_server.AsyncServer(
+                    ip,
+                    port,
+                    "udp",
+                    elem.get("mode"),
+                    keep_data=elem.get("keep_data") == "1",
+                )
+            else:
+                serv = socket_server.get_udp_server(
+                    ip, port, responder=True, max_size=1000000
+                )
             serv_list.append(serv)
     if len(serv_list) == 0:
         assert (
@@ -559,6 +603,8 @@ def udp_server(read_config_default):
     yield serv_list
     swilog.debug("UDP servers shutdown!")
     for serv in serv_list:
+        if isinstance(serv, socket_server.AsyncServer):
+            _socket_server_reports.append(serv.get_stats())
         serv.shutdown()
         serv.server_close()
 
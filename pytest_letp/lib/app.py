@@ -12,15 +12,19 @@ Module related to the Legato application (build, install, verification, ...)
 import os
 import re
 import subprocess
-import time
+from concurrent.futures import ThreadPoolExecutor
 
 import pexpect
 
+from pytest_letp.lib import build_cache
+from pytest_letp.lib import metrics
 from pytest_letp.lib import swilog
+from pytest_letp.lib import wait
 
 __copyright__ = "Copyright (C) Sierra Wireless Inc."
 
 # It goes to LEGATO_ROOT, build, install the binary, clean it after tests.
+@metrics.timed("make", link="host")
 def make(target_type, app_name, app_path="", should_fail=False, option="", timeout=600):
     """Make a Legato application.
 
@@ -60,12 +64,33 @@ def make(target_type, app_name, app_path="", should_fail=False, option="", timeo
     else:
         adef_path = app_path
 
-    cmd = "mkapp %s %s -t %s %s" % (
-        adef_path,
-        " ".join(search_path),
+    flags = "%s -t %s %s" % (" ".join(search_path), target_type, option)
+    cmd = "mkapp %s %s" % (adef_path, flags)
+    # The artifact is in the current directory, unless given by the options.
+    artifact = "%s.%s.update" % (
+        os.path.basename(adef_path)[: -len(".adef")],
         target_type,
-        option,
     )
+    cache = build_cache.get_build_cache()
+    if should_fail or re.search(r"(^|\s)(-o|--output-dir)", option):
+        cache = None
+    if cache is None:
+        return _mkapp(cmd, should_fail, timeout)
+
+    key = cache.get_key(adef_path, target_type, flags)
+    with cache.lock(key):
+        rsp = cache.fetch(key, artifact)
+        if rsp is not None:
+            swilog.info("%s: %s from the build cache" % (cmd, artifact))
+            return rsp
+        rsp = _mkapp(cmd, should_fail, timeout)
+        if os.path.isfile(artifact):
+            cache.store(key, artifact, rsp)
+    return rsp
+
+
+def _mkapp(cmd, should_fail, timeout):
+    """Run mkapp and check its exit status."""
     swilog.info(cmd)
     rsp, _exit = pexpect.run(cmd, encoding="utf-8", timeout=timeout, withexitstatus=1)
     swilog.info(rsp)
@@ -77,6 +102,31 @@ def make(target_type, app_name, app_path="", should_fail=False, option="", timeo
     return rsp
 
 
+def make_parallel(target_type, apps, option="", timeout=600, max_workers=None):
+    """Make Legato applications in parallel.
+
+    :param target_type: type of target (wp85, ar759x, ...)
+    :param apps: list of (app_name, app_path)
+    :param option: extra mkapp options
+    :param timeout: timeout of each make
+    :param max_workers: maximum number of parallel builds, the CPU count
+        by default
+
+    :returns: list of the make stdout, in the order of apps
+
+    :raises: AssertionError: If a make failed
+    """
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        futures = [
+            executor.submit(
+                make, target_type, app_name, app_path, False, option, timeout
+            )
+            for app_name, app_path in apps
+        ]
+        return [future.result() for future in futures]
+
+
+@metrics.timed("install", link="host")
 def install(
     target_type,
     target_ip,
@@ -141,6 +191,7 @@ def install_legato(target_type, target_ip):
     assert _exit == 0
 
 
+@metrics.timed("make", link="host")
 def make_sys(
     target_type,
     sys_name,
@@ -216,6 +267,7 @@ def make_sys(
     return rsp
 
 
+@metrics.timed("install", link="host")
 def install_sys(target_type, target_ip, sys_name, sys_path="", quiet=False, timeout=60):
     """Install a system.
 
@@ -609,7 +661,7 @@ def wait_for_log_msg(target, pattern, timeout, grep_options=""):
         if found is True:
             break
         count -= 1
-        time.sleep(1)
+        wait.sleep(1)
     return found
 
 
@@ -705,7 +757,7 @@ def set_probation_timer(target, ptimer):
         + "/legato/systems/current/bin/legato start"
     )
     cmd_exit, _ = target.run(cmd, withexitstatus=1)
-    time.sleep(5)
+    wait.sleep(5)
     return cmd_exit
 
 
@@ -716,7 +768,7 @@ def reset_probation_timer(target):
         "/legato/systems/current/bin/legato start"
     )
     cmd_exit, _ = target.run(cmd, withexitstatus=1)
-    time.sleep(5)
+    wait.sleep(5)
     return cmd_exit
 
 
@@ -725,7 +777,7 @@ def full_legato_restart(target):
     exit, _ = target.run(cmd, withexitstatus=1)
     cmd = "/legato/systems/current/bin/legato start"
     exit, _ = target.run(cmd, withexitstatus=1)
-    time.sleep(10)  # give time for framework to start
+    wait.sleep(10)  # give time for framework to start
     return exit
 
 
@@ -776,7 +828,7 @@ def wait_for_system_to_start(target, indx, time_wait=100):
         if get_current_system_index(target) == indx:
             return 0
         time_past += 1
-        time.sleep(1)
+        wait.sleep(1)
     return 1
 
 
@@ -788,7 +840,7 @@ def reboot_target(target):
 
 # Legato tools on the host.
 def _wait_for_legato_start():
-    time.sleep(10)
+    wait.sleep(10)
 
 
 def update_legato_cwe(target, file_path, timeout=120):
@@ -855,6 +907,25 @@ class LegatoManager:
             self.target.target_name, app_name, app_path, should_fail, option, timeout
         )
 
+    def make_parallel(self, apps, option="", timeout=600, max_workers=None):
+        """Make Legato applications in parallel.
+
+        Args:
+            apps: list of (app_name, app_path)
+            option: extra mkapp options
+            timeout: timeout of each make
+            max_workers: maximum number of parallel builds
+
+        Returns:
+            list of the make stdout, in the order of apps
+
+        Raises:
+            AssertionError: If a make failed
+        """
+        return make_parallel(
+            self.target.target_name, apps, option, timeout, max_workers
+        )
+
     def install(self, app_name, app_path="", signed=False, should_fail=False):
         """Install a Legato application.
 
@@ -0,0 +1,288 @@
+"""Concurrent AT commands on several links.
+
+The AtDispatcher runs AT commands on several target_serial_at links
+(slink2, CMUX channels, target_at, ...) at once: a selector loop in a
+background thread waits for the answers of all the links, so that
+commands on N links take max(latency) instead of sum(latency).
+
+The commands have the semantics of com.run_at_cmd_and_check (OK, ERROR,
+TIMEOUT, expected responses, check) and return futures:
+
+.. code-block:: python
+
+    with AtDispatcher() as dispatcher:
+        futures = [dispatcher.submit(link, "AT+CSQ") for link in links]
+        responses = [future.result() for future in futures]
+
+The commands of one link run in the order of submission, one at a time.
+"""
+import collections
+import selectors
+import socket
+import threading
+import time
+from concurrent.futures import Future
+
+import pexpect
+
+from pytest_letp.lib import com
+from pytest_letp.lib import metrics
+from pytest_letp.lib import swilog
+from pytest_letp.lib.com_exceptions import ComException
+
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+
+class _AtCommand:
+    """AT command in progress on a link.
+
+    The response is matched by com.match_at_rsp, one step at a time: the
+    data of the link is matched without waiting when it is received, and
+    the TIMEOUT of the step when its deadline is reached.
+    """
+
+    def __init__(self, link, at_cmd, timeout, expect_rsp, check, eol, strict):
+        if expect_rsp and (strict or link.strict_match):
+            expect_rsp = ["\r\n".join(expect_rsp)]
+        self.link = link
+        self.raw_cmd = at_cmd.replace("\r", "").replace("\n", "")
+        self.at_cmd = at_cmd + eol if eol not in at_cmd else at_cmd
+        self.timeout = timeout
+        self.expect_rsp = expect_rsp
+        self.check = check
+        self.future = Future()
+        self.matcher = com.match_at_rsp(link, self.raw_cmd, expect_rsp)
+        self.patterns = self.received = None
+        self.start = self.deadline = None
+
+    def send(self):
+        """Send the command and match the data already received."""
+        com.clear_buffer(self.link)
+        swilog.debug("Send %s" % list(self.at_cmd))
+        self.start = time.perf_counter()
+        self.link.send(self.at_cmd)
+        return self._next_step(next(self.matcher))
+
+    def _next_step(self, patterns):
+        self.patterns = self.link.compile_pattern_list(patterns)
+        # The TIMEOUT of the step is only matched at its deadline.
+        self.received = [
+            (index, pattern)
+            for index, pattern in enumerate(self.patterns)
+            if pattern is not pexpect.TIMEOUT
+        ]
+        self.deadline = time.monotonic() + self.timeout
+        return self.receive()
+
+    def receive(self):
+        """Match the data of the link. Returns True when the command is done."""
+        try:
+            index = self.link.expect_list(
+                [pattern for _, pattern in self.received], timeout=0
+            )
+        except pexpect.TIMEOUT:
+            return False
+        return self._matched(self.received[index][0])
+
+    def expire(self):
+        """Match the data of the link or the timeout of the current step."""
+        index = self.link.expect_list(self.patterns, timeout=0)
+        try:
+            return self._matched(index)
+        except AssertionError as e:
+            return self.fail(e, timeout=self.patterns[index] is pexpect.TIMEOUT)
+
+    def _matched(self, index):
+        try:
+            patterns = self.matcher.send(index)
+        except StopIteration as stop:
+            return self.done(stop.value)
+        return self._next_step(patterns)
+
+    def _record(self, timeout=False):
+        if metrics.registry.enabled:
+            metrics.registry.record(
+                "run_at_cmd",
+                metrics.get_link_name(self.link),
+                time.perf_counter() - self.start,
+                timeout,
+            )
+
+    def done(self, rsp):
+        """Complete the command with its response."""
+        self._record()
+        self.future.set_result(rsp)
+        return True
+
+    def fail(self, error, timeout=False):
+        """Complete the command with an error, or None if not checked."""
+        self._record(timeout)
+        if self.check:
+            exc = ComException(
+                "{} didn't return after {} is sent".format(self.expect_rsp, self.at_cmd)
+            )
+            exc.__cause__ = error
+            self.future.set_exception(exc)
+        else:
+            if getattr(self.link, "before", None):
+                swilog.debug("Received:\n%s" % list(self.link.before))
+            self.future.set_result(None)
+        return True
+
+
+class AtDispatcher:
+    """Run AT commands on several links concurrently.
+
+    The selector loop runs in a background thread, started on the first
+    command; close stops it.
+    """
+
+    def __init__(self):
+        self._queues = collections.defaultdict(collections.deque)
+        self._current = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        self._wakeup_r, self._wakeup_w = socket.socketpair()
+        self._wakeup_r.setblocking(False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(
+        self,
+        link,
+        at_cmd,
+        timeout=20,
+        expect_rsp=None,
+        check=True,
+        eol="\r",
+        strict=False,
+    ):
+        """Queue an AT command on a link.
+
+        The arguments are those of com.run_at_cmd_and_check.
+
+        Returns:
+            Future of the response: the result of run_at_cmd_and_check, or
+            its ComException if check is True.
+        """
+        command = _AtCommand(link, at_cmd, timeout, expect_rsp, check, eol, strict)
+        with self._lock:
+            assert not self._closed, "The dispatcher is closed"
+            self._queues[link].append(command)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, daemon=True)
+                self._thread.start()
+        self._wakeup_w.send(b"\0")
+        return command.future
+
+    def run(self, commands, timeout=20, check=True):
+        """Run AT commands concurrently and wait for their responses.
+
+        Args:
+            commands: list of (link, AT command).
+            timeout: timeout of each command.
+            check: raise the ComException of a failed command.
+
+        Returns:
+            List of the responses, in the order of the commands.
+        """
+        futures = [
+            self.submit(link, at_cmd, timeout, check=check) for link, at_cmd in commands
+        ]
+        return [future.result() for future in futures]
+
+    def close(self):
+        """Stop the loop once the queued commands are done."""
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+        self._wakeup_w.send(b"\0")
+        if thread is not None:
+            thread.join()
+        self._wakeup_r.close()
+        self._wakeup_w.close()
+
+    def _start_next(self, link):
+        """Start the next commands of a link, until one waits for data."""
+        while True:
+            with self._lock:
+                queue = self._queues[link]
+                if not queue:
+                    self._current.pop(link, None)
+                    return
+                command = queue.popleft()
+            self._current[link] = command
+            try:
+                if not command.send():
+                    return
+            except Exception as e:  # pylint: disable=broad-except
+                if not command.future.done():
+                    command.fail(e)
+
+    def _loop(self):
+        selector = selectors.DefaultSelector()
+        selector.register(self._wakeup_r, selectors.EVENT_READ)
+        registered = set()
+        while True:
+            with self._lock:
+                idle = [link for link in self._queues if link not in self._current]
+                closed = self._closed and not any(self._queues.values())
+            for link in idle:
+                self._start_next(link)
+            for link in registered - set(self._current):
+                selector.unregister(link.child_fd)
+                registered.discard(link)
+            for link in set(self._current) - registered:
+                selector.register(link.child_fd, selectors.EVENT_READ, link)
+                registered.add(link)
+            if closed and not self._current:
+                break
+            deadlines = [command.deadline for command in self._current.values()]
+            wait_time = max(0, min(deadlines) - time.monotonic()) if deadlines else None
+            for key, _ in selector.select(wait_time):
+                if key.fileobj is self._wakeup_r:
+                    try:
+                        self._wakeup_r.recv(4096)
+                    except BlockingIOError:
+                        pass
+                    continue
+                self._read(key.data)
+            now = time.monotonic()
+            for link, command in list(self._current.items()):
+                if command.deadline <= now and self._step(command, command.expire):
+                    self._start_next(link)
+        selector.close()
+
+    def _read(self, link):
+        command = self._current[link]
+        if self._step(command, command.receive):
+            self._start_next(link)
+
+    @staticmethod
+    def _step(command, method, *args):
+        try:
+            return method(*args)
+        except Exception as e:  # pylint: disable=broad-except
+            if not command.future.done():
+                command.fail(e)
+            return True
+
+
+def run_at_cmds(commands, timeout=20, check=True):
+    """Run AT commands on several links concurrently.
+
+    Args:
+        commands: list of (link, AT command).
+        timeout: timeout of each command.
+        check: raise the ComException of a failed command.
+
+    Returns:
+        List of the responses, in the order of the commands.
+    """
+    with AtDispatcher() as dispatcher:
+        return dispatcher.run(commands, timeout, check)
@@ -23,8 +23,7 @@ Examples
         target.run_at_cmd("at+wdss=1,0", 20, [r"\+WDSI: 8"])
 """
 # pylint: disable=too-many-public-methods
-from time import sleep
-from pytest_letp.lib import swilog
+from pytest_letp.lib import swilog, wait
 from pytest_letp.lib.av_server import AVServer
 
 __copyright__ = "Copyright (C) Sierra Wireless Inc."
@@ -236,7 +235,7 @@ class AVManager:
             if result:
                 return AVResultVerifier.return_rsp(rsp, True, return_rsp)
             swilog.warning(f"Received {rsp} instead of {result}")
-            sleep(wait_time)
+            wait.sleep(wait_time)
         swilog.error(f"Did not receive {result} within {attempts} attempts")
         return AVResultVerifier.return_rsp(None, False, return_rsp)
 
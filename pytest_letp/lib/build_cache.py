@@ -0,0 +1,238 @@
+"""Content-addressed cache of the Legato application builds.
+
+The key of a build covers the adef name, which names the artifact, the
+sources of the application, the content of the search directories of the
+build flags (-i, -s, -c), the target type, the toolchain (Legato version,
+toolchain directory, mkapp) and the build flags. When the key matches, make copies the cached
+.update artifact instead of running mkapp.
+
+The cache is disabled unless test_run/build_cache is set.
+
+The entries are shared by the sessions running on the host. The builds
+of the same key are serialized by a lock file; the builds of different
+applications run in parallel (see app.make_parallel).
+"""
+import contextlib
+import hashlib
+import os
+import re
+import shlex
+import shutil
+import tempfile
+import threading
+
+from pytest_letp.lib import swilog
+from pytest_letp.pytest_test_config import TestConfig
+
+if os.name == "posix":
+    import fcntl
+else:
+    fcntl = None
+
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+OUTPUT_FILE = "mkapp.log"
+
+# Build directories and artifacts in the application sources.
+_IGNORED = re.compile(r"^(\..*|_build.*|.*\.update|__pycache__)$")
+_TOKEN = re.compile(r"[\w.${}/-]+")
+# mkapp options of the interface, source and component search directories.
+_SEARCH_OPTIONS = {
+    "-i": "--interface-search",
+    "-s": "--source-search",
+    "-c": "--component-search",
+}
+
+
+class BuildCache:
+    """Build cache in a directory.
+
+    Args:
+        cache_dir: directory of the cache entries.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        # Hash of the source files: {path: ((mtime, size), digest)}.
+        self._file_hashes = {}
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def _file_hash(self, path):
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        cached = self._file_hashes.get(path)
+        if cached and cached[0] == signature:
+            return cached[1]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 16), b""):
+                digest.update(block)
+        self._file_hashes[path] = (signature, digest.hexdigest())
+        return digest.hexdigest()
+
+    def _hash_tree(self, digest, root):
+        for dir_path, dir_names, file_names in os.walk(root):
+            dir_names[:] = sorted(d for d in dir_names if not _IGNORED.match(d))
+            for name in sorted(file_names):
+                if _IGNORED.match(name):
+                    continue
+                path = os.path.join(dir_path, name)
+                digest.update(os.path.relpath(path, root).encode())
+                digest.update(self._file_hash(path).encode())
+
+    @staticmethod
+    def get_sources(adef_path):
+        """Get the source directories and files of an application.
+
+        They are the directory of the adef, and the relative or
+        environment paths of the adef (components, bundled files) outside
+        of this directory. The absolute paths are those of the target.
+        """
+        adef_dir = os.path.dirname(os.path.abspath(adef_path))
+        sources = [adef_dir]
+        with open(adef_path, encoding="utf-8", errors="replace") as f:
+            content = f.read()
+        for token in sorted(set(_TOKEN.findall(content))):
+            if token.startswith("/"):
+                continue
+            path = os.path.normpath(os.path.join(adef_dir, os.path.expandvars(token)))
+            if (
+                path in sources
+                or not os.path.exists(path)
+                or path == os.environ.get("LEGATO_ROOT")
+                or (adef_dir + os.sep).startswith(path + os.sep)
+                or path.startswith(adef_dir + os.sep)
+            ):
+                continue
+            sources.append(path)
+        return sources
+
+    @staticmethod
+    def get_search_dirs(flags):
+        """Get the search directories of the mkapp flags, in their order."""
+        search_dirs = []
+        args = shlex.split(flags)
+        for idx, arg in enumerate(args):
+            option, sep, value = arg.partition("=")
+            if option in _SEARCH_OPTIONS.values() and sep:
+                path = value
+            elif arg in _SEARCH_OPTIONS and idx + 1 < len(args):
+                path = args[idx + 1]
+            else:
+                continue
+            path = os.path.abspath(os.path.expandvars(path))
+            if path not in search_dirs:
+                search_dirs.append(path)
+        return search_dirs
+
+    @staticmethod
+    def get_toolchain(target_type):
+        """Get the toolchain identification of a target type."""
+        legato_root = os.environ.get("LEGATO_ROOT", "")
+        version = ""
+        version_file = os.path.join(legato_root, "version")
+        if os.path.isfile(version_file):
+            with open(version_file, encoding="utf-8", errors="replace") as f:
+                version = f.read().strip()
+        toolchain = [legato_root, version, shutil.which("mkapp") or ""]
+        for suffix in ("TOOLCHAIN_DIR", "TOOLCHAIN_PREFIX"):
+            toolchain.append(
+                os.environ.get("{}_{}".format(target_type.upper(), suffix), "")
+            )
+        return toolchain
+
+    def get_key(self, adef_path, target_type, flags):
+        """Get the key of a build.
+
+        Args:
+            adef_path: path of the adef.
+            target_type: type of target (wp85, ar759x, ...)
+            flags: mkapp arguments other than the adef.
+        """
+        digest = hashlib.sha256()
+        # The adefs of a directory share their sources, but not their artifact.
+        values = [os.path.basename(adef_path), target_type, flags]
+        for value in values + self.get_toolchain(target_type):
+            digest.update(value.encode() + b"\0")
+        sources = self.get_sources(adef_path)
+        for search_dir in self.get_search_dirs(flags):
+            if search_dir not in sources and os.path.isdir(search_dir):
+                sources.append(search_dir)
+        for source in sources:
+            digest.update(source.encode() + b"\0")
+            if os.path.isdir(source):
+                self._hash_tree(digest, source)
+            else:
+                digest.update(self._file_hash(source).encode())
+        return digest.hexdigest()
+
+    def _entry(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    @contextlib.contextmanager
+    def lock(self, key):
+        """Serialize the builds of a key, in the process and on the host."""
+        with self._locks_lock:
+            thread_lock = self._locks.setdefault(key, threading.Lock())
+        with thread_lock:
+            if fcntl is None:
+                yield
+                return
+            entry = self._entry(key)
+            os.makedirs(os.path.dirname(entry), exist_ok=True)
+            with open(entry + ".lock", "w") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def fetch(self, key, artifact):
+        """Copy the cached artifact of a key to the artifact path.
+
+        Returns:
+            The mkapp output of the cached build, None if not in the cache.
+        """
+        entry = self._entry(key)
+        cached = os.path.join(entry, os.path.basename(artifact))
+        if not os.path.isfile(cached):
+            return None
+        shutil.copyfile(cached, artifact)
+        with open(os.path.join(entry, OUTPUT_FILE), encoding="utf-8") as f:
+            return f.read()
+
+    def store(self, key, artifact, output):
+        """Store the artifact and the mkapp output of a build."""
+        entry = self._entry(key)
+        if os.path.isdir(entry):
+            return
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        tmp_entry = tempfile.mkdtemp(dir=os.path.dirname(entry))
+        try:
+            shutil.copyfile(
+                artifact, os.path.join(tmp_entry, os.path.basename(artifact))
+            )
+            with open(os.path.join(tmp_entry, OUTPUT_FILE), "w", encoding="utf-8") as f:
+                f.write(output)
+            os.rename(tmp_entry, entry)
+        except OSError as e:
+            swilog.warning(
+                "Unable to store {} in the build cache: {}".format(artifact, e)
+            )
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+
+
+_caches = {}
+
+
+def get_build_cache():
+    """Get the build cache of the session config, None if disabled."""
+    if TestConfig.default_cfg is None:
+        return None
+    cache_dir = TestConfig.default_cfg.get_build_cache_dir()
+    if not cache_dir:
+        return None
+    if cache_dir not in _caches:
+        _caches[cache_dir] = BuildCache(cache_dir)
+    return _caches[cache_dir]
@@ -0,0 +1,263 @@
+"""CMUX channels of the AT port, pooled across the tests.
+
+The CmuxManager keeps the gsmMuxd muxer up for the session and leases its
+channels to the tests:
+
+- the muxer is started on the first lease, and restarted when it is dead,
+  when its channels do not answer AT (target reboot) or when the port or
+  the channel count change;
+- the muxer keeps the AT port in CMUX mode: it is stopped before the
+  tests which do not use the channels (see the cmux_exclusive fixture);
+- the channels stay open between the leases, their AT state is reset at
+  each lease;
+- run_parallel runs AT commands on several channels at once, and
+  measures the throughput of each channel.
+"""
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from pytest_letp.lib import com
+from pytest_letp.lib import swilog
+from pytest_letp.lib import wait
+
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+CMUX_PREFIX = "/dev/cmux"
+# Timeout of the AT probe of a channel before its lease, in seconds.
+PROBE_TIMEOUT = 2
+# AT commands resetting the state of a channel at each lease.
+RESET_AT_CMDS = ["ATZ", "ATE1"]
+
+
+class ChannelStats:
+    """AT traffic of a channel during run_parallel."""
+
+    def __init__(self):
+        self.commands = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.elapsed = 0.0
+        self.responses = []
+
+    @property
+    def throughput(self):
+        """Bytes sent and received per second."""
+        if not self.elapsed:
+            return 0.0
+        return (self.bytes_sent + self.bytes_received) / self.elapsed
+
+    @property
+    def commands_per_second(self):
+        """AT commands per second."""
+        return self.commands / self.elapsed if self.elapsed else 0.0
+
+    def to_dict(self):
+        """Get the JSON representation."""
+        return {
+            "commands": self.commands,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "elapsed_s": round(self.elapsed, 6),
+            "throughput_bps": round(self.throughput, 1),
+        }
+
+
+class CmuxManager:
+    """Muxer of the AT port, with channels leased to the tests.
+
+    Args:
+        run_cmd: function running a host command list as super user,
+            e.g. the sudo fixture.
+        prefix: path prefix of the channel devices.
+        start_timeout: time to wait for the channel devices, in seconds.
+        probe_timeout: timeout of the AT probe of a channel, in seconds.
+    """
+
+    def __init__(
+        self,
+        run_cmd=None,
+        prefix=CMUX_PREFIX,
+        start_timeout=10,
+        probe_timeout=PROBE_TIMEOUT,
+    ):
+        self.run_cmd = run_cmd
+        self.prefix = prefix
+        self.start_timeout = start_timeout
+        self.probe_timeout = probe_timeout
+        self.at_port = None
+        self.baudrate = None
+        self.count = 0
+        self.restarts = 0
+        self._channels = []
+        self._leased = set()
+        self._lock = threading.Lock()
+
+    def channel_path(self, index):
+        """Device path of a channel."""
+        return "{}{}".format(self.prefix, index)
+
+    def _start_muxer(self):
+        cmd = ["gsmMuxd", "-w", "-p", self.at_port, "-b", str(self.baudrate)]
+        cmd += ["-s", self.prefix] + ["/dev/ptmx"] * self.count
+        self.run_cmd(cmd)
+
+    def _stop_muxer(self):
+        try:
+            self.run_cmd(["pkill", "--full", "gsmMuxd"])
+        except subprocess.CalledProcessError as e:
+            swilog.debug(e)
+
+    def _muxer_running(self):
+        rsp = subprocess.run(
+            ["pgrep", "--full", "gsmMuxd"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=False,
+        )
+        return rsp.returncode == 0
+
+    def _channels_ready(self):
+        return all(
+            os.access(self.channel_path(i), os.R_OK | os.W_OK)
+            for i in range(self.count)
+        )
+
+    def is_alive(self):
+        """Check that the muxer runs and its channels are present."""
+        return bool(self.count) and self._muxer_running() and self._channels_ready()
+
+    def start(self, at_port, baudrate, count):
+        """Start the muxer on the AT port, with count channels."""
+        self.at_port, self.baudrate, self.count = at_port, baudrate, count
+        swilog.info("Start the CMUX muxer on {} ({} channels)".format(at_port, count))
+        self._start_muxer()
+        assert wait.wait_until(
+            self._channels_ready, timeout=self.start_timeout
+        ), "CMUX channels {}0..{} not ready".format(self.prefix, count - 1)
+
+    def stop(self):
+        """Close the channels and stop the muxer."""
+        self._close_channels()
+        if self.count:
+            self._stop_muxer()
+        self.count = 0
+
+    def _close_channels(self):
+        for channel in self._channels:
+            try:
+                channel.close()
+            except Exception as e:  # pylint: disable=broad-except
+                swilog.debug(e)
+        self._channels = []
+        self._leased.clear()
+
+    def _channel_answers(self):
+        """Probe a free channel with AT.
+
+        A module reboot leaves the muxer running with dead channels.
+        """
+        free = [i for i in range(self.count) if i not in self._leased]
+        if not free:
+            return True
+        rsp = com.run_at_cmd_and_check(
+            self._get_channel(free[0]), "AT", self.probe_timeout, check=False
+        )
+        return rsp is not None
+
+    def ensure(self, at_port, baudrate, count):
+        """Start or restart the muxer if needed."""
+        if (
+            self.count >= count
+            and (self.at_port, self.baudrate) == (at_port, baudrate)
+            and self.is_alive()
+            and self._channel_answers()
+        ):
+            return
+        if self.count:
+            swilog.warning("CMUX muxer dead or reconfigured: restart it")
+            self.restarts += 1
+            self.stop()
+        self.start(at_port, baudrate, count)
+
+    def _open_channel(self, index):
+        return com.target_serial_at(
+            dev_tty=self.channel_path(index), baudrate=self.baudrate, rtscts=False
+        )
+
+    def _get_channel(self, index):
+        """Get the open channel of an index."""
+        while len(self._channels) < self.count:
+            self._channels.append(None)
+        if self._channels[index] is None:
+            self._channels[index] = self._open_channel(index)
+        return self._channels[index]
+
+    @staticmethod
+    def reset_channel(channel):
+        """Reset the AT state of a channel."""
+        com.clear_buffer(channel)
+        for at_cmd in RESET_AT_CMDS:
+            com.run_at_cmd_and_check(channel, at_cmd, timeout=5, check=False)
+
+    def lease(self, at_port, baudrate, count):
+        """Lease count channels, reset.
+
+        Returns:
+            List of target_serial_at, to give back with release.
+        """
+        with self._lock:
+            self.ensure(at_port, baudrate, count)
+            free = [i for i in range(self.count) if i not in self._leased]
+            assert len(free) >= count, "Only {} free CMUX channels".format(len(free))
+            leased = []
+            for index in free[:count]:
+                self._leased.add(index)
+                leased.append(self._get_channel(index))
+        for channel in leased:
+            self.reset_channel(channel)
+        return leased
+
+    def release(self, channels):
+        """Give back leased channels."""
+        with self._lock:
+            for channel in channels:
+                if channel in self._channels:
+                    self._leased.discard(self._channels.index(channel))
+
+    @staticmethod
+    def run_parallel(channels, at_cmds, timeout=20):
+        """Run AT commands on channels at once.
+
+        Args:
+            channels: list of channels.
+            at_cmds: list of AT commands run on each channel, or list of
+                lists of AT commands, one per channel.
+            timeout: timeout of each command.
+
+        Returns:
+            List of ChannelStats, one per channel.
+        """
+        if at_cmds and isinstance(at_cmds[0], str):
+            at_cmds = [at_cmds] * len(channels)
+
+        def run(channel, cmds):
+            stats = ChannelStats()
+            start = time.perf_counter()
+            for at_cmd in cmds:
+                rsp = com.run_at_cmd_and_check(channel, at_cmd, timeout)
+                stats.commands += 1
+                stats.bytes_sent += len(at_cmd) + 1
+                stats.bytes_received += len(rsp or "")
+                stats.responses.append(rsp)
+            stats.elapsed = time.perf_counter() - start
+            return stats
+
+        with ThreadPoolExecutor(max_workers=len(channels) or 1) as executor:
+            futures = [
+                executor.submit(run, channel, cmds)
+                for channel, cmds in zip(channels, at_cmds)
+            ]
+            return [future.result() for future in futures]
@@ -9,11 +9,15 @@ import serial
 import serial.tools.list_ports as ser_lst
 import struct
 import sys
+import threading
 import time
 import stat
 
 from enum import Enum
+from pexpect.utils import select_ignore_interrupts
+from pytest_letp.lib import metrics
 from pytest_letp.lib import swilog
+from pytest_letp.lib import wait
 from pytest_letp.lib.com_exceptions import ComException
 from pytest_letp.lib.misc import in_container
 
@@ -27,6 +31,7 @@ elif os.name == "posix":
     from pexpect.fdpexpect import fdspawn as SerialSpawn
     import termios
     import fcntl
+    from pytest_letp.lib.modem_lines import ModemLineMonitor
 
     PROMPT_swi_qct = "root@.+:.+#"
 __copyright__ = "Copyright (C) Sierra Wireless Inc."
@@ -52,6 +57,8 @@ TIOCM_DTR_str = struct.pack("L", TIOCM_DTR)
 
 # Size of the pexpect maxread
 PEXPECT_MAXREAD = 2000
+# Read size of the high speed mode of ttyspawn.
+HIGH_SPEED_MAXREAD = 65536
 
 # Terminal size to avoid \n after 80 characters
 TTY_SIZE = 500
@@ -292,7 +299,7 @@ class ComPortDevice:
                 swilog.info("USB device {} is present!".format(self.name))
                 return True
 
-            time.sleep(1)
+            wait.sleep(1)
             time_elapsed = time.time()
 
         return False
@@ -304,6 +311,7 @@ def clear_buffer(target):
         target.match.group(0)
 
 
+@metrics.timed("run_at_cmd")
 def run_at_cmd_and_check(
     target, at_cmd, timeout=20, expect_rsp=None, check=True, eol="\r", strict=False
 ):
@@ -346,58 +354,76 @@ def run_at_cmd_and_check(
     swilog.debug("Send %s" % list(at_cmd))
     target.send(at_cmd)
     try:
-        if not expect_rsp:
-            regex_ok = r"(?P<rsp>.*OK)"
-            regex_error = r"(?P<rsp>.*ERROR)"
-            # Regex to search for the command + rsp + OK.
-            # This is to avoid matching to previous command responses in the buffer.
-            # Linux targets do not have the command echoed in AT port, this is for rtos.
-            regex_ok_with_cmd = r"({}\s){}".format(re.escape(raw_cmd), regex_ok)
-
-            rsp = target.expect(
-                [
-                    regex_ok_with_cmd,
-                    regex_ok,
-                    regex_error,
-                    pexpect.TIMEOUT,
-                    pexpect.EOF,
-                ],
-                timeout=timeout,
-            )
-            assert rsp != 2, "Command %s error" % raw_cmd
-            assert rsp != 3, "Command %s timeout. Received:\n%s" % (
-                raw_cmd,
-                list(target.before),
-            )
-            assert rsp in (0, 1, 4), "No answer from command %s. Received:\n%s" % (
-                raw_cmd,
-                list(target.before),
-            )
-            return target.match.group("rsp")
-        else:
-            buf = ""
-            for expect_pattern in expect_rsp:
-                rsp = target.expect([pexpect.TIMEOUT, expect_pattern], timeout=timeout)
-                if rsp == 0:
-                    swilog.debug(
-                        "Did not received %s. Received: \n%s"
-                        % (expect_pattern, list(target.before))
-                    )
-                    assert 0, "timeout from command %s" % raw_cmd
-                buf += target.before
-                if isinstance(target.after, str):
-                    buf += target.after
-            return buf
+        matcher = match_at_rsp(target, raw_cmd, expect_rsp)
+        patterns = next(matcher)
+        while True:
+            patterns = matcher.send(target.expect(patterns, timeout=timeout))
+    except StopIteration as stop:
+        return stop.value
     except Exception as e:
         if check:
             raise ComException(
                 "{} didn't return after {} is sent".format(expect_rsp, at_cmd)
             )
-        if getattr(target, "before"):
+        if getattr(target, "before", None):
             swilog.debug("Received:\n%s" % list(target.before))
         return None
 
 
+def match_at_rsp(target, raw_cmd, expect_rsp):
+    """Match the response of an AT command, one expect step at a time.
+
+    This generator yields the pattern list of each step, is sent the
+    index of the pattern matched on the target, and returns the response
+    of the command.
+
+    :param target: target fixture
+    :param raw_cmd: AT command, without end of line.
+    :param expect_rsp: List of expected patterns, in order.
+                       If void, wait for OK or ERROR.
+
+    :raises: AssertionError if command error or timeout
+    """
+    if not expect_rsp:
+        regex_ok = r"(?P<rsp>.*OK)"
+        regex_error = r"(?P<rsp>.*ERROR)"
+        # Regex to search for the command + rsp + OK.
+        # This is to avoid matching to previous command responses in the buffer.
+        # Linux targets do not have the command echoed in AT port, this is for rtos.
+        regex_ok_with_cmd = r"({}\s){}".format(re.escape(raw_cmd), regex_ok)
+
+        rsp = yield [
+            regex_ok_with_cmd,
+            regex_ok,
+            regex_error,
+            pexpect.TIMEOUT,
+            pexpect.EOF,
+        ]
+        assert rsp != 2, "Command %s error" % raw_cmd
+        assert rsp != 3, "Command %s timeout. Received:\n%s" % (
+            raw_cmd,
+            list(target.before),
+        )
+        assert rsp in (0, 1, 4), "No answer from command %s. Received:\n%s" % (
+            raw_cmd,
+            list(target.before),
+        )
+        return target.match.group("rsp")
+    buf = ""
+    for expect_pattern in expect_rsp:
+        rsp = yield [pexpect.TIMEOUT, expect_pattern]
+        if rsp == 0:
+            swilog.debug(
+                "Did not received %s. Received: \n%s"
+                % (expect_pattern, list(target.before))
+            )
+            assert 0, "timeout from command %s" % raw_cmd
+        buf += target.before
+        if isinstance(target.after, str):
+            buf += target.after
+    return buf
+
+
 def setup_linux_login(target):
     """Handle login nagger for linux."""
     status = target.expect([pexpect.TIMEOUT, target.PROMPT, "Do nothing"], timeout=1)
@@ -411,8 +437,11 @@ def setup_linux_login(target):
         target.sendcontrol("x")
         # Just in case it is in an application
         target.sendcontrol("c")
-        # Just in case it is rebooting, wait a little
-        time.sleep(10)
+        # Just in case it is rebooting, wait for the console
+        patterns = [target.PROMPT]
+        if getattr(target, "LOGIN", None):
+            patterns.append(target.LOGIN)
+        wait.wait_for_pattern(target, patterns, 10, probe="\r")
     if status == 2:
         # Login nagger detected, disabling
         target.sendline("3")
@@ -493,6 +522,85 @@ class ttyspawn(SerialSpawn):
         self.logfile_read = TTYLog("IN", False)
         self.logfile_send = TTYLog("OUT", True)
 
+    def set_high_speed(
+        self,
+        enable=True,
+        maxread=HIGH_SPEED_MAXREAD,
+        vmin=0,
+        vtime=0,
+        bounded_search=True,
+    ):
+        """Read in large chunks, for baud rates of 921600 and more.
+
+        The data is still decoded incrementally by pexpect: a multibyte
+        character split between two reads is not replaced.
+
+        Args:
+            enable: enable or disable the high speed mode.
+            maxread: maximum number of bytes per read.
+            vmin: VMIN of the port, minimum number of bytes of a read.
+            vtime: VTIME of the port, in tenths of second: a read returns
+                after this silence between two bytes.
+            bounded_search: search the patterns of expect in the last
+                2 * maxread characters only, instead of all the data
+                received since the last match.
+        """
+        self.maxread = maxread if enable else PEXPECT_MAXREAD
+        # pexpect sleeps 100 us after each read by default.
+        self.delayafterread = None if enable else 0.0001
+        self.searchwindowsize = 2 * maxread if enable and bounded_search else None
+        tty = getattr(self, "tty", None)
+        if isinstance(tty, SerialPort):
+            if enable:
+                tty.set_read_timing(vmin, vtime)
+            else:
+                tty.set_read_timing(0, 0)
+
+    def read_raw(self, size=None, timeout=-1):
+        """Read raw bytes, without decoding nor logging.
+
+        The data already read by expect and not consumed is returned
+        first.
+
+        Args:
+            size: maximum number of bytes, maxread by default.
+            timeout: time to wait for data in seconds, self.timeout if -1.
+
+        Returns:
+            The bytes read, b"" if the timeout is reached.
+
+        Raises:
+            pexpect.EOF: the port is closed.
+        """
+        size = size or self.maxread
+        pending = self._take_pending(size)
+        if pending:
+            return pending
+        if os.name != "posix":
+            try:
+                return self.read_nonblocking(size, timeout).encode("utf-8")
+            except pexpect.TIMEOUT:
+                return b""
+        if timeout == -1:
+            timeout = self.timeout
+        if not select_ignore_interrupts([self.child_fd], [], [], timeout)[0]:
+            return b""
+        try:
+            data = os.read(self.child_fd, size)
+        except OSError as e:
+            raise pexpect.EOF(e)
+        if not data:
+            raise pexpect.EOF("End of file on {}".format(self.child_fd))
+        return data
+
+    def _take_pending(self, size):
+        """Take the buffered data, and the bytes of a split character."""
+        pending = self.buffer.encode("utf-8") + self._decoder.getstate()[0]
+        self._decoder.reset()
+        # Keep the rest in the buffer.
+        self.buffer = self._decoder.decode(pending[size:])
+        return pending[:size]
+
     # Ubuntu 14.04 does not have __enter__ and __exit__ in pexpect, so define
     # them here.
     def __enter__(self):
@@ -559,6 +667,7 @@ class ttyspawn(SerialSpawn):
             return 0
         return self.send(chr(d[char]))
 
+    @metrics.timed("expect", check_after=True)
     def expect(self, *args, **kwargs):
         """Intermediate function to expect.
 
@@ -569,6 +678,7 @@ class ttyspawn(SerialSpawn):
         except Exception as e:
             raise ComException(e)
 
+    @metrics.timed("expect", check_after=True)
     def expect_exact(self, *args, **kwargs):
         """Intermediate function to expect_exact.
 
@@ -617,6 +727,60 @@ class ttyspawn(SerialSpawn):
             swilog.debug(e)
 
 
+class PortRegistry:
+    """Cache of the serial ports of the host.
+
+    serial.tools.list_ports.comports scans sysfs for every device: the
+    list is kept until a device node is added to or removed from /dev
+    (hotplug), or for ttl seconds.
+    """
+
+    DEV_DIR = "/dev"
+
+    def __init__(self, ttl=2.0):
+        self.ttl = ttl
+        self.scans = 0
+        self._devices = None
+        self._stamp = None
+        self._expiry = 0
+        self._lock = threading.Lock()
+
+    def _dev_stamp(self):
+        try:
+            return os.stat(self.DEV_DIR).st_mtime_ns
+        except OSError:
+            return None
+
+    def invalidate(self):
+        """Scan the ports again on the next lookup."""
+        with self._lock:
+            self._devices = None
+
+    def devices(self):
+        """Get the device names of the serial ports."""
+        stamp = self._dev_stamp()
+        with self._lock:
+            if (
+                self._devices is None
+                or stamp != self._stamp
+                or time.monotonic() >= self._expiry
+            ):
+                self._devices = [elmt.device for elmt in ser_lst.comports()]
+                self._stamp = stamp
+                self._expiry = time.monotonic() + self.ttl
+                self.scans += 1
+            return list(self._devices)
+
+    def contains(self, device_name):
+        """Check if a device name matches a serial port."""
+        return any(
+            device_name in device or device in device_name for device in self.devices()
+        )
+
+
+port_registry = PortRegistry()
+
+
 class SerialPort:
     """Class providing serial port configuration."""
 
@@ -672,29 +836,37 @@ class SerialPort:
             port = SerialPort(device, baudrate, rtscts)
         return port
 
+    @staticmethod
+    def is_char_device(device_name):
+        """Check if the device name is a character device, without scanning."""
+        try:
+            return stat.S_ISCHR(os.stat(device_name).st_mode)
+        except OSError:
+            return False
+
     @staticmethod
     def is_valid_port(device_name):
         """Check if the given device name is a valid port."""
         if device_name and isinstance(device_name, str):
             if "/dev/mhitty" in device_name:
                 return True
-            for elmt in ser_lst.comports():
-                if device_name in elmt.device or elmt.device in device_name:
-                    return True
-            else:
-                swilog.debug(f"{device_name} is not in available comports.")
-                device_stat = None
-                try:
-                    device_stat = os.stat(device_name)
-                except OSError:
-                    pass
-
-                if device_stat and stat.S_ISCHR(device_stat.st_mode):
-                    return True
+            if SerialPort.is_char_device(device_name):
+                return True
+            if port_registry.contains(device_name):
+                return True
+            swilog.debug(f"{device_name} is not in available comports.")
             if in_container() and os.access(device_name, os.R_OK | os.W_OK):
                 return True
         return False
 
+    @staticmethod
+    def is_same_device(device_name, fd):
+        """Check that an opened fd is still the device of a device name."""
+        try:
+            return os.stat(device_name).st_rdev == os.fstat(fd).st_rdev
+        except (OSError, TypeError):
+            return False
+
     def __init__(self, device, baudrate, rtscts):
         """Instantiate serial port wrapper.
 
@@ -704,6 +876,7 @@ class SerialPort:
         """
         self._device = device
         self._baudrate = None
+        self._vmin = self._vtime = 0
         swilog.debug(
             "Init of {}, baudrate [{}], rtscts [{}]".format(
                 self._device, baudrate, rtscts
@@ -731,6 +904,19 @@ class SerialPort:
         if self._baudrate not in self.BAUD:
             raise ComException("Missing baudrate configuration for {}".format(device))
 
+    def set_read_timing(self, vmin, vtime):
+        """Set VMIN and VTIME of the port.
+
+        A read of a blocking port returns after vmin bytes, or after
+        vtime tenths of second of silence between two bytes.
+        """
+        self._vmin, self._vtime = vmin, vtime
+        if os.name == "posix":
+            attr = termios.tcgetattr(self.fd)
+            attr[self.CC][termios.VMIN] = vmin
+            attr[self.CC][termios.VTIME] = vtime
+            termios.tcsetattr(self.fd, termios.TCSANOW, attr)
+
     def flush(self):
         """Flush serial port input and output buffers."""
         termios.tcflush(self.fd, termios.TCIOFLUSH)
@@ -776,7 +962,9 @@ class SerialPort:
             self.fd, termios.TCSANOW, [iflag, oflag, cflag, lflag, ispeed, ospeed, cc]
         )
         self.flush()
-        time.sleep(0.1)
+        # Settle time of the line at the new speed: termios reports the new
+        # speed at once, so there is no condition to wait on.
+        wait.sleep(0.1)
 
     @property
     def rtscts(self):
@@ -822,6 +1010,8 @@ class SerialPort:
             self._tty_attr[self.OFLAG] = 0
             self._tty_attr[self.LFLAG] = 0
             self._tty_attr[self.CC] = [0] * 32
+            self._tty_attr[self.CC][termios.VMIN] = self._vmin
+            self._tty_attr[self.CC][termios.VTIME] = self._vtime
             if not baudrate:
                 self._tty_attr[self.CFLAG] = termios.CS8 | (
                     self._tty_attr[self.CFLAG] & termios.CBAUD
@@ -937,6 +1127,7 @@ class target_qct:
                 raise CommandFailedException(msg)
         return rsp.strip("\r\n")
 
+    @metrics.timed("run")
     def run(self, cmd, timeout=-1, local_echo=True, withexitstatus=False, check=True):
         """Intermediate function to run.
 
@@ -947,6 +1138,7 @@ class target_qct:
         except Exception as e:
             raise ComException(e)
 
+    @metrics.timed("login")
     def login(self, attempts=10):
         """Login to target cli."""
         for _ in range(attempts):
@@ -959,10 +1151,12 @@ class target_qct:
                 return
         assert False, "Impossible to send command stty to target"
 
+    @metrics.timed("reboot")
     def reboot(self, timeout=60, login=True):
         self.sendline("reboot")
         self.wait_for_reboot(timeout, login)
 
+    @metrics.timed("wait_for_reboot")
     def wait_for_reboot(self, timeout=60, login=True):
         assert self.wait_for_device_down(timeout=timeout) == 0
         assert self.wait_for_device_up(timeout=timeout) == 0, "No login after reboot"
@@ -994,7 +1188,7 @@ class target_qct:
             status = self.expect([pexpect.TIMEOUT, self.LOGIN, self.PROMPT], sleep_time)
             if status == 0:
                 return 0
-            time.sleep(sleep_time)
+            wait.sleep(sleep_time)
         return 1
 
     def wait_for_device(self, down, timeout=60):
@@ -1105,6 +1299,7 @@ class target_at:
     def login(self):
         """Login to target_at."""
 
+    @metrics.timed("reboot")
     def reboot(self, timeout=60, power_supply=None, cmd="AT+CFUN=1,1\r"):
         """Reboot target via target_at."""
         if not power_supply:
@@ -1184,6 +1379,7 @@ class target_serial_at(target_at, ttyspawn):
                 "Unable to open tty %s baudrate[%d] rtscts[%s]"
                 % (self.dev_tty, bd, self.rtscts)
             )
+        self._stop_line_monitor()
         ttyspawn.__init__(self, fd=self.tty.fd, **self.save_kwargs)
         target_at.__init__(self, self.dev_tty, bd, rtscts)
 
@@ -1223,6 +1419,44 @@ class target_serial_at(target_at, ttyspawn):
         s = fcntl.ioctl(self.tty.fd, TIOCMGET, TIOCM_zero_str)
         return struct.unpack("I", s)[0] & TIOCM_CD != 0
 
+    @property
+    def line_monitor(self):
+        """Monitor of the modem lines, started on the first access.
+
+        Returns:
+            modem_lines.ModemLineMonitor recording the edges of the CTS,
+            DSR, RI and CD lines.
+        """
+        monitor = getattr(self, "_line_monitor", None)
+        if monitor is None:
+            monitor = self._line_monitor = ModemLineMonitor(self.tty.fd)
+            monitor.start()
+        return monitor
+
+    def wait_for_line_change(self, lines=("ri",), state=None, timeout=10):
+        """Wait for a change of modem lines, without polling.
+
+        Args:
+            lines: names of the lines: cts, dsr, ri or cd.
+            state: new state of the line, any by default.
+            timeout: timeout in seconds.
+
+        Returns:
+            The modem_lines.Edge of the change, or None on timeout.
+        """
+        return self.line_monitor.wait_for_edge(lines, state, timeout)
+
+    def _stop_line_monitor(self):
+        monitor = getattr(self, "_line_monitor", None)
+        if monitor is not None:
+            monitor.stop()
+            self._line_monitor = None
+
+    def close(self):
+        """Stop the modem line monitor and close the serial connection."""
+        self._stop_line_monitor()
+        super().close()
+
 
 class target_telnet_at(target_at):
     """Wrap fdPExpect to hold reference to file object.
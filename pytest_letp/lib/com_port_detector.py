@@ -1,12 +1,12 @@
 """com port detector library."""
 import os
-import time
 
 import pexpect
 import serial.tools.list_ports
 
 from pytest_letp.lib import com
 from pytest_letp.lib import swilog
+from pytest_letp.lib import wait
 
 __copyright__ = "Copyright (C) Sierra Wireless Inc."
 
@@ -200,6 +200,6 @@ class ComPortDetector:
             swilog.info(
                 f"Wait for {str(max_wait_time)} seconds before the next retry..."
             )
-            time.sleep(max_wait_time)
+            wait.sleep(max_wait_time)
 
         return None
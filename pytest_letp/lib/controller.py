@@ -1,20 +1,31 @@
 """Controller for external equipment."""
+import contextlib
 import os
+import re
 import sys
-import time
+import threading
 
 import pexpect
 import pexpect.fdpexpect
 
 from pytest_letp.lib import com
 from pytest_letp.lib import swilog
+from pytest_letp.lib import wait
 from pytest_letp.lib import com_port_detector
 
+if os.name == "posix":
+    import fcntl
+else:
+    fcntl = None
 
 __copyright__ = "Copyright (C) Sierra Wireless Inc."
 
 available_ctrl = {}
 
+# Locks of the relay boards, by serial port or network address.
+_board_locks = {}
+_board_locks_lock = threading.Lock()
+
 
 def register(name, ctrl_class):
     """Register controller classes."""
@@ -124,18 +135,174 @@ class power_supply(controller):  # noqa: N801
         assert 0, "Not implemented"
 
     def cycle(self, nb=-1, delay=2):
-        """Cycle power supply."""
+        """Cycle power supply.
+
+        The delay is a hold time for the module to be powered off, not a
+        condition to wait on: the relay ports cycle the same way.
+        """
         self.off(nb)
-        time.sleep(delay)
+        wait.sleep(delay)
         self.on(nb)
 
 
+class RelaySession:
+    """Command session on a Numato relay board, shared by its ports.
+
+    The commands are pipelined: the commands of execute, or of a batch
+    block, are sent in one write, then their acknowledgements (">") are
+    parsed in order.
+
+    The users of a board are serialized by a lock: the threads of the
+    process by the lock of the board key, the processes of the host by a
+    lock on the serial port.
+
+    Args:
+        io: serial or telnet link to the board.
+        key: serial port or network address of the board.
+        timeout: timeout of each acknowledgement, in seconds.
+    """
+
+    def __init__(self, io, key=None, timeout=5):
+        self.io = io
+        self.timeout = timeout
+        if key is None:
+            self._lock = threading.RLock()
+        else:
+            with _board_locks_lock:
+                self._lock = _board_locks.setdefault(key, threading.RLock())
+        self._depth = 0
+        # Commands and debounce of the current batch.
+        self._pending = None
+        self._debounce = 0
+
+    def _fd(self):
+        if fcntl is None:
+            return None
+        fd = getattr(getattr(self.io, "tty", None), "fd", None)
+        return fd if isinstance(fd, int) else None
+
+    @contextlib.contextmanager
+    def locked(self):
+        """Lock the board for a sequence of commands."""
+        with self._lock:
+            fd = self._fd() if self._depth == 0 else None
+            if fd is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if fd is not None:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def sync(self):
+        """Wait for the prompt of the board, to align the acknowledgements."""
+        with self.locked():
+            self.io.send("\r")
+            self.io.expect([">", pexpect.TIMEOUT], 1)
+            com.clear_buffer(self.io)
+
+    def _run(self, commands, debounce):
+        swilog.debug("numato {}".format(" | ".join(commands)))
+        self.io.send("".join("{}\r".format(cmd) for cmd in commands))
+        responses = []
+        for _ in commands:
+            self.io.expect(">", self.timeout)
+            responses.append(self.io.before)
+            swilog.debug(self.io.before)
+        wait.sleep(debounce / 1000)
+        return responses
+
+    def execute(self, commands, debounce=0, deferrable=False):
+        """Send commands in one write and wait for their acknowledgements.
+
+        In a batch block, the deferrable commands (on, off) are only sent
+        at the end of the block, or with the next command to answer.
+
+        Args:
+            commands: command or list of commands, without "\\r".
+            debounce: time to wait after the commands, in ms.
+            deferrable: the command does not have to be sent immediately.
+
+        Returns:
+            The response of each command (before its prompt), None for the
+            deferred commands.
+        """
+        if isinstance(commands, str):
+            commands = [commands]
+        count = len(commands)
+        with self.locked():
+            if self._pending is not None:
+                self._pending.extend(commands)
+                self._debounce = max(self._debounce, debounce)
+                if deferrable:
+                    return [None] * count
+                commands, self._pending = self._pending, []
+                debounce, self._debounce = self._debounce, 0
+            return self._run(commands, debounce)[-count:]
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Pipeline the on/off commands of the block in one write.
+
+        The debounce is waited once, the longest of the commands.
+        """
+        with self.locked():
+            if self._pending is not None:
+                yield
+                return
+            self._pending, self._debounce = [], 0
+            try:
+                yield
+            finally:
+                commands, debounce = self._pending, self._debounce
+                self._pending = None
+                if commands:
+                    self._run(commands, debounce)
+
+    def read_all(self):
+        """Read the state of all the relays with one "relay readall" query.
+
+        Returns:
+            {relay number: True if on}, None if the board does not support it.
+        """
+        words = (self.execute("relay readall")[0] or "").split()
+        if len(words) < 3 or not re.match(r"^[0-9A-Fa-f]+$", words[-1]):
+            return None
+        mask = int(words[-1], 16)
+        return {nb: bool(mask >> nb & 1) for nb in range(len(words[-1]) * 4)}
+
+    def read(self, nbs):
+        """Read the state of relays.
+
+        One readall query for several relays, or pipelined read commands
+        if the board does not support it.
+
+        Returns:
+            {relay number: True if on}
+        """
+        if len(nbs) > 1:
+            states = self.read_all()
+            if states is not None and all(nb in states for nb in nbs):
+                return {nb: states[nb] for nb in nbs}
+        responses = self.execute(["relay read {}".format(nb) for nb in nbs])
+        return {nb: _is_on(response) for nb, response in zip(nbs, responses)}
+
+
+def _is_on(response):
+    """Parse the response of a relay read command."""
+    words = (response or "").split()
+    return bool(words) and words[-1] == "on"
+
+
 class RelayPort:
     """Relay port class."""
 
-    def __init__(self, config, io):
+    def __init__(self, config, io, session=None):
         self.io = io
         assert self.io is not None, "No serial or telnet ports opened"
+        self.session = session if session is not None else RelaySession(io)
         self.inverted = config.get("inverted") == "1"
         if config.get("debounce") is not None:
             self.debounce = int(config.get("debounce"))
@@ -149,21 +316,19 @@ class RelayPort:
 
     def __on(self):
         """Set port on."""
-        swilog.debug(f"numato {self.object} {self.port_nb} on")
-        self.io.send(f"{self.object} {self.on_cmd} {self.port_nb}\r")
-        self.io.expect(">", 5)
-        time.sleep(self.debounce / 1000)
-        swilog.debug(self.io.before)
-        swilog.debug(self.io.after)
+        self.session.execute(
+            f"{self.object} {self.on_cmd} {self.port_nb}",
+            self.debounce,
+            deferrable=True,
+        )
 
     def __off(self):
         """Set port off."""
-        swilog.debug(f"numato {self.object} {self.port_nb} off")
-        self.io.send(f"{self.object} {self.off_cmd} {self.port_nb}\r")
-        self.io.expect(">", 5)
-        time.sleep(self.debounce / 1000)
-        swilog.debug(self.io.before)
-        swilog.debug(self.io.after)
+        self.session.execute(
+            f"{self.object} {self.off_cmd} {self.port_nb}",
+            self.debounce,
+            deferrable=True,
+        )
 
     def on(self):  # noqa: D402
         """Set port on (if inverted relay off else relay on)."""
@@ -181,16 +346,19 @@ class RelayPort:
 
     def state(self):
         """Read port state."""
-        com.clear_buffer(self.io)
-        self.io.send(f"{self.object} {self.read_cmd} {self.port_nb}\r")
-        self.io.expect(">", 5)
-        expected_on_state = "on" if not self.inverted else "off"
-        return "on" if expected_on_state in self.io.before else "off"
+        response = self.session.execute(
+            f"{self.object} {self.read_cmd} {self.port_nb}"
+        )[0]
+        return self.get_state(_is_on(response))
+
+    def get_state(self, relay_on):
+        """Get the port state from the relay state."""
+        return "on" if relay_on != self.inverted else "off"
 
     def cycle(self, delay=2):
         """Cycle port."""
         self.off()
-        time.sleep(delay)
+        wait.sleep(delay)
         self.on()
 
     def set_debounce(self, debounce):
@@ -205,8 +373,8 @@ class RelayPort:
 class GPIOPort(RelayPort):
     """Relay GPIO port class."""
 
-    def __init__(self, config, io):
-        super().__init__(config, io)
+    def __init__(self, config, io, session=None):
+        super().__init__(config, io, session)
         self.object = "gpio"
         self.on_cmd = "set"
         self.off_cmd = "clear"
@@ -224,7 +392,11 @@ class numato(power_supply):  # noqa: N801
         super().__init__(config)
         self.io = self.serial if self.serial is not None else self.telnet
         assert self.io is not None, "No serial or telnet ports opened"
-        self.io.send("\r")
+        board = (
+            self.com_port if self.serial is not None else f"{self.ip}:{self.ip_port}"
+        )
+        self.session = RelaySession(self.io, board)
+        self.session.sync()
         self.__map_ports(config)
 
     @property
@@ -258,40 +430,31 @@ class numato(power_supply):  # noqa: N801
 
     def __map_ports(self, config):
         """Map ports from config to class attributes."""
+        self.relay_ports = {}
         for port in self.__get_ports(config):
-            setattr(self, port.tag, RelayPort(port, self.io))
+            self.relay_ports[port.tag] = RelayPort(port, self.io, self.session)
+            setattr(self, port.tag, self.relay_ports[port.tag])
         gpio_config = config.find("gpio")
         if gpio_config and gpio_config.get("used") == "1":
             for port in self.__get_ports(gpio_config):
-                setattr(self, port.tag, GPIOPort(port, self.io))
+                setattr(self, port.tag, GPIOPort(port, self.io, self.session))
 
     def reset(self):
         """Reset relay."""
         swilog.debug("Reset the numato relay")
-        self.io.send("reset\r")
-        self.io.expect(">", 5)
-        swilog.debug(self.io.before)
-        swilog.debug(self.io.after)
+        self.session.execute("reset")
 
     def __on(self, nb=-1):
         """Set relay on."""
         if nb == -1:
             nb = self.port_nb
-        swilog.debug(f"numato relay {nb} on")
-        self.io.send(f"relay on {nb}\r")
-        self.io.expect(">", 5)
-        swilog.debug(self.io.before)
-        swilog.debug(self.io.after)
+        self.session.execute(f"relay on {nb}", deferrable=True)
 
     def __off(self, nb=-1):
         """Set relay off."""
         if nb == -1:
             nb = self.port_nb
-        swilog.debug(f"numato relay {nb} off")
-        self.io.send(f"relay off {nb}\r")
-        self.io.expect(">", 5)
-        swilog.debug(self.io.before)
-        swilog.debug(self.io.after)
+        self.session.execute(f"relay off {nb}", deferrable=True)
 
     def on(self, nb=-1):  # noqa: D402
         """Set port on (if inverted relay off else relay on)."""
@@ -309,10 +472,57 @@ class numato(power_supply):  # noqa: N801
 
     def state(self, nb=-1):  # noqa: D402
         """Read port state."""
-        com.clear_buffer(self.io)
         if nb == -1:
             nb = self.port_nb
-        self.io.send(f"relay read {nb}\r")
-        self.io.expect(">", 5)
-        expected_on_state = "on" if not self.inverted else "off"
-        return "on" if expected_on_state in self.io.before else "off"
+        relay_on = self.session.read([nb])[nb]
+        return "on" if relay_on != bool(self.inverted) else "off"
+
+    def batch(self):
+        """Send the on/off commands of the block in one write.
+
+        .. code-block:: python
+
+            with power_supply.batch():
+                power_supply.power.off()
+                power_supply.sim.off()
+        """
+        return self.session.batch()
+
+    def port_states(self, names=None):
+        """Read the state of the relay ports with one query.
+
+        Args:
+            names: names of the ports in the config, all by default.
+
+        Returns:
+            {port name: "on" or "off"}
+        """
+        ports = {
+            name: port
+            for name, port in self.relay_ports.items()
+            if names is None or name in names
+        }
+        relays = self.session.read(sorted({port.port_nb for port in ports.values()}))
+        return {
+            name: port.get_state(relays[port.port_nb]) for name, port in ports.items()
+        }
+
+    def cycle_ports(self, names=None, delay=2):
+        """Cycle several relay ports together.
+
+        Args:
+            names: names of the ports in the config, all by default.
+            delay: time between off and on, in seconds.
+        """
+        ports = [
+            port
+            for name, port in self.relay_ports.items()
+            if names is None or name in names
+        ]
+        with self.batch():
+            for port in ports:
+                port.off()
+        wait.sleep(delay)
+        with self.batch():
+            for port in ports:
+                port.on()
@@ -0,0 +1,477 @@
+"""Device pool scheduler.
+
+Run one test session on a pool of devices, one worker process per device.
+
+The pool is described in an xml file. Each device has the --config
+values of its target, and the devices with a second target (target2)
+are declared as paired:
+
+.. code-block:: xml
+
+    <device_pool>
+        <device name="bench1">
+            <config>module/slink1/name=/dev/ttyUSB0</config>
+            <config>module/slink2/name=/dev/ttyUSB1</config>
+        </device>
+        <device name="bench2" paired="1">
+            <config>config/target.xml</config>
+            <config>config/target2.xml</config>
+        </device>
+    </device_pool>
+
+Each worker is a pytest session bound to its device. The workers collect
+the tests and ask the scheduler for the next test to run, so that the
+tests are dispatched to the free devices. The tests using the target2
+fixture only run on the paired devices.
+
+The junit and json reports of the workers are merged into one report of
+the session.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import xml.etree.ElementTree as ET
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener
+
+import pytest
+
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+# Environment of the worker sessions.
+ADDRESS_ENV = "LETP_POOL_ADDRESS"
+AUTHKEY_ENV = "LETP_POOL_AUTHKEY"
+DEVICE_ENV = "LETP_POOL_DEVICE"
+
+# Fixture of the tests which need paired targets.
+PAIRED_FIXTURE = "target2"
+
+
+class Device:
+    """A device of the pool, bound to one worker."""
+
+    def __init__(self, name, configs, paired=False):
+        self.name = name
+        self.configs = configs
+        self.paired = paired
+
+    def __repr__(self):
+        return f"Device({self.name!r}, paired={self.paired})"
+
+
+def read_device_pool(pool_file):
+    """Read the devices of a device pool xml file."""
+    root = ET.parse(pool_file).getroot()
+    devices = []
+    for i, elem in enumerate(root.findall("device")):
+        name = elem.get("name") or f"device{i + 1}"
+        configs = [config.text.strip() for config in elem.findall("config")]
+        paired = elem.get("paired", "0").lower() in ("1", "true")
+        devices.append(Device(name, configs, paired))
+    names = [device.name for device in devices]
+    assert devices, f"No device in {pool_file}"
+    assert len(set(names)) == len(names), f"Duplicated device names: {names}"
+    return devices
+
+
+class PoolScheduler:
+    """Dispatch the tests to the workers of the devices.
+
+    The tests are dispatched in the collection order, which is ordered by
+    the test duration history when test_run/order is configured. The
+    paired devices get the paired tests first since they are the only
+    ones able to run them.
+
+    The session runs the union of the tests collected by the workers. The
+    tests dispatched to a worker which exits without finishing them are
+    reported as errors.
+    """
+
+    def __init__(self, devices):
+        self.devices = {device.name: device for device in devices}
+        self._lock = threading.Lock()
+        self.pending = []
+        self.paired_tests = set()
+        self.collected = {}
+        self.dispatched = {}
+        self.results = {}
+        self.lost = {}
+
+    def collect(self, device_name, tests):
+        """Register the tests collected by a worker.
+
+        The tests not collected by the previous workers are appended to
+        the pending tests.
+
+        Args:
+            device_name: name of the device of the worker.
+            tests: list of (nodeid, paired) in the collection order.
+        """
+        with self._lock:
+            self.collected[device_name] = {nodeid for nodeid, _ in tests}
+            known = set(self.pending) | set(self.dispatched)
+            for nodeid, paired in tests:
+                if nodeid not in known:
+                    known.add(nodeid)
+                    self.pending.append(nodeid)
+                if paired:
+                    self.paired_tests.add(nodeid)
+
+    def next_test(self, device_name):
+        """Get the next test to run on a device, or None if there is no more."""
+        device = self.devices[device_name]
+        with self._lock:
+            collected = self.collected.get(device_name, ())
+            candidates = [
+                nodeid
+                for nodeid in self.pending
+                if nodeid in collected
+                and (device.paired or nodeid not in self.paired_tests)
+            ]
+            if device.paired:
+                paired = [n for n in candidates if n in self.paired_tests]
+                candidates = paired or candidates
+            if not candidates:
+                return None
+            nodeid = candidates[0]
+            self.pending.remove(nodeid)
+            self.dispatched[nodeid] = device_name
+            return nodeid
+
+    def release(self, device_name, nodeid):
+        """Give back a test dispatched to a device which did not run it."""
+        with self._lock:
+            if self.dispatched.get(nodeid) == device_name:
+                del self.dispatched[nodeid]
+                self.pending.insert(0, nodeid)
+
+    def finish(self, device_name, nodeid, outcome):
+        """Register the outcome of a test."""
+        with self._lock:
+            self.results[nodeid] = (device_name, outcome)
+
+    def abandon(self, device_name):
+        """Report the unfinished tests of a device whose worker exited.
+
+        The test was running when the worker crashed: it is reported as an
+        error rather than dispatched again, not to crash another worker.
+
+        Returns:
+            The nodeids of the unfinished tests.
+        """
+        with self._lock:
+            lost = [
+                nodeid
+                for nodeid, name in self.dispatched.items()
+                if name == device_name and nodeid not in self.results
+            ]
+            for nodeid in lost:
+                self.results[nodeid] = (device_name, "error")
+                self.lost[nodeid] = device_name
+            return lost
+
+    def get_total(self):
+        """Get the number of tests of the session."""
+        with self._lock:
+            return len(self.dispatched) + len(self.pending)
+
+    def get_unscheduled(self):
+        """Get the tests which could not run on any device of the pool."""
+        with self._lock:
+            return list(self.pending)
+
+
+class PoolServer:
+    """Serve the scheduler to the workers.
+
+    The workers send:
+        ("collected", device_name, [(nodeid, paired), ...])
+        ("next", device_name): answered with the next nodeid or None.
+        ("release", device_name, nodeid): the worker stops without
+        running the test.
+        ("finished", device_name, nodeid, outcome)
+    """
+
+    def __init__(self, scheduler, log=print):
+        self.scheduler = scheduler
+        self.authkey = os.urandom(16)
+        self.listener = Listener(("localhost", 0), authkey=self.authkey)
+        self.log = log
+        self._threads = []
+        self._closed = False
+        self._accept_thread = threading.Thread(target=self._accept, daemon=True)
+
+    @property
+    def address(self):
+        """Address of the server as host:port."""
+        host, port = self.listener.address
+        return f"{host}:{port}"
+
+    def start(self):
+        """Start to accept the workers."""
+        self._accept_thread.start()
+
+    def close(self):
+        """Stop the server."""
+        self._closed = True
+        self.listener.close()
+        for thread in self._threads:
+            thread.join(timeout=5)
+
+    def _accept(self):
+        while not self._closed:
+            try:
+                conn = self.listener.accept()
+            except (OSError, EOFError, AuthenticationError):
+                # Closed listener or failed authentication.
+                continue
+            thread = threading.Thread(target=self._serve, args=(conn,), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _serve(self, conn):
+        device_name = None
+        with conn:
+            while True:
+                try:
+                    msg = conn.recv()
+                except (EOFError, OSError):
+                    break
+                device_name = msg[1]
+                if msg[0] == "collected":
+                    self.scheduler.collect(msg[1], msg[2])
+                elif msg[0] == "next":
+                    conn.send(self.scheduler.next_test(msg[1]))
+                elif msg[0] == "release":
+                    self.scheduler.release(msg[1], msg[2])
+                elif msg[0] == "finished":
+                    _, device_name, nodeid, outcome = msg
+                    self.scheduler.finish(device_name, nodeid, outcome)
+                    self.log(
+                        f"[{device_name}] {outcome.upper()} {nodeid} "
+                        f"({len(self.scheduler.results)}/{self.scheduler.get_total()})"
+                    )
+        if device_name:
+            self.abandon(device_name)
+
+    def abandon(self, device_name):
+        """Report the unfinished tests of a device whose worker exited."""
+        for nodeid in self.scheduler.abandon(device_name):
+            self.log(f"[{device_name}] ERROR {nodeid} (worker exited)")
+
+
+def _lost_testcase(nodeid, device_name):
+    """Get the junit testcase of a test lost by a worker."""
+    parts = nodeid.split("::")
+    module = parts[0][: -len(".py")] if parts[0].endswith(".py") else parts[0]
+    classname = ".".join([module.replace("/", ".")] + parts[1:-1])
+    testcase = ET.Element("testcase", classname=classname, name=parts[-1], time="0")
+    error = ET.SubElement(
+        testcase, "error", message=f"The worker of {device_name} exited"
+    )
+    error.text = "The worker exited while running the test"
+    return testcase
+
+
+def merge_junit_reports(junit_files, output_file, lost=None):
+    """Merge the junit xml reports of the workers into one test suite.
+
+    Args:
+        junit_files: junit xml reports of the workers.
+        output_file: merged report file.
+        lost: {nodeid: device name} of the tests lost by the workers,
+            reported as errors.
+    """
+    merged = ET.Element("testsuite", name="pytest")
+    counters = dict.fromkeys(("tests", "errors", "failures", "skipped"), 0)
+    duration = 0.0
+    timestamps = []
+    for junit_file in junit_files:
+        root = ET.parse(junit_file).getroot()
+        suites = [root] if root.tag == "testsuite" else root.findall("testsuite")
+        for suite in suites:
+            for key in counters:
+                counters[key] += int(suite.get(key, 0))
+            duration = max(duration, float(suite.get("time", 0)))
+            if suite.get("timestamp"):
+                timestamps.append(suite.get("timestamp"))
+            if suite.get("hostname"):
+                merged.set("hostname", suite.get("hostname"))
+            for testcase in suite.findall("testcase"):
+                merged.append(testcase)
+    for nodeid, device_name in (lost or {}).items():
+        merged.append(_lost_testcase(nodeid, device_name))
+        counters["tests"] += 1
+        counters["errors"] += 1
+    for key, value in counters.items():
+        merged.set(key, str(value))
+    merged.set("time", f"{duration:.3f}")
+    if timestamps:
+        merged.set("timestamp", min(timestamps))
+    root = ET.Element("testsuites")
+    root.append(merged)
+    ET.ElementTree(root).write(output_file, encoding="utf-8", xml_declaration=True)
+
+
+def merge_json_reports(json_reports, output_file, collected=None, lost=None):
+    """Merge the json reports of the workers.
+
+    Args:
+        json_reports: {device name: json report file}
+        output_file: merged report file.
+        collected: number of tests of the session.
+        lost: {nodeid: device name} of the tests lost by the workers,
+            reported as errors.
+    """
+    merged = None
+    for device_name, json_file in json_reports.items():
+        with open(json_file, encoding="utf8") as f:
+            report = json.load(f)
+        for test in report.get("tests", []):
+            test["device"] = device_name
+        if merged is None:
+            merged = report
+            merged["devices"] = [device_name]
+            continue
+        merged["devices"].append(device_name)
+        merged["created"] = min(merged.get("created", 0), report.get("created", 0))
+        merged["duration"] = max(merged.get("duration", 0), report.get("duration", 0))
+        merged["exitcode"] = merged.get("exitcode") or report.get("exitcode", 0)
+        merged.setdefault("tests", []).extend(report.get("tests", []))
+        for key, value in report.get("summary", {}).items():
+            if key != "collected":
+                summary = merged.setdefault("summary", {})
+                summary[key] = summary.get(key, 0) + value
+    if merged is None:
+        return
+    for nodeid, device_name in (lost or {}).items():
+        merged.setdefault("tests", []).append(
+            {
+                "nodeid": nodeid,
+                "outcome": "error",
+                "device": device_name,
+                "longrepr": "The worker exited while running the test",
+            }
+        )
+        summary = merged.setdefault("summary", {})
+        summary["error"] = summary.get("error", 0) + 1
+        summary["total"] = summary.get("total", 0) + 1
+    if collected is not None:
+        merged.setdefault("summary", {})["collected"] = collected
+    with open(output_file, "w", encoding="utf8") as f:
+        json.dump(merged, f, indent=4)
+
+
+def _split_report_args(pytest_args):
+    """Remove the report file options which are set per worker."""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--junitxml", "--junit-xml", dest="junitxml")
+    parser.add_argument("--json-report-file", dest="json_report_file")
+    parser.add_argument("--json-report", action="store_true")
+    return parser.parse_known_args(pytest_args)
+
+
+def run_pool(pool_file, pytest_args, log_dir=os.path.join("log", "pool"), env=None):
+    """Run a test session on a pool of devices.
+
+    Args:
+        pool_file: device pool xml file.
+        pytest_args: arguments of the pytest session of each worker.
+        log_dir: directory of the worker outputs and reports.
+        env: extra environment variables of the workers.
+
+    Returns:
+        The exit code of the session.
+    """
+    devices = read_device_pool(pool_file)
+    report_args, pytest_args = _split_report_args(pytest_args)
+    os.makedirs(log_dir, exist_ok=True)
+    scheduler = PoolScheduler(devices)
+    server = PoolServer(scheduler)
+    server.start()
+    worker_env = dict(os.environ, **(env or {}))
+    worker_env[ADDRESS_ENV] = server.address
+    worker_env[AUTHKEY_ENV] = server.authkey.hex()
+    workers = {}
+    junit_files = {}
+    json_reports = {}
+    start = time.time()
+    print(f"Run on {len(devices)} devices: {devices}")
+    try:
+        for device in devices:
+            junit_files[device.name] = os.path.join(log_dir, device.name + ".xml")
+            json_reports[device.name] = os.path.join(log_dir, device.name + ".json")
+            cmd = [sys.executable, "-m", "pytest"] + pytest_args
+            for config in device.configs:
+                cmd += ["--config", config]
+            cmd += [
+                "--junitxml",
+                junit_files[device.name],
+                "--json-report",
+                "--json-report-file",
+                json_reports[device.name],
+            ]
+            output = open(
+                os.path.join(log_dir, device.name + ".log"), "w", encoding="utf8"
+            )
+            workers[device.name] = (
+                subprocess.Popen(
+                    cmd,
+                    stdout=output,
+                    stderr=subprocess.STDOUT,
+                    env=dict(worker_env, **{DEVICE_ENV: device.name}),
+                ),
+                output,
+            )
+        exit_codes = {}
+        for name, (process, output) in workers.items():
+            exit_codes[name] = process.wait()
+            output.close()
+            server.abandon(name)
+    finally:
+        for process, output in workers.values():
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            output.close()
+        server.close()
+    junit_file = report_args.junitxml or os.path.join(log_dir, "junit.xml")
+    merge_junit_reports(
+        [f for f in junit_files.values() if os.path.exists(f)],
+        junit_file,
+        lost=scheduler.lost,
+    )
+    json_file = report_args.json_report_file or os.path.join(log_dir, "report.json")
+    merge_json_reports(
+        {name: f for name, f in json_reports.items() if os.path.exists(f)},
+        json_file,
+        collected=scheduler.get_total(),
+        lost=scheduler.lost,
+    )
+    print(
+        f"Ran {len(scheduler.results)} tests on {len(devices)} devices "
+        f"in {time.time() - start:.1f}s"
+    )
+    for name, exit_code in exit_codes.items():
+        print(f"[{name}] exit code {exit_code}")
+    print(f"Merged reports: {junit_file} {json_file}")
+    unscheduled = scheduler.get_unscheduled()
+    if unscheduled:
+        print(
+            f"{len(unscheduled)} tests could not run on the pool "
+            f"(no paired device?): {unscheduled}"
+        )
+    failed_codes = [
+        code
+        for code in exit_codes.values()
+        if code not in (pytest.ExitCode.OK, pytest.ExitCode.NO_TESTS_COLLECTED)
+    ]
+    if failed_codes:
+        return max(failed_codes)
+    if unscheduled or scheduler.lost:
+        return pytest.ExitCode.TESTS_FAILED
+    return pytest.ExitCode.OK
@@ -0,0 +1,224 @@
+"""Test duration history.
+
+The durations and outcomes of the tests are stored per target and test
+campaign in a local SQLite database, filled from the JSON report at the
+end of each session.
+
+The history is used to order the tests of the next sessions:
+
+- longest_first: start the long tests early.
+- fail_fast: run the recently failing tests first.
+
+and to split a session into balanced shards for several test benches.
+"""
+import heapq
+import json
+import os
+import sqlite3
+import statistics
+import time
+import zlib
+
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+FAILED_OUTCOMES = ("failed", "error")
+
+
+class DurationDB:
+    """Store of the test durations of the previous sessions."""
+
+    def __init__(self, db_file):
+        db_dir = os.path.dirname(db_file)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self.db_file = db_file
+        self._conn = sqlite3.connect(db_file)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "target TEXT NOT NULL, campaign TEXT NOT NULL, "
+                "nodeid TEXT NOT NULL, duration REAL NOT NULL, "
+                "outcome TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS results_test "
+                "ON results (target, nodeid, created)"
+            )
+
+    def close(self):
+        """Close the database."""
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def record(self, results, target, campaign=None, created=None):
+        """Record the results of a session.
+
+        Args:
+            results: iterable of (nodeid, duration, outcome).
+            target: target name.
+            campaign: test campaign name.
+            created: session timestamp, now by default.
+        """
+        created = created or time.time()
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (target or "", campaign or "", nodeid, duration, outcome, created)
+                    for nodeid, duration, outcome in results
+                ),
+            )
+
+    def record_json_report(self, json_file, target, campaign=None):
+        """Record the results of a pytest JSON report.
+
+        The duration of a test is the sum of its setup, call and
+        teardown durations.
+        """
+        with open(json_file, encoding="utf8") as f:
+            json_data = json.load(f)
+        results = []
+        for test in json_data.get("tests", []):
+            duration = sum(
+                test[phase].get("duration", 0)
+                for phase in ("setup", "call", "teardown")
+                if phase in test
+            )
+            results.append((test["nodeid"], duration, test["outcome"]))
+        self.record(results, target, campaign, json_data.get("created"))
+        return len(results)
+
+    def _query(self, columns, target, campaign):
+        """Get the results of a target, the newest first.
+
+        The results of the campaign come first so that they are preferred
+        to the results of the other campaigns.
+        """
+        return self._conn.execute(
+            f"SELECT {columns} FROM results WHERE target = ? "
+            "ORDER BY campaign = ? DESC, created DESC",
+            (target or "", campaign or ""),
+        )
+
+    def get_durations(self, target, campaign=None, last=5):
+        """Get the mean duration of the last runs of each test.
+
+        Returns:
+            {nodeid: duration}
+        """
+        samples = {}
+        for nodeid, duration in self._query("nodeid, duration", target, campaign):
+            test_samples = samples.setdefault(nodeid, [])
+            if len(test_samples) < last:
+                test_samples.append(duration)
+        return {
+            nodeid: statistics.mean(test_samples)
+            for nodeid, test_samples in samples.items()
+        }
+
+    def get_failures(self, target, campaign=None, last=5):
+        """Get the tests which failed in their last runs.
+
+        Returns:
+            {nodeid: (number of failures, time of the last failure)}
+        """
+        runs = {}
+        failures = {}
+        for nodeid, outcome, created in self._query(
+            "nodeid, outcome, created", target, campaign
+        ):
+            runs[nodeid] = runs.get(nodeid, 0) + 1
+            if runs[nodeid] > last or outcome not in FAILED_OUTCOMES:
+                continue
+            count, last_failure = failures.get(nodeid, (0, created))
+            failures[nodeid] = (count + 1, max(last_failure, created))
+        return failures
+
+
+def estimate_durations(nodeids, durations):
+    """Estimate the duration of each test.
+
+    Tests without history are estimated with the median duration of the
+    other tests.
+    """
+    default = statistics.median(durations.values()) if durations else 0.0
+    return {nodeid: durations.get(nodeid, default) for nodeid in nodeids}
+
+
+def order_longest_first(items, durations):
+    """Order the tests from the longest one.
+
+    Tests without history keep their order after the known tests.
+    """
+    return sorted(items, key=lambda item: -durations.get(item.nodeid, -1.0))
+
+
+def order_fail_fast(items, failures):
+    """Order the most recently and often failing tests first."""
+    failing = sorted(
+        (item for item in items if item.nodeid in failures),
+        key=lambda item: (-failures[item.nodeid][1], -failures[item.nodeid][0]),
+    )
+    return failing + [item for item in items if item.nodeid not in failures]
+
+
+def shard_items(items, durations, index, count):
+    """Get the tests of one of count shards of balanced durations.
+
+    The longest tests are assigned first to the least loaded shard, or to
+    the shard with the fewest tests on a tie. Without durations, the tests
+    are split by a hash of their nodeid. The partition only depends on the
+    nodeids and the durations, not on the order of the items, so that all
+    the test benches compute the same one. The tests of a shard keep their
+    order.
+
+    Args:
+        items: tests to split.
+        durations: estimated duration of each test.
+        index: shard index, from 1 to count.
+        count: number of shards.
+    """
+    assert 1 <= index <= count, f"Invalid shard {index}/{count}"
+    if not durations:
+        return [
+            item
+            for item in items
+            if zlib.crc32(item.nodeid.encode()) % count == index - 1
+        ]
+    loads = [(0.0, 0, shard) for shard in range(1, count + 1)]
+    shards = {}
+    by_duration = sorted(
+        range(len(items)),
+        key=lambda i: (-durations.get(items[i].nodeid, 0.0), items[i].nodeid),
+    )
+    for i in by_duration:
+        load, tests, shard = heapq.heappop(loads)
+        shards[i] = shard
+        load += durations.get(items[i].nodeid, 0.0)
+        heapq.heappush(loads, (load, tests + 1, shard))
+    return [item for i, item in enumerate(items) if shards[i] == index]
+
+
+class SessionEstimate:
+    """Estimate the remaining time of a session."""
+
+    def __init__(self, durations):
+        self.durations = durations
+        self.remaining = sum(durations.values())
+
+    def finish(self, nodeid):
+        """Account for a finished test."""
+        self.remaining -= self.durations.pop(nodeid, 0.0)
+        return self.remaining
+
+    @staticmethod
+    def format(seconds):
+        """Format a duration in seconds as H:MM:SS."""
+        minutes, seconds = divmod(int(max(seconds, 0)), 60)
+        hours, minutes = divmod(minutes, 60)
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
@@ -1,8 +1,8 @@
 """File copy or transfer (scp, adb, wget...)."""
-import time
 import os
 import pexpect
 from pytest_letp.lib import swilog
+from pytest_letp.lib import wait
 
 __copyright__ = "Copyright (C) Sierra Wireless Inc."
 
@@ -53,13 +53,13 @@ def adb_transfer(file_list, dest, timeout=180):
     adb_path = "/usr/bin/adb"
     if not os.path.isfile(adb_path):
         adb_path = "/usr/local/bin/adb"
-    time.sleep(5)
+    wait.sleep(5)
     exit_status = -1
     count = 20
     # Wait for a device
     while exit_status != 0:
         output, exit_status = pexpect.run(f"{adb_path} devices", withexitstatus=1)
-        time.sleep(1)
+        wait.sleep(1)
         count -= 1
         assert count != 0
     cmd = (
@@ -71,7 +71,7 @@ def adb_transfer(file_list, dest, timeout=180):
     output, exit_status = pexpect.run(cmd, timeout=timeout, withexitstatus=1)
     swilog.info(output)
     assert exit_status == 0
-    time.sleep(1)
+    wait.sleep(1)
 
 
 def fetch_binary(file_location, file_output):
@@ -0,0 +1,292 @@
+"""Timing of the LeTP operations.
+
+The link operations (run, expect, login, reboot, ...), the application
+build and install and the fixture setup and teardown are timed per test,
+operation and link. Each entry has a count, a latency histogram and the
+time spent in timeouts.
+
+The operations are nested: the duration of target.run includes the
+duration of its expect calls.
+
+Instrument a function with the timed decorator:
+
+.. code-block:: python
+
+    @metrics.timed("run")
+    def run(self, cmd, timeout=-1):
+        ...
+
+The link name is the metrics_link attribute of the first argument (set
+for the module links), else its class name.
+"""
+import bisect
+import functools
+import math
+import os
+import threading
+import time
+
+import pexpect
+
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+# Upper bounds in seconds of the latency histogram buckets.
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 2, 5, 10, 30, 60, 300, math.inf)
+
+# Test name of the operations outside of the tests.
+SESSION = "session"
+
+
+def _is_timeout(exc):
+    """Check if an exception, or the exception it wraps, is a timeout."""
+    while exc is not None:
+        if isinstance(exc, pexpect.TIMEOUT):
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+def get_link_name(obj):
+    """Get the link name of an object in the metrics."""
+    return getattr(obj, "metrics_link", None) or type(obj).__name__
+
+
+class OperationStats:
+    """Count, latency histogram and timeouts of an operation."""
+
+    __slots__ = ("count", "total", "max", "timeouts", "timeout_time", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.timeouts = 0
+        self.timeout_time = 0.0
+        self.buckets = [0] * len(BUCKETS)
+
+    def add(self, duration, timeout=False):
+        """Add an operation of duration seconds."""
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+        if timeout:
+            self.timeouts += 1
+            self.timeout_time += duration
+        self.buckets[bisect.bisect_left(BUCKETS, duration)] += 1
+
+    def merge(self, other):
+        """Add the operations of other."""
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        self.timeouts += other.timeouts
+        self.timeout_time += other.timeout_time
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+
+    def to_dict(self):
+        """Get the JSON representation, with the non-empty buckets only."""
+        return {
+            "count": self.count,
+            "total_s": round(self.total, 6),
+            "max_s": round(self.max, 6),
+            "timeouts": self.timeouts,
+            "timeout_s": round(self.timeout_time, 6),
+            "buckets": {
+                _format_bound(bound): count
+                for bound, count in zip(BUCKETS, self.buckets)
+                if count
+            },
+        }
+
+
+def _format_bound(bound):
+    return "+Inf" if bound == math.inf else repr(bound)
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return ",".join(
+        '{}="{}"'.format(name, _escape_label(value)) for name, value in labels.items()
+    )
+
+
+class MetricsRegistry:
+    """Operation statistics of a session, per (test, operation, link)."""
+
+    def __init__(self):
+        self.enabled = True
+        self.test = SESSION
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def reset(self):
+        """Forget all the statistics."""
+        with self._lock:
+            self._stats = {}
+        self.test = SESSION
+
+    def record(self, operation, link, duration, timeout=False, test=None):
+        """Record an operation of the current test."""
+        key = (test or self.test, operation, link)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = OperationStats()
+            stats.add(duration, timeout)
+
+    def get_test_stats(self, test):
+        """Get the statistics of a test: {operation: {link: dict}}."""
+        result = {}
+        with self._lock:
+            for (stats_test, operation, link), stats in self._stats.items():
+                if stats_test == test:
+                    result.setdefault(operation, {})[link] = stats.to_dict()
+        return result
+
+    def get_totals(self):
+        """Get the statistics of the session: {(operation, link): stats}."""
+        totals = {}
+        with self._lock:
+            for (_, operation, link), stats in self._stats.items():
+                total = totals.get((operation, link))
+                if total is None:
+                    total = totals[(operation, link)] = OperationStats()
+                total.merge(stats)
+        return totals
+
+    def to_dict(self):
+        """Get the session statistics: {operation: {link: dict}}."""
+        result = {}
+        for (operation, link), stats in sorted(self.get_totals().items()):
+            result.setdefault(operation, {})[link] = stats.to_dict()
+        return result
+
+    def to_prometheus(self):
+        """Get the statistics in the Prometheus text format.
+
+        The latency histograms are per operation and link, the counts and
+        durations also per test.
+        """
+        lines = [
+            "# HELP letp_operation_duration_seconds Duration of the LeTP operations.",
+            "# TYPE letp_operation_duration_seconds histogram",
+        ]
+        totals = sorted(self.get_totals().items())
+        for (operation, link), stats in totals:
+            labels = _labels(operation=operation, link=link)
+            cumulative = 0
+            for bound, count in zip(BUCKETS, stats.buckets):
+                cumulative += count
+                lines.append(
+                    'letp_operation_duration_seconds_bucket{{{},le="{}"}} {}'.format(
+                        labels, _format_bound(bound), cumulative
+                    )
+                )
+            lines.append(
+                "letp_operation_duration_seconds_sum{{{}}} {}".format(
+                    labels, stats.total
+                )
+            )
+            lines.append(
+                "letp_operation_duration_seconds_count{{{}}} {}".format(
+                    labels, stats.count
+                )
+            )
+        lines += [
+            "# HELP letp_operation_timeouts_total Operations ended by a timeout.",
+            "# TYPE letp_operation_timeouts_total counter",
+        ]
+        for (operation, link), stats in totals:
+            lines.append(
+                "letp_operation_timeouts_total{{{}}} {}".format(
+                    _labels(operation=operation, link=link), stats.timeouts
+                )
+            )
+        lines += [
+            "# HELP letp_operation_timeout_seconds_total Time spent in timeouts.",
+            "# TYPE letp_operation_timeout_seconds_total counter",
+        ]
+        for (operation, link), stats in totals:
+            lines.append(
+                "letp_operation_timeout_seconds_total{{{}}} {}".format(
+                    _labels(operation=operation, link=link), stats.timeout_time
+                )
+            )
+        with self._lock:
+            per_test = sorted(self._stats.items())
+        lines += [
+            "# HELP letp_test_operations_total Operations per test.",
+            "# TYPE letp_test_operations_total counter",
+        ]
+        for (test, operation, link), stats in per_test:
+            lines.append(
+                "letp_test_operations_total{{{}}} {}".format(
+                    _labels(test=test, operation=operation, link=link), stats.count
+                )
+            )
+        lines += [
+            "# HELP letp_test_operation_seconds_total Operation time per test.",
+            "# TYPE letp_test_operation_seconds_total counter",
+        ]
+        for (test, operation, link), stats in per_test:
+            lines.append(
+                "letp_test_operation_seconds_total{{{}}} {}".format(
+                    _labels(test=test, operation=operation, link=link), stats.total
+                )
+            )
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, prom_file):
+        """Write the Prometheus text file, atomically for the collectors."""
+        prom_dir = os.path.dirname(prom_file)
+        if prom_dir:
+            os.makedirs(prom_dir, exist_ok=True)
+        tmp_file = prom_file + ".tmp"
+        with open(tmp_file, "w") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_file, prom_file)
+
+
+registry = MetricsRegistry()
+
+
+def timed(operation, link=None, check_after=False):
+    """Time the calls of a function in the registry.
+
+    Args:
+        operation: operation name.
+        link: link name. By default, the link name of the first argument.
+        check_after: the call is a timeout if the after attribute of the
+            first argument is pexpect.TIMEOUT, as for expect.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not registry.enabled:
+                return func(*args, **kwargs)
+            timeout = False
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+                if check_after:
+                    timeout = getattr(args[0], "after", None) is pexpect.TIMEOUT
+                return result
+            except Exception as e:
+                timeout = _is_timeout(e)
+                raise
+            finally:
+                registry.record(
+                    operation,
+                    link or get_link_name(args[0]),
+                    time.perf_counter() - start,
+                    timeout,
+                )
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,255 @@
+"""Modem control lines of a serial port, monitored without polling.
+
+The ModemLineMonitor waits in a background thread for the changes of the
+CTS, DSR, RI and CD lines with the TIOCMIWAIT ioctl, and records their
+edges with a timestamp. The interrupt counters of the port (TIOCGICOUNT)
+show the pulses shorter than the wake up of the thread.
+
+.. code-block:: python
+
+    with ModemLineMonitor(target.at.tty.fd) as monitor:
+        target.at.send("AT+CRING...")
+        edge = monitor.wait_for_edge(["ri"], state=True, timeout=30)
+        pulses = monitor.pulses("ri")
+
+The drivers without TIOCMIWAIT are polled with TIOCMGET.
+"""
+import collections
+import errno
+import fcntl
+import struct
+import termios
+import threading
+import time
+
+from pytest_letp.lib import swilog
+
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+TIOCMGET = getattr(termios, "TIOCMGET", 0x5415)
+TIOCMIWAIT = getattr(termios, "TIOCMIWAIT", 0x545C)
+TIOCGICOUNT = getattr(termios, "TIOCGICOUNT", 0x545D)
+
+# Modem lines: (TIOCM bit, name of the counter in serial_icounter_struct).
+LINES = {
+    "cts": (getattr(termios, "TIOCM_CTS", 0x020), "cts"),
+    "dsr": (getattr(termios, "TIOCM_DSR", 0x100), "dsr"),
+    "ri": (getattr(termios, "TIOCM_RI", 0x080), "rng"),
+    "cd": (getattr(termios, "TIOCM_CD", 0x040), "dcd"),
+}
+# The kernel counts the trailing edges of RI, and both edges of the others.
+COUNTED_EDGES_PER_PULSE = {"ri": 1}
+# First fields of struct serial_icounter_struct.
+_ICOUNT_FORMAT = "4i16i"
+_ICOUNT_FIELDS = ("cts", "dsr", "rng", "dcd")
+# Errors of the drivers without TIOCMIWAIT or TIOCGICOUNT.
+_UNSUPPORTED = (errno.EINVAL, errno.ENOTTY, errno.ENOSYS, 515)
+
+
+class Edge(collections.namedtuple("Edge", "time,line,state,missed")):
+    """Change of a modem line.
+
+    time is time.monotonic() at the wake up of the monitor; missed is
+    True for the edges of a pulse only seen by the interrupt counters.
+    """
+
+
+def get_lines(fd, lines=LINES):
+    """Read the state of modem lines with TIOCMGET.
+
+    Returns:
+        {line name: True if the line is set}
+    """
+    bits = struct.unpack("I", fcntl.ioctl(fd, TIOCMGET, struct.pack("I", 0)))[0]
+    return {name: bits & LINES[name][0] != 0 for name in lines}
+
+
+class ModemLineMonitor:
+    """Record the edges of the modem lines of a serial port.
+
+    Args:
+        fd: file descriptor of the serial port.
+        lines: names of the monitored lines.
+        poll_interval: polling interval of the drivers without TIOCMIWAIT.
+    """
+
+    def __init__(self, fd, lines=("cts", "dsr", "ri", "cd"), poll_interval=0.01):
+        assert set(lines) <= set(LINES), "Unknown modem lines {}".format(lines)
+        self.fd = fd
+        self.lines = tuple(lines)
+        self.poll_interval = poll_interval
+        self.polling = False
+        self.state = {}
+        self._edges = []
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _get_lines(self):
+        return get_lines(self.fd, self.lines)
+
+    def _wait_change(self):
+        """Wait for a change of the lines, or poll_interval if unsupported."""
+        if not self.polling:
+            mask = 0
+            for name in self.lines:
+                mask |= LINES[name][0]
+            try:
+                fcntl.ioctl(self.fd, TIOCMIWAIT, mask)
+                return
+            except OSError as e:
+                if e.errno not in _UNSUPPORTED:
+                    raise
+                swilog.debug("No TIOCMIWAIT on fd {}: poll the lines".format(self.fd))
+                self.polling = True
+        self._stop.wait(self.poll_interval)
+
+    def _get_counts(self):
+        """Get the interrupt counters of the lines, or None if unsupported."""
+        try:
+            data = fcntl.ioctl(
+                self.fd, TIOCGICOUNT, bytes(struct.calcsize(_ICOUNT_FORMAT))
+            )
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED:
+                raise
+            return None
+        counts = dict(zip(_ICOUNT_FIELDS, struct.unpack(_ICOUNT_FORMAT, data)))
+        return {name: counts[LINES[name][1]] for name in self.lines}
+
+    def start(self):
+        """Start the monitoring thread."""
+        if self._thread is not None:
+            return
+        self.state = self._get_lines()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the monitoring.
+
+        The thread blocked in TIOCMIWAIT exits at the next change of the
+        lines, or when the port is closed.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.poll_interval * 2)
+        self._thread = None
+
+    def _loop(self):
+        counts = self._get_counts()
+        while not self._stop.is_set():
+            try:
+                self._wait_change()
+                now = time.monotonic()
+                state = self._get_lines()
+                new_counts = self._get_counts()
+            except OSError as e:
+                swilog.debug("Modem line monitoring stopped: {}".format(e))
+                return
+            if self._stop.is_set():
+                return
+            self._record(now, state, counts, new_counts)
+            counts = new_counts
+
+    def _record(self, now, state, counts, new_counts):
+        edges = []
+        for name in self.lines:
+            changed = state[name] != self.state[name]
+            if counts and new_counts:
+                per_pulse = COUNTED_EDGES_PER_PULSE.get(name, 2)
+                counted = new_counts[name] - counts[name]
+                if changed and per_pulse == 2:
+                    counted -= 1
+                elif changed and not state[name]:
+                    # Trailing edge of RI.
+                    counted -= 1
+                for _ in range(max(0, counted) // per_pulse):
+                    previous = self.state[name]
+                    edges.append(Edge(now, name, not previous, True))
+                    edges.append(Edge(now, name, previous, True))
+            if changed:
+                edges.append(Edge(now, name, state[name], False))
+        with self._cond:
+            self.state = state
+            self._edges.extend(edges)
+            self._cond.notify_all()
+
+    def edges(self, lines=None, since=None):
+        """Get the recorded edges.
+
+        Args:
+            lines: names of the lines, all by default.
+            since: only the edges after this time.monotonic() value.
+        """
+        with self._cond:
+            return [
+                edge
+                for edge in self._edges
+                if (lines is None or edge.line in lines)
+                and (since is None or edge.time > since)
+            ]
+
+    def clear(self):
+        """Forget the recorded edges."""
+        with self._cond:
+            self._edges = []
+
+    def wait_for_edge(self, lines=None, state=None, timeout=10, since=None):
+        """Wait for an edge of some lines.
+
+        Args:
+            lines: names of the lines, all by default.
+            state: new state of the line, any by default.
+            timeout: timeout in seconds.
+            since: also accept the edges recorded after this
+                time.monotonic() value. Only the new edges by default.
+
+        Returns:
+            The first matching Edge, or None on timeout.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            start = len(self._edges)
+            while True:
+                candidates = self._edges if since is not None else self._edges[start:]
+                for edge in candidates:
+                    if (
+                        (lines is None or edge.line in lines)
+                        and (state is None or edge.state == state)
+                        and (since is None or edge.time > since)
+                    ):
+                        return edge
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    def pulses(self, line, active=True):
+        """Get the pulses of a line.
+
+        Args:
+            line: name of the line.
+            active: state of the line during a pulse.
+
+        Returns:
+            List of (start time, width in seconds). The width of the
+            missed pulses is 0.
+        """
+        pulses = []
+        start = None
+        for edge in self.edges([line]):
+            if edge.state == active:
+                start = edge.time
+            elif start is not None:
+                pulses.append((start, edge.time - start))
+                start = None
+        return pulses
@@ -21,7 +21,7 @@ import pexpect.fdpexpect
 import xml.etree.ElementTree as ET
 
 from pytest_letp import TestConfig
-from pytest_letp.lib import com, com_port_detector, swilog
+from pytest_letp.lib import com, com_port_detector, swilog, wait
 from pytest_letp.lib.module_exceptions import SlinkException, TargetException
 from pytest_letp.lib.versions import TargetVersions
 from pytest_letp.lib.com import clear_buffer
@@ -117,6 +117,11 @@ class ModuleLink:
     def obj(self, obj):
         """Set the link obj."""
         swilog.debug("[Link %s] = %s" % (self.name, obj))
+        if obj is not None:
+            # Name of the link in the operation metrics.
+            obj.metrics_link = (
+                "slink%d" % self.name if isinstance(self.name, int) else self.name
+            )
         self.__obj = obj
         self.refresh_aliases()
 
@@ -408,15 +413,8 @@ class SwiModule:
 
         # if CLI was pre-defined with a valid fd but device name has been changed
         if not os.name == "nt":
-            re_opened_port = com.SerialPort.open(
-                link_obj.dev_tty, link_obj.baudrate, link_obj.rtscts
-            )
-            if not re_opened_port:
+            if not com.SerialPort.is_same_device(link_obj.dev_tty, link_obj.fd):
                 return False
-            try:
-                re_opened_port.close()
-            except Exception as e:
-                swilog.debug(e)
 
         return self.is_port_responsive(port_type, timeout)
 
@@ -439,7 +437,7 @@ class SwiModule:
         if self.__class__.__name__ == "HL79XX":
             swilog.step("killall socat dotnet")
             os.system("killall socat dotnet")
-            time.sleep(2)
+            wait.sleep(2)
             if self.dotnet_proc:
                 swilog.debug(self.dotnet_proc.stdout.read().decode("utf-8"))
             # Restore the port information of slink1 to its original value
@@ -620,7 +618,7 @@ class SwiModule:
                 swilog.info("Device is up!")
                 return 0
 
-            time.sleep(1)
+            wait.sleep(1)
             time_elapsed = time.time()
 
         swilog.warning("Device may be at some bad state")
@@ -637,7 +635,7 @@ class SwiModule:
             else:
                 swilog.info("AT port is down!")
                 return 0
-            time.sleep(1)
+            wait.sleep(1)
             time_elapsed = time.time()
 
         swilog.warning("Device is still up")
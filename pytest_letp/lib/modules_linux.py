@@ -5,15 +5,17 @@
 
 Set of functions for Linux modules.
 """
-import time
 import re
 import os
+from concurrent.futures import ThreadPoolExecutor
 import pexpect
 import pexpect.fdpexpect
 
 from pytest_letp.lib import swilog
 from pytest_letp.lib import com
 from pytest_letp.lib import app
+from pytest_letp.lib import wait
+from pytest_letp.lib.reboot_tracker import RebootTracker
 
 from pytest_letp.lib.versions_linux import LinuxVersions
 from pytest_letp.lib.module_exceptions import SlinkException, TargetException
@@ -30,6 +32,14 @@ __copyright__ = "Copyright (C) Sierra Wireless Inc."
 # =====================================================================================
 # Linux Helper Functions
 # =====================================================================================
+def _is_qcmap_stopped(target):
+    """Check that QCMAP_ConnectionManager is not running."""
+    exit_code, _ = target.run(
+        "pidof QCMAP_ConnectionManager", withexitstatus=True, check=False
+    )
+    return exit_code != 0
+
+
 def configure_ssh_env(read_config, inst_name):
     """Determine the ip address and the port of the target, set env variables.
 
@@ -350,28 +360,49 @@ class ModuleLinux(SwiModule):
 
     # pylint: disable=arguments-differ
     def wait_for_reboot(self, timeout=60, request=None):
-        """Wait for a reboot of the target (by ssh)."""
+        """Wait for a reboot of the target.
+
+        The console, the SSH port and the USB AT port are watched together
+        (see RebootTracker): the wait ends as soon as the target is back.
+        Then, the links are re-established in parallel.
+        """
+        tracker = RebootTracker()
+        if self.slink1 is not None:
+            tracker.watch_console(self.slink1)
+        if self.ssh is not None:
+            tracker.watch_tcp(self.ssh)
+        usb_tty = getattr(self.slink2, "dev_tty", None)
+        if usb_tty and os.path.exists(usb_tty):
+            tracker.watch_usb(usb_tty)
+        source = tracker.wait(timeout)
+        assert tracker.down.is_set(), "No shutdown of the target"
+        assert source is not None, "Device was not started"
+
         if self.slink1 is not None and self.ssh is not None:
-            self.slink1.wait_for_reboot(timeout=timeout)
+            self.slink1.login()
             if self.ssh.check_communication() != 0:
                 self.configure_board_for_ssh(request)
-        else:
-            assert self.wait_for_device_down(timeout) == 0, "No shutdown of the target"
-            assert self.wait_for_device_up(timeout) == 0, "Device was not started"
 
+        reinits = []
         if hasattr(self, "reinit"):
-            self.reinit()
+            reinits.append(self.reinit)
         if hasattr(self, "ssh2") and self.ssh2:
-            self.ssh2.reinit()
+            reinits.append(self.ssh2.reinit)
         if hasattr(self, "ssh_logread") and self.ssh_logread:
-            self.ssh_logread.reinit()
-            self.ssh_logread.sendline("logread -f")
+            reinits.append(self._reinit_logread)
+        with ThreadPoolExecutor(max_workers=len(reinits) or 1) as executor:
+            for future in [executor.submit(reinit) for reinit in reinits]:
+                future.result()
+
+    def _reinit_logread(self):
+        self.ssh_logread.reinit()
+        self.ssh_logread.sendline("logread -f")
 
     def reboot(self, timeout=60, power_supply=None):
         """Reboot the target using a power supply or sending reboot command."""
         if power_supply is None:
             self.send("/sbin/reboot -f\n")
-            time.sleep(2)
+            wait.sleep(2)
         for name in ["ssh", "ssh2", "ssh_logread"]:
             if not hasattr(self, name):
                 continue
@@ -401,7 +432,7 @@ class ModuleLinux(SwiModule):
                 break
             except Exception:
                 swilog.debug("Interface not ready. Wait for 5 s")
-                time.sleep(5)
+                wait.sleep(5)
                 count += 5
         assert count < timeout, "The expected interface %s was not mounted" % itf
 
@@ -440,7 +471,12 @@ class ModuleLinux(SwiModule):
 
         cmd = "/usr/bin/microcom /dev/ttyAT"
         self.sendline(cmd)
-        time.sleep(1)
+        # Wait for microcom to forward the AT commands.
+        if wait.wait_for_pattern(self, "OK", 1, probe="AT\r", interval=0.1) is not None:
+            # Drop the answers to the other probes, still in flight.
+            while self.expect(["OK", pexpect.TIMEOUT], 0.1) == 0:
+                pass
+            com.clear_buffer(self)
         try:
             rsp = com.run_at_cmd_and_check(
                 self, at_cmd, timeout, expect_rsp, check, eol, strict
@@ -627,9 +663,15 @@ class ModuleLinux(SwiModule):
             )
             if target_mac_addr is not None:
                 self.set_mac(target_mac_addr)
-            # Wait a little. It seems that udhcpc does not work sometimes
+            # Wait for the link. It seems that udhcpc does not work sometimes
             # if configure_eth is done just after reboot
-            time.sleep(10)
+            wait.wait_until(
+                lambda: self.target.run(
+                    "cat /sys/class/net/eth0/operstate", check=False
+                ).strip()
+                == "up",
+                timeout=10,
+            )
             self.configure_eth(ip_addr)
             # Open ssh port
             self.open_port(22)
@@ -933,9 +975,9 @@ class AR758X(ModuleLinux):
         self.target.run(
             "/etc/init.d/start_QCMAP_ConnectionManager_le stop", check=False
         )
-        time.sleep(5)
+        wait.wait_until(lambda: _is_qcmap_stopped(self.target), timeout=5)
         self.target.run("killall QCMAP_ConnectionManager", check=False)
-        time.sleep(5)
+        wait.wait_until(lambda: _is_qcmap_stopped(self.target), timeout=5)
         if addr == "":
             try:
                 rsp = self.target.run("udhcpc -i eth0")
@@ -960,9 +1002,9 @@ class AR759X(ModuleLinux):
         self.target.run(
             "/etc/init.d/start_QCMAP_ConnectionManager_le stop", check=False
         )
-        time.sleep(5)
+        wait.wait_until(lambda: _is_qcmap_stopped(self.target), timeout=5)
         self.target.run("killall QCMAP_ConnectionManager", check=False)
-        time.sleep(5)
+        wait.wait_until(lambda: _is_qcmap_stopped(self.target), timeout=5)
         if addr == "":
             try:
                 rsp = self.target.run("udhcpc -i eth0")
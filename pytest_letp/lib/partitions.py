@@ -1,12 +1,24 @@
 """Utility functions to flash partitions."""
 import os
-import time
+import subprocess
 
 from pytest_letp.lib import swilog
+from pytest_letp.lib import wait
 
 __copyright__ = "Copyright (C) Sierra Wireless Inc."
 
 
+def _fastboot_devices(sudo=""):
+    """List the devices in fastboot mode."""
+    return subprocess.run(
+        "%s fastboot devices" % sudo,
+        shell=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        universal_newlines=True,
+    ).stdout.strip()
+
+
 def erase(target, partition_name, root_password=None):
     """Erase a partition with fastboot.
 
@@ -14,10 +26,10 @@ def erase(target, partition_name, root_password=None):
     :param partition_name: partition to erase
     :param root_password: optional host root password
     """
+    sudo = 'echo "%s" | sudo -S ' % root_password if root_password else ""
     target.sendline("sys_reboot bootloader")
     swilog.info("wait for bootloader")
-    time.sleep(20)
-    sudo = 'echo "%s" | sudo -S ' % root_password if root_password else ""
+    wait.wait_until(lambda: _fastboot_devices(sudo), timeout=20, interval=0.5)
     cmd = "%s fastboot erase %s" % (sudo, partition_name)
     swilog.info(cmd)
     # Pexpect does not support "|" in command
@@ -1,12 +1,14 @@
 """Script to manage qTest's API.
 
 reference to: https://qtest.dev.tricentis.com/
+
+The requests are sent by the QTestSession of qtest_client.
 """
 import sys
 import xml.etree.ElementTree as ET
 import json
-import time
-import requests
+
+from pytest_letp.tools.qTest_upload.qtest_client import QTestSession
 
 
 # ====================================================================================
@@ -22,11 +24,20 @@ API_V3 = SERVER_URL + "api/v3/projects"
 class QTestAPI:
     """Class for qTest manager using REST API."""
 
-    def __init__(self, accessToken, project_id=None, parent_id=0, parent_type="root"):
+    def __init__(
+        self,
+        accessToken,
+        project_id=None,
+        parent_id=0,
+        parent_type="root",
+        server_url=SERVER_URL,
+    ):
         self.access_token = accessToken
         self.project_id = project_id
         self.parent_id = parent_id
         self.parent_type = parent_type
+        self.api_v3 = server_url + "api/v3/projects"
+        self.client = QTestSession(accessToken)
 
     def get_projects(self):
         """Retrieve all Projects that the qTest account can access.
@@ -34,7 +45,7 @@ class QTestAPI:
         API: /api/v3/projects
         """
         params = {"access_token": self.access_token}
-        response_json = self.get_qTest_info(API_V3, params)
+        response_json = self.get_qTest_info(self.api_v3, params)
         return response_json
 
     def get_cycles(self, parentId, parentType):
@@ -42,7 +53,7 @@ class QTestAPI:
 
         API: /api/v3/projects/{Project_ID}/test-cycles
         """
-        api_url = API_V3 + f"/{self.project_id}/test-cycles"
+        api_url = self.api_v3 + f"/{self.project_id}/test-cycles"
         params = {
             "access_token": self.access_token,
             "parentId": parentId,
@@ -56,7 +67,7 @@ class QTestAPI:
 
         API: /api/v3/projects/{Project_ID}/releases
         """
-        api_url = API_V3 + f"/{self.project_id}/releases"
+        api_url = self.api_v3 + f"/{self.project_id}/releases"
         params = {"access_token": self.access_token}
         response_json = self.get_qTest_info(api_url, params)
         return response_json
@@ -68,7 +79,7 @@ class QTestAPI:
 
         API: /api/v3/projects/{Project_ID}/test-suites
         """
-        api_url = API_V3 + f"/{self.project_id}/test-suites"
+        api_url = self.api_v3 + f"/{self.project_id}/test-suites"
         params = {
             "access_token": self.access_token,
             "parentId": parentId,
@@ -84,22 +95,20 @@ class QTestAPI:
 
         API: /api/v3/projects/{Project_ID}/test-runs
         """
-        api_url = API_V3 + f"/{self.project_id}/test-runs"
+        api_url = self.api_v3 + f"/{self.project_id}/test-runs"
         params = {
             "access_token": self.access_token,
             "parentId": parentId,
             "parentType": parentType,
-            "pageSize": 1000,
         }
-        response_json = self.get_qTest_info(api_url, params)
-        return response_json
+        return self.client.get_pages(api_url, params)
 
     def get_test_cases(self, test_case_id):
         """Retrieve a Test Case.
 
         API: /api/v3/projects/{Project_ID}/test-cases/{testCaseId}
         """
-        api_url = API_V3 + f"/{self.project_id}/test-cases/{test_case_id}"
+        api_url = self.api_v3 + f"/{self.project_id}/test-cases/{test_case_id}"
         params = {"access_token": self.access_token}
         response_json = self.get_qTest_info(api_url, params)
         return response_json
@@ -109,7 +118,7 @@ class QTestAPI:
 
         API: /api/v3/projects/{Project_ID}/{type}/{id}
         """
-        api_url = API_V3 + f"/{self.project_id}/{parent_type}/{parent_id}"
+        api_url = self.api_v3 + f"/{self.project_id}/{parent_type}/{parent_id}"
         params = {"access_token": self.access_token}
         response_json = self.get_qTest_info(api_url, params)
         return response_json
@@ -119,16 +128,9 @@ class QTestAPI:
 
         API: /api/v3/projects/{Project_ID}/test-cycles/{testCycleId}
         """
-        api_url = API_V3 + f"/{self.project_id}/test-cycles/{testCycleId}"
+        api_url = self.api_v3 + f"/{self.project_id}/test-cycles/{testCycleId}"
         params = {"access_token": self.access_token}
-        # Retry 6 times if the 'put' operation is unsuccessful,
-        # with cumulative waiting time gradually increases to 30 minutes.
-        for i in range(6):
-            time.sleep(i * 60 * 2)
-            response = requests.put(api_url, params=params, json=data)
-            if response.status_code == 200:
-                break
-        assert response.status_code == 200, f"{response.status_code} - {response.text}"
+        self.client.request("PUT", api_url, params=params, json=data)
 
     def get_cycle_id(self, cycle_name):
         """Get Test Cycles ID which are located directly under root."""
@@ -220,14 +222,18 @@ class QTestAPI:
     def get_test_script(self):
         """Get test cases and their test scripts."""
         test_run_data = self.get_test_runs(self.parent_id, self.parent_type)
+        # L_ReinitTest will be run separately when preparing testbed
+        test_runs = [
+            test_run
+            for test_run in test_run_data["items"]
+            if test_run["name"] != "L_ReinitTest"
+        ]
+        test_ids = list(dict.fromkeys(test_run["testCaseId"] for test_run in test_runs))
+        test_cases = dict(zip(test_ids, self.client.map(self.get_test_cases, test_ids)))
         dict_test_cases = {}
         empty_list = []
-        for test_run in test_run_data["items"]:
-            # L_ReinitTest will be run separately when preparing testbed
-            if test_run["name"] == "L_ReinitTest":
-                continue
-            test_id = test_run["testCaseId"]
-            tc_data = self.get_test_cases(test_id)
+        for test_run in test_runs:
+            tc_data = test_cases[test_run["testCaseId"]]
             test_script = ""
             for field in tc_data["properties"]:
                 if field["field_name"] == "Script Name":
@@ -255,35 +261,20 @@ class QTestAPI:
             element.find("campaign_type").text = self.parent_type
         tree.write(xml_file_path)
 
-    @staticmethod
-    def get_qTest_info(url, params):
-        """Retrieve information from qTest, if the process fails, retry it 6 times.
+    def get_qTest_info(self, url, params):
+        """Retrieve information from qTest.
 
-        With the cumulative waiting time gradually increasing to 30 minutes
+        The transient errors are retried with a jittered exponential
+        backoff, see QTestSession.
         """
-        for i in range(6):
-            if i != 0:
-                print(
-                    f"Try again after {i*2} mins when "
-                    + "retrieving information from qTest fails."
-                )
-            time.sleep(i * 60 * 2)
-            response = requests.get(url, params=params)
-            if response.status_code == 200:
-                break
-        assert response.status_code == 200, f"{response.status_code} - {response.text}"
-        return response.json()
+        return self.client.get_json(url, params)
 
 
 def gen_json_file(input_dict, file_path):
     """Generate JSON file with preset data structure."""
     # Create a data structure for the JSON file
     output_data = {
-        "letp": {
-            "tests": [
-                {"name": value} for value in input_dict.values()
-            ]
-        }
+        "letp": {"tests": [{"name": value} for value in input_dict.values()]}
     }
 
     # Write structured data to a JSON file
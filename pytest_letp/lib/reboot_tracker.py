@@ -0,0 +1,173 @@
+"""Event-driven reboot detection.
+
+A RebootTracker watches each way a target shows a reboot in its own
+thread, and wakes as soon as one of them shows the target is back:
+
+- the serial console: boot banner (down), then the login or shell
+  prompt (up). No answer (silent) only stops the probes of the console:
+  a busy target is silent too, it is not a shutdown.
+- the TCP port of the SSH server: unreachable (down), then reachable (up).
+- the USB device of a port: removed (down). Plugged again does not mean
+  the target is reachable: it does not wake the tracker.
+
+Example::
+
+    tracker = RebootTracker()
+    tracker.watch_console(target.slink1)
+    tracker.watch_tcp(target.ssh)
+    assert tracker.wait(60), "Device was not started"
+"""
+import os
+import threading
+import time
+
+import pexpect
+
+from pytest_letp.lib import swilog
+
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+BOOT_BANNERS = [r"U-Boot", r"Starting kernel", r"Booting Linux"]
+
+
+class RebootTracker:
+    """Wait for a target to go down and come back, from several sources.
+
+    Args:
+        poll_interval: polling interval of the sources without events
+            (TCP, USB) and expect timeout of the console, in seconds.
+        silence: time without any prompt after which the console is
+            considered silent, and not probed anymore, in seconds.
+    """
+
+    def __init__(self, poll_interval=0.2, silence=2.0):
+        self.poll_interval = poll_interval
+        self.silence = silence
+        self.down = threading.Event()
+        self.up = threading.Event()
+        self.up_source = None
+        # List of (time since start, source, event).
+        self.events = []
+        self._start = time.monotonic()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._watchers = []
+
+    def add_watcher(self, name, watch):
+        """Add a source, watched by watch(name) until stopped is set."""
+        self._watchers.append((name, watch))
+
+    @property
+    def stopped(self):
+        """The tracker does not wait anymore."""
+        return self._stop.is_set()
+
+    def set_event(self, source, event):
+        """Record an event ("down", "up", ...) of a source."""
+        with self._lock:
+            self.events.append((time.monotonic() - self._start, source, event))
+            swilog.debug("Reboot tracker: {} {}".format(source, event))
+            if event == "down":
+                self.down.set()
+            elif event == "up" and self.down.is_set() and not self.up.is_set():
+                self.up_source = source
+                self.up.set()
+
+    def watch_console(self, link, banners=None):
+        """Watch the boot banner and the prompts on a console link.
+
+        The console is probed with a new line every second until it is
+        silent (no prompt during silence seconds) or the target is down,
+        not to stop the boot loader. A prompt is the target back only
+        after a shutdown seen by a source (boot banner, TCP, USB): a
+        prompt after a silence only resumes the probes.
+        """
+        banners = BOOT_BANNERS if banners is None else banners
+        patterns = banners + [link.LOGIN, link.PROMPT, pexpect.TIMEOUT]
+
+        def watch(name):
+            last_answer = last_probe = time.monotonic()
+            silent = False
+            link.send("\r")
+            while not self.stopped:
+                probe = not (silent or self.down.is_set())
+                if probe and time.monotonic() - last_probe >= 1:
+                    last_probe = time.monotonic()
+                    link.send("\r")
+                try:
+                    index = link.expect(patterns, self.poll_interval)
+                except Exception as e:
+                    # The console is gone with the USB device of the target.
+                    swilog.debug(e)
+                    self.set_event(name, "down")
+                    return
+                if index < len(banners):
+                    self.set_event(name, "down")
+                elif index < len(banners) + 2:
+                    if self.down.is_set():
+                        self.set_event(name, "up")
+                        return
+                    if silent:
+                        silent = False
+                        self.set_event(name, "answer")
+                    last_answer = time.monotonic()
+                elif probe and time.monotonic() - last_answer > self.silence:
+                    silent = True
+                    self.set_event(name, "silent")
+
+        self.add_watcher("console", watch)
+
+    def watch_tcp(self, link):
+        """Watch the TCP port of a link with check_communication."""
+
+        def watch(name):
+            seen_down = False
+            while not self.stopped:
+                if link.check_communication(timeout=1) != 0:
+                    if not seen_down:
+                        seen_down = True
+                        self.set_event(name, "down")
+                elif seen_down:
+                    self.set_event(name, "up")
+                    return
+                self._stop.wait(self.poll_interval)
+
+        self.add_watcher("tcp", watch)
+
+    def watch_usb(self, path):
+        """Watch the presence of the USB device path of a port."""
+
+        def watch(name):
+            present = os.path.exists(path)
+            while not self.stopped:
+                if os.path.exists(path) != present:
+                    present = not present
+                    self.set_event(name, "plugged" if present else "down")
+                self._stop.wait(self.poll_interval)
+
+        self.add_watcher("usb", watch)
+
+    def wait(self, timeout):
+        """Watch the sources until the target is back or the timeout.
+
+        Returns:
+            The source which saw the target back, or None at timeout.
+        """
+        self._start = time.monotonic()
+        threads = [
+            threading.Thread(target=watch, args=(name,), daemon=True)
+            for name, watch in self._watchers
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            self.up.wait(timeout)
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+        if not self.down.is_set():
+            swilog.warning("No shutdown of the target")
+        elif not self.up.is_set():
+            swilog.warning("Device was not started")
+        return self.up_source
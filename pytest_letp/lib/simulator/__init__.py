@@ -0,0 +1,41 @@
+"""Simulated targets.
+
+Simulate a target without hardware, for the framework tests and the
+benchmarks of the LeTP communication links:
+
+- FakeShell: Linux console behind a pseudo terminal, with login prompt.
+- FakeModem: AT command port behind a pseudo terminal.
+- SimulatedSSHServer: local SSH endpoint (requires paramiko).
+- FakeNumato: Numato relay board behind a pseudo terminal.
+- SimulatedTarget: a module with a console, an AT port and optionally
+  SSH, which reboot together.
+
+The latency, baud rate, echo and boot time are configurable. The ports
+are symbolic links in a temporary directory, and the target writes its
+xml configuration to plug it into define_target:
+
+.. code-block:: python
+
+    with SimulatedTarget(boot_time=2) as sim:
+        sim.write_config("sim_target.xml")
+        # letp run --config sim_target.xml ...
+
+Run "python -m pytest_letp.lib.simulator" to start a simulated target
+from the command line.
+"""
+from pytest_letp.lib.simulator.device import SimulatedDevice
+from pytest_letp.lib.simulator.modem import FakeModem
+from pytest_letp.lib.simulator.numato import FakeNumato
+from pytest_letp.lib.simulator.shell import FakeShell, ShellSession
+from pytest_letp.lib.simulator.target import SimulatedTarget
+
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+__all__ = [
+    "SimulatedDevice",
+    "FakeModem",
+    "FakeNumato",
+    "FakeShell",
+    "ShellSession",
+    "SimulatedTarget",
+]
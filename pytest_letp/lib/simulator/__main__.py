@@ -0,0 +1,46 @@
+"""Start a simulated target until it is interrupted."""
+import argparse
+import time
+
+from pytest_letp.lib.simulator.target import SimulatedTarget
+
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+
+def main():
+    """Start the simulated target and write its configuration."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--config-file",
+        default="sim_target.xml",
+        help="xml configuration of the target, to use with letp run --config",
+    )
+    parser.add_argument("--module", default="wp76xx", help="Module name")
+    parser.add_argument("--latency", type=float, default=0.0, help="Latency in s")
+    parser.add_argument("--baudrate", type=int, help="Throttle to this baud rate")
+    parser.add_argument("--boot-time", type=float, default=5.0, help="Boot time in s")
+    parser.add_argument("--no-echo", action="store_true", help="Disable the echo")
+    parser.add_argument("--ssh", action="store_true", help="Start an SSH endpoint")
+    args = parser.parse_args()
+
+    with SimulatedTarget(
+        module_name=args.module,
+        latency=args.latency,
+        baudrate=args.baudrate,
+        echo=not args.no_echo,
+        boot_time=args.boot_time,
+        ssh=args.ssh,
+    ) as sim:
+        sim.write_config(args.config_file)
+        print("Simulated target configuration: {}".format(args.config_file))
+        for config in sim.get_config():
+            print("    {}".format(config))
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""Benchmarks of the LeTP I/O paths on a simulated target.
+
+Each benchmark times an operation of LeTP against a SimulatedTarget:
+
+- run: target.run on the Linux console.
+- at_cmd: run_at_cmd_and_check on the AT port.
+- login: login on the Linux console.
+- reboot: detection of a reboot and of the login prompt.
+- port_detection: detection of the AT port by ComPortDetector.
+- bulk_read, bulk_read_high_speed, bulk_read_raw: reception of a boot
+  log of BULK_SIZE bytes, with the default and the high speed modes of
+  ttyspawn, and with read_raw. The pseudo terminal is not throttled:
+  the data rate is far above 4 Mbaud.
+
+The results of each run are appended to a history file (JSON lines),
+and compared to the median of the previous runs to show the regressions.
+
+    python -m pytest_letp.lib.simulator.benchmark --history log/bench.jsonl
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from pytest_letp.lib import com
+from pytest_letp.lib.com_port_detector import ComPortDetector
+from pytest_letp.lib.simulator.device import SimulatedDevice
+from pytest_letp.lib.simulator.target import SimulatedTarget
+
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+DEFAULT_HISTORY = os.path.join("log", "benchmark_history.jsonl")
+# A benchmark regresses when its mean is this ratio slower than the median
+# of the previous runs.
+DEFAULT_THRESHOLD = 0.2
+# Size of the data of the bulk_read benchmarks, in bytes.
+BULK_SIZE = 1024 * 1024
+BULK_LINE = "[   12.345678] usb 1-1: new device, état °OK\r\n"
+BULK_END = "BULK_END"
+
+
+class _BulkDevice(SimulatedDevice):
+    """Device sending a boot log of size bytes on each carriage return."""
+
+    def __init__(self, size=BULK_SIZE, **kwargs):
+        super().__init__("bulk", **kwargs)
+        line = BULK_LINE.encode("utf-8")
+        # The log may end in the middle of a multibyte character.
+        self.payload = (line * (size // len(line) + 1))[:size]
+        self.payload += "\r\n{}\r\n".format(BULK_END).encode()
+
+    def handle_input(self, data):
+        if "\r" in data:
+            self.write(self.payload)
+
+
+class _SimulatedPortDetector(ComPortDetector):
+    """Detect the ports among the ports of a simulated target."""
+
+    def __init__(self, sim, *args):
+        super().__init__(*args)
+        self.sim = sim
+
+    def _get_com_port_device_lst(self, com_port_name=com.ComPortType.CLI.name):
+        return [device.link_path for device in self.sim.devices]
+
+
+def _measure(func, iterations, setup=None):
+    """Time func iterations times, after setup if any."""
+    samples = []
+    for _ in range(iterations):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    mean = statistics.mean(samples)
+    return {
+        "iterations": iterations,
+        "ops_per_s": 1 / mean if mean else 0.0,
+        "mean_ms": mean * 1000,
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000,
+    }
+
+
+def run_benchmarks(iterations=50, reboot_iterations=2, names=None, **sim_kwargs):
+    """Run the benchmarks on a simulated target.
+
+    Args:
+        iterations: iterations of the fast benchmarks.
+        reboot_iterations: iterations of the reboot benchmark.
+        names: benchmarks to run, all by default.
+        sim_kwargs: arguments of SimulatedTarget.
+
+    Returns:
+        {benchmark name: {"iterations", "ops_per_s", "mean_ms", "p95_ms"}}
+    """
+    # The reboot detection of LeTP polls every 2s or so: a shorter boot
+    # would not be detected.
+    sim_kwargs.setdefault("boot_time", 3.0)
+    results = {}
+    with SimulatedTarget(**sim_kwargs) as sim:
+        bulk = _BulkDevice(link_dir=sim.link_dir)
+        bulk.start()
+        cli = com.target_serial_qct(sim.cli.link_path, sim.baudrate or 115200)
+        at_port = com.target_serial_at(sim.at.link_path, sim.baudrate or 115200)
+        bulk_port = com.target_serial_at(bulk.link_path, 4000000)
+        bulk_iterations = max(1, iterations // 10)
+        try:
+            benchmarks = {
+                "run": (lambda: cli.run("uname"), iterations, None),
+                "at_cmd": (
+                    lambda: com.run_at_cmd_and_check(at_port, "ATI"),
+                    iterations,
+                    None,
+                ),
+                "login": (cli.login, iterations, sim.cli.session.logout),
+                "reboot": (
+                    lambda: _reboot(cli),
+                    reboot_iterations,
+                    None,
+                ),
+                "port_detection": (
+                    lambda: _detect_at_port(sim),
+                    max(1, iterations // 10),
+                    None,
+                ),
+                "bulk_read": (
+                    lambda: _bulk_read(bulk_port),
+                    bulk_iterations,
+                    lambda: _bulk_setup(bulk_port, False),
+                ),
+                "bulk_read_high_speed": (
+                    lambda: _bulk_read(bulk_port),
+                    bulk_iterations,
+                    lambda: _bulk_setup(bulk_port, True),
+                ),
+                "bulk_read_raw": (
+                    lambda: _bulk_read_raw(bulk_port, len(bulk.payload)),
+                    bulk_iterations,
+                    lambda: _bulk_setup(bulk_port, True),
+                ),
+            }
+            cli.login()
+            for name, (func, count, setup) in benchmarks.items():
+                if names and name not in names:
+                    continue
+                results[name] = _measure(func, count, setup)
+                if name == "reboot":
+                    # Let the AT port come back before the next benchmarks.
+                    at_port.reinit()
+        finally:
+            cli.close()
+            at_port.close()
+            bulk_port.close()
+            bulk.stop()
+    return results
+
+
+def _bulk_setup(link, high_speed):
+    link.set_high_speed(high_speed)
+    com.clear_buffer(link)
+
+
+def _bulk_read(link):
+    # Keep the processing of the logs, without printing them.
+    with contextlib.redirect_stdout(io.StringIO()):
+        link.send("\r")
+        link.expect(BULK_END, 60)
+
+
+def _bulk_read_raw(link, size):
+    link.send("\r")
+    received = 0
+    while received < size:
+        data = link.read_raw(timeout=60)
+        assert data, "Bulk data not received"
+        received += len(data)
+
+
+def _reboot(cli):
+    cli.sendline("reboot")
+    cli.wait_for_reboot(timeout=60)
+
+
+def _detect_at_port(sim):
+    port_info = com.ComPortInfo()
+    port_info.add_port(com.ComPortType.AT.name, "simulated")
+    detector = _SimulatedPortDetector(
+        sim, {com.ComPortType.AT.name: [("ATI", sim.at.model)]}, port_info
+    )
+    port = detector.get_com_port(com.ComPortType.AT.name)
+    assert port == sim.at.link_path, "AT port not detected"
+
+
+def _get_revision():
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            check=True,
+            universal_newlines=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def load_history(history_file):
+    """Load the previous benchmark runs."""
+    if not os.path.exists(history_file):
+        return []
+    with open(history_file) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def record(history_file, results, revision=None, created=None):
+    """Append the results of a run to the history."""
+    history_dir = os.path.dirname(history_file)
+    if history_dir:
+        os.makedirs(history_dir, exist_ok=True)
+    entry = {
+        "created": created or time.time(),
+        "revision": _get_revision() if revision is None else revision,
+        "results": results,
+    }
+    with open(history_file, "a") as f:
+        f.write(json.dumps(entry) + "\n")
+    return entry
+
+
+def find_regressions(history, results, threshold=DEFAULT_THRESHOLD):
+    """Compare results to the median of the previous runs.
+
+    Returns:
+        {benchmark name: (mean in ms, median of the previous means in ms)}
+        of the benchmarks slower than the median by more than threshold.
+    """
+    regressions = {}
+    for name, result in results.items():
+        previous = [
+            entry["results"][name]["mean_ms"]
+            for entry in history
+            if name in entry.get("results", {})
+        ]
+        if not previous:
+            continue
+        median = statistics.median(previous)
+        if result["mean_ms"] > median * (1 + threshold):
+            regressions[name] = (result["mean_ms"], median)
+    return regressions
+
+
+def main(argv=None):
+    """Run the benchmarks, record and compare their results."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark the LeTP I/O paths on a simulated target"
+    )
+    parser.add_argument("--history", default=DEFAULT_HISTORY, help="History file")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--reboot-iterations", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.0, help="Latency in s")
+    parser.add_argument("--baudrate", type=int, help="Throttle to this baud rate")
+    parser.add_argument("--boot-time", type=float, default=3.0, help="Boot time in s")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Regression ratio to the median of the previous runs",
+    )
+    parser.add_argument("--no-record", action="store_true", help="Do not record")
+    parser.add_argument(
+        "benchmarks", nargs="*", help="Benchmarks to run, all by default"
+    )
+    args = parser.parse_args(argv)
+
+    history = load_history(args.history)
+    results = run_benchmarks(
+        args.iterations,
+        args.reboot_iterations,
+        args.benchmarks,
+        latency=args.latency,
+        baudrate=args.baudrate,
+        boot_time=args.boot_time,
+    )
+    for name, result in results.items():
+        print(
+            "{:20} {:>10.1f} ops/s {:>10.3f} ms mean {:>10.3f} ms p95".format(
+                name, result["ops_per_s"], result["mean_ms"], result["p95_ms"]
+            )
+        )
+    if not args.no_record:
+        record(args.history, results)
+    regressions = find_regressions(history, results, args.threshold)
+    for name, (mean, median) in regressions.items():
+        print(
+            "Regression of {}: {:.3f} ms, previous median {:.3f} ms".format(
+                name, mean, median
+            )
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
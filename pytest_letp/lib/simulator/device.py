@@ -0,0 +1,156 @@
+"""Simulated serial device behind a pseudo terminal."""
+import os
+import pty
+import select
+import tempfile
+import threading
+import time
+import tty
+
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+
+class SimulatedDevice:
+    """A serial device simulated behind a pseudo terminal.
+
+    LeTP opens the device with its link path, a symbolic link to the
+    slave side of the pseudo terminal, as any serial port. The link path
+    is stable across the reboots of the device.
+
+    Args:
+        name: name of the link in the link directory.
+        link_dir: directory of the link, a temporary directory by default.
+        latency: delay in seconds before the device processes a command.
+        baudrate: throttle the output of the device to this baud rate.
+            No throttling if None.
+        echo: echo the received characters.
+        persistent: keep the port during a reboot, as an UART. Otherwise,
+            the port disappears while the device is down, as an USB port.
+    """
+
+    def __init__(
+        self,
+        name="device",
+        link_dir=None,
+        latency=0.0,
+        baudrate=None,
+        echo=True,
+        persistent=True,
+    ):
+        self.name = name
+        self.link_dir = link_dir or tempfile.mkdtemp(prefix="letp_sim_")
+        self.link_path = os.path.join(self.link_dir, name)
+        self.latency = latency
+        self.baudrate = baudrate
+        self.echo = echo
+        self.persistent = persistent
+        self.up = False
+        self.boot_count = 0
+        self._master = self._slave = None
+        self._reader = None
+        self._stop_reader = None
+        self._write_lock = threading.RLock()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        """Plug and boot the device."""
+        self._open()
+        self.power_on()
+
+    def stop(self):
+        """Unplug the device."""
+        self.up = False
+        self._close()
+
+    def power_off(self):
+        """Shut the device down, without any answer until power_on."""
+        self.up = False
+        if not self.persistent:
+            self._close()
+
+    def power_on(self):
+        """Boot the device."""
+        if self._master is None:
+            self._open()
+        self.boot_count += 1
+        self.up = True
+        self.on_boot()
+
+    def _open(self):
+        self._master, self._slave = pty.openpty()
+        # The device only sees what LeTP writes: no echo or line editing
+        # by the pseudo terminal itself.
+        tty.setraw(self._slave)
+        tmp_link = self.link_path + ".tmp"
+        if os.path.lexists(tmp_link):
+            os.unlink(tmp_link)
+        os.symlink(os.ttyname(self._slave), tmp_link)
+        os.replace(tmp_link, self.link_path)
+        self._stop_reader = threading.Event()
+        self._reader = threading.Thread(
+            target=self._read_loop, args=(self._master, self._stop_reader), daemon=True
+        )
+        self._reader.start()
+
+    def _close(self):
+        if self._master is None:
+            return
+        if os.path.lexists(self.link_path):
+            os.unlink(self.link_path)
+        self._stop_reader.set()
+        if self._reader is not threading.current_thread():
+            self._reader.join()
+        with self._write_lock:
+            os.close(self._master)
+            os.close(self._slave)
+            self._master = self._slave = None
+
+    def _read_loop(self, master, stop):
+        while not stop.is_set():
+            readable, _, _ = select.select([master], [], [], 0.05)
+            if not readable:
+                continue
+            try:
+                data = os.read(master, 4096)
+            except OSError:
+                return
+            if self.up and data:
+                self.handle_input(data.decode("utf-8", "replace"))
+
+    def write(self, data):
+        """Send data to LeTP, at the baud rate of the device if any."""
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        with self._write_lock:
+            if self._master is None:
+                return
+            if not self.baudrate:
+                os.write(self._master, data)
+                return
+            # 10 bits per byte on the line: start, 8 data and stop bits.
+            bytes_per_second = self.baudrate / 10
+            chunk_size = max(1, int(bytes_per_second / 100))
+            start = time.perf_counter()
+            for sent in range(0, len(data), chunk_size):
+                delay = start + sent / bytes_per_second - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                os.write(self._master, data[sent : sent + chunk_size])
+
+    def wait_latency(self):
+        """Simulate the processing time of a command."""
+        if self.latency:
+            time.sleep(self.latency)
+
+    def handle_input(self, data):
+        """Process the data written by LeTP."""
+        raise NotImplementedError
+
+    def on_boot(self):
+        """Send the boot output of the device."""
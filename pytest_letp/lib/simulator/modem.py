@@ -0,0 +1,110 @@
+"""Simulated AT command modem."""
+from pytest_letp.lib.simulator.device import SimulatedDevice
+
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+DEFAULT_RESPONSES = {
+    "AT": "",
+    "ATI": (
+        "Manufacturer: Sierra Wireless, Incorporated\r\n"
+        "Model: {model}\r\n"
+        "Revision: SWI9X07Y_02.37.03.00 b7ff9f simulated\r\n"
+        "IMEI: 359779080000001\r\n"
+        "IMEI SV: 13\r\n"
+        "FSN: VU0000000000A1\r\n"
+        "+GCAP: +CGSM"
+    ),
+    "ATI8": "FWVERSION: SWI9X07Y_02.37.03.00",
+    "ATI9": "BOOT VERSION: SWI9X07Y_02.37.03.00",
+    "AT+CGSN": "359779080000001",
+    "AT+KGSN=0": "+KGSN: 359779080000001",
+    "AT+KGSN=3": "+KGSN: VU0000000000A1",
+    "AT+KSREP?": "+KSREP: 0,0",
+    "AT+CIMI": "001010123456789",
+    "AT+CCID?": "+CCID: 89330000000000000001",
+    "AT+ICCID": "ICCID: 89330000000000000001",
+    "AT+CPIN?": "+CPIN: READY",
+    "AT+CSQ": "+CSQ: 20,99",
+    "AT+CFUN?": "+CFUN: 1",
+}
+
+
+class FakeModem(SimulatedDevice):
+    """Simulated AT command port.
+
+    The commands end with "\\r". The answer is the response of the command
+    followed by OK, or ERROR for an unknown command. ATE0/ATE1 disable or
+    enable the echo and AT+CFUN=1,1 reboots the target.
+
+    Args:
+        name: name of the link.
+        responses: {command: response}, the response can be a function
+            of the command returning the response or None for ERROR.
+        model: module model in the ATI response.
+        target: simulated target to reboot.
+    """
+
+    def __init__(
+        self, name="at", responses=None, model="WP7607", target=None, **kwargs
+    ):
+        kwargs.setdefault("persistent", False)
+        super().__init__(name, **kwargs)
+        self.responses = dict(DEFAULT_RESPONSES)
+        self.responses.update(responses or {})
+        self.model = model
+        self.target = target
+        self.commands = []
+        self._line = ""
+
+    def handle_input(self, data):
+        """Process the data written by LeTP."""
+        for char in data:
+            if char == "\n":
+                continue
+            if self.echo:
+                self.write(char)
+            if char == "\r":
+                line, self._line = self._line.strip(), ""
+                if line:
+                    self.wait_latency()
+                    self.process(line)
+            else:
+                self._line += char
+
+    def process(self, cmd):
+        """Answer an AT command."""
+        self.commands.append(cmd)
+        upper_cmd = cmd.upper()
+        if upper_cmd in ("ATE0", "ATE1"):
+            self.echo = upper_cmd == "ATE1"
+            self._answer("")
+        elif upper_cmd in ("AT+CFUN=1,1", "AT!RESET"):
+            self._answer("")
+            self.reboot()
+        elif upper_cmd in self.responses:
+            response = self.responses[upper_cmd]
+            if callable(response):
+                response = response(cmd)
+            self._answer(response)
+        else:
+            self._answer(None)
+
+    def _answer(self, response):
+        if response is None:
+            self.write("\r\nERROR\r\n")
+            return
+        if response:
+            self.write("\r\n{}\r\n".format(response.format(model=self.model)))
+        self.write("\r\nOK\r\n")
+
+    def reboot(self):
+        """Reboot the target of the modem."""
+        if self.target:
+            self.target.reboot()
+        else:
+            self.power_off()
+            self.power_on()
+
+    def on_boot(self):
+        """Reset the modem state."""
+        self._line = ""
@@ -0,0 +1,74 @@
+"""Simulated Numato USB relay and GPIO board."""
+from pytest_letp.lib.simulator.device import SimulatedDevice
+
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+
+class FakeNumato(SimulatedDevice):
+    """Simulated Numato relay board.
+
+    The commands end with "\\r" and are echoed. The answer is followed by
+    the ">" prompt:
+
+    - relay on/off/read N, relay readall (hexadecimal mask of the relays).
+    - gpio set/clear/read N.
+    - reset: all the relays off.
+
+    Args:
+        name: name of the link.
+        relays: number of relays.
+        gpios: number of GPIOs.
+    """
+
+    def __init__(self, name="numato", relays=8, gpios=8, **kwargs):
+        super().__init__(name, **kwargs)
+        self.relays = [False] * relays
+        self.gpios = [False] * gpios
+        self.commands = []
+        self._line = ""
+
+    def handle_input(self, data):
+        """Process the data written by LeTP."""
+        for char in data:
+            if char == "\n":
+                continue
+            if self.echo and char != "\r":
+                self.write(char)
+            if char == "\r":
+                line, self._line = self._line.strip(), ""
+                self.wait_latency()
+                self.process(line)
+            else:
+                self._line += char
+
+    def process(self, cmd):
+        """Answer a command."""
+        if cmd:
+            self.commands.append(cmd)
+        response = self._execute(cmd.split())
+        if response is not None:
+            self.write("\n\r{}".format(response))
+        self.write("\n\r>")
+
+    def _execute(self, words):
+        if words == ["reset"]:
+            self.relays = [False] * len(self.relays)
+            return None
+        if words == ["relay", "readall"]:
+            mask = sum(1 << nb for nb, state in enumerate(self.relays) if state)
+            return "{:0{}X}".format(mask, max(2, len(self.relays) // 4))
+        if len(words) != 3 or not words[2].isdigit():
+            return None
+        obj, action, nb = words[0], words[1], int(words[2])
+        states = {"relay": self.relays, "gpio": self.gpios}.get(obj)
+        if states is None or nb >= len(states):
+            return None
+        if action in ("on", "set"):
+            states[nb] = True
+        elif action in ("off", "clear"):
+            states[nb] = False
+        elif action == "read":
+            if obj == "gpio":
+                return "1" if states[nb] else "0"
+            return "on" if states[nb] else "off"
+        return None
@@ -0,0 +1,220 @@
+"""Simulated Linux console."""
+import re
+import time
+
+from pytest_letp.lib.simulator.device import SimulatedDevice
+
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+HOSTNAME = "swi-mdm9x28-wp"
+
+BOOT_LOG = (
+    "\r\nU-Boot 2014.04 (simulated)\r\n"
+    "Starting kernel ...\r\n"
+    "Poky (Yocto Project Reference Distro) 2.5.3 {hostname} ttyHSL0\r\n"
+)
+
+DEFAULT_COMMANDS = {
+    "uname": "Linux",
+    "uname -a": "Linux {hostname} 4.14.206 #1 PREEMPT armv7l GNU/Linux",
+    "hostname": "{hostname}",
+    "legato version": "21.05.0_simulated",
+    "cat /legato/systems/current/version": "21.05.0_simulated",
+    "free": (
+        "              total        used        free      shared  buff/cache\r\n"
+        "Mem:         154704       59572       68908         556       26224\r\n"
+        "Swap:             0           0           0"
+    ),
+    "ls /": "bin\r\nboot\r\ndata\r\ndev\r\netc\r\nlegato\r\nmnt\r\ntmp\r\nvar",
+    "true": "",
+    "false": ("", 1),
+    "sync": "",
+}
+
+
+class ShellSession:
+    """Interpreter of a simulated Linux shell session.
+
+    It handles the login, the echo, the line continuation of unbalanced
+    quotes and the exit status of the last command ($?).
+
+    Args:
+        write: function to send the output of the session.
+        commands: {command line: output or (output, exit status) or
+            function(command line) returning them}.
+        echo: echo the received characters, as a terminal.
+        logged_in: start with a prompt instead of a login prompt.
+        hostname: host name in the prompts.
+    """
+
+    def __init__(
+        self, write, commands=None, echo=True, logged_in=False, hostname=HOSTNAME
+    ):
+        self.write = write
+        self.commands = dict(DEFAULT_COMMANDS)
+        self.commands.update(commands or {})
+        self.echo = echo
+        self.hostname = hostname
+        self.logged_in = logged_in
+        self.last_exit = 0
+        self.on_reboot = None
+        self.on_exit = None
+        self.on_command = None
+        self._line = ""
+        self._pending = ""
+        self._last_char = ""
+
+    @property
+    def prompt(self):
+        """Shell prompt."""
+        return "root@{}:~# ".format(self.hostname)
+
+    @property
+    def login_prompt(self):
+        """Login prompt."""
+        return "\r\n{} login: ".format(self.hostname)
+
+    def show_prompt(self):
+        """Send the prompt of the current state."""
+        self.write(self.prompt if self.logged_in else self.login_prompt)
+
+    def logout(self):
+        """Go back to the login prompt."""
+        self.logged_in = False
+        self.write(self.login_prompt)
+
+    def feed(self, data):
+        """Process the received characters."""
+        for char in data:
+            if char == "\n" and self._last_char == "\r":
+                # \r\n is one end of line.
+                self._last_char = ""
+                continue
+            self._last_char = char
+            if char in "\r\n":
+                if self.echo:
+                    self.write("\r\n")
+                line, self._line = self._line, ""
+                self._process_line(line)
+            elif char == "\x03":
+                if self.echo:
+                    self.write("^C\r\n")
+                self._line = self._pending = ""
+                self.show_prompt()
+            elif char in "\x7f\x08":
+                self._line = self._line[:-1]
+            else:
+                if self.echo:
+                    self.write(char)
+                self._line += char
+
+    def _process_line(self, line):
+        if not self.logged_in:
+            if line.strip() == "root":
+                self.logged_in = True
+            elif line.strip():
+                self.write("Login incorrect\r\n")
+            self.show_prompt()
+            return
+        line = self._pending + line
+        if line.count('"') % 2 or line.count("'") % 2:
+            # Unbalanced quotes: the command continues on the next line.
+            self._pending = line + "\n"
+            self.write("> ")
+            return
+        self._pending = ""
+        if not line.strip():
+            self.show_prompt()
+            return
+        if self.on_command:
+            self.on_command(line)
+        output, exit_status = self.execute(line.strip())
+        self.last_exit = exit_status
+        if output is None:
+            # The session does not answer anymore (reboot, exit).
+            return
+        if output:
+            self.write(output.replace("\r\n", "\n").replace("\n", "\r\n") + "\r\n")
+        self.show_prompt()
+
+    def execute(self, cmd):
+        """Execute a command line.
+
+        Returns:
+            (output, exit status). The output is None when the session
+            ends with the command.
+        """
+        if cmd in self.commands:
+            result = self.commands[cmd]
+            if callable(result):
+                result = result(cmd)
+            if isinstance(result, tuple):
+                output, exit_status = result
+            else:
+                output, exit_status = result, 0
+            return output.format(hostname=self.hostname), exit_status
+        name = cmd.split()[0]
+        if name in ("reboot", "/sbin/reboot"):
+            self.write("\r\nThe system is going down NOW!\r\n")
+            if self.on_reboot:
+                self.on_reboot()
+            return None, 0
+        if name in ("exit", "logout"):
+            if self.on_exit:
+                self.on_exit()
+            else:
+                self.logout()
+            return None, 0
+        if name == "echo":
+            return self._echo(cmd[len("echo") :].strip()), 0
+        if name in ("cd", "stty", "export"):
+            return "", 0
+        if name == "sleep":
+            time.sleep(float(cmd.split()[1]))
+            return "", 0
+        return "-sh: {}: not found".format(name), 127
+
+    def _echo(self, args):
+        args = args.replace("$?", str(self.last_exit))
+        quoted = re.fullmatch(r"\"(.*)\"|'(.*)'", args, re.S)
+        if quoted:
+            args = quoted.group(1) if quoted.group(1) is not None else quoted.group(2)
+        return args
+
+
+class FakeShell(SimulatedDevice):
+    """Simulated Linux console on an UART.
+
+    It boots on the login prompt. The commands are those of
+    ShellSession, "reboot" reboots the target.
+    """
+
+    def __init__(self, name="cli", commands=None, target=None, **kwargs):
+        super().__init__(name, **kwargs)
+        self.target = target
+        self.session = ShellSession(self._write_output, commands, echo=self.echo)
+        self.session.on_reboot = self.reboot
+        self.session.on_command = lambda line: self.wait_latency()
+
+    def _write_output(self, data):
+        self.write(data)
+
+    def reboot(self):
+        """Reboot the target of the console."""
+        if self.target:
+            self.target.reboot()
+        else:
+            self.power_off()
+            self.power_on()
+
+    def handle_input(self, data):
+        """Process the data written by LeTP."""
+        self.session.echo = self.echo
+        self.session.feed(data)
+
+    def on_boot(self):
+        """Send the boot log and the login prompt."""
+        self.session.logged_in = False
+        self.session._line = self.session._pending = ""
+        self.write(BOOT_LOG.format(hostname=self.session.hostname))
+        self.session.show_prompt()
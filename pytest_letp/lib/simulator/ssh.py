@@ -0,0 +1,164 @@
+"""Local SSH endpoint of a simulated target.
+
+It requires paramiko. Any user and password are accepted, and each
+shell or exec channel runs a ShellSession of the target.
+"""
+import logging
+import socket
+import threading
+
+import paramiko
+
+from pytest_letp.lib.simulator.shell import ShellSession
+
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+# The connection checks of LeTP are closed without any SSH banner: do not
+# report them.
+LOG_CHANNEL = "letp.simulator.ssh"
+logging.getLogger(LOG_CHANNEL).addHandler(logging.NullHandler())
+logging.getLogger(LOG_CHANNEL).propagate = False
+
+
+class _ServerInterface(paramiko.ServerInterface):
+    """Accept any authentication and the shell/exec channels."""
+
+    def __init__(self):
+        self.shell_requested = threading.Event()
+        self.command = None
+
+    def get_allowed_auths(self, username):
+        return "none,password,publickey"
+
+    def check_auth_none(self, username):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_auth_password(self, username, password):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_auth_publickey(self, username, key):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_channel_request(self, kind, chanid):
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_pty_request(self, *args):
+        return True
+
+    def check_channel_window_change_request(self, *args):
+        return True
+
+    def check_channel_shell_request(self, channel):
+        self.shell_requested.set()
+        return True
+
+    def check_channel_exec_request(self, channel, command):
+        self.command = command.decode("utf-8", "replace")
+        self.shell_requested.set()
+        return True
+
+
+class SimulatedSSHServer:
+    """SSH server of a simulated target, on the local host.
+
+    Args:
+        target: simulated target, rebooted by the "reboot" command.
+        host: listening address.
+        port: listening port, any free port by default.
+    """
+
+    def __init__(self, target=None, host="127.0.0.1", port=0):
+        self.target = target
+        self.host = host
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind((host, port))
+        self.port = self._socket.getsockname()[1]
+        self._host_key = paramiko.RSAKey.generate(2048)
+        self._transports = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self._running = False
+
+    def start(self):
+        """Start to accept the SSH connections."""
+        self._socket.listen(5)
+        self._running = True
+        self._thread = threading.Thread(target=self._accept, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the server and close the connections."""
+        self._running = False
+        self._socket.close()
+        self.disconnect()
+
+    def disconnect(self):
+        """Close the connections, as when the target reboots."""
+        with self._lock:
+            transports, self._transports = self._transports, []
+        for transport in transports:
+            transport.close()
+
+    def _accept(self):
+        while self._running:
+            try:
+                sock, _ = self._socket.accept()
+            except OSError:
+                return
+            if self.target and not self.target.up:
+                sock.close()
+                continue
+            threading.Thread(target=self._serve, args=(sock,), daemon=True).start()
+
+    def _serve(self, sock):
+        transport = paramiko.Transport(sock)
+        transport.set_log_channel(LOG_CHANNEL)
+        transport.add_server_key(self._host_key)
+        server = _ServerInterface()
+        with self._lock:
+            self._transports.append(transport)
+        try:
+            transport.start_server(server=server)
+            channel = transport.accept(20)
+            if channel is None or not server.shell_requested.wait(20):
+                return
+            if server.command is not None:
+                self._exec(channel, server.command)
+            else:
+                self._shell(channel)
+        except (EOFError, OSError, paramiko.SSHException):
+            pass
+        finally:
+            transport.close()
+
+    def _new_session(self, channel, echo):
+        session = ShellSession(channel.sendall, echo=echo, logged_in=True)
+        if self.target:
+            session.commands.update(self.target.cli.session.commands)
+            session.on_reboot = self.target.reboot
+        return session
+
+    def _exec(self, channel, command):
+        session = self._new_session(channel, echo=False)
+        output, exit_status = session.execute(command.strip())
+        if output:
+            channel.sendall(output.replace("\n", "\r\n") + "\r\n")
+        channel.send_exit_status(exit_status)
+        channel.shutdown_write()
+        # The client closes the channel once it got the exit status.
+        while not channel.closed and channel.recv(4096):
+            pass
+        channel.close()
+
+    def _shell(self, channel):
+        session = self._new_session(channel, echo=True)
+        session.on_exit = channel.close
+        session.show_prompt()
+        while not channel.closed:
+            data = channel.recv(4096)
+            if not data:
+                return
+            session.feed(data.decode("utf-8", "replace"))
@@ -0,0 +1,165 @@
+"""Simulated target: a Linux console, an AT port and optionally SSH."""
+import threading
+import xml.etree.ElementTree as ET
+
+from pytest_letp.lib.simulator.modem import FakeModem
+from pytest_letp.lib.simulator.shell import FakeShell
+
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+
+class SimulatedTarget:
+    """Simulated module with a CLI port (slink1) and an AT port (slink2).
+
+    The target is plugged into define_target with its xml configuration,
+    see get_config and write_config.
+
+    Args:
+        module_name: module name of the configuration, e.g. wp76xx.
+        model: model of the module in the ATI response.
+        latency: delay in seconds before a command is processed.
+        baudrate: baud rate of the ports, to throttle their output.
+        echo: echo of the ports.
+        boot_time: time in seconds during which the target is down when
+            it reboots.
+        ssh: also start a local SSH endpoint (requires paramiko).
+        link_dir: directory of the port links.
+    """
+
+    def __init__(
+        self,
+        module_name="wp76xx",
+        model="WP7607",
+        latency=0.0,
+        baudrate=None,
+        echo=True,
+        boot_time=1.0,
+        ssh=False,
+        link_dir=None,
+    ):
+        self.module_name = module_name
+        self.baudrate = baudrate
+        self.boot_time = boot_time
+        self.cli = FakeShell(
+            "cli",
+            target=self,
+            link_dir=link_dir,
+            latency=latency,
+            baudrate=baudrate,
+            echo=echo,
+        )
+        self.at = FakeModem(
+            "at",
+            model=model,
+            target=self,
+            link_dir=self.cli.link_dir,
+            latency=latency,
+            baudrate=baudrate,
+            echo=echo,
+        )
+        self.ssh = None
+        if ssh:
+            # pylint: disable=import-outside-toplevel
+            from pytest_letp.lib.simulator.ssh import SimulatedSSHServer
+
+            self.ssh = SimulatedSSHServer(self)
+        self.devices = [self.cli, self.at]
+        self._boot_timer = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def link_dir(self):
+        """Directory of the port links."""
+        return self.cli.link_dir
+
+    def start(self):
+        """Plug and boot the target."""
+        for device in self.devices:
+            device.start()
+        if self.ssh:
+            self.ssh.start()
+
+    def stop(self):
+        """Unplug the target."""
+        if self._boot_timer:
+            self._boot_timer.cancel()
+        if self.ssh:
+            self.ssh.stop()
+        for device in self.devices:
+            device.stop()
+
+    @property
+    def up(self):
+        """The target is booted."""
+        return all(device.up for device in self.devices)
+
+    def power_off(self):
+        """Shut the target down."""
+        if self._boot_timer:
+            self._boot_timer.cancel()
+        for device in self.devices:
+            device.power_off()
+        if self.ssh:
+            self.ssh.disconnect()
+
+    def power_on(self):
+        """Boot the target."""
+        for device in self.devices:
+            device.power_on()
+
+    def reboot(self, boot_time=None):
+        """Reboot the target: down for boot_time, then booted again."""
+        self.power_off()
+        self._boot_timer = threading.Timer(
+            self.boot_time if boot_time is None else boot_time, self.power_on
+        )
+        self._boot_timer.daemon = True
+        self._boot_timer.start()
+
+    def get_config(self, inst_name="module"):
+        """Get the --config values of the target."""
+        speed = self.baudrate or 115200
+        config = ["{}/name={}".format(inst_name, self.module_name)]
+        for slink, device in (("slink1", self.cli), ("slink2", self.at)):
+            config += [
+                "{}/{}(used)=1".format(inst_name, slink),
+                "{}/{}/name={}".format(inst_name, slink, device.link_path),
+                "{}/{}/speed={}".format(inst_name, slink, speed),
+                "{}/{}/rtscts=0".format(inst_name, slink),
+            ]
+        if self.ssh:
+            config += [
+                "{}/ssh(used)=1".format(inst_name),
+                "{}/ssh/ip_address={}".format(inst_name, self.ssh.host),
+                "{}/ssh/port={}".format(inst_name, self.ssh.port),
+            ]
+        else:
+            config.append("{}/ssh(used)=0".format(inst_name))
+        return config
+
+    def write_config(self, xml_file, inst_name="module"):
+        """Write the xml configuration of the target, to use with --config."""
+        root = ET.Element("test")
+        for value in self.get_config(inst_name):
+            path, value = value.split("=", 1)
+            attr = None
+            if "(" in path:
+                path, attr = path[:-1].split("(")
+            elem = root
+            for tag in path.split("/"):
+                child = elem.find(tag)
+                if child is None:
+                    child = ET.SubElement(elem, tag)
+                elem = child
+            if attr:
+                elem.set(attr, value)
+            else:
+                elem.text = value
+        ET.ElementTree(root).write(xml_file, encoding="utf-8", xml_declaration=True)
+        return xml_file
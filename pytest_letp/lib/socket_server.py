@@ -1,10 +1,26 @@
-"""Network(Server) connection library."""
+"""Network(Server) connection library.
+
+- get_tcp_server/get_udp_server: threaded servers, one thread per
+  connection or datagram.
+- AsyncServer (get_async_tcp_server/get_async_udp_server): asyncio
+  server for load tests, with thousands of concurrent connections, in
+  echo, sink or source mode, with the throughput of each connection.
+- The measure mode of AsyncServer echoes the packets of make_packet
+  (sequence number and timestamp), counts them per connection, detects
+  the UDP losses and reorders, and measures the round trip time of the
+  probes sent by the server to the peer.
+"""
 # pylint: skip-file
 # Reenable pylint after error fixes.
+import asyncio
+import bisect
+import math
+import struct
 import sys
 import threading
 import time
 from pytest_letp.lib import swilog
+from pytest_letp.lib import wait
 
 if sys.version_info[0] > 2:
     import socketserver as SocketServer
@@ -76,7 +92,7 @@ class ThreadedTCPRequestHandler(SocketServer.BaseRequestHandler):
                 ):
                     break
         # Do not close the socket too early
-        time.sleep(self.server.wait_after_transaction)
+        wait.sleep(self.server.wait_after_transaction)
 
 
 class ThreadedTCPServer(SocketServer.ThreadingMixIn, SocketServer.TCPServer):
@@ -153,7 +169,7 @@ class ThreadedUDPRequestHandler(SocketServer.BaseRequestHandler):
             socket.sendto(self.data, self.client_address)
         self.server.cur_data += self.data
         # Do not close the socket too early
-        time.sleep(self.server.wait_after_transaction)
+        wait.sleep(self.server.wait_after_transaction)
 
 
 class ThreadedUDPServer(SocketServer.ThreadingMixIn, SocketServer.UDPServer):
@@ -184,3 +200,630 @@ def get_udp_server(ip, port, responder=True, max_size=128):
     # Do not close the socket too early
     serv.wait_after_transaction = 5
     return serv
+
+
+# Modes of AsyncServer.
+ASYNC_SERVER_MODES = ("echo", "sink", "source", "measure")
+# Maximum payload of an UDP datagram.
+UDP_MAX_SIZE = 65507
+# Header of the packets of the measure mode: magic, flags, sequence
+# number, timestamp of the sender in ns and length of the packet.
+MEASURE_HEADER = struct.Struct("!4sBIQI")
+MEASURE_MAGIC = b"LETP"
+# Flag of the probes sent by the server.
+FLAG_PROBE = 0x01
+# Upper bounds in seconds of the round trip time histogram buckets.
+RTT_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    math.inf,
+)
+# Maximum number of the missing sequence numbers tracked per connection.
+MAX_MISSING = 65536
+
+
+def monotonic_ns():
+    """Get time.monotonic() in ns (time.monotonic_ns is new in Python 3.7)."""
+    return int(time.monotonic() * 1e9)
+
+
+def make_packet(seq, size=MEASURE_HEADER.size, flags=0, timestamp=None):
+    """Build a packet of the measure mode.
+
+    Args:
+        seq: sequence number.
+        size: size of the packet, padded with zeros.
+        flags: FLAG_PROBE for the probes of the server.
+        timestamp: timestamp in ns, monotonic_ns() by default.
+
+    Returns:
+        The packet bytes.
+    """
+    size = max(size, MEASURE_HEADER.size)
+    if timestamp is None:
+        timestamp = monotonic_ns()
+    header = MEASURE_HEADER.pack(MEASURE_MAGIC, flags, seq, timestamp, size)
+    return header + bytes(size - MEASURE_HEADER.size)
+
+
+def parse_packet(data, offset=0):
+    """Parse the header of a packet of the measure mode.
+
+    Returns:
+        (flags, seq, timestamp, length), or None if it is not a packet.
+    """
+    if len(data) - offset < MEASURE_HEADER.size:
+        return None
+    magic, flags, seq, timestamp, length = MEASURE_HEADER.unpack_from(data, offset)
+    if magic != MEASURE_MAGIC or length < MEASURE_HEADER.size:
+        return None
+    return flags, seq, timestamp, length
+
+
+class SequenceStats:
+    """Losses, reorders and duplicates of the sequence numbers of a peer."""
+
+    def __init__(self):
+        self.packets = 0
+        self.reordered = 0
+        self.duplicates = 0
+        self.max_seq = None
+        self._missing = set()
+        self._untracked = 0
+
+    @property
+    def lost(self):
+        """Number of the sequence numbers not received (yet)."""
+        return len(self._missing) + self._untracked
+
+    def add(self, seq):
+        """Count a received sequence number."""
+        self.packets += 1
+        if self.max_seq is None:
+            self.max_seq = seq
+        elif seq > self.max_seq:
+            gap = range(self.max_seq + 1, seq)
+            room = max(0, MAX_MISSING - len(self._missing))
+            self._missing.update(gap[:room])
+            self._untracked += max(0, len(gap) - room)
+            self.max_seq = seq
+        elif seq in self._missing:
+            self._missing.discard(seq)
+            self.reordered += 1
+        else:
+            self.duplicates += 1
+
+    def to_dict(self):
+        """Get the JSON representation."""
+        expected = self.packets - self.duplicates + self.lost
+        return {
+            "packets": self.packets,
+            "lost": self.lost,
+            "reordered": self.reordered,
+            "duplicates": self.duplicates,
+            "loss_ratio": round(self.lost / expected, 6) if expected else 0.0,
+        }
+
+
+class RttHistogram:
+    """Histogram of round trip times."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.buckets = [0] * len(RTT_BUCKETS)
+
+    def add(self, rtt):
+        """Count a round trip time in seconds."""
+        self.count += 1
+        self.total += rtt
+        self.min = min(self.min, rtt)
+        self.max = max(self.max, rtt)
+        self.buckets[bisect.bisect_left(RTT_BUCKETS, rtt)] += 1
+
+    def percentile(self, percent):
+        """Upper bound of the bucket of a percentile, at most max."""
+        if not self.count:
+            return 0.0
+        rank = math.ceil(self.count * percent / 100)
+        seen = 0
+        for bound, count in zip(RTT_BUCKETS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        """Get the JSON representation, with the non-empty buckets only."""
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "min_s": round(self.min, 6),
+            "avg_s": round(self.total / self.count, 6),
+            "max_s": round(self.max, 6),
+            "p50_s": round(self.percentile(50), 6),
+            "p95_s": round(self.percentile(95), 6),
+            "buckets": {
+                "+Inf" if bound == math.inf else repr(bound): count
+                for bound, count in zip(RTT_BUCKETS, self.buckets)
+                if count
+            },
+        }
+
+
+class ConnectionStats:
+    """Traffic of a TCP connection, or of an UDP peer, of an AsyncServer."""
+
+    def __init__(self, peer, keep_data=False, send=None):
+        self.peer = peer
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self.packets_received = 0
+        self.packets_sent = 0
+        self.invalid_bytes = 0
+        # Sequence numbers of the packets of the peer, in measure mode.
+        self.sequence = SequenceStats()
+        # Round trip times of the probes of the server, in measure mode.
+        self.rtt = RttHistogram()
+        self.start = time.perf_counter()
+        self.end = None
+        self.data = bytearray() if keep_data else None
+        # Set when the connection is closed, or when the UDP peer is idle.
+        self.done = threading.Event()
+        self._timer = None
+        self._send = send
+
+    @property
+    def elapsed(self):
+        """Duration of the connection in seconds, up to now if not done."""
+        return (self.end or time.perf_counter()) - self.start
+
+    @property
+    def throughput(self):
+        """Bytes received and sent per second."""
+        elapsed = self.elapsed
+        return (self.bytes_received + self.bytes_sent) / elapsed if elapsed else 0.0
+
+    def to_dict(self):
+        """Get the JSON representation."""
+        result = {
+            "peer": "{}:{}".format(*self.peer[:2]) if self.peer else "",
+            "bytes_received": self.bytes_received,
+            "bytes_sent": self.bytes_sent,
+            "elapsed_s": round(self.elapsed, 6),
+            "throughput_bps": round(self.throughput, 1),
+        }
+        if self.packets_received or self.packets_sent:
+            result.update(
+                packets_received=self.packets_received,
+                packets_sent=self.packets_sent,
+                invalid_bytes=self.invalid_bytes,
+                sequence=self.sequence.to_dict(),
+                rtt=self.rtt.to_dict(),
+            )
+        return result
+
+
+# asyncio.BufferedProtocol is new in Python 3.7: read with data_received
+# before.
+_StreamProtocol = getattr(asyncio, "BufferedProtocol", asyncio.Protocol)
+
+
+class _TcpProtocol(_StreamProtocol):
+    """Connection of an AsyncServer, read into a reused buffer."""
+
+    def __init__(self, server):
+        self.server = server
+        self.buffer = memoryview(bytearray(server.chunk_size))
+        self.transport = None
+        self.stats = None
+        self.remaining = 0
+        self.paused = False
+        self.pending = bytearray()
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.server._transports.add(transport)
+        self.stats = self.server._open(
+            transport.get_extra_info("peername"), transport.write
+        )
+        if self.server.mode == "source":
+            self.remaining = self.server.source_size
+            self._send_source()
+
+    def get_buffer(self, sizehint):
+        return self.buffer
+
+    def buffer_updated(self, nbytes):
+        self.data_received(self.buffer[:nbytes])
+
+    def data_received(self, data):
+        self.server._received(self.stats, data)
+        if self.server.mode == "echo":
+            # The buffer is reused by the next read: copy the data.
+            self.transport.write(bytes(data))
+            self.stats.bytes_sent += len(data)
+        elif self.server.mode == "measure":
+            self._measure(data)
+
+    def _measure(self, data):
+        """Count and echo the complete packets of the stream.
+
+        The invalid data is skipped up to the next MEASURE_MAGIC.
+        """
+        pending = self.pending
+        pending += data
+        offset = 0
+        while len(pending) - offset >= MEASURE_HEADER.size:
+            packet = parse_packet(pending, offset)
+            if packet is None:
+                found = pending.find(MEASURE_MAGIC, offset + 1)
+                if found < 0:
+                    # Keep the bytes which may start the next magic.
+                    found = max(offset + 1, len(pending) - len(MEASURE_MAGIC) + 1)
+                self.stats.invalid_bytes += found - offset
+                offset = found
+                continue
+            length = packet[3]
+            if len(pending) - offset < length:
+                break
+            if self.server._measured(self.stats, packet):
+                self.transport.write(bytes(pending[offset : offset + length]))
+                self.stats.bytes_sent += length
+                self.stats.packets_sent += 1
+            offset += length
+        del pending[:offset]
+
+    def pause_writing(self):
+        self.paused = True
+
+    def resume_writing(self):
+        self.paused = False
+        self._send_source()
+
+    def _send_source(self):
+        payload = self.server.payload
+        while self.remaining and not self.paused:
+            size = min(self.remaining, len(payload))
+            self.transport.write(payload[:size])
+            self.stats.bytes_sent += size
+            self.remaining -= size
+        if not self.remaining and self.transport.can_write_eof():
+            self.transport.write_eof()
+
+    def eof_received(self):
+        # Close once the pending data is sent.
+        return False
+
+    def connection_lost(self, exc):
+        self.server._transports.discard(self.transport)
+        self.server._close(self.stats)
+
+
+class _UdpProtocol(asyncio.DatagramProtocol):
+    """Datagrams of an AsyncServer."""
+
+    def __init__(self, server):
+        self.server = server
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        server = self.server
+        stats = server._peer(addr, self.transport)
+        server._received(stats, data)
+        if server.mode == "measure":
+            packet = parse_packet(data)
+            if packet is None:
+                stats.invalid_bytes += len(data)
+            elif server._measured(stats, packet):
+                self.transport.sendto(data, addr)
+                stats.bytes_sent += len(data)
+                stats.packets_sent += 1
+        elif server.mode == "echo":
+            self.transport.sendto(data, addr)
+            stats.bytes_sent += len(data)
+        elif server.mode == "source":
+            payload = server.payload[:UDP_MAX_SIZE]
+            remaining = server.source_size
+            while remaining:
+                size = min(remaining, len(payload))
+                self.transport.sendto(payload[:size], addr)
+                stats.bytes_sent += size
+                remaining -= size
+
+
+class AsyncServer:
+    """TCP or UDP server of an asyncio event loop in a background thread.
+
+    The completion of each connection is signalled: wait_for_connections
+    and wait_for_bytes replace the sleep after each transaction of the
+    threaded servers.
+
+    Args:
+        ip: ip address of the server.
+        port: port of the server, 0 for any free port.
+        protocol: "tcp" or "udp".
+        mode: "echo" sends the received data back, "sink" discards it,
+            "source" sends source_size bytes to each client: on
+            connection for TCP, on each datagram for UDP. "measure"
+            echoes the packets of make_packet and measures them, see
+            probe.
+        source_size: size of the data sent in source mode.
+        chunk_size: size of the reads and of the writes.
+        keep_data: keep the received data, in cur_data.
+        idle_timeout: an UDP peer is done after this time without
+            datagram, in seconds.
+        backlog: listen backlog of TCP.
+    """
+
+    def __init__(
+        self,
+        ip,
+        port,
+        protocol="tcp",
+        mode="echo",
+        source_size=1024 * 1024,
+        chunk_size=65536,
+        keep_data=False,
+        idle_timeout=1.0,
+        backlog=4096,
+    ):
+        assert protocol in ("tcp", "udp"), "Unknown protocol {}".format(protocol)
+        assert mode in ASYNC_SERVER_MODES, "Unknown mode {}".format(mode)
+        self.protocol = protocol
+        self.mode = mode
+        self.source_size = source_size
+        self.chunk_size = chunk_size
+        self.keep_data = keep_data
+        self.idle_timeout = idle_timeout
+        self.payload = memoryview(bytes(range(256)) * (chunk_size // 256 + 1))[
+            :chunk_size
+        ]
+        self.connections = []
+        self.bytes_received = 0
+        self._peers = {}
+        self._transports = set()
+        self._cond = threading.Condition()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        try:
+            self._server = asyncio.run_coroutine_threadsafe(
+                self._start(ip, port, backlog), self._loop
+            ).result()
+        except Exception:
+            self._stop_loop()
+            raise
+        swilog.debug(
+            "[{} SERVER] {} mode on {}".format(
+                protocol.upper(), mode, self.server_address
+            )
+        )
+
+    async def _start(self, ip, port, backlog):
+        if self.protocol == "tcp":
+            server = await self._loop.create_server(
+                lambda: _TcpProtocol(self),
+                ip,
+                port,
+                backlog=backlog,
+                reuse_address=True,
+            )
+            self.server_address = server.sockets[0].getsockname()[:2]
+            return server
+        transport, _ = await self._loop.create_datagram_endpoint(
+            lambda: _UdpProtocol(self), local_addr=(ip, port)
+        )
+        self.server_address = transport.get_extra_info("sockname")[:2]
+        return transport
+
+    @property
+    def responder(self):
+        """Send the received data back, as the threaded servers."""
+        return self.mode == "echo"
+
+    @property
+    def cur_data(self):
+        """Data received by the server, if keep_data."""
+        with self._cond:
+            return b"".join(
+                bytes(stats.data) for stats in self.connections if stats.data
+            )
+
+    @property
+    def active(self):
+        """Number of the connections in progress."""
+        with self._cond:
+            return sum(not stats.done.is_set() for stats in self.connections)
+
+    def _open(self, peer, send=None):
+        stats = ConnectionStats(peer, self.keep_data, send)
+        with self._cond:
+            self.connections.append(stats)
+        return stats
+
+    def _peer(self, addr, transport):
+        stats = self._peers.get(addr)
+        if stats is None:
+            stats = self._peers[addr] = self._open(
+                addr, lambda data: transport.sendto(data, addr)
+            )
+        else:
+            stats._timer.cancel()
+        stats._timer = self._loop.call_later(self.idle_timeout, self._close, stats)
+        return stats
+
+    def _received(self, stats, data):
+        size = len(data)
+        stats.bytes_received += size
+        if stats.data is not None:
+            stats.data += data
+        with self._cond:
+            self.bytes_received += size
+            self._cond.notify_all()
+
+    def _measured(self, stats, packet):
+        """Measure a packet. Returns True if it is echoed."""
+        flags, seq, timestamp, _ = packet
+        stats.packets_received += 1
+        if flags & FLAG_PROBE:
+            stats.rtt.add((monotonic_ns() - timestamp) / 1e9)
+            with self._cond:
+                self._cond.notify_all()
+            return False
+        stats.sequence.add(seq)
+        return True
+
+    def _close(self, stats):
+        stats.end = time.perf_counter()
+        self._peers.pop(stats.peer, None)
+        with self._cond:
+            stats.done.set()
+            self._cond.notify_all()
+
+    def wait_for_connections(self, count, timeout=15):
+        """Wait until count connections are done.
+
+        Returns:
+            True if they are done before the timeout.
+        """
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: sum(stats.done.is_set() for stats in self.connections) >= count,
+                timeout,
+            )
+
+    def wait_for_bytes(self, size, timeout=15):
+        """Wait until the server received size bytes in total.
+
+        Returns:
+            True if they are received before the timeout.
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: self.bytes_received >= size, timeout)
+
+    async def _probe(self, stats, count, size, interval):
+        for seq in range(count):
+            packet = make_packet(seq, size, FLAG_PROBE)
+            stats._send(packet)
+            stats.bytes_sent += len(packet)
+            stats.packets_sent += 1
+            if interval:
+                await asyncio.sleep(interval)
+
+    def probe(self, stats=None, count=10, size=64, interval=0.01, timeout=5):
+        """Measure the round trip time to a peer echoing the data.
+
+        In measure mode, send count probes to the peer, and wait for them
+        to come back.
+
+        Args:
+            stats: ConnectionStats of the peer, the last connection by
+                default.
+            count: number of probes.
+            size: size of the probes in bytes.
+            interval: interval between the probes in seconds.
+            timeout: time to wait for the probes after the last one.
+
+        Returns:
+            The RttHistogram of the peer.
+        """
+        assert self.mode == "measure", "Probes need the measure mode"
+        stats = stats or self.connections[-1]
+        expected = stats.rtt.count + count
+        asyncio.run_coroutine_threadsafe(
+            self._probe(stats, count, size, interval), self._loop
+        ).result()
+        with self._cond:
+            if not self._cond.wait_for(lambda: stats.rtt.count >= expected, timeout):
+                swilog.warning("{} probes lost".format(expected - stats.rtt.count))
+        return stats.rtt
+
+    def get_stats(self):
+        """Get the totals of the server and the stats of each connection."""
+        with self._cond:
+            connections = list(self.connections)
+        result = {
+            "protocol": self.protocol,
+            "mode": self.mode,
+            "address": "{}:{}".format(*self.server_address),
+            "connections": len(connections),
+            "bytes_received": sum(stats.bytes_received for stats in connections),
+            "bytes_sent": sum(stats.bytes_sent for stats in connections),
+        }
+        if self.mode == "measure":
+            result["packets_received"] = sum(
+                stats.packets_received for stats in connections
+            )
+            result["packets_lost"] = sum(stats.sequence.lost for stats in connections)
+            result["packets_reordered"] = sum(
+                stats.sequence.reordered for stats in connections
+            )
+        result["per_connection"] = [stats.to_dict() for stats in connections]
+        return result
+
+    async def _shutdown(self):
+        self._server.close()
+        for transport in list(self._transports):
+            transport.close()
+        if self.protocol == "tcp":
+            await self._server.wait_closed()
+
+    def shutdown(self):
+        """Stop the server and its event loop."""
+        if not self._loop.is_running():
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+        self._stop_loop()
+
+    def _stop_loop(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def server_close(self):
+        """Close the server, as the threaded servers."""
+        self.shutdown()
+
+
+def get_async_tcp_server(ip, port, mode="echo", **kwargs):
+    """Get an asyncio TCP server.
+
+    :param ip: ip address of the server
+    :param port: tcp port
+    :param mode: echo, sink or source
+    :param kwargs: arguments of AsyncServer
+
+    @returns the AsyncServer instance
+    """
+    return AsyncServer(ip, port, "tcp", mode, **kwargs)
+
+
+def get_async_udp_server(ip, port, mode="echo", **kwargs):
+    """Get an asyncio UDP server.
+
+    :param ip: ip address of the server
+    :param port: udp port
+    :param mode: echo, sink or source
+    :param kwargs: arguments of AsyncServer
+
+    @returns the AsyncServer instance
+    """
+    return AsyncServer(ip, port, "udp", mode, **kwargs)
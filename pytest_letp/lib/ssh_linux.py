@@ -2,10 +2,11 @@
 """SSH communictaion link for linux environment."""
 import sys
 import re
-import time
 import socket
 import pexpect.pxssh
+from pytest_letp.lib import metrics
 from pytest_letp.lib import swilog
+from pytest_letp.lib import wait
 from pytest_letp.lib.com import (
     TTYLog,
     setup_linux_login,
@@ -65,6 +66,7 @@ class target_ssh_qct(pexpect.pxssh.pxssh):
                 return False
         return True
 
+    @metrics.timed("login")
     def login(self, timeout=90):
         """Login to the embedded Linux console."""
         delay = 10
@@ -77,7 +79,7 @@ class target_ssh_qct(pexpect.pxssh.pxssh):
             swilog.warning(
                 "No communication with the target. Trying again in %ds.", delay
             )
-            time.sleep(delay)
+            wait.sleep(delay)
         try:
             super(target_ssh_qct, self).login(
                 self.target_ip, "root", auto_prompt_reset=False, port=self.ssh_port
@@ -96,6 +98,7 @@ class target_ssh_qct(pexpect.pxssh.pxssh):
             count += 1
             assert count != 5, "Impossible to send command stty to target"
 
+    @metrics.timed("expect", check_after=True)
     def expect(self, *args, **kwargs):
         r"""Expect function from the pexpect library.
 
@@ -223,7 +226,9 @@ class target_ssh_qct(pexpect.pxssh.pxssh):
                     )
                     if self.cli_port is not None:
                         assert self.check_target_status(60) == 0, "Device was not started"
-                    time.sleep(30)
+                    wait.wait_until(
+                        lambda: self.check_communication() == 0, timeout=30, interval=1
+                    )
                     self.reinit()
                     assert 0, (
                         "communication error!!!. Was there an unexpected reboot? %s"
@@ -234,6 +239,7 @@ class target_ssh_qct(pexpect.pxssh.pxssh):
                         "Communication to the device is lost after reboot"
                     )
 
+    @metrics.timed("run")
     def run(self, cmd, timeout=-1, local_echo=True, withexitstatus=False, check=True):
         r"""Run a command, check the exit status by default.
 
@@ -275,6 +281,7 @@ class target_ssh_qct(pexpect.pxssh.pxssh):
             swilog.warning(e)
             raise ComException("Unable to send the cmd {} through ssh link".format(cmd))
 
+    @metrics.timed("reboot")
     def reboot(self, timeout=60, power_supply=None):
         """Reboot the device.
 
@@ -318,10 +325,11 @@ class target_ssh_qct(pexpect.pxssh.pxssh):
         while self.check_communication(timeout=1) != expected_com and count != 0:
             # Sleep should be done only if expected_com == 1:
             # But seen that sometimes the socket does not wait 1 s (LETEST-1619)
-            time.sleep(1)
+            wait.sleep(1)
             count -= 1
         return 1 if count == 0 else 0
 
+    @metrics.timed("wait_for_reboot")
     def wait_for_reboot(self, timeout=60):
         """Wait for a reboot of the target (by ssh).
 
@@ -349,7 +357,7 @@ class target_ssh_qct(pexpect.pxssh.pxssh):
             **self.save_kwargs
         )
         self.PROMPT = QctAttr().prompt
-        time.sleep(2)
+        wait.sleep(2)
         self.login()
         self.reinit_in_progress = False
 
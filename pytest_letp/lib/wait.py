@@ -0,0 +1,117 @@
+"""Waits on conditions instead of fixed sleeps.
+
+wait_until polls a predicate and wait_for_pattern expects a pattern on
+a link, with an exponential backoff and an upper bound: they return as
+soon as the condition holds.
+
+The remaining fixed sleeps go through sleep, so that the time spent
+sleeping is in the session metrics (operation "sleep", per caller).
+"""
+import sys
+import time
+
+import pexpect
+
+from pytest_letp.lib import metrics
+
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+
+def _caller_name(depth=2):
+    return sys._getframe(depth).f_code.co_name  # pylint: disable=protected-access
+
+
+def sleep(seconds, reason=None):
+    """Sleep, recorded in the sleep metric.
+
+    Args:
+        seconds: time to sleep.
+        reason: name of the sleep in the metrics, the caller by default.
+    """
+    if seconds <= 0:
+        return
+    start = time.perf_counter()
+    time.sleep(seconds)
+    if metrics.registry.enabled:
+        metrics.registry.record(
+            "sleep", reason or _caller_name(), time.perf_counter() - start
+        )
+
+
+def _intervals(timeout, interval, backoff, max_interval):
+    """Yield the polling intervals until the timeout."""
+    end_time = time.monotonic() + timeout
+    while True:
+        remaining = end_time - time.monotonic()
+        if remaining <= 0:
+            return
+        yield min(interval, remaining)
+        interval = min(interval * backoff, max_interval)
+
+
+def wait_until(
+    predicate, timeout, interval=0.05, backoff=2.0, max_interval=2.0, reason=None
+):
+    """Wait until a predicate holds.
+
+    The predicate is polled immediately, then after intervals growing by
+    backoff up to max_interval.
+
+    Args:
+        predicate: function without argument.
+        timeout: upper bound of the wait in seconds.
+        interval: first polling interval in seconds.
+        backoff: growth factor of the polling interval.
+        max_interval: maximum polling interval in seconds.
+        reason: name of the wait in the sleep metric, the caller by default.
+
+    Returns:
+        The first true value of the predicate, or its last value at timeout.
+    """
+    reason = reason or _caller_name()
+    result = predicate()
+    if result:
+        return result
+    for delay in _intervals(timeout, interval, backoff, max_interval):
+        sleep(delay, reason)
+        result = predicate()
+        if result:
+            return result
+    return result
+
+
+def wait_for_pattern(
+    target,
+    patterns,
+    timeout,
+    probe=None,
+    interval=0.5,
+    backoff=2.0,
+    max_interval=4.0,
+):
+    """Wait until a link receives one of the patterns.
+
+    Each attempt sends probe if any, then expects the patterns during
+    the polling interval, growing by backoff up to max_interval.
+
+    Args:
+        target: link with send and expect, e.g. target_serial_qct.
+        patterns: pattern or list of patterns.
+        timeout: upper bound of the wait in seconds.
+        probe: data to send before each attempt, e.g. "\\r".
+        interval: first expect timeout in seconds.
+        backoff: growth factor of the expect timeout.
+        max_interval: maximum expect timeout in seconds.
+
+    Returns:
+        The index of the received pattern, or None at timeout.
+    """
+    if not isinstance(patterns, list):
+        patterns = [patterns]
+    for delay in _intervals(timeout, interval, backoff, max_interval):
+        if probe is not None:
+            target.send(probe)
+        index = target.expect(patterns + [pexpect.TIMEOUT], delay)
+        if index is not None and index < len(patterns):
+            return index
+    return None
@@ -0,0 +1,140 @@
+"""Device pool worker.
+
+When a session is started by the device pool scheduler (see
+lib/device_pool.py), the tests are not run in the collection order: the
+worker asks the scheduler for the next test to run on its device until
+there is no more test.
+
+The next test is only claimed when the current test tears down its
+fixtures, so that a worker never holds a test while it runs another one.
+"""
+import os
+import pytest
+import _pytest.config
+from multiprocessing.connection import Client
+from pytest_letp.lib import device_pool
+
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+
+@pytest.hookimpl
+def pytest_configure(config: _pytest.config.Config) -> None:
+    """Configure the plugin when the session is a worker of a device pool."""
+    if os.environ.get(device_pool.ADDRESS_ENV):
+        config.pluginmanager.register(DevicePoolWorker(config), "DevicePoolWorker")
+
+
+class _NextItem:
+    """Next test of a worker, claimed from the scheduler on first use.
+
+    pytest uses the next item in the teardown of the current test, to
+    keep the fixtures that the next test also uses.
+    """
+
+    def __init__(self, worker, items, session):
+        self._worker = worker
+        self._items = items
+        self._session = session
+        self.claimed = False
+        self.item = None
+
+    def resolve(self):
+        """Claim the next test, unless the session stops."""
+        if not self.claimed:
+            self.claimed = True
+            if not (self._session.shouldfail or self._session.shouldstop):
+                self.item = self._worker.next_item(self._items)
+        return self.item
+
+    def listchain(self):
+        """Get the collectors of the next test, none if there is no more."""
+        item = self.resolve()
+        return item.listchain() if item else []
+
+    def __getattr__(self, name):
+        return getattr(self.resolve(), name)
+
+
+class DevicePoolWorker:
+    """Run the tests dispatched by the device pool scheduler."""
+
+    def __init__(self, config):
+        self.config = config
+        self.device_name = os.environ[device_pool.DEVICE_ENV]
+        self._conn = None
+        self._outcomes = {}
+
+    def _connect(self):
+        host, port = os.environ[device_pool.ADDRESS_ENV].rsplit(":", 1)
+        authkey = bytes.fromhex(os.environ[device_pool.AUTHKEY_ENV])
+        self._conn = Client((host, int(port)), authkey=authkey)
+
+    def next_item(self, items):
+        """Claim the next test of the device from the scheduler."""
+        self._conn.send(("next", self.device_name))
+        nodeid = self._conn.recv()
+        return items[nodeid] if nodeid else None
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_runtestloop(self, session):
+        """Run the tests dispatched to the device."""
+        if (
+            session.testsfailed
+            and not session.config.option.continue_on_collection_errors
+        ):
+            plural = "s" if session.testsfailed != 1 else ""
+            raise session.Interrupted(
+                f"{session.testsfailed} error{plural} during collection"
+            )
+        if session.config.option.collectonly:
+            return True
+        self._connect()
+        items = {item.nodeid: item for item in session.items}
+        self._conn.send(
+            (
+                "collected",
+                self.device_name,
+                [
+                    (item.nodeid, device_pool.PAIRED_FIXTURE in item.fixturenames)
+                    for item in session.items
+                ],
+            )
+        )
+        item = self.next_item(items)
+        while item:
+            nextitem = _NextItem(self, items, session)
+            item.config.hook.pytest_runtest_protocol(item=item, nextitem=nextitem)
+            self._conn.send(
+                (
+                    "finished",
+                    self.device_name,
+                    item.nodeid,
+                    self._outcomes.get(item.nodeid, "unknown"),
+                )
+            )
+            if session.shouldfail or session.shouldstop:
+                if nextitem.item:
+                    # Claimed before the session stopped: give it back.
+                    self._conn.send(("release", self.device_name, nextitem.item.nodeid))
+                if session.shouldfail:
+                    raise session.Failed(session.shouldfail)
+                raise session.Interrupted(session.shouldstop)
+            item = nextitem.resolve()
+        return True
+
+    @pytest.hookimpl
+    def pytest_runtest_logreport(self, report):
+        """Keep the outcome of the tests for the scheduler."""
+        if report.when == "call" or report.outcome != "passed":
+            if self._outcomes.get(report.nodeid) in ("failed", "error"):
+                return
+            outcome = report.outcome
+            if report.when != "call" and report.failed:
+                outcome = "error"
+            self._outcomes[report.nodeid] = outcome
+
+    @pytest.hookimpl
+    def pytest_unconfigure(self):
+        """Disconnect from the scheduler."""
+        if self._conn:
+            self._conn.close()
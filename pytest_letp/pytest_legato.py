@@ -21,6 +21,11 @@ def app_leg_main(request, target, read_config, tmpdir):
     where xxx is the name of the test ie,
     APP_NAME_test_L_AtomicFile_Operation_0012     APP_NAME if the
     application is shared for all the tests
+
+    The build cache is disabled by default. Enable it with
+    --config test_run/build_cache=true (~/.cache/letp/build) or a
+    directory: the build is then reused when the adef, its sources, the
+    build flags and the toolchain did not change.
     """
     assert read_config
     target_type = target.target_name
@@ -66,6 +71,10 @@ def app_leg(request, target, read_config, tmpdir):
     """Fixture to build, install and clean a Legato application.
 
     This fixture builds and installs the Legato application.
+    The build cache is disabled by default. Enable it with
+    --config test_run/build_cache=true (~/.cache/letp/build) or a
+    directory: the build is then reused when the adef, its sources, the
+    build flags and the toolchain did not change.
 
     At the end, remove the application and clean the build on host.
     The application name and path should be declared at
@@ -242,6 +251,8 @@ def legato(target):
 
     :py:func:`~lib.app.make`
 
+    :py:func:`~lib.app.make_parallel`
+
     :py:func:`~lib.app.install`
 
     :py:func:`~lib.app.make_install`
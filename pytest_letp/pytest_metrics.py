@@ -0,0 +1,122 @@
+"""Operation metrics.
+
+The link operations, the application build and install, and the fixture
+setup and teardown are timed per test and link (see lib/metrics.py). The
+fixed sleeps and condition waits (see lib/wait.py) are recorded as the
+"sleep" operation, summed up at the end of the session.
+
+The statistics of each test are in its JSON report metadata ("metrics"),
+the session statistics at the top of the JSON report. At the end of the
+session, they are also written in a Prometheus text file.
+
+In test_run.xml:
+
+metrics: false disables the metrics, enabled by default.
+
+metrics_file: Prometheus text file, log/letp_metrics.prom by default.
+"""
+import os
+import time
+import pytest
+import _pytest.config
+from pytest_letp.lib import metrics
+from pytest_letp.pytest_test_config import TEST_CONFIG_KEY
+
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+
+@pytest.hookimpl
+def pytest_configure(config: _pytest.config.Config) -> None:
+    """Configure the plugin."""
+    config.pluginmanager.register(MetricsPlugin(config), "MetricsPlugin")
+
+
+class MetricsPlugin:
+    """Time the fixtures and attribute the operations to the tests."""
+
+    def __init__(self, config):
+        self.config = config
+        self.registry = metrics.registry
+        self._teardown_start = {}
+
+    def pytest_sessionstart(self, session):
+        """Start the metrics of the session."""
+        self.registry.reset()
+        default_cfg = session.config._store.get(TEST_CONFIG_KEY, None)
+        self.registry.enabled = default_cfg is None or default_cfg.is_metrics_enabled()
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_protocol(self, item):
+        """Attribute the operations during the test to the test."""
+        self.registry.test = item.nodeid
+        yield
+        self.registry.test = metrics.SESSION
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_fixture_setup(self, fixturedef, request):
+        """Time the fixture setup, and its teardown from its last finalizer."""
+        if not self.registry.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        yield
+        self.registry.record(
+            "fixture_setup", fixturedef.argname, time.perf_counter() - start
+        )
+        # The finalizers run in the reverse order: this one runs first and
+        # pytest_fixture_post_finalizer after the fixture teardown.
+        fixturedef.addfinalizer(
+            lambda: self._teardown_start.__setitem__(
+                fixturedef.argname, time.perf_counter()
+            )
+        )
+
+    def pytest_fixture_post_finalizer(self, fixturedef, request):
+        """Record the fixture teardown."""
+        start = self._teardown_start.pop(fixturedef.argname, None)
+        if start is not None:
+            self.registry.record(
+                "fixture_teardown", fixturedef.argname, time.perf_counter() - start
+            )
+
+    def pytest_json_runtest_metadata(self, item, call):
+        """Add the metrics of the test to its JSON report metadata."""
+        if call.when != "teardown" or not self.registry.enabled:
+            return None
+        return {"metrics": self.registry.get_test_stats(item.nodeid)}
+
+    def pytest_json_modifyreport(self, json_report):
+        """Add the metrics of the session to the JSON report."""
+        if self.registry.enabled:
+            json_report["metrics"] = self.registry.to_dict()
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_sessionfinish(self, session):
+        """Write the Prometheus text file."""
+        default_cfg = session.config._store.get(TEST_CONFIG_KEY, None)
+        if not self.registry.enabled or default_cfg is None:
+            return
+        self.registry.write_prometheus(
+            os.path.join(
+                str(self.config.invocation_params.dir), default_cfg.get_metrics_file()
+            )
+        )
+
+    def pytest_terminal_summary(self, terminalreporter):
+        """Report the time spent in fixed sleeps and waits."""
+        if not self.registry.enabled:
+            return
+        sleeps = sorted(
+            (stats.total, link)
+            for (operation, link), stats in self.registry.get_totals().items()
+            if operation == "sleep"
+        )
+        if not sleeps:
+            return
+        total = sum(duration for duration, _ in sleeps)
+        longest = ", ".join(
+            "{} {:.1f}s".format(link, duration) for duration, link in sleeps[-3:][::-1]
+        )
+        terminalreporter.write_line(
+            "Time spent sleeping: {:.1f}s ({})".format(total, longest)
+        )
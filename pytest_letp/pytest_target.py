@@ -2,9 +2,9 @@
 
 Use the pytest_target pytest plugin to communicate with targets.
 """
-import os
 import pytest
 
+from pytest_letp.lib import cmux as cmux_lib
 from pytest_letp.lib import com
 from pytest_letp.lib import modules
 
@@ -216,9 +216,49 @@ def target_at(request, read_config):
     return slink1
 
 
+@pytest.fixture(scope="session")
+def cmux_manager():
+    """CMUX muxer of the session, shared by the cmux fixtures.
+
+    The muxer stays up across the tests and is stopped at the end of the
+    session. See :py:class:`~lib.cmux.CmuxManager`.
+
+    :yield: CMUX manager.
+    :rtype: CmuxManager
+    """
+    manager = cmux_lib.CmuxManager()
+    yield manager
+    manager.stop()
+
+
+@pytest.fixture(autouse=True)
+def cmux_exclusive(request, cmux_manager):
+    """Stop the CMUX muxer before the tests which do not use it.
+
+    The muxer keeps the AT port (slink2) in CMUX mode: the port is only
+    usable as a plain AT port once the muxer is stopped.
+
+    :param request: Fixture request state.
+    :type request: pytest.fixture
+    :param cmux_manager: CMUX muxer of the session.
+    :type cmux_manager: pytest.fixture
+    """
+    if "cmux" not in request.fixturenames:
+        cmux_manager.stop()
+
+
 @pytest.fixture
-def cmux(request: pytest.fixture, sudo: pytest.fixture, target: pytest.fixture):
-    """Set up and tear down virtual CMUX devices attached to the main AT port.
+def cmux(
+    request: pytest.fixture,
+    sudo: pytest.fixture,
+    target: pytest.fixture,
+    cmux_manager: pytest.fixture,
+):
+    """Lease virtual CMUX devices attached to the main AT port.
+
+    The CMUX daemon is started on the first use in the session, and
+    restarted if it is dead. The channels are reset for each test. The
+    daemon is stopped before the next test which does not use it.
 
     :param request: Fixture request state.
     :type request: pytest.fixture
@@ -226,6 +266,8 @@ def cmux(request: pytest.fixture, sudo: pytest.fixture, target: pytest.fixture):
     :type sudo: pytest.fixture
     :param target: Connected device under test.
     :type target: pytest.fixture
+    :param cmux_manager: CMUX muxer of the session.
+    :type cmux_manager: pytest.fixture
     :yield: List of open CMUX ports.
     :rtype: list[target_serial_at]
     """
@@ -234,37 +276,19 @@ def cmux(request: pytest.fixture, sudo: pytest.fixture, target: pytest.fixture):
     if not target.slink2:
         pytest.skip("No AT port (slink2) configured.")
         return
-    at_port = target.slink2.dev_tty
-    baudrate = target.slink2.baudrate
-    sim_iccid = target.sim_iccid
-    sim_imsi = target.sim_imsi
-
-    # Start the CMUX daemon.
-    cmd = ["gsmMuxd", "-w", "-p", at_port, "-b", str(baudrate), "-s", "/dev/cmux"]
-    cmd += ["/dev/ptmx"] * count
-    sudo(cmd)
-
-    # Create device wrappers for each CMUX channel.
-    channels = []
-    for i in range(count):
-        port = f"/dev/cmux{i}"
-        assert os.access(port, os.R_OK | os.W_OK, follow_symlinks=True)
-
-        slink = com.target_serial_at(dev_tty=port, baudrate=baudrate, rtscts=False)
-
+    cmux_manager.run_cmd = sudo
+    channels = cmux_manager.lease(target.slink2.dev_tty, target.slink2.baudrate, count)
+    for slink in channels:
         # Add some extra properties to allow the link to be used with
         # sim_lib.get_sim_info().  Maybe there is a better way to compose an
         # appropriate object?
-        slink.sim_iccid = sim_iccid
-        slink.sim_imsi = sim_imsi
-
-        channels.append(slink)
+        slink.sim_iccid = target.sim_iccid
+        slink.sim_imsi = target.sim_imsi
 
     # Yield to the test execution.
     yield channels
 
-    # Stop the CMUX daemon.
-    sudo(["pkill", "--full", "gsmMuxd"])
+    cmux_manager.release(channels)
 
 
 # @}
@@ -208,6 +208,11 @@ class TestConfig:
     )  # letp_tests_info
     default_cfg_xml_cache = os.path.join("log", "default_test_cfg.xml")
     last_test_config_file = os.path.join("log", "last_test_cfg.xml")
+    duration_db_file = os.path.join("log", "test_durations.db")
+    metrics_file = os.path.join("log", "letp_metrics.prom")
+    default_build_cache_dir = os.path.join("~", ".cache", "letp", "build")
+    # Application build cache, disabled by default.
+    build_cache_dir = None
     default_cfg = None
     test_list = []
 
@@ -709,6 +714,49 @@ class TestConfig:
         """Read the config dict to see if the test run should be random."""
         return self._elem_dict.get("test_run/randomize")
 
+    def get_test_order(self):
+        """Read the test order strategy config if there is any."""
+        return self._get_args_config_value("test_run/order")
+
+    def get_test_shard(self):
+        """Read the "index/count" test shard config if there is any."""
+        return self._get_args_config_value("test_run/shard")
+
+    def get_shard_db(self):
+        """Read the duration history shared by the test shards, if any."""
+        return self._get_args_config_value("test_run/shard_db")
+
+    def get_duration_db(self):
+        """Read the test duration database path."""
+        return (
+            self._get_args_config_value("test_run/duration_db")
+            or TestConfig.duration_db_file
+        )
+
+    def is_metrics_enabled(self):
+        """Read if the operation metrics are enabled, the default."""
+        value = self._get_args_config_value("test_run/metrics")
+        return not value or value.lower() not in ("false", "0", "no")
+
+    def get_metrics_file(self):
+        """Read the Prometheus text file path of the operation metrics."""
+        return (
+            self._get_args_config_value("test_run/metrics_file")
+            or TestConfig.metrics_file
+        )
+
+    def get_build_cache_dir(self):
+        """Read the application build cache directory, None if disabled."""
+        value = self._get_args_config_value("test_run/build_cache")
+        if value and value.lower() in ("none", "false", "0", "no"):
+            return None
+        if value and value.lower() in ("true", "1", "yes"):
+            value = TestConfig.default_build_cache_dir
+        value = value or TestConfig.build_cache_dir
+        if not value:
+            return None
+        return os.path.abspath(os.path.expanduser(value))
+
     @staticmethod
     def read_default_config(session):
         """Read the default configuration file."""
@@ -0,0 +1,177 @@
+"""Test duration history.
+
+The test durations and outcomes are recorded in the duration database
+from the JSON report when the session finishes.
+
+How to use the history?
+In test_run.xml:
+
+order: longest_first runs the longest tests first, fail_fast runs the
+recently failing tests first.
+
+shard: "index/count", e.g. "2/4", runs the second of 4 shards, one per
+test bench.
+
+shard_db: duration database shared by the test benches, e.g. on a
+network share, to balance the durations of the shards. Without it, the
+tests are split by a hash of their nodeid, so that all the benches
+compute the same shards.
+
+duration_db: path of the database, log/test_durations.db by default.
+
+The estimated remaining time of the session is displayed every
+ESTIMATE_INTERVAL seconds.
+"""
+import os
+import sys
+import time
+import pytest
+import _pytest.config
+from pytest_letp.lib import durations
+from pytest_letp.pytest_test_config import TEST_CONFIG_KEY
+
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+ORDER_STRATEGIES = ("longest_first", "fail_fast")
+# Minimum time between two displays of the remaining time, in seconds.
+ESTIMATE_INTERVAL = 300
+
+
+@pytest.hookimpl
+def pytest_configure(config: _pytest.config.Config) -> None:
+    """Configure the plugin."""
+    config.pluginmanager.register(TestDurationPlugin(config), "TestDurationPlugin")
+
+
+def _parse_shard(shard):
+    """Parse a "index/count" shard."""
+    try:
+        index, count = (int(value) for value in shard.split("/"))
+    except ValueError as e:
+        raise pytest.UsageError(
+            f"Invalid test_run/shard {shard}, expected index/count"
+        ) from e
+    if not 1 <= index <= count:
+        raise pytest.UsageError(f"Invalid test_run/shard {shard}")
+    return index, count
+
+
+class TestDurationPlugin:
+    """Order the tests and estimate the session time from the history."""
+
+    def __init__(self, config):
+        self.config = config
+        self._tw = _pytest.config.create_terminal_writer(config, sys.stdout)
+        self.estimate = None
+        self._last_estimate = 0.0
+
+    def _get_db_file(self, db_file):
+        """Get a database path, relative to the invocation directory."""
+        return os.path.join(str(self.config.invocation_params.dir), db_file)
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_collection_modifyitems(self, session):
+        """Order and shard the items, once the other plugins modified them."""
+        yield
+        self.order_items(session)
+
+    def _get_shard_durations(self, default_cfg, items):
+        """Get the estimated durations used to split the shards.
+
+        They come from the shared shard_db, so that all the test benches
+        compute the same shards. None without shard_db.
+        """
+        shard_db = default_cfg.get_shard_db()
+        if not shard_db:
+            return None
+        db_file = self._get_db_file(shard_db)
+        if not os.path.exists(db_file):
+            raise pytest.UsageError(f"test_run/shard_db {db_file} not found")
+        with durations.DurationDB(db_file) as db:
+            history = db.get_durations(
+                default_cfg.get_target_name(), default_cfg.get_test_campaign()
+            )
+        return durations.estimate_durations([item.nodeid for item in items], history)
+
+    def order_items(self, session):
+        """Order and shard session.items as configured in test_run."""
+        default_cfg = session.config._store[TEST_CONFIG_KEY]
+        order = default_cfg.get_test_order()
+        shard = default_cfg.get_test_shard()
+        if order and order not in ORDER_STRATEGIES:
+            raise pytest.UsageError(
+                f"Invalid test_run/order {order}, expected one of {ORDER_STRATEGIES}"
+            )
+        target = default_cfg.get_target_name()
+        campaign = default_cfg.get_test_campaign()
+        history = {}
+        failures = {}
+        db_file = self._get_db_file(default_cfg.get_duration_db())
+        if os.path.exists(db_file):
+            with durations.DurationDB(db_file) as db:
+                history = db.get_durations(target, campaign)
+                if order == "fail_fast":
+                    failures = db.get_failures(target, campaign)
+        items = session.items
+        if order == "longest_first":
+            items = durations.order_longest_first(items, history)
+        elif order == "fail_fast":
+            items = durations.order_fail_fast(items, failures)
+        estimated = durations.estimate_durations(
+            [item.nodeid for item in items], history
+        )
+        if shard:
+            index, count = _parse_shard(shard)
+            shard_durations = self._get_shard_durations(default_cfg, items)
+            selected = durations.shard_items(items, shard_durations, index, count)
+            selected_ids = {item.nodeid for item in selected}
+            deselected = [item for item in items if item.nodeid not in selected_ids]
+            if deselected:
+                session.config.hook.pytest_deselected(items=deselected)
+            items = selected
+            estimated = {item.nodeid: estimated[item.nodeid] for item in items}
+        session.items = items
+        if not history:
+            return
+        self.estimate = durations.SessionEstimate(estimated)
+        unknown = sum(1 for item in items if item.nodeid not in history)
+        reporter = session.config.pluginmanager.get_plugin("terminalreporter")
+        if reporter:
+            reporter.write_line(
+                "Estimated session time: {} ({} tests without history)".format(
+                    durations.SessionEstimate.format(self.estimate.remaining), unknown
+                )
+            )
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_runtest_logfinish(self, nodeid):
+        """Display the estimated remaining time of the session."""
+        if not self.estimate or not self.estimate.durations:
+            return
+        remaining = self.estimate.finish(nodeid)
+        now = time.monotonic()
+        if now - self._last_estimate >= ESTIMATE_INTERVAL:
+            self._last_estimate = now
+            self._tw.write(
+                "\nEstimated remaining time: {}".format(
+                    durations.SessionEstimate.format(remaining)
+                ),
+                flush=True,
+            )
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_sessionfinish(self, session):
+        """Record the test durations from the JSON report."""
+        if not session.config.getoption("--json-report", default=None):
+            return
+        json_report = session.config.getoption("--json-report-file")
+        if not json_report or not os.path.exists(json_report):
+            return
+        default_cfg = session.config._store[TEST_CONFIG_KEY]
+        db_file = self._get_db_file(default_cfg.get_duration_db())
+        with durations.DurationDB(db_file) as db:
+            db.record_json_report(
+                json_report,
+                default_cfg.get_target_name(),
+                default_cfg.get_test_campaign(),
+            )
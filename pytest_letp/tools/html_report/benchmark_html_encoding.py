@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""!@package benchmark_html_encoding Benchmark the HTML log encoding.
+
+Compare HTMLLogConverter with the sequential replacements
+it supersedes on a generated colored log.
+"""
+import argparse
+import timeit
+
+from report_template import HTMLLogConverter
+
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+LOG_LINES = [
+    "\x1b[32m10:00:00 INFO \x1b[01m========== Begin of test_a[1] ==========\x1b[02m\x1b[0m",
+    "\x1b[32m10:00:01 INFO Sending command to the target: cm info all\x1b[0m",
+    "\x1b[36m10:00:02 DEBUG Target reply: Device: WP7607 FW: SWI9X07Y_02.37.03.00\x1b[0m",
+    "\x1b[32m10:00:03 INFO Check that the legato status is 'running'\x1b[0m",
+    "\x1b[01;33m10:00:04 WARNING Retry 1/3 to connect to 192.168.2.2 port 22\x1b[0m",
+    '\x1b[01;31m10:00:05 ERROR <target> & "host" timeout > 30s\x1b[0m',
+    "plain output line from the device console, without any escape sequence",
+]
+
+
+def legacy_html_encoding(msg):
+    """Encode the message with the previous sequential replacements."""
+    if "<img" not in msg and "</img" not in msg:
+        msg = msg.replace("&", "&amp;")
+        msg = msg.replace("<", "&lt;")
+        msg = msg.replace(">", "&gt;")
+        msg = msg.replace('"', "&quot;")
+        msg = msg.replace("'", "&apos;")
+    msg = msg.replace("\x1b[0m", "</font>")
+    msg = msg.replace("\x1b[01m", '<font class="bold">')
+    msg = msg.replace("\x1b[02m", "</font>")
+    msg = msg.replace("\x1b[31m", '<font class="black">')
+    msg = msg.replace("\x1b[31m", '<font class="red">')
+    msg = msg.replace("\x1b[01;31m", '<font class="red bold">')
+    msg = msg.replace("\x1b[32m", '<font class="green">')
+    msg = msg.replace("\x1b[33m", '<font class="yellow">')
+    msg = msg.replace("\x1b[01;33m", '<font class="yellow bold">')
+    msg = msg.replace("\x1b[34m", '<font class="blue">')
+    msg = msg.replace("\x1b[35m", '<font class="magenta">')
+    msg = msg.replace("\x1b[36m", '<font class="cyan">')
+    msg = msg.replace("\x1b[37m", '<font class="white">')
+    return msg
+
+
+def gen_log(size):
+    """Generate a log of about size characters."""
+    line_size = sum(len(line) + 1 for line in LOG_LINES)
+    return "\n".join(LOG_LINES * max(1, size // line_size))
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--size", type=int, default=10 << 20, help="Size of the log in characters"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="Number of runs of each converter"
+    )
+    args = parser.parse_args()
+
+    log = gen_log(args.size)
+    converter = HTMLLogConverter()
+    assert converter.convert(log) == legacy_html_encoding(log)
+    chunk_size = 1 << 16
+    chunks = (log[i : i + chunk_size] for i in range(0, len(log), chunk_size))
+    assert "".join(converter.convert_chunks(chunks)) == converter.convert(log)
+
+    print(f"Log of {len(log)} characters, best of {args.repeat} runs:")
+    for name, fn in (
+        ("legacy", lambda: legacy_html_encoding(log)),
+        ("converter", lambda: converter.convert(log)),
+    ):
+        best = min(timeit.repeat(fn, number=1, repeat=args.repeat))
+        print(f"{name:>12}: {best:.3f}s ({len(log) / best / (1 << 20):.1f} MiB/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,9 +7,11 @@ import json
 import os
 import sys
 from jinja2 import Environment, FileSystemLoader
+from report_loader import ReportLoader
 
 COMBINE_REPORT = False
 RMD = False
+LOADER = ReportLoader()
 
 
 def get_task_logs(log_path):
@@ -28,36 +30,67 @@ def get_task_logs(log_path):
     return "".join(logs)
 
 
+def _process_json_file(loader, json_file, platform, process_fn):
+    """Load the JSON file of a platform and process it in a worker."""
+    return process_fn(platform, loader.load(json_file))
+
+
+def process_json_files(data_path, index, process_fn):
+    """Process the JSON file at index of each platform in the workers.
+
+    Returns:
+        The result of process_fn(platform, json_data) of each platform, in
+        the order of data_path.
+    """
+    json_files = []
+    for platform in data_path:
+        json_file = data_path[platform][index]
+        assert os.path.exists(json_file), "Could not find JSON file"
+        json_files.append(json_file)
+    results = LOADER.map(
+        _process_json_file, json_files, list(data_path), [process_fn] * len(json_files)
+    )
+    return dict(zip(data_path, results))
+
+
+def get_execution_data(platform, all_data):
+    """Get execution and results of a platform."""
+    return all_data["Execution"], all_data["Tests"]
+
+
 def get_one_click_data(data_path):
     """Get execution and results of One-Click test cases."""
     execution = {}
     data = {}
-    for platform in data_path:
-        json_file = data_path[platform][1]
-        assert os.path.exists(json_file), "Could not find JSON file"
-        with open(json_file, encoding="utf8") as f:
-            all_data = json.load(f)
-            execution[platform] = all_data["Execution"]
-            data[platform] = all_data["Tests"]
+    all_data = process_json_files(data_path, 1, get_execution_data)
+    for platform, (platform_execution, platform_data) in all_data.items():
+        execution[platform] = platform_execution
+        data[platform] = platform_data
     assert len(data) != 0, "No data to generate report"
 
     return execution, data
 
 
+def get_swi_auto_data(platform, all_data):
+    """Get execution, results and summary of a platform."""
+    summary = get_summary(all_data)
+    summary.pop('NoTC')
+    return all_data["Execution"], all_data["Tests"], summary
+
+
 def get_data(data_path):
-    """Get execution and results of Swilib or Autotestplus."""
+    """Get execution, results and summary of Swilib or Autotestplus."""
     execution = {}
     data = {}
-    for platform in data_path:
-        json_file = data_path[platform][0]
-        assert os.path.exists(json_file), "Could not find JSON file"
-        with open(json_file, encoding="utf8") as f:
-            all_data = json.load(f)
-        execution[platform] = all_data["Execution"]
-        data[platform] = all_data["Tests"]
+    summary_stats = {}
+    all_data = process_json_files(data_path, 0, get_swi_auto_data)
+    for platform, (platform_execution, platform_data, summary) in all_data.items():
+        execution[platform] = platform_execution
+        data[platform] = platform_data
+        summary_stats[platform] = summary
     assert len(data) != 0, "No data to generate report"
 
-    return execution, data
+    return execution, data, summary_stats
 
 
 def get_summary(data):
@@ -93,13 +126,8 @@ def get_summary(data):
     return summary
 
 
-def get_letp_data(platform, data_path):
+def get_letp_data(platform, json_data):
     """Get data from job run with LeTP framework."""
-    json_data = {}
-    assert os.path.exists(data_path[platform][0]), "Could not find JSON file"
-
-    with open(data_path[platform][0], encoding="utf8") as f:
-        json_data = json.load(f)
     if len(json_data) == 0:
         print(f"========== LeTP data for {platform} NOT AVAILABLE ==========")
     else:
@@ -110,21 +138,24 @@ def get_letp_data(platform, data_path):
     return json_data
 
 
+def get_nightly_stats(platform, json_data):
+    """Get the LeTP stats or the One-click summary of a platform."""
+    if "letp" in platform.lower():
+        return get_letp_data(platform, json_data)
+    return get_summary(json_data)
+
+
 def get_TPE_nightly_data(data_path):
     """Get the execution results of One-click and LeTP test cases."""
     letp_stats = {}
     swi_auto_stats = {}
-    for platform in data_path:
+    all_stats = process_json_files(data_path, 0, get_nightly_stats)
+    for platform, stats in all_stats.items():
         if "letp" in platform.lower():
-            json_data = get_letp_data(platform, data_path)
-            if len(json_data) != 0:
-                letp_stats[platform] = json_data
+            if len(stats) != 0:
+                letp_stats[platform] = stats
         else:
-            json_file = data_path[platform][0]
-            assert os.path.exists(json_file), "Could not find JSON file"
-            with open(json_file, encoding="utf8") as f:
-                json_data = json.load(f)
-                swi_auto_stats[platform] = get_summary(json_data)
+            swi_auto_stats[platform] = stats
     if len(letp_stats) == 0 and len(swi_auto_stats) == 0:
         print("No data to generate report")
         sys.exit(1)
@@ -281,15 +312,7 @@ def run(title, data_path, artifact_path=None):
             False: If report generated failed.
     """
     if RMD and artifact_path is None:
-        summary_stats = {}
-        execution, data = get_data(data_path)
-        for platform in data_path:
-            json_file = data_path[platform][0]
-            assert os.path.exists(json_file), "Could not find JSON file"
-            with open(json_file, encoding="utf8") as f:
-                json_data = json.load(f)
-            summary_stats[platform] = get_summary(json_data)
-            summary_stats[platform].pop('NoTC')
+        execution, data, summary_stats = get_data(data_path)
 
         return generate_swi_auto_report(title, execution, data, summary_stats)
 
@@ -315,6 +338,10 @@ if __name__ == "__main__":
     artifact_path = os.environ.get("ARTIFACT_PATH")
 
     assert len(data_path) != 0, "Could not find DATA path to generate report"
+    LOADER = ReportLoader(
+        os.environ.get("JSON_CACHE_DIR"),
+        jobs=int(os.environ.get("REPORT_JOBS", os.cpu_count())),
+    )
 
     if "TPE-Nightly" in title:
         COMBINE_REPORT = True
@@ -4,21 +4,89 @@
 The differential test report to compare current results with previous
 results.
 """
-import json
 import os
 import argparse
 from report_template import HTMLRender
+from report_loader import ReportLoader
 
 __copyright__ = "Copyright (C) Sierra Wireless Inc."
 
 
+class ResultComparison:
+    """!Compare the results of a run with the results of previous runs.
+
+    Results are indexed as {(target, test): status}, so that the
+    comparison only does dictionary lookups. A result is compared with
+    the most recent previous run having the same target and test.
+    """
+
+    FAILED = {"failed", "error"}
+
+    def __init__(self, results, previous_runs):
+        """previous_runs are the indexed previous results, most recent first."""
+        self.results = results
+        self.previous = {}
+        for run in reversed(previous_runs):
+            self.previous.update(run)
+
+    def get_new_status(self, status):
+        """Get the results which changed to status.
+
+        Returns:
+            {(target, test): previous status}, None for a new test.
+        """
+        previous = self.previous
+        return {
+            key: previous.get(key)
+            for key, result in self.results.items()
+            if result == status and previous.get(key) != status
+        }
+
+    def get_new_failures(self):
+        """Get the results which failed and did not fail previously."""
+        return {
+            key: self.previous[key]
+            for key in self.results.keys() & self.previous.keys()
+            if self.results[key] in self.FAILED
+            and self.previous[key] not in self.FAILED
+        }
+
+    def get_fixes(self):
+        """Get the results which passed and failed previously."""
+        return {
+            key: self.previous[key]
+            for key in self.results.keys() & self.previous.keys()
+            if self.results[key] == "passed" and self.previous[key] in self.FAILED
+        }
+
+    def get_missing(self):
+        """Get the results of previous runs which are not in the results."""
+        missing = self.previous.keys() - self.results.keys()
+        return [key for key in self.previous if key in missing]
+
+    def get_added(self):
+        """Get the results which are not in the previous runs."""
+        added = self.results.keys() - self.previous.keys()
+        return [key for key in self.results if key in added]
+
+
 class LegatoQaJSONParser:
     """Test report Json parser."""
 
     def __init__(self, result_data, pre_result_data):
+        """pre_result_data is a previous report or a list of them.
+
+        The previous reports are ordered from the most recent one.
+        """
+        if isinstance(pre_result_data, dict):
+            pre_result_data = [pre_result_data]
         self.result_data = result_data
         self.pre_result_data = pre_result_data
         self.target_list = self.get_target()
+        self.comparison = ResultComparison(
+            self.index_results(result_data),
+            [self.index_results(data) for data in pre_result_data],
+        )
 
     def get_target(self):
         """Get all the targets in the report."""
@@ -27,81 +95,78 @@ class LegatoQaJSONParser:
         print(target_list)
         return target_list
 
+    @staticmethod
+    def reduce_test(test):
+        """Keep only the results of a test."""
+        return {
+            key: value if key == "name" else {"result": value["result"]}
+            for key, value in test.items()
+        }
+
+    @staticmethod
+    def index_results(data):
+        """Index the results of a report by (target, test)."""
+        results = {}
+        for test in data["tests"]:
+            name = test["name"]
+            for target, result in test.items():
+                if target != "name":
+                    results.setdefault((target, name), result["result"])
+        return results
+
     def get_test(self, status):
         """Get test cases with new status."""
-        test_list = {}
         print(f"========== List of New {status} tests ==========")
-        for index in range(len(self.result_data["tests"])):
-            test = self.result_data["tests"][index]["name"]
-            data = self.check_result(status, index, test)
+        new_status = self.comparison.get_new_status(status)
+        targets = {}
+        for (target, test), pre_result in new_status.items():
+            targets.setdefault(test, {})[target] = (
+                status if pre_result is not None else f"new-{status}"
+            )
+        test_list = {}
+        for test, results in targets.items():
+            data = [results.get(target, "N/A") for target in self.target_list]
             if status in data:
                 test_list[test] = data
         print(test_list)
         return test_list
 
-    def check_result(self, status, index, test):
-        """Check if state of test case is new."""
-        data = []
-        for target in self.target_list:
-            if target in self.result_data["tests"][index]:
-                result = self.result_data["tests"][index][target]["result"]
-                if status == result:
-                    check_result = self.check_target_result(test, target, result)
-                    data.append(check_result)
-                else:
-                    data.append("N/A")
-            else:
-                data.append("N/A")
-        return data
-
-    def check_target_result(self, test, target, result):
-        """Check if the state of the test case on the target is new."""
-        for index in range(len(self.pre_result_data["tests"])):
-            if self.pre_result_data["tests"][index]["name"] == test:
-                if target in self.pre_result_data["tests"][index]:
-                    pre_result = self.pre_result_data["tests"][index][target]["result"]
-                    return "N/A" if pre_result == result else result
-                else:
-                    return f"new-{result}"
-        return f"new-{result}"
-
     def get_miss_tests(self):
         """Get missing test cases.
 
         The missing test case is the one present in the previous result
         but not in the current result.
         """
+        targets = {}
+        for target, test in self.comparison.get_missing():
+            targets.setdefault(test, set()).add(target)
         miss_tests = {}
-        for index in range(len(self.pre_result_data["tests"])):
-            test = self.pre_result_data["tests"][index]["name"]
-            run_target = list(self.pre_result_data["tests"][index])
-            run_target.remove("name")
-            miss_on_target = []
-            for target in self.target_list:
-                status = "N/A"
-                if target in run_target:
-                    check_miss = self.check_miss(test, target)
-                    if check_miss:
-                        status = "miss"
-                miss_on_target.append(status)
+        for test, miss_targets in targets.items():
+            miss_on_target = [
+                "miss" if target in miss_targets else "N/A"
+                for target in self.target_list
+            ]
             if "miss" in miss_on_target:
                 miss_tests[test] = miss_on_target
         return miss_tests
 
-    def check_miss(self, test, target):
-        """Check if state of test case is missing."""
-        for index in range(len(self.result_data["tests"])):
-            if self.result_data["tests"][index]["name"] == test:
-                return target not in self.result_data["tests"][index]
-        return True
-
 
 class CPJSONParser:
     """Test report Json parser."""
 
     def __init__(self, result_data, pre_result_data):
+        """pre_result_data is a previous report or a list of them.
+
+        The previous reports are ordered from the most recent one.
+        """
+        if isinstance(pre_result_data, dict):
+            pre_result_data = [pre_result_data]
         self.result_data = result_data
         self.pre_result_data = pre_result_data
+        self.comparison = ResultComparison(
+            self.index_results(result_data),
+            [self.index_results(data) for data in pre_result_data],
+        )
 
     def get_target(self):
         """Get the target in the report."""
@@ -109,53 +174,52 @@ class CPJSONParser:
         print(target)
         return target
 
+    @staticmethod
+    def reduce_test(test):
+        """Keep only the result of a test."""
+        return {"nodeid": test["nodeid"], "outcome": test["outcome"]}
+
+    def index_results(self, data):
+        """Index the results of a report by (target, test).
+
+        The reports have a single target, so the previous results are
+        compared whatever their target is.
+        """
+        target = self.result_data["target_name"]
+        results = {}
+        for test in data["tests"]:
+            results.setdefault((target, test["nodeid"]), test["outcome"])
+        return results
+
     def get_test(self, status):
         """Get test cases with new status."""
-        test_list = {}
         print(f"========== List of New_{status} tests ==========")
-        for index in range(len(self.result_data["tests"])):
-            test = self.result_data["tests"][index]["nodeid"]
-            result = self.result_data["tests"][index]["outcome"]
-            if status == result:
-                check_result = self.check_result(test, result)
-                if check_result:
-                    test_list[test] = [result]
+        test_list = {
+            test: [status] for _, test in self.comparison.get_new_status(status)
+        }
         print(test_list)
         return test_list
 
-    def check_result(self, test, result):
-        """Check if state of test case is new."""
-        for index in range(len(self.pre_result_data["tests"])):
-            if self.pre_result_data["tests"][index]["nodeid"] == test:
-                pre_result = self.pre_result_data["tests"][index]["outcome"]
-                return pre_result != result
-        return True
-
     def get_miss_tests(self):
         """Get missing test cases.
 
         The missing test case is the one present in the previous result
         but not in the current result.
         """
-        miss_tests = {}
-        for index in range(len(self.pre_result_data["tests"])):
-            test = self.pre_result_data["tests"][index]["nodeid"]
-            miss_on_target = []
-            status = "N/A"
-            check_miss = self.check_miss(test)
-            if check_miss:
-                status = "miss"
-            miss_on_target.append(status)
-            if "miss" in miss_on_target:
-                miss_tests[test] = miss_on_target
-        return miss_tests
+        return {test: ["miss"] for _, test in self.comparison.get_missing()}
+
 
-    def check_miss(self, test):
-        """Check if state of test case is missing."""
-        for index in range(len(self.result_data["tests"])):
-            if self.result_data["tests"][index]["nodeid"] == test:
-                return False
-        return True
+def load_report(loader, json_file):
+    """Load a report in a worker, keeping only the results of its tests."""
+    data = loader.load(json_file)
+    if "target_name" in data:
+        reduce_test = CPJSONParser.reduce_test
+    elif "stats" in data:
+        reduce_test = LegatoQaJSONParser.reduce_test
+    else:
+        return data
+    data["tests"] = [reduce_test(test) for test in data["tests"]]
+    return data
 
 
 def parse_args():
@@ -163,11 +227,23 @@ def parse_args():
     parser = argparse.ArgumentParser()
     parser.add_argument("--result-path", required=True, help="Path to result files")
     parser.add_argument(
-        "--pre-result-path", required=True, help="Path to previous result files"
+        "--pre-result-path",
+        required=True,
+        nargs="+",
+        help="Paths to previous result files, from the most recent one",
     )
     parser.add_argument(
         "--output", default="differential_report.html", help="Output file path"
     )
+    parser.add_argument(
+        "--json-cache-dir", help="Directory to cache the parsed JSON inputs"
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of processes to load the JSON inputs",
+    )
     args = parser.parse_args()
     return args
 
@@ -177,14 +253,15 @@ if __name__ == "__main__":
     assert os.path.exists(
         args.result_path
     ), f"{args.result_path}: Could not find JSON file"
-    assert os.path.exists(
-        args.pre_result_path
-    ), f"{args.pre_result_path}: Could not find JSON file"
+    for pre_result_path in args.pre_result_path:
+        assert os.path.exists(
+            pre_result_path
+        ), f"{pre_result_path}: Could not find JSON file"
 
-    with open(args.result_path, encoding="utf8") as f:
-        result_data = json.load(f)
-    with open(args.pre_result_path, encoding="utf8") as f:
-        pre_result_data = json.load(f)
+    report_loader = ReportLoader(args.json_cache_dir, jobs=args.jobs)
+    result_data, *pre_result_data = report_loader.map(
+        load_report, [args.result_path] + args.pre_result_path
+    )
 
     status_list = ["failed", "error", "skipped", "xfailed", "passed"]
     TestSummary = {}
@@ -208,6 +285,13 @@ if __name__ == "__main__":
         status_len[status] = len(tests)
     print("========== Summary of new status ==========")
     print(status_len)
+    comparison = JsonParser.comparison
+    print(
+        f"New failures: {len(comparison.get_new_failures())}, "
+        f"fixes: {len(comparison.get_fixes())}, "
+        f"added: {len(comparison.get_added())}, "
+        f"missing: {len(comparison.get_missing())}"
+    )
 
     html_render = HTMLRender("differential_report_template.html")
     html_render.contents = {
@@ -4,14 +4,51 @@
 Json file is based on raw results.
 """
 import os
+import gzip
+import io
 import json
 import re
 import argparse
+import shutil
+import tempfile
 from datetime import datetime, timedelta
 
 
+class LogParseState:
+    """!State of the test case whose log is being parsed."""
+
+    def __init__(self, sys_info_patterns):
+        """!Start a test case, which searches sys_info_patterns if it is the first."""
+        self.name = None
+        self.status = None
+        self.status_pattern = None
+        # Statuses found before the test name, by test name.
+        self.statuses = {}
+        self.sys_info_patterns = dict(sys_info_patterns)
+        self.start_time = None
+        self.first_line = None
+        self.last_line = None
+        self.raw_log = []
+
+
 class Informations:
-    """!Get information from the running system."""
+    """!Get information from the running system.
+
+    The test logs are parsed in one pass: the lines which may contain a
+    missing field are found with a single pattern of their MARKERS, and only
+    their fields are parsed into the state of the test case.
+    """
+
+    FW_PATTERN = re.compile(r"(?P<fw>HL78\d{2}\..+?)(\n|<CR>)")
+    LEGATO_PATTERN = re.compile(r"Legato RTOS:\s+(?P<legato>[^ ]*)")
+    NAME_PATTERN = None
+    # Status pattern, formatted with the test name.
+    STATUS_PATTERN = None
+    # Execution information key: pattern and format of the value, searched in
+    # the first test log.
+    SYS_INFO_PATTERNS = {}
+    # Field: pattern found in the lines containing the field.
+    MARKERS = {}
 
     def __init__(self):
         """!Define information format."""
@@ -32,6 +69,7 @@ class Informations:
             "Python Version": "N/A",
             "Tool Version": "N/A",
         }
+        self._any_status_pattern = re.compile(self.STATUS_PATTERN.format(r"\w+"))
 
     @staticmethod
     def _get_module_info():
@@ -43,65 +81,98 @@ class Informations:
         }
 
     @staticmethod
-    def _get_FW_ver(test_log):
-        """Get Firmware & Legato version from test log."""
-        firmware_ver = "N/A"
-        firmware = re.search(r"(?P<fw>HL78\d{2}\..+?)(\n|<CR>)", test_log)
-        if firmware:
-            firmware_ver = firmware.group("fw")
-
-        return firmware_ver
-
-    @staticmethod
-    def _get_Legato_ver(test_log):
-        """Get Firmware & Legato version from test log."""
-        legato_ver = "N/A"
-        legato = re.search(r"Legato RTOS:\s+(?P<legato>[^ ]*)", test_log)
-        if legato:
-            legato_ver = legato.group("legato")
-
-        return legato_ver
-
-
-class AutoTestPlus(Informations):
-    """!Test case information with Json format."""
-
-    def __init__(self, data):
-        """!Generate test case information with Json format."""
-        super().__init__()
-
-        self.test_json_data["Tests"] = []
-        self.data = data
-        self.test_json_data["Execution"]["test_set_id"] = "6481304"
-        self.test_json_data["Execution"]["test_set_name"] = "AutoTestPlus_Sample_test"
-
-    @staticmethod
-    def _get_test(log):
-        """Get test cases name from data."""
-        test = re.search(r"FILE:\s+(?P<name>\w+)\.py", log)
-        test_name = test.group("name")
-
-        return test_name
-
-    @staticmethod
-    def _get_status(test_name, log):
-        """Get test cases status from data."""
-        status = re.search(rf"Status\s+{test_name}:\s+(?P<status>\w+)", log)
-        if status is None:
-            test_status = "N/A"
-        else:
-            test_status = status.group("status").title()
-
-        return test_status
+    def _encode_log(log):
+        """Encode a test log for HTML."""
+        log = log.replace("<", "&lt;")
+        log = log.replace(">", "&gt;")
+        return log.replace("\n", "<br/>")
+
+    def _new_test(self, first):
+        """Start the parsing of a test case."""
+        return LogParseState(self.SYS_INFO_PATTERNS if first else {})
+
+    def _get_marker_pattern(self, test):
+        """Get the pattern of the lines which may contain a missing field."""
+        execution = self.test_json_data["Execution"]
+        missing = {
+            "FW Version": execution["FW Version"] == "N/A",
+            "Legato Version": execution["Legato Version"] == "N/A",
+            "name": test.name is None,
+            "status": test.status is None,
+            "start time": test.start_time is None,
+        }
+        markers = [
+            marker
+            for field, marker in self.MARKERS.items()
+            if missing.get(field, field in test.sys_info_patterns)
+        ]
+        return re.compile("|".join(markers)) if markers else None
+
+    def _parse_lines(self, test, lines):
+        """Get the information of a test case from lines of its log."""
+        end = 0
+        pattern = self._get_marker_pattern(test)
+        while pattern:
+            marker = pattern.search(lines, end)
+            if marker is None:
+                break
+            start = lines.rfind("\n", 0, marker.start()) + 1
+            end = lines.find("\n", marker.end()) + 1 or len(lines)
+            self._parse_fields(test, lines[start:end])
+            pattern = self._get_marker_pattern(test)
+        test.raw_log.append(self._encode_log(lines))
+
+    def _parse_fields(self, test, line):
+        """Get the fields of a test case from a line of its log."""
+        execution = self.test_json_data["Execution"]
+        if execution["FW Version"] == "N/A":
+            firmware = self.FW_PATTERN.search(line)
+            if firmware:
+                execution["FW Version"] = firmware.group("fw")
+        if execution["Legato Version"] == "N/A":
+            legato = self.LEGATO_PATTERN.search(line)
+            if legato:
+                execution["Legato Version"] = legato.group("legato")
+        for key, (pattern, value_format) in tuple(test.sys_info_patterns.items()):
+            sys_info = pattern.search(line)
+            if sys_info:
+                execution[key] = value_format.format(sys_info.group("value"))
+                del test.sys_info_patterns[key]
+        if test.name is None:
+            name = self.NAME_PATTERN.search(line)
+            if name:
+                test.name = name.group("name")
+                test.status = test.statuses.get(test.name)
+                test.status_pattern = re.compile(self.STATUS_PATTERN.format(test.name))
+        if test.status is None:
+            if test.name is None:
+                for status in self._any_status_pattern.finditer(line):
+                    test.statuses.setdefault(
+                        status.group("name"), status.group("status")
+                    )
+            else:
+                status = test.status_pattern.search(line)
+                if status:
+                    test.status = status.group("status")
+
+    def _get_test_case_info(self, test):
+        """Get the Json information of a parsed test case."""
+        if test.name is None:
+            raise ValueError("Test name not found in the test log")
+        return {
+            "Test Name": test.name,
+            "Result": "N/A" if test.status is None else test.status.title(),
+            "Duration(secs)": self._get_duration(test),
+            "raw_log": "".join(test.raw_log),
+        }
 
-    @staticmethod
-    def _get_duration(log):
+    def _get_duration(self, test):
         """Calculate the test case running time."""
-        start_time = re.search(r"Start Time: (\d|-)+ (?P<time>\d{2}:\d{2}:\d{2})", log)
-        start_time = str(start_time.group("time"))
+        raise NotImplementedError
 
-        times = re.findall(r"\d{2}:\d{2}:\d{2}:\d+", log)
-        end_time = times[-1][:8]
+    @staticmethod
+    def _get_time_difference(start_time, end_time):
+        """Get the seconds between two %H:%M:%S times, across midnight."""
         start_time = datetime.strptime(start_time, "%H:%M:%S")
         end_time = datetime.strptime(end_time, "%H:%M:%S")
         if end_time < start_time:
@@ -110,149 +181,307 @@ class AutoTestPlus(Informations):
 
         return duration.total_seconds()
 
-    @staticmethod
-    def _get_sys_info(test_log):
-        """Get module information used for testing."""
-        system_info = re.search(r"OS info\s+:\s+(?P<sys>.*)\n", test_log).group("sys")
-        python_ver = re.search(r"Python ver\.\s+:\s+(?P<py_ver>.+)", test_log).group(
-            "py_ver"
-        )
-        tool_ver = re.search(
-            r"AutoTestPlus version\s+:\s+(?P<swi_ver>.+)", test_log
-        ).group("swi_ver")
-
-        return {
-            "Operating System": system_info,
-            "Python Version": python_ver,
-            "Tool Version": f"AutoTestPlus: {tool_ver}",
-        }
+    def iter_tests(self):
+        """Generate the test cases information one at a time."""
+        raise NotImplementedError
 
     def run(self):
         """Generate the test log with Json format."""
-        pattern = "Start the Test"
-        test_case_logs = self.data.split(pattern)[1:]
-        env_info = self._get_sys_info(test_case_logs[0])
-        self.test_json_data["Execution"].update(env_info)
-
-        for log in test_case_logs:
-            test_case_info = {}
-            if self.test_json_data["Execution"]["FW Version"] == "N/A":
-                self.test_json_data["Execution"]["FW Version"] = self._get_FW_ver(log)
-            if self.test_json_data["Execution"]["Legato Version"] == "N/A":
-                self.test_json_data["Execution"][
-                    "Legato Version"
-                ] = self._get_Legato_ver(log)
-            test_name = self._get_test(log)
-            test_case_info["Test Name"] = test_name
-            test_case_info["Result"] = self._get_status(test_name, log)
-            test_case_info["Duration(secs)"] = self._get_duration(log)
-            test_case_info["raw_log"] = pattern + log
-            test_case_info["raw_log"] = test_case_info["raw_log"].replace("<", '&lt;')
-            test_case_info["raw_log"] = test_case_info["raw_log"].replace(">", '&gt;')
-            test_case_info["raw_log"] = test_case_info["raw_log"].replace("\n", '<br/>')
-            self.test_json_data["Tests"].append(test_case_info)
+        self.test_json_data["Tests"] = list(self.iter_tests())
 
         return self.test_json_data
 
+    def write(self, output_file):
+        """Write the Json file without keeping all the test cases in memory.
+
+        The test cases are spooled to a temporary file as they are
+        generated since the execution information is only complete once
+        all the test logs are parsed.
+        """
+        with tempfile.TemporaryFile("w+", encoding="utf8") as tests_file:
+            separator = "[\n"
+            for test_case_info in self.iter_tests():
+                tests_file.write(separator)
+                tests_file.write(self._dump(test_case_info, "    "))
+                separator = ",\n"
+            tests_file.seek(0)
+            with open(output_file, "w", encoding="utf8") as f:
+                f.write('{\n  "Execution": ')
+                f.write(self._dump(self.test_json_data["Execution"], "  ").lstrip())
+                f.write(',\n  "Tests": ')
+                if separator == "[\n":
+                    f.write("[]")
+                else:
+                    shutil.copyfileobj(tests_file, f)
+                    f.write("\n  ]")
+                f.write("\n}")
 
-class Swilib(Informations):
+    @staticmethod
+    def _dump(data, prefix):
+        """Dump a flat dictionary in Json format, indented with prefix.
+
+        The output is the same as with json.dumps(data, indent=2), which
+        falls back to the much slower pure Python encoder.
+        """
+        items = ",\n".join(
+            f"{prefix}  {json.dumps(key)}: {json.dumps(value)}"
+            for key, value in data.items()
+        )
+        return f"{prefix}{{\n{items}\n{prefix}}}"
+
+
+class AutoTestPlus(Informations):
     """!Test case information with Json format."""
 
+    TEST_START = "Start the Test"
+    NAME_PATTERN = re.compile(r"FILE:\s+(?P<name>\w+)\.py")
+    STATUS_PATTERN = r"Status\s+(?P<name>{}):\s+(?P<status>\w+)"
+    SYS_INFO_PATTERNS = {
+        "Operating System": (re.compile(r"OS info\s+:\s+(?P<value>.*)\n"), "{}"),
+        "Python Version": (re.compile(r"Python ver\.\s+:\s+(?P<value>.+)"), "{}"),
+        "Tool Version": (
+            re.compile(r"AutoTestPlus version\s+:\s+(?P<value>.+)"),
+            "AutoTestPlus: {}",
+        ),
+    }
+    READ_SIZE = 1 << 20
+    START_TIME_PATTERN = re.compile(r"Start Time: (\d|-)+ (?P<time>\d{2}:\d{2}:\d{2})")
+    TIME_PATTERN = re.compile(r"\d{2}:\d{2}:\d{2}:\d+")
+    MARKERS = {
+        "FW Version": "HL78",
+        "Legato Version": "Legato RTOS:",
+        "Operating System": "OS info",
+        "Python Version": r"Python ver\.",
+        "Tool Version": "AutoTestPlus version",
+        "name": "FILE:",
+        "status": "Status",
+        "start time": "Start Time:",
+    }
+
     def __init__(self, data):
-        """!Generate test case information with Json format."""
+        """!Generate test case information with Json format.
+
+        data is the test log, or a file object to stream it from.
+        """
         super().__init__()
 
         self.test_json_data["Tests"] = []
         self.data = data
-        self.test_json_data["Execution"]["test_set_id"] = "6481308"
-        self.test_json_data["Execution"]["test_set_name"] = "SWILIB_Sample_Test"
+        self.test_json_data["Execution"]["test_set_id"] = "6481304"
+        self.test_json_data["Execution"]["test_set_name"] = "AutoTestPlus_Sample_test"
 
-    @staticmethod
-    def _get_sys_info(test_log):
-        """Get module information used for testing."""
-        python_ver = "N/A"
-        system_info = re.search(r"Operating System:\s+(?P<sys>.*)\n", test_log).group(
-            "sys"
-        )
-        python_info = re.search(
-            r"Python Version:\s+(?P<py_ver>Python\s\d+\.\d+\.\d+)\n", test_log
+    def _parse_fields(self, test, line):
+        """Get the fields of a test case from a line of its log."""
+        super()._parse_fields(test, line)
+        if test.start_time is None and "Start Time:" in line:
+            start_time = self.START_TIME_PATTERN.search(line)
+            if start_time:
+                test.start_time = start_time.group("time")
+
+    def _get_duration(self, test):
+        """Calculate the test case running time.
+
+        The end time is the last time logged, searched line by line from
+        the end of the log, which the HTML encoding does not change.
+        """
+        end_time = None
+        for log in reversed(test.raw_log):
+            end = len(log)
+            while end >= 0 and end_time is None:
+                start = log.rfind("<br/>", 0, end)
+                times = self.TIME_PATTERN.findall(log, start + 1, end)
+                if times:
+                    end_time = times[-1][:8]
+                end = start
+            if end_time is not None:
+                break
+        if test.start_time is None or end_time is None:
+            raise ValueError(f"{test.name}: start or end time not found")
+        return self._get_time_difference(test.start_time, end_time)
+
+    def _iter_line_blocks(self):
+        """Read the test log by blocks which end at the end of a line."""
+        read = (
+            io.StringIO(self.data).read
+            if isinstance(self.data, str)
+            else self.data.read
         )
-        if python_info is not None:
-            python_ver = python_info.group("py_ver")
-        swilib_ver = re.search(
-            r"Tool Version:\s+(?P<swi_ver>\d+\.\d+)\n", test_log
-        ).group("swi_ver")
+        tail = ""
+        for block in iter(lambda: read(self.READ_SIZE), ""):
+            block = tail + block
+            end = block.rfind("\n") + 1
+            if end:
+                yield block[:end]
+            tail = block[end:]
+        if tail:
+            yield tail
+
+    def iter_tests(self):
+        """Generate the test cases information from the test log.
+
+        The log is read by blocks of whole lines and split at each "Start
+        the Test", so only the log of the current test case is kept in
+        memory.
+        """
+        test = None
+        for lines in self._iter_line_blocks():
+            parts = lines.split(self.TEST_START)
+            if test is not None:
+                self._parse_lines(test, parts[0])
+            for part in parts[1:]:
+                if test is not None:
+                    yield self._get_test_case_info(test)
+                test = self._new_test(test is None)
+                test.raw_log.append(self.TEST_START)
+                self._parse_lines(test, part)
+        if test is not None:
+            yield self._get_test_case_info(test)
 
-        return {
-            "Operating System": system_info,
-            "Python Version": python_ver,
-            "Tool Version": f"Swilib: {swilib_ver}"
-        }
 
-    @staticmethod
-    def _get_test(test_log):
-        """Get test cases name from test log."""
-        test = re.search(r"Running Test Name:\s+(?P<name>\w+)\s+", test_log)
-        test_name = test.group("name")
+class Swilib(Informations):
+    """!Test case information with Json format."""
 
-        return test_name
+    READ_SIZE = 1 << 20
+    NAME_PATTERN = re.compile(r"Running Test Name:\s+(?P<name>\w+)\s+")
+    STATUS_PATTERN = r"(?<!\S)(?P<name>{}):(?P<status>\w+)"
+    SYS_INFO_PATTERNS = {
+        "Operating System": (
+            re.compile(r"Operating System:\s+(?P<value>.*)\n"),
+            "{}",
+        ),
+        "Python Version": (
+            re.compile(r"Python Version:\s+(?P<value>Python\s\d+\.\d+\.\d+)\n"),
+            "{}",
+        ),
+        "Tool Version": (
+            re.compile(r"Tool Version:\s+(?P<value>\d+\.\d+)\n"),
+            "Swilib: {}",
+        ),
+    }
+    TIME_PATTERN = re.compile(r"\s+(?P<time>\d+\:\d+\:\d+)\s+")
+    MARKERS = {
+        "FW Version": "HL78",
+        "Legato Version": "Legato RTOS:",
+        "Operating System": "Operating System:",
+        "Python Version": "Python Version:",
+        "Tool Version": "Tool Version:",
+        "name": "Running Test Name:",
+        "status": r"(?<!\S)\w+:\w",
+    }
 
-    @staticmethod
-    def _get_duration(test_log):
-        """Get the execution time of each test case."""
-        first_line = test_log.splitlines()[0]
-        last_line = test_log.splitlines()[-1]
-        start_time_str = re.search(
-            r"\s+(?P<start_time>\d+\:\d+\:\d+)\s+", first_line
-        ).group("start_time")
-        end_time_str = re.search(r"\s+(?P<end_time>\d+\:\d+\:\d+)\s+", last_line).group(
-            "end_time"
-        )
-
-        start_time = datetime.strptime(start_time_str, "%H:%M:%S")
-        end_time = datetime.strptime(end_time_str, "%H:%M:%S")
+    def __init__(self, data):
+        """!Generate test case information with Json format.
 
-        if end_time < start_time:
-            end_time += timedelta(days=1)
+        data is the Swilib json document, or a file object to stream its
+        test logs from.
+        """
+        super().__init__()
 
-        duration = end_time - start_time
+        self.test_json_data["Tests"] = []
+        self.data = data
+        self.test_json_data["Execution"]["test_set_id"] = "6481308"
+        self.test_json_data["Execution"]["test_set_name"] = "SWILIB_Sample_Test"
 
-        return duration.total_seconds()
+    def _get_duration(self, test):
+        """Get the execution time from the first and last lines of the log."""
+        start_time = self.TIME_PATTERN.search(test.first_line.splitlines()[0])
+        end_time = self.TIME_PATTERN.search(test.last_line.splitlines()[-1])
+        if start_time is None or end_time is None:
+            raise ValueError(f"{test.name}: start or end time not found")
+        return self._get_time_difference(
+            start_time.group("time"), end_time.group("time")
+        )
 
-    @staticmethod
-    def _get_status(test_name, test_log):
-        """Get test cases status from test log."""
-        status = re.search(rf"\s+{test_name}:(?P<status>\w+)", test_log)
-        if status is None:
-            test_status = "N/A"
+    def iter_tests(self):
+        """Generate the test cases information from the test logs."""
+        if isinstance(self.data, dict):
+            logs = self.data["Test_log"]
         else:
-            test_status = status.group("status").title()
+            logs = iter_json_array(self.data, "Test_log", self.READ_SIZE)
+        for i, log in enumerate(logs):
+            test = self._new_test(i == 0)
+            test.first_line = log[: log.find("\n") + 1 or None]
+            test.last_line = log[log.rfind("\n", 0, len(log) - 1) + 1 :]
+            self._parse_lines(test, log)
+            yield self._get_test_case_info(test)
+
+
+def iter_json_array(f, key, read_size=1 << 20):
+    """!Generate the items of the array of a key of a json object file.
+
+    The file is read by blocks, and only the current item is kept in
+    memory. The values of the other keys are parsed and dropped.
+    """
+    decoder = json.JSONDecoder()
+    state = {"buf": "", "pos": 0}
+
+    def fill():
+        # Read at least the buffered size, not to decode a long value
+        # again for each block.
+        buf = state["buf"][state["pos"] :]
+        block = f.read(max(read_size, len(buf)))
+        state["buf"], state["pos"] = buf + block, 0
+        return bool(block)
+
+    def next_char():
+        while True:
+            buf, pos = state["buf"], state["pos"]
+            while pos < len(buf) and buf[pos] in " \t\r\n":
+                pos += 1
+            state["pos"] = pos
+            if pos < len(buf):
+                return buf[pos]
+            if not fill():
+                return ""
+
+    def expect(chars):
+        char = next_char()
+        if not char or char not in chars:
+            raise ValueError(f"Expected one of {chars!r} in json, got {char!r}")
+        state["pos"] += 1
+        return char
+
+    def decode():
+        next_char()
+        while True:
+            try:
+                value, end = decoder.raw_decode(state["buf"], state["pos"])
+            except json.JSONDecodeError:
+                if fill():
+                    continue
+                raise
+            # A number may continue in the next block.
+            if end == len(state["buf"]) and fill():
+                continue
+            state["pos"] = end
+            return value
+
+    expect("{")
+    if next_char() == "}":
+        return
+    while True:
+        name = decode()
+        expect(":")
+        if name != key:
+            decode()
+        else:
+            expect("[")
+            if next_char() == "]":
+                state["pos"] += 1
+            else:
+                while True:
+                    yield decode()
+                    if expect(",]") == "]":
+                        break
+        if expect(",}") == "}":
+            return
 
-        return test_status
 
-    def run(self):
-        """Generate the Json file."""
-        env_info = self._get_sys_info(self.data["Test_log"][0])
-        self.test_json_data["Execution"].update(env_info)
-        for log in self.data["Test_log"]:
-            test_case_info = {}
-            if self.test_json_data["Execution"]["FW Version"] == "N/A":
-                self.test_json_data["Execution"]["FW Version"] = self._get_FW_ver(log)
-            if self.test_json_data["Execution"]["Legato Version"] == "N/A":
-                self.test_json_data["Execution"][
-                    "Legato Version"
-                ] = self._get_Legato_ver(log)
-            test_name = self._get_test(log)
-            test_case_info["Test Name"] = test_name
-            test_case_info["Result"] = self._get_status(test_name, log)
-            test_case_info["Duration(secs)"] = self._get_duration(log)
-            test_case_info["raw_log"] = log
-            test_case_info["raw_log"] = test_case_info["raw_log"].replace("<", '&lt;')
-            test_case_info["raw_log"] = test_case_info["raw_log"].replace(">", '&gt;')
-            test_case_info["raw_log"] = test_case_info["raw_log"].replace("\n", '<br/>')
-            self.test_json_data["Tests"].append(test_case_info)
-
-        return self.test_json_data
+def open_log(log_path):
+    """!Open a raw data file, which may be compressed with gzip."""
+    if log_path.endswith(".gz"):
+        return gzip.open(log_path, "rt", encoding="utf8")
+    return open(log_path, encoding="utf8")
 
 
 def parse_args():
@@ -271,18 +500,12 @@ if __name__ == "__main__":
 
     assert os.path.exists(args.raw_data), f"{args.raw_data}: Could not find file"
 
-    if ".json" in log_path:
-        with open(log_path, encoding="utf8") as f:
-            raw_data = json.load(f)
-        test = Swilib(raw_data)
-    else:
-        with open(log_path, encoding="utf8") as f:
-            raw_data = f.read()
-        test = AutoTestPlus(raw_data)
-    json_data = test.run()
-    output = json.dumps(json_data, indent=2, separators=(",", ": "))
-
-    if args.output:
-        with open(args.output, "w", encoding="utf8") as f:
-            f.write(output)
-        print(f"Generating Json file in {args.output}")
+    with open_log(log_path) as f:
+        if ".json" in log_path:
+            test = Swilib(f)
+        else:
+            test = AutoTestPlus(f)
+
+        if args.output:
+            test.write(args.output)
+            print(f"Generating Json file in {args.output}")
@@ -0,0 +1,202 @@
+"""!@package report_loader Load the json report inputs.
+
+Each report file is parsed once. Sort keys such as the creation time are
+read from the beginning of the file without parsing the whole document,
+and parsed reports can be cached on disk, keyed on the file hash, so
+that regenerating a report does not parse its inputs again.
+
+The reports are processed in a process pool: the workers load the
+reports and run the per-report processing, and the results are returned
+in the order of the inputs.
+"""
+import hashlib
+import json
+import os
+import pickle
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+# Size of the file prefix that may be scanned for the sort keys.
+READ_PREFIX_SIZE = 1 << 20
+READ_CHUNK_SIZE = 1 << 16
+HASH_CHUNK_SIZE = 1 << 20
+
+_WHITESPACE = re.compile(r"\s*")
+
+
+class ReportLoader:
+    """!Load json report files with a single parse.
+
+    The parsed documents are cached in cache_dir if it is provided.
+    Up to jobs worker processes are used to process several reports.
+    """
+
+    def __init__(self, cache_dir=None, jobs=1):
+        self.cache_dir = cache_dir
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+        self.jobs = jobs or os.cpu_count() or 1
+        # json_file: document parsed before load() was called.
+        self._parsed = {}
+
+    def __getstate__(self):
+        """Do not send the parsed documents to the worker processes."""
+        state = self.__dict__.copy()
+        state["_parsed"] = {}
+        return state
+
+    def map(self, fn, *iterables):
+        """Call fn(loader, *item) on the items of iterables in the workers.
+
+        fn needs to be a module level function, the items and the results
+        picklable. The results are indexed on the items: they are returned
+        in the order of the items, whatever the order the workers finish
+        them in.
+        """
+        items = list(zip(*iterables))
+        jobs = min(self.jobs, len(items))
+        if jobs <= 1:
+            return [fn(self, *item) for item in items]
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(fn, self, *item) for item in items]
+            return [future.result() for future in futures]
+
+    def load_all(self, json_files):
+        """Load several json files, in the order of the inputs."""
+        return [self.load(json_file) for json_file in json_files]
+
+    @staticmethod
+    def file_hash(json_file):
+        """Get the hash of the file content."""
+        digest = hashlib.sha1()
+        with open(json_file, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _iter_top_level_items(f, max_size=None):
+        """Iterate the top level key/value pairs of a json object.
+
+        Stop when the next pair cannot be decoded from the first
+        max_size characters of the file.
+        """
+        max_size = max_size or READ_PREFIX_SIZE
+        decoder = json.JSONDecoder()
+        buf = ""
+        pos = 0
+        eof = False
+
+        def _read_more():
+            nonlocal buf, eof
+            if eof or len(buf) >= max_size:
+                return False
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                eof = True
+                return False
+            buf += chunk
+            return True
+
+        def _next_char():
+            nonlocal pos
+            while True:
+                pos = _WHITESPACE.match(buf, pos).end()
+                if pos < len(buf):
+                    return buf[pos]
+                if not _read_more():
+                    return None
+
+        def _decode():
+            nonlocal pos
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buf, pos)
+                    # A number at the end of the buffer may be truncated.
+                    if end < len(buf) or eof:
+                        pos = end
+                        return True, value
+                except json.JSONDecodeError:
+                    pass
+                if not _read_more():
+                    return False, None
+
+        if _next_char() != "{":
+            return
+        pos += 1
+        while _next_char() == '"':
+            decoded, key = _decode()
+            if not decoded or _next_char() != ":":
+                return
+            pos += 1
+            if _next_char() is None:
+                return
+            decoded, value = _decode()
+            if not decoded:
+                return
+            yield key, value
+            if _next_char() != ",":
+                return
+            pos += 1
+
+    def read_keys(self, json_file, keys):
+        """Read top level keys from the beginning of a json file.
+
+        Keys that are not found in the prefix are read from the fully
+        parsed document, which is kept for the following load().
+        """
+        keys = set(keys)
+        values = {}
+        with open(json_file, encoding="utf8") as f:
+            for key, value in self._iter_top_level_items(f):
+                if key in keys:
+                    values[key] = value
+                    if len(values) == len(keys):
+                        return values
+        json_data = self._parsed.get(json_file)
+        if json_data is None:
+            json_data = self._load(json_file)
+            self._parsed[json_file] = json_data
+        return {key: json_data[key] for key in keys if key in json_data}
+
+    def load(self, json_file):
+        """Load a json file."""
+        json_data = self._parsed.pop(json_file, None)
+        if json_data is None:
+            json_data = self._load(json_file)
+        return json_data
+
+    def _load(self, json_file):
+        """Load a json file from the cache or parse it."""
+        if not self.cache_dir:
+            return self._parse(json_file)
+        cache_file = os.path.join(self.cache_dir, f"{self.file_hash(json_file)}.pickle")
+        if os.path.exists(cache_file):
+            try:
+                with open(cache_file, "rb") as f:
+                    return pickle.load(f)
+            except (OSError, EOFError, pickle.UnpicklingError) as e:
+                print(f"Invalid report cache {cache_file}: {e}")
+        json_data = self._parse(json_file)
+        self._store(cache_file, json_data)
+        return json_data
+
+    @staticmethod
+    def _parse(json_file):
+        with open(json_file, encoding="utf8") as f:
+            return json.load(f)
+
+    def _store(self, cache_file, json_data):
+        """Atomically store the parsed document in the cache."""
+        fd, tmp_file = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(json_data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            print(f"Unable to cache the report in {cache_file}: {e}")
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
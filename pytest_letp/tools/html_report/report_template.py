@@ -2,10 +2,111 @@
 
 Report can be any text-based format
 """
+import functools
 import os
+import re
 from jinja2 import FileSystemLoader, Environment
 
 
+class HTMLLogConverter:
+    """!Convert logs to HTML.
+
+    ANSI SGR sequences are converted to font tags with the classes of
+    their colors and styles, and HTML special characters are encoded
+    unless escape is False.
+
+    The SGR sequences and the special characters are replaced in a single
+    scan with one compiled alternation. Large logs are converted by chunks
+    so that the replacement never copies the whole log.
+    """
+
+    SPECIAL_CHARACTERS = {
+        "&": "&amp;",
+        "<": "&lt;",
+        ">": "&gt;",
+        '"': "&quot;",
+        "'": "&apos;",
+    }
+    COLORS = ["black", "red", "green", "yellow", "blue", "magenta", "cyan", "white"]
+    # SGR codes closing the current font: reset and end of bold.
+    CLOSE_CODES = {"", "0", "00", "2", "02", "22"}
+    BOLD_CODES = {"1", "01"}
+    CHUNK_SIZE = 1 << 18
+
+    _SGR_PATTERN = re.compile(r"\x1b\[([0-9;]*)m")
+    _SGR_OR_SPECIAL_PATTERN = re.compile(r"\x1b\[([0-9;]*)m|[&<>\"']")
+    # Escape sequence which may be completed by the next chunk.
+    _PARTIAL_SGR_PATTERN = re.compile(r"\x1b(\[[0-9;]*)?")
+
+    def __init__(self, escape=True):
+        self.escape = escape
+        self._pattern = self._SGR_OR_SPECIAL_PATTERN if escape else self._SGR_PATTERN
+
+    @classmethod
+    @functools.lru_cache(maxsize=256)
+    def _convert_sgr(cls, params):
+        """!Convert the parameters of a SGR sequence to font tags."""
+        tags = []
+        color = None
+        bold = False
+        for code in params.split(";"):
+            if code in cls.CLOSE_CODES:
+                if color or bold:
+                    tags.append(cls._font(color, bold))
+                    color = None
+                    bold = False
+                tags.append("</font>")
+            elif code in cls.BOLD_CODES:
+                bold = True
+            elif code.isdigit() and int(code) // 10 in (3, 9) and int(code) % 10 < 8:
+                # Normal and bright foreground colors.
+                color = cls.COLORS[int(code) % 10]
+        if color or bold:
+            tags.append(cls._font(color, bold))
+        return "".join(tags)
+
+    @staticmethod
+    def _font(color, bold):
+        classes = " ".join(c for c in (color, "bold" if bold else None) if c)
+        return f'<font class="{classes}">'
+
+    def _convert(self, chunk):
+        """!Convert a chunk which does not end with a partial SGR sequence."""
+        return self._pattern.sub(self._replace, chunk)
+
+    def _replace(self, match):
+        params = match.group(1)
+        if params is None:
+            return self.SPECIAL_CHARACTERS[match.group()]
+        return self._convert_sgr(params)
+
+    def convert(self, msg):
+        """!Convert a log message."""
+        if len(msg) <= self.CHUNK_SIZE:
+            return self._convert(msg)
+        chunks = (
+            msg[i : i + self.CHUNK_SIZE] for i in range(0, len(msg), self.CHUNK_SIZE)
+        )
+        return "".join(self.convert_chunks(chunks))
+
+    def convert_chunks(self, chunks):
+        """!Convert a log given as an iterable of chunks.
+
+        Escape sequences split across chunks are converted as a whole.
+        """
+        pending = ""
+        for chunk in chunks:
+            chunk = pending + chunk
+            pending = ""
+            start = chunk.rfind("\x1b")
+            if start >= 0 and self._PARTIAL_SGR_PATTERN.fullmatch(chunk, start):
+                chunk, pending = chunk[:start], chunk[start:]
+            if chunk:
+                yield self._convert(chunk)
+        if pending:
+            yield self._convert(pending)
+
+
 class TemplateRender:
     """!Render the contents to the generic template."""
 
@@ -32,44 +133,18 @@ class HTMLRender(TemplateRender):
         super().__init__()
         self.env.filters["html_encoding"] = self._html_encoding
         self.env.filters["clean_pytest_name"] = self._clean_pytest_name
+        self._log_converter = HTMLLogConverter()
+        # Logs with images are already HTML encoded.
+        self._image_log_converter = HTMLLogConverter(escape=False)
         self.template = self.env.get_template(template_file)
 
     def _html_encoding(self, msg):
         """Process text before it is displayed in HTML."""
         if not msg:
             return msg
-        msg = self._convert_special_character(msg)
-        return self._convert_colors(msg)
-
-    @staticmethod
-    def _convert_special_character(msg):
-        """!Replace special characters with HTML encoded characters."""
         if "<img" in msg or "</img" in msg:
-            return msg
-        msg = msg.replace("&", '&amp;')
-        msg = msg.replace("<", '&lt;')
-        msg = msg.replace(">", '&gt;')
-        msg = msg.replace('"', '&quot;')
-        msg = msg.replace("'", '&apos;')
-        return msg
-
-    @staticmethod
-    def _convert_colors(msg):
-        """!Replace ansi color by html colors."""
-        msg = msg.replace("\x1b[0m", "</font>")
-        msg = msg.replace("\x1b[01m", '<font class="bold">')
-        msg = msg.replace("\x1b[02m", "</font>")
-        msg = msg.replace("\x1b[31m", '<font class="black">')
-        msg = msg.replace("\x1b[31m", '<font class="red">')
-        msg = msg.replace("\x1b[01;31m", '<font class="red bold">')
-        msg = msg.replace("\x1b[32m", '<font class="green">')
-        msg = msg.replace("\x1b[33m", '<font class="yellow">')
-        msg = msg.replace("\x1b[01;33m", '<font class="yellow bold">')
-        msg = msg.replace("\x1b[34m", '<font class="blue">')
-        msg = msg.replace("\x1b[35m", '<font class="magenta">')
-        msg = msg.replace("\x1b[36m", '<font class="cyan">')
-        msg = msg.replace("\x1b[37m", '<font class="white">')
-        return msg
+            return self._image_log_converter.convert(msg)
+        return self._log_converter.convert(msg)
 
     @staticmethod
     def _clean_pytest_name(name):
@@ -86,17 +161,21 @@ class HTMLRender(TemplateRender):
         """!Render a completed html report."""
         return self.template.render(**self.contents)
 
+    def _summary_contents(self):
+        """!Get the contents of the summary section."""
+        return {
+            "title": self.contents.get("title"),
+            "basic": self.contents.get("basic"),
+            "summary": self.contents.get("summary"),
+            "summary_headers": self.contents.get("summary_headers"),
+            "environment_dict": {},
+            "section": self.contents.get("section"),
+            "baisc": self.contents.get("basic"),
+        }
+
     def _render_summary_sections(self):
         """!Render summary section only in the html report."""
-        return self.template.render(
-            title=self.contents.get("title"),
-            basic=self.contents.get("basic"),
-            summary=self.contents.get("summary"),
-            summary_headers=self.contents.get("summary_headers"),
-            environment_dict={},
-            section=self.contents.get("section"),
-            baisc=self.contents.get("basic"),
-        )
+        return self.template.render(**self._summary_contents())
 
     def render(self):
         """!Render the data."""
@@ -110,6 +189,33 @@ class HTMLRender(TemplateRender):
 
         return None
 
+    def generate(self):
+        """!Render the data piece by piece.
+
+        Return an iterator over the rendered chunks.
+        """
+        if self.contents:
+            section = self.contents.get("section").lower()
+
+            if "all" in section:
+                return self.template.generate(**self.contents)
+            elif "summary" in section:
+                return self.template.generate(**self._summary_contents())
+
+        return None
+
+    def stream(self, output_file):
+        """!Render the data into output_file as it is generated.
+
+        The rendered report is never held in memory.
+        """
+        chunks = self.generate()
+        if chunks is None:
+            return False
+        with open(output_file, "w", encoding="utf8") as f:
+            f.writelines(chunks)
+        return True
+
     def diff(self):
         """!Render the data."""
         return self._render_all_sections()
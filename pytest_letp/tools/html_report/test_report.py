@@ -9,14 +9,15 @@ import json
 import os
 import sys
 import re
-import glob
 import argparse
+import tempfile
 from collections import OrderedDict, Counter
 import xml.etree.ElementTree as ET
 import requests
 from requests.auth import HTTPBasicAuth
 from build_configuration import PytestResult, Components, Environment
 from report_template import HTMLRender
+from report_loader import ReportLoader
 
 __copyright__ = "Copyright (C) Sierra Wireless Inc."
 
@@ -277,14 +278,52 @@ class TestSummary:
         return update_sumary
 
 
+class ImageIndex:
+    """!Index of the test images of a directory by test name.
+
+    The directory is scanned once, and again only when it changes.
+    """
+
+    # img_dir: (directory mtime, {test name: [images]})
+    _cache = {}
+
+    @classmethod
+    def get(cls, img_dir):
+        """Get the images of img_dir by test name."""
+        try:
+            mtime = os.stat(img_dir).st_mtime_ns
+        except OSError:
+            return {}
+        cached = cls._cache.get(img_dir)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        index = {}
+        with os.scandir(img_dir) as entries:
+            for entry in entries:
+                test_name, sep, _ = entry.name.rpartition("-")
+                if sep and entry.name.endswith(".png"):
+                    index.setdefault(test_name, []).append(
+                        os.path.join(img_dir, entry.name)
+                    )
+        cls._cache[img_dir] = (mtime, index)
+        return index
+
+
 class TestCaseResult:
     """!Result for one test case."""
 
+    TIMESTAMP_PATTERN = re.compile(r"(\d\d:\d\d:\d\d)")
+
     def __init__(self):
         """One test case result."""
         self.pytest_json_result = None
-        self._system_out = ""
-        self._system_err = ""
+        # Logs are kept as chunks, joined when they are read.
+        self._system_out = [""]
+        self._system_err = [""]
+        # Today's data extracted from the logs and the logs it is from.
+        self.today_data = None
+        # (spool file, offset, system out size, system err size)
+        self._log_spool = None
 
     def add_pytest_json_result(self, pytest_result):
         """Add pytest json result."""
@@ -309,27 +348,24 @@ class TestCaseResult:
                 return exit_phase.get("message", "N/A")
         return ""
 
+    @staticmethod
+    def _join_logs(chunks):
+        """Join the log chunks into a single one."""
+        if len(chunks) > 1:
+            chunks[:] = ["\n".join(chunks)]
+        return chunks[0]
+
     @property
     def system_out(self):
         """System out from all xml elements."""
-        return self._system_out
+        if self._log_spool:
+            return self._read_spooled_logs()[0]
+        return self._join_logs(self._system_out)
 
     @system_out.setter
     def system_out(self, logs):
         """Set system out."""
-        self._system_out = f"{self._system_out}\n{logs}"
-
-    def get_log_start_index(self):
-        """Get start index for runtime logs."""
-        initialized = False
-        extra_init_lines = 2
-        for i, log_line in enumerate(self.system_out.split("\n")):
-            if not initialized:
-                if "Begin of" in log_line:
-                    initialized = True
-                continue
-            return i + extra_init_lines
-        return 0
+        self._system_out.append(logs)
 
     @staticmethod
     def get_time_from_timestamp(log_match):
@@ -343,50 +379,90 @@ class TestCaseResult:
 
     def get_time_from_log(self, log):
         """Get time from log line."""
-        log_match = re.search(r"(\d\d:\d\d:\d\d)", log)
+        log_match = self.TIMESTAMP_PATTERN.search(log)
         if log_match:
             return self.get_time_from_timestamp(log_match)
         return None
 
-    def insert_image(self, image, image_time, timestamp):
-        """Insert image into runtime logs."""
-        log_start = self.get_log_start_index()
+    def _scan_logs(self, logs, test_name):
+        """Scan the log lines once for the runtime logs and their times.
+
+        Returns:
+            The test start time, end time, the start index of the runtime
+            logs and the time of each log line.
+        """
+        begin_pattern = re.compile(rf"(\d\d:\d\d:\d\d) INFO .* Begin of {test_name}")
+        end_pattern = re.compile(rf"(\d\d:\d\d:\d\d) INFO .* End of {test_name}")
+        start_time = None
+        end_time = None
+        begin_idx = None
+        log_times = []
+        for i, log_line in enumerate(logs):
+            log_times.append(self.get_time_from_log(log_line))
+            if begin_idx is None and "Begin of" in log_line:
+                begin_idx = i
+            if not start_time:
+                start_time = self.get_time_from_timestamp(
+                    begin_pattern.search(log_line)
+                )
+            if not end_time:
+                end_time = self.get_time_from_timestamp(end_pattern.search(log_line))
+        # Runtime logs start 2 lines after the line following "Begin of".
+        log_start = 0
+        if begin_idx is not None and begin_idx + 1 < len(logs):
+            log_start = begin_idx + 3
+        return start_time, end_time, log_start, log_times
+
+    @staticmethod
+    def _merge_images(logs, log_times, log_start, images):
+        """Merge the images into the runtime logs in a single pass.
+
+        The images are sorted by time: an image is inserted before the
+        first log line logged after it.
+        Returns the merged logs and the images that were not inserted.
+        """
+        merged = logs[:log_start]
+        not_inserted = []
+        next_image = 0
         prev_log_time = None
-        for i, log_line in enumerate(self.system_out.split("\n")[log_start:]):
-            log_time = self.get_time_from_log(log_line)
-            if not log_time:
-                continue
-            if prev_log_time and prev_log_time <= image_time <= log_time:
-                image = os.path.relpath(image, "log")
-                image_tag = f'<img src="{image}" alt="{timestamp}"></br>'
-                logs = self.system_out.split("\n")
-                logs.insert(i + log_start, image_tag)
-                self._system_out = "\n".join(logs)
-                return True
-            prev_log_time = log_time
-        return False
+        for i in range(log_start, len(logs)):
+            if next_image == len(images):
+                merged.extend(logs[i:])
+                break
+            log_time = log_times[i]
+            if log_time:
+                while (
+                    prev_log_time
+                    and next_image < len(images)
+                    and images[next_image][0] <= log_time
+                ):
+                    image_time, timestamp, image = images[next_image]
+                    next_image += 1
+                    if image_time < prev_log_time:
+                        # Taken before the first timed log line.
+                        not_inserted.append(image)
+                        continue
+                    image = os.path.relpath(image, "log")
+                    merged.append(f'<img src="{image}" alt="{timestamp}"></br>')
+                prev_log_time = log_time
+            merged.append(logs[i])
+        not_inserted += [image for _, _, image in images[next_image:]]
+        return merged, not_inserted
 
     def add_images(self, test_id):
         """Add images from image directory to report."""
         img_dir = os.path.join("log", "images")
-        if not os.path.exists(img_dir):
-            return
         test_name = test_id.split(":")[-1]
-        test_name_glob = test_name.replace("[", "(").replace("]", ")")
-        test_name = test_name.replace("[", r"\[").replace("]", r"\]")
-        images = glob.glob(os.path.join(img_dir, rf"{test_name_glob}-*.png"))
+        test_name_image = test_name.replace("[", "(").replace("]", ")")
+        images = ImageIndex.get(img_dir).get(test_name_image)
         if not images:
             return
-        start_time = self.get_time_from_timestamp(
-            re.search(
-                rf"(\d\d:\d\d:\d\d) INFO .* Begin of {test_name}", self.system_out
-            )
-        )
-        end_time = self.get_time_from_timestamp(
-            re.search(rf"(\d\d:\d\d:\d\d) INFO .* End of {test_name}", self.system_out)
-        )
+        test_name = test_name.replace("[", r"\[").replace("]", r"\]")
+        logs = self.system_out.split("\n")
+        start_time, end_time, log_start, log_times = self._scan_logs(logs, test_name)
         if not start_time or not end_time:
             return
+        test_images = []
         for image in images:
             timestamp = image.split("-")[-1].strip(".png")
             timestamp = datetime.datetime.fromtimestamp(float(timestamp))
@@ -395,18 +471,71 @@ class TestCaseResult:
             )
             # Check if image timestamp is within test execution
             if start_time <= image_time <= end_time:
-                if not self.insert_image(image, image_time, timestamp):
-                    print(f"Unable to insert image into runtime logs: {image}")
+                test_images.append((image_time, timestamp, image))
+        if not test_images:
+            return
+        test_images.sort(key=lambda test_image: test_image[1])
+        merged, not_inserted = self._merge_images(
+            logs, log_times, log_start, test_images
+        )
+        self._system_out = ["\n".join(merged)]
+        for image in not_inserted:
+            print(f"Unable to insert image into runtime logs: {image}")
 
     @property
     def system_err(self):
         """System err from all xml elements."""
-        return self._system_err
+        if self._log_spool:
+            return self._read_spooled_logs()[1]
+        return self._join_logs(self._system_err)
+
+    def spool_logs(self, spool):
+        """Move the logs into the spool file.
+
+        They are read back from the file each time they are used.
+        """
+        system_out = self.system_out.encode("utf8", "surrogatepass")
+        system_err = self.system_err.encode("utf8", "surrogatepass")
+        self._log_spool = (spool.name, spool.tell(), len(system_out), len(system_err))
+        spool.write(system_out)
+        spool.write(system_err)
+        self._system_out = None
+        self._system_err = None
+
+    def _read_spooled_logs(self):
+        """Read the system out and err from the spool file."""
+        spool_file, offset, out_size, err_size = self._log_spool
+        with open(spool_file, "rb") as f:
+            f.seek(offset)
+            logs = f.read(out_size + err_size)
+        return (
+            logs[:out_size].decode("utf8", "surrogatepass"),
+            logs[out_size:].decode("utf8", "surrogatepass"),
+        )
 
     @system_err.setter
     def system_err(self, logs):
         """Set system err."""
-        self._system_err = f"{self._system_err}\n{logs}"
+        self._system_err.append(logs)
+
+    def release_pytest_logs(self):
+        """Drop the logs of the pytest result phases.
+
+        They are kept in the system out and err of the result.
+        """
+        if self.pytest_json_result:
+            self.pytest_json_result = {
+                key: {
+                    phase_key: phase_value
+                    for phase_key, phase_value in value.items()
+                    if phase_key not in ("stdout", "stderr")
+                }
+                if isinstance(value, dict)
+                else value
+                for key, value in self.pytest_json_result.items()
+            }
+        self._join_logs(self._system_out)
+        self._join_logs(self._system_err)
 
     def update_pytest_logs(self, pytest_result, update_before_log=False):
         """Update tcs pytest log."""
@@ -417,8 +546,8 @@ class TestCaseResult:
                     pytest_result[run_phase].get("stderr", ""),
                 ]
                 if update_before_log:
-                    self._system_out = pytest_log[0]
-                    self._system_err = pytest_log[1]
+                    self._system_out = [pytest_log[0]]
+                    self._system_err = [pytest_log[1]]
                 else:
                     self.system_out = pytest_log[0]
                     self.system_err = pytest_log[1]
@@ -535,6 +664,25 @@ class GlobalTestCase:
             )
         return self.results[target_name]
 
+    def add_target_result(self, target_name, test_result, reinit_status):
+        """Add the test result of a target processed on its own.
+
+        The results of the other targets are kept or dropped as in
+        get_create_target_result().
+        """
+        origin_target_name = TestReportBuilder._parse_sys_type_name(target_name)
+        for target in list(self.results.keys()):
+            if origin_target_name in target:
+                if self.reinit_status[target] is False:
+                    del self.results[target]
+                    del self.reinit_status[target]
+                else:
+                    self.results.setdefault(target_name, test_result)
+                    return
+        if target_name not in self.results:
+            self.results[target_name] = test_result
+            self.reinit_status[target_name] = reinit_status
+
 
 class TestCaseView:
     """!Test case view for ninja template."""
@@ -620,13 +768,44 @@ class TestCaseView:
         """For Ninja usage."""
         return self.test_case.pytest_json_result.get("outcome", "N/A").lower()
 
+    @property
+    def duration(self):
+        """Test duration in seconds, None if there is no test on the system."""
+        if not self.test_case:
+            return None
+        pytest_json_result = self.test_case.pytest_json_result
+        return sum(
+            pytest_json_result[phase].get("duration", 0)
+            for phase in ("setup", "call", "teardown")
+            if isinstance(pytest_json_result.get(phase), dict)
+        )
+
+
+class TestCaseRow:
+    """!Cell of a results table row.
+
+    Only what the results tables show is taken from the test case view:
+    the test case result logs are not read.
+    """
+
+    def __init__(self, test_case_view: TestCaseView, link=None):
+        self.test_name = test_case_view.test_name
+        self.target_name = test_case_view.target_name
+        self.id = test_case_view.id
+        self.result = test_case_view.result
+        self.duration = test_case_view.duration
+        self.test_case = test_case_view.test_case
+        # Link to the test log page.
+        self.link = link
+
 
 class BuildConfiguration:
     """!Describes a specific build/test configuration."""
 
-    def __init__(self, json_file, name=None):
-        with open(json_file, encoding="utf8") as f:
-            self.json_data = json.load(f)
+    def __init__(self, json_file, name=None, json_data=None):
+        if json_data is None:
+            json_data = ReportLoader().load(json_file)
+        self.json_data = json_data
 
         self.error = False
 
@@ -636,15 +815,26 @@ class BuildConfiguration:
             self.flags.pop(0)
         self.pytest_results = {}
         self.pytest_test_name_array = []
+        # test name: indices of its results, first occurrence first.
+        self._test_name_index = {}
+        # nodeid: test name.
+        self._nodeid_index = {}
         self.build_pytest_results()
         self.name = name or self.json_data.get("target_name", "N/A")
         self.name = self.name.replace(":wip", "")
         self.jenkins_build_number = self.get_jenkins_build_number()
+        # (json file, entry name) of the consolidated reports.
+        self.entries = [(json_file, name)]
+        # Results of the build configuration processed on its own.
+        self.test_summary = None
+        self.test_data = None
 
     def consolidate_test_results(self, another_cfg):
         """!Consolidate test results."""
+        start = len(self.pytest_results)
         self.pytest_results += another_cfg.pytest_results
         self.pytest_test_name_array += another_cfg.pytest_test_name_array
+        self._index_pytest_results(start)
 
     def consolidate_summary(self, another_cfg):
         """!Consolidate summary statistics."""
@@ -675,6 +865,7 @@ class BuildConfiguration:
         self.consolidate_summary(another_cfg)
         self.consolidate_test_results(another_cfg)
         self.consolidate_target_components(another_cfg)
+        self.entries += another_cfg.entries
 
     def build_pytest_results(self):
         """!Build pytest results if any."""
@@ -683,6 +874,26 @@ class BuildConfiguration:
             self.pytest_test_name_array = [
                 PytestResult(x).get_test_name() for x in self.pytest_results
             ]
+            self._index_pytest_results()
+
+    def release_pytest_results(self):
+        """!Drop the pytest results once they are processed."""
+        self.json_data.pop("tests", None)
+        self.pytest_results = []
+        self.pytest_test_name_array = []
+        self._test_name_index = {}
+        self._nodeid_index = {}
+
+    def _index_pytest_results(self, start=0):
+        """!Index pytest results from start by test name and nodeid.
+
+        Duplicated test names are grouped in the same pass.
+        """
+        for idx in range(start, len(self.pytest_results)):
+            test_name = self.pytest_test_name_array[idx]
+            self._test_name_index.setdefault(test_name, []).append(idx)
+            nodeid = self.pytest_results[idx].get("nodeid")
+            self._nodeid_index.setdefault(nodeid, test_name)
 
     def _get_json(self, key):
         if key in self.json_data:
@@ -779,10 +990,10 @@ class BuildConfiguration:
 
     def _lookup_pytest_json_result(self, test_name) -> dict:
         """!Look up pytest json result dictionary."""
-        if not test_name or test_name not in self.pytest_test_name_array:
+        indices = self._test_name_index.get(test_name) if test_name else None
+        if not indices:
             return {}
-        idx = self.pytest_test_name_array.index(test_name)
-        return self.pytest_results[idx]
+        return self.pytest_results[indices[0]]
 
     @staticmethod
     def _build_element_name(elmt, prefix):
@@ -820,25 +1031,24 @@ class BuildConfiguration:
                 summary.stat_errors += 1
         summary.stat_tcs = len(test_result)
 
-    @staticmethod
-    def _get_duplicate_element_indices(test_list):
-        """Get the value of duplicate element indices in list."""
-        res = [idx for idx, val in enumerate(test_list) if val in test_list[:idx]]
-        return res
-
     def _update_result_of_duplicate_tcs(self, pytest_result, test_result):
         """Update results of duplicate tcs in final report."""
-        res = self._get_duplicate_element_indices(self.pytest_test_name_array)
-        test_name = PytestResult(pytest_result).get_test_name()
-        for i in res:
-            if self.pytest_test_name_array[i] == test_name:
-                if pytest_result.get("outcome") == "passed":
-                    break
-                pytest_result = self.pytest_results[i]
-                test_result.update_pytest_logs(pytest_result, update_before_log=True)
-                test_result.pytest_json_result = pytest_result
+        test_name = self._get_test_name(pytest_result)
+        for i in self._test_name_index.get(test_name, [])[1:]:
+            if pytest_result.get("outcome") == "passed":
+                break
+            pytest_result = self.pytest_results[i]
+            test_result.update_pytest_logs(pytest_result, update_before_log=True)
+            test_result.pytest_json_result = pytest_result
         return pytest_result
 
+    def _get_test_name(self, pytest_result):
+        """Get the test name of an indexed pytest result."""
+        test_name = self._nodeid_index.get(pytest_result.get("nodeid"))
+        if test_name is None:
+            test_name = PytestResult(pytest_result).get_test_name()
+        return test_name
+
     @staticmethod
     def get_xfailed_mes(pytest_result):
         """Get a text message explaining why xfailed."""
@@ -877,7 +1087,7 @@ class BuildConfiguration:
         tests = self.json_data.get("tests", [])
         verify_duplicate_tcs = {}
         for elmt in tests:
-            test_name = PytestResult(elmt).get_test_name()
+            test_name = self._get_test_name(elmt)
             pytest_result = self._lookup_pytest_json_result(test_name)
             if not pytest_result:
                 print(f"Unable to get the test result for {pytest_result}")
@@ -909,12 +1119,10 @@ class BuildConfiguration:
     def _add_pytest_test_logs(self, global_test_data, pytest_result):
         """Try to recover the test logs using pytest results."""
         if pytest_result:
-            for test_name, global_test_case in global_test_data.items():
+            global_test_case = global_test_data.get(self._get_test_name(pytest_result))
+            if global_test_case:
                 test_result_to_recover = global_test_case.results.get(self.name)
-                if (
-                    PytestResult(pytest_result).get_test_name() == test_name
-                    and test_result_to_recover
-                ):
+                if test_result_to_recover:
                     test_result_to_recover.update_pytest_logs(pytest_result)
 
     def process_test_data(self, global_test_data):
@@ -947,7 +1155,17 @@ class BuildConfiguration:
 class TestReportBuilder:
     """!Building test report."""
 
-    def __init__(self):
+    # Filtered results tables of the report.
+    RESULT_FILTERS = {
+        "failed": GlobalTestCase.is_failed,
+        "xfailed": GlobalTestCase.is_xfailed,
+    }
+
+    def __init__(self, loader=None):
+        self.loader = loader or ReportLoader()
+        # The test logs are spooled in files of this directory.
+        self.log_spool = None
+        self.filtered_results = {}
         self.build_cfg_list = []  # List of build configurations
         self.build_number_dict = {}  # build_id: BuildConfiguration instance
         self.build_names = {}  # Build cfgs may have the same name.
@@ -1087,9 +1305,9 @@ class TestReportBuilder:
         for entry in json_path:
             dt_obj = {}
             entry_name, entry_path = self._get_entry_path(entry)
-            build_cfg = BuildConfiguration(entry_path, entry_name)
-            if "created" in build_cfg.json_data:
-                cre_time = build_cfg.json_data["created"]
+            sort_keys = self.loader.read_keys(entry_path, ["created"])
+            if "created" in sort_keys:
+                cre_time = sort_keys["created"]
             else:
                 cre_time = os.path.getctime(entry_path)
             cre_time = datetime.datetime.fromtimestamp(cre_time)
@@ -1102,10 +1320,23 @@ class TestReportBuilder:
         return list_build_cfg
 
     def _add_build_cfgs(self, json_path):
+        """Process the build configurations and register them in order.
+
+        Each input is processed on its own in the worker processes. The
+        build configurations consolidating several inputs are processed
+        again from all their inputs once they are registered.
+        """
         list_build_cfg = self.sort_file_by_times(json_path)
         temp_list_build_cfg = {}
-        for entry in list_build_cfg:
-            build_cfg = BuildConfiguration(entry["entry_path"], entry["entry_name"])
+        options = _get_report_options()
+        self.log_spool = tempfile.TemporaryDirectory(prefix="test_report_")
+        all_build_cfgs = self.loader.map(
+            _process_build_configuration,
+            [[(entry["entry_path"], entry["entry_name"])] for entry in list_build_cfg],
+            [options] * len(list_build_cfg),
+            [self.log_spool.name] * len(list_build_cfg),
+        )
+        for entry, build_cfg in zip(list_build_cfg, all_build_cfgs):
             self.set_unique_name(build_cfg)
             print(f'[{build_cfg.name}] {entry["entry_path"]} {entry["time"]}')
             registered_cfg = self.register_new_build_configuration(build_cfg)
@@ -1126,6 +1357,20 @@ class TestReportBuilder:
                 self.build_cfg_list.append(build_cfg)
             else:
                 registered_cfg.consolidate(build_cfg)
+        consolidated = [
+            (idx, build_cfg)
+            for idx, build_cfg in enumerate(self.build_cfg_list)
+            if len(build_cfg.entries) > 1
+        ]
+        all_build_cfgs = self.loader.map(
+            _process_build_configuration,
+            [build_cfg.entries for _, build_cfg in consolidated],
+            [options] * len(consolidated),
+            [self.log_spool.name] * len(consolidated),
+            [build_cfg.name for _, build_cfg in consolidated],
+        )
+        for (idx, _), build_cfg in zip(consolidated, all_build_cfgs):
+            self.build_cfg_list[idx] = build_cfg
 
     def _add_env_list_header(self):
         # Environment parts
@@ -1169,9 +1414,25 @@ class TestReportBuilder:
                 self.environment_dict[build_cfg.name]["Execution_time"] = exe_time
             else:
                 self.environment_dict[build_cfg.name]["Execution_time"] = "N/A"
-            new_summary = build_cfg.process_test_data(self.global_test_data)
+            new_summary = build_cfg.test_summary
+            new_summary.cfg = build_cfg.name
+            self._merge_test_data(build_cfg)
             self.test_summary.add_summary(build_cfg.name, new_summary)
 
+    def _merge_test_data(self, build_cfg):
+        """Merge the test data of a build configuration into the global one."""
+        for test_name, test_case in build_cfg.test_data.items():
+            global_test_case = BuildConfiguration._get_create_global_test_case(
+                self.global_test_data, test_name
+            )
+            for target_name, test_result in test_case.results.items():
+                global_test_case.add_target_result(
+                    build_cfg.name,
+                    test_result,
+                    test_case.reinit_status.get(target_name),
+                )
+        build_cfg.test_data = None
+
     def _add_env_global_list(self, global_env, global_env_path):
         # From args
         if global_env:
@@ -1386,7 +1647,10 @@ class TestReportBuilder:
 
     def get_result_groups(self, filter_fn):
         """Get table of result groups with filter filtering."""
-        results = []
+        return [result for _, result in self._iter_result_groups(filter_fn)]
+
+    def _iter_result_groups(self, filter_fn):
+        """Iterate the result groups rows with their global test case."""
         group_status = {}
 
         test_group = TestGroups(
@@ -1401,35 +1665,73 @@ class TestReportBuilder:
                 if filter_fn and not filter_fn(global_test_case):
                     continue
                 result = self.collect_test_result(global_test_case, test_name)
-                results.append(result)
                 if not filter_fn:
                     self.group_summary = test_group._summarize_group(
                         group, result, group_status
                     )
+                yield global_test_case, result
         if not filter_fn and MERGE_REPORT:
             self.platform = test_group.gen_result_platforms()
 
-        return results
-
-    def gen_results_table(self, filter_fn=None):
-        """!Get results table with filtering."""
-        results = []
-
+    def _iter_results(self, filter_fn=None):
+        """Iterate the results rows with their global test case."""
         if GROUP_CONFIG_PATH:
-            results = self.get_result_groups(filter_fn)
+            yield from self._iter_result_groups(filter_fn)
         else:
             for test_name, global_test_case in self.global_test_data.items():
                 if filter_fn and not filter_fn(global_test_case):
                     continue
 
                 result = self.collect_test_result(global_test_case, test_name)
-                results.append(result)
-        return results
+                yield global_test_case, result
+
+    def gen_results_table(self, filter_fn=None):
+        """!Get results table with filtering."""
+        return [
+            self._gen_result_row(result) for _, result in self._iter_results(filter_fn)
+        ]
+
+    def _gen_result_row(self, result):
+        """!Get the row of a results table from the test case views."""
+        return [TestCaseRow(test_case_view) for test_case_view in result]
+
+    def gen_results_tables(self, filters=None):
+        """!Get results table and its filtered tables in one pass.
+
+        Args:
+            filters: Filter function of each filtered table, by table name.
+                Defaults to RESULT_FILTERS.
+
+        Returns:
+            The results table and the filtered tables by table name.
+        """
+        if filters is None:
+            filters = self.RESULT_FILTERS
+        results = []
+        filtered_results = {name: [] for name in filters}
+        for global_test_case, result in self._iter_results():
+            row = self._gen_result_row(result)
+            results.append(row)
+            for name, filter_fn in filters.items():
+                if filter_fn(global_test_case):
+                    filtered_results[name].append(row)
+        return results, filtered_results
 
     def generate_report(self, results_all, status, other_contents: dict, data=None):
         """!Generate the test report."""
         raise NotImplementedError
 
+    def _prepare_log_pages(self, output, other_contents: dict):
+        """!Prepare the test log pages of the report, if it has any."""
+
+    def write_report(
+        self, output, results_all, status, other_contents: dict, data=None
+    ):
+        """!Generate the test report into the output file."""
+        report = self.generate_report(results_all, status, other_contents, data=data)
+        with open(output, "w", encoding="utf8") as f:
+            f.write(report)
+
     def _add_results_headers(self):
         """Add the result header.
 
@@ -1464,6 +1766,7 @@ class TestReportBuilder:
 
         time.
         """
+        target_name = None
         if "hl78" in tc.target_name.lower():
             target_name = "RTOS"
         elif "rc76" in tc.target_name.lower():
@@ -1745,25 +2048,57 @@ class TestReportBuilder:
         cpu["Idle Percentage"] = dict(zip(platforms, val))
         boot_time["Device Up"] = dict(zip(platforms, val))
         flash_time["Flash Time"] = dict(zip(platforms, val))
+        today_data = dict(zip(infor, [memory, cpu, boot_time, flash_time]))
         for tcs in results_all:
             for tc in tcs:
-                if (
-                    tc.test_name.split(".")[-1] in self.mem_cpu_boottime_tcs_list
-                    and tc.test_case is not None
-                    and tc.result.lower() == "passed"
-                    and tc.target_name != "em92xx"
-                ):
-                    memory = self._collect_data_of_memory(memory, tc, platforms)
-                    cpu = self._collect_data_of_cpu(cpu, tc)
-                    boot_time = self._collect_data_of_boot_time(
-                        boot_time, tc, platforms
-                    )
-                    flash_time = self._collect_data_of_flash_time(
-                        flash_time, tc, platforms
-                    )
-        today_data = dict(zip(infor, [memory, cpu, boot_time, flash_time]))
+                if not self._has_today_data(tc):
+                    continue
+                if tc.test_case.today_data is not None:
+                    self._add_today_data(today_data, *tc.test_case.today_data)
+                    continue
+                self._collect_data_of_memory(memory, tc, platforms)
+                self._collect_data_of_cpu(cpu, tc)
+                self._collect_data_of_boot_time(boot_time, tc, platforms)
+                self._collect_data_of_flash_time(flash_time, tc, platforms)
         return today_data
 
+    def _has_today_data(self, tc):
+        """Check if today's data is collected from the test case."""
+        return (
+            tc.test_name.split(".")[-1] in self.mem_cpu_boottime_tcs_list
+            and tc.test_case is not None
+            and tc.result.lower() == "passed"
+            and tc.target_name != "em92xx"
+        )
+
+    def extract_today_data(self, tc):
+        """Extract today's data from the logs of a test case.
+
+        Returns:
+            The data which is not N/A and the logs it is extracted from,
+            by data and platform.
+        """
+        if not self._has_today_data(tc) or self._get_target_name(tc) is None:
+            return {}, {}
+        self.summary_log = {tc_name: {} for tc_name in self.summary_log}
+        data = {}
+        for infor, infor_value in self.get_today_data([[tc]]).items():
+            for data_name, data_value in infor_value.items():
+                for target, value in data_value.items():
+                    if value != "N/A":
+                        data.setdefault(infor, {}).setdefault(data_name, {})
+                        data[infor][data_name][target] = value
+        logs = {tc_name: log for tc_name, log in self.summary_log.items() if log}
+        return data, logs
+
+    def _add_today_data(self, today_data, data, logs):
+        """Add the data extracted from the logs of a test case."""
+        for infor, infor_value in data.items():
+            for data_name, data_value in infor_value.items():
+                today_data[infor][data_name].update(data_value)
+        for tc_name, log in logs.items():
+            self.summary_log[tc_name].update(log)
+
     def check_data(self, data: dict):
         """Check the status of today's data against reference data."""
         for infor, infor_value in data["Data"].items():
@@ -1936,12 +2271,14 @@ class TestReportBuilder:
         self._add_env_global_list(args.global_env, args.global_env_path)
         self._add_results_headers()
         status = self._add_summary_section(txt_paths)
-        results_all = self.gen_results_table()
         other_contents = {
             "title": args.title,
             "basic": args.basic,
             "section": args.html_section,
+            "log_pages": args.log_pages,
         }
+        self._prepare_log_pages(args.output, other_contents)
+        results_all, self.filtered_results = self.gen_results_tables()
         all_data = {}
         if args.output_format == "HTML":
             sum_data = {}
@@ -1967,21 +2304,25 @@ class TestReportBuilder:
                         "Today": data_check["Data"],
                     }
                 )
-        output = self.generate_report(
-            results_all, status, other_contents, data=all_data
-        )
         if args.output:
-            with open(args.output, "w", encoding="utf8") as f:
-                f.write(output)
+            self.write_report(
+                args.output, results_all, status, other_contents, data=all_data
+            )
             print(f"Generating report in {args.output}")
+        else:
+            self.generate_report(results_all, status, other_contents, data=all_data)
 
 
 class TestReportHTMLBuilder(TestReportBuilder):
     """!Test report HTML format builder."""
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, loader=None):
+        super().__init__(loader)
         self.failure = None
+        # Directory of the test log pages, relative to the report.
+        self.log_pages = None
+        self.log_pages_dir = None
+        self.log_render = HTMLRender("test_log_template.html")
 
     def get_failure(self):
         """Get failure reasons from Json file."""
@@ -2000,8 +2341,14 @@ class TestReportHTMLBuilder(TestReportBuilder):
         else:
             return ""
 
-    def generate_report(self, results_all, status, other_contents: dict, data=None):
-        """!Generate report in HTML."""
+    def _get_filtered_results(self, name):
+        """Get a filtered results table."""
+        if name in self.filtered_results:
+            return self.filtered_results[name]
+        return self.gen_results_table(self.RESULT_FILTERS[name])
+
+    def _get_html_render(self, results_all, other_contents: dict, data=None):
+        """Get the HTML render of the report."""
         html_render = HTMLRender("report_template.html")
         summary_headers = ["Config", "Status"]
         targets = ["RTOS", "ThreadX", "Linux(WP76xx)", "Linux(WP77xx)"]
@@ -2028,8 +2375,8 @@ class TestReportHTMLBuilder(TestReportBuilder):
             "testing_env_infos": self.testing_env_infos,
             "environment_dict": self.environment_dict,
             "results_headers": self.results_headers,
-            "results_failed": self.gen_results_table(lambda x: x.is_failed()),
-            "results_xfailed": self.gen_results_table(lambda x: x.is_xfailed()),
+            "results_failed": self._get_filtered_results("failed"),
+            "results_xfailed": self._get_filtered_results("xfailed"),
             "test_groups": self.groups,
             "group_len": self.group_len,
             "platform_info": self.platform,
@@ -2042,9 +2389,61 @@ class TestReportHTMLBuilder(TestReportBuilder):
             "targets": targets,
             "failure": self.failure,
             "extend_tcs": self.collected_test,
+            "log_pages": self.log_pages,
         }
+        return html_render
+
+    def generate_report(self, results_all, status, other_contents: dict, data=None):
+        """!Generate report in HTML."""
+        html_render = self._get_html_render(results_all, other_contents, data=data)
         return html_render.render()
 
+    def write_report(
+        self, output, results_all, status, other_contents: dict, data=None
+    ):
+        """!Generate report in HTML into the output file.
+
+        The report is written as it is rendered.
+        """
+        html_render = self._get_html_render(results_all, other_contents, data=data)
+        html_render.stream(output)
+
+    def _prepare_log_pages(self, output, other_contents: dict):
+        """!Prepare the directory of the test log pages.
+
+        With the log_pages content, the test logs are written into one page
+        per test in a directory next to the report instead of being
+        embedded into it. The pages are written as the results tables are
+        generated.
+        """
+        if not output or not other_contents.get("log_pages"):
+            return
+        if other_contents.get("basic"):
+            return
+        self.log_pages = f"{os.path.splitext(os.path.basename(output))[0]}_logs"
+        self.log_pages_dir = os.path.join(os.path.dirname(output), self.log_pages)
+        os.makedirs(self.log_pages_dir, exist_ok=True)
+
+    def _gen_result_row(self, result):
+        """!Get the row of a results table and write its test log pages."""
+        if not self.log_pages:
+            return super()._gen_result_row(result)
+        row = []
+        for test_case_view in result:
+            if test_case_view.target_name == "Jira ID":
+                row.append(TestCaseRow(test_case_view))
+                continue
+            page_name = f"info-{HTMLRender._clean_pytest_name(test_case_view.id)}.html"
+            self.log_render.contents = {
+                "section": "all",
+                "test_case_view": test_case_view,
+            }
+            self.log_render.stream(os.path.join(self.log_pages_dir, page_name))
+            row.append(
+                TestCaseRow(test_case_view, link=f"{self.log_pages}/{page_name}")
+            )
+        return row
+
     def build(self, title, input_json_file, output_name):
         """!Build the html report."""
         self._add_build_cfgs(input_json_file)
@@ -2052,19 +2451,19 @@ class TestReportHTMLBuilder(TestReportBuilder):
         self._add_results_headers()
         status = self._add_summary_section()
         self._add_env_list_header()
-        results_all = self.gen_results_table()
+        results_all, self.filtered_results = self.gen_results_tables()
         other_contents = {"title": title, "section": "all"}
-        output = self.generate_report(results_all, status, other_contents)
         if output_name:
-            with open(output_name, "w", encoding="utf8") as f:
-                f.write(output)
+            self.write_report(output_name, results_all, status, other_contents)
+        else:
+            self.generate_report(results_all, status, other_contents)
 
 
 class TestReportJSONBuilder(TestReportBuilder):
     """!Test report JSON format builder."""
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, loader=None):
+        super().__init__(loader)
         self.content = None
 
     def generate_report(self, results_all, status, other_contents: dict, data=None):
@@ -2075,7 +2474,7 @@ class TestReportJSONBuilder(TestReportBuilder):
             tc1 = row[0]
             t = {"name": tc1.test_name}
             for cell in row:
-                if isinstance(cell, TestCaseView):
+                if isinstance(cell, TestCaseRow):
                     if cell.test_case:
                         t[cell.target_name] = {"result": cell.result}
             tests.append(t)
@@ -2605,6 +3004,62 @@ class JiraServer:
         return is_valid
 
 
+def _get_report_options():
+    """Get the report options to process the reports in the workers."""
+    return {
+        "MERGE_REPORT": MERGE_REPORT,
+        "JIRA_SERVER": JIRA_SERVER,
+        "JIRA_USERNAME": JIRA_USERNAME,
+        "JIRA_PASSWORD": JIRA_PASSWORD,
+    }
+
+
+def _process_build_configuration(loader, entries, options, log_spool, name=None):
+    """Process a build configuration on its own in a worker.
+
+    The logs, images and today's data of its tests are extracted, the logs
+    are spooled into a file and its pytest results are released, so that
+    only the processed build configuration is sent back.
+
+    Args:
+        loader: The report loader.
+        entries: (json file, entry name) of the reports to consolidate.
+        options: The report options.
+        log_spool: Directory where the test logs are spooled.
+        name: The build configuration name, if it is already registered.
+
+    Returns:
+        The processed build configuration.
+    """
+    globals().update(options)
+    build_cfg = None
+    for json_file, entry_name in entries:
+        entry_cfg = BuildConfiguration(
+            json_file, entry_name, json_data=loader.load(json_file)
+        )
+        if build_cfg is None:
+            build_cfg = entry_cfg
+        else:
+            build_cfg.consolidate(entry_cfg)
+    if name:
+        build_cfg.name = name
+    build_cfg.test_data = OrderedDict()
+    build_cfg.test_summary = build_cfg.process_test_data(build_cfg.test_data)
+    builder = TestReportBuilder(loader)
+    with tempfile.NamedTemporaryFile(
+        dir=log_spool, suffix=".log", delete=False
+    ) as spool:
+        for test_name, test_case in build_cfg.test_data.items():
+            for test_result in test_case.results.values():
+                test_result.today_data = builder.extract_today_data(
+                    TestCaseView(test_name, build_cfg.name, test_result)
+                )
+                test_result.release_pytest_logs()
+                test_result.spool_logs(spool)
+    build_cfg.release_pytest_results()
+    return build_cfg
+
+
 def parse_args():
     """!Parse all arguments for test_report."""
     parser = argparse.ArgumentParser()
@@ -2654,6 +3109,11 @@ def parse_args():
         help="Generate a basic version of the HTML report (for email)",
     )
     parser.add_argument("--online-link", help="URL to the online report")
+    parser.add_argument(
+        "--log-pages",
+        action="store_true",
+        help="Write the test logs into one page per test instead of the report",
+    )
     parser.add_argument(
         "--get-tc",
         action="append",
@@ -2664,6 +3124,15 @@ def parse_args():
         status can be "failed", "passed", "error", "xfailed", "skipped" \n""",
     )
     parser.add_argument("--report-groups", help="Path to group config")
+    parser.add_argument(
+        "--json-cache-dir", help="Directory to cache the parsed JSON inputs"
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of processes to process the JSON inputs",
+    )
     args = parser.parse_args()
     return args
 
@@ -2694,10 +3163,11 @@ if __name__ == "__main__":
         if re.search(".json", args.output):
             TestReportJSONBuilder().convert_list_to_json(test_list, args.output)
     else:
+        report_loader = ReportLoader(args.json_cache_dir, jobs=args.jobs)
         if args.output_format == "HTML":
-            TestReportHTMLBuilder().run(args)
+            TestReportHTMLBuilder(report_loader).run(args)
         elif args.output_format == "JSON":
-            test_report_builder = TestReportJSONBuilder()
+            test_report_builder = TestReportJSONBuilder(report_loader)
             test_report_builder.run(args)
             if args.elasticsearch_url:
                 test_report_builder.upload(args.elasticsearch_url)
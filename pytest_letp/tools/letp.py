@@ -13,6 +13,7 @@ import sys
 import traceback
 import re
 import pytest
+from pytest_letp.lib import device_pool
 from pytest_letp.lib import pytest_qTest
 
 __copyright__ = "Copyright (C) Sierra Wireless Inc."
@@ -101,6 +102,12 @@ def _get_arguments():
 
     # subparser for running tests
     run_parser = subparsers.add_parser("run", help="run test with pytest parameters.")
+    run_parser.add_argument(
+        "--device-pool",
+        dest="device_pool",
+        help="run the tests on the devices of a device pool xml file, "
+        "one worker session per device",
+    )
 
     # Debug level
     # Simple option like -d is reserved by pytest. This is obsolete.
@@ -151,23 +158,32 @@ def run(args, pytest_args):
     # so pytest-letp must be called to process the json file
     # into LeTP tests (pytest_load_initial_conftests hook)
     _rc = pytest.ExitCode.INTERNAL_ERROR
+    pytest_args = [
+        "-r a",  # (a)ll except passed (p/P) extra summary info
+        "--color=yes",
+        "--dbg-lvl",
+        str(args.dbglvl),
+        "-v",
+        "--rootdir",
+        pytest_root,
+        "-c",
+        os.path.join(pytest_root, _pytest_config_file),
+        "-p",
+        "pytest_letp",
+    ] + pytest_args
     try:
-        _rc = pytest.main(
-            [
-                "-r a",  # (a)ll except passed (p/P) extra summary info
-                "--color=yes",
-                "--dbg-lvl",
-                str(args.dbglvl),
-                "-v",
-                "--rootdir",
-                pytest_root,
-                "-c",
-                os.path.join(pytest_root, _pytest_config_file),
-                "-p",
-                "pytest_letp",
-            ]
-            + pytest_args
-        )
+        if getattr(args, "device_pool", None):
+            _rc = device_pool.run_pool(
+                args.device_pool,
+                pytest_args,
+                env={
+                    "PYTHONPATH": os.pathsep.join(
+                        LIB_PATHS + [os.environ.get("PYTHONPATH", "")]
+                    )
+                },
+            )
+        else:
+            _rc = pytest.main(pytest_args)
     except:
         exc_type, exc_value, exc_traceback = sys.exc_info()
         traceback.print_exception(exc_type, exc_value, exc_traceback, file=sys.stdout)
@@ -6,7 +6,8 @@ import json
 import os
 import xml.etree.ElementTree as ET
 from datetime import datetime
-import requests
+
+from qtest_client import QTestCache, QTestSession
 
 SERVER_URL = "https://sierrawireless.qtestnet.com/"
 CONFIG_PATH = os.path.join(os.environ.get("LETP_PATH"),
@@ -14,6 +15,16 @@ CONFIG_PATH = os.path.join(os.environ.get("LETP_PATH"),
                            "tools",
                            "qTest_upload",
                            "test_data.xml")
+# Fields of the test logs, in test_data.xml.
+RESULT_FIELDS = (
+    "Legato_Version",
+    "LXSWI_Version",
+    "FW_Version_WP76",
+    "FW_Version_WP77",
+    "FW_Version_HL78",
+    "FW_Version_RC76",
+    "Module_Ref",
+)
 
 
 def read_test_config(path_dir):
@@ -32,16 +43,46 @@ def write_config(path, value):
 class QTestAPI:
     """Class for upload the result by REST API."""
 
-    def __init__(self, accessToken, project_name="", release_name=""):
+    def __init__(self, accessToken, project_name="", release_name="", cache=None):
         # Get accesstoken with login
         self.access_token = accessToken
+        # Pooled keep-alive connections, shared by the parallel uploads
+        self.client = QTestSession(accessToken)
+        # IDs of the projects, releases, test suites and fields
+        self.cache = cache or QTestCache()
         self.project_name = project_name
         self.release_name = release_name
         if self.project_name:
             self.project_id = self.get_project_ID()
         if self.release_name:
             self.release_id = self.get_release_ID()
-            self.test_suite_names = self.get_testsuite_name()
+            # The test suites added to the release must be found
+            self.test_suite_names = self.get_testsuite_name(refresh=True)
+
+    def get_scope(self, release=False):
+        """Get the cache scope of the server, project or release."""
+        return QTestCache.make_scope(
+            SERVER_URL,
+            getattr(self, "project_id", ""),
+            getattr(self, "release_id", "") if release else "",
+        )
+
+    def get_cached_ID(self, scope, name, key, fetch):
+        """Get an ID in a cached {name: ID} map.
+
+        The map is fetched again when the key is missing.
+        """
+        ids = self.cache.get_or_fetch(scope, name, fetch)
+        if key not in ids:
+            self.cache.invalidate(scope, name)
+            ids = self.cache.get_or_fetch(scope, name, fetch)
+        return ids.get(key, 0)
+
+    def fetch_IDs(self, api_url, params=None):
+        """Get the {name: ID} map of a list of qTest objects."""
+        params = dict(params or {}, access_token=self.access_token)
+        response = self.client.request("GET", api_url, params=params)
+        return {item["name"]: item["id"] for item in response.json()}
 
     def get_project_ID(self):
         """Get project ID assigned to user.
@@ -53,15 +94,15 @@ class QTestAPI:
             0 if otherwise
         """
         api_url = SERVER_URL + "/api/v3/projects"
-        params = {"access_token": self.access_token}
-        headers = {}
-        response = requests.request("GET", api_url, params=params, headers=headers)
-        responsejson = response.json()
-        for project in responsejson:
-            if project["name"] == self.project_name:
-                print(f'Project ID: {project["id"]}')
-                return project["id"]
-        return 0
+        project_id = self.get_cached_ID(
+            QTestCache.make_scope(SERVER_URL),
+            "projects",
+            self.project_name,
+            lambda: self.fetch_IDs(api_url),
+        )
+        if project_id:
+            print(f"Project ID: {project_id}")
+        return project_id
 
     def get_release_ID(self):
         """Get release ID with release name.
@@ -73,42 +114,62 @@ class QTestAPI:
             0 if otherwise
         """
         api_url = SERVER_URL + f"/api/v3/projects/{self.project_id}/releases"
-        params = {"access_token": self.access_token}
-        headers = {}
-        response = requests.request("GET", api_url, params=params, headers=headers)
-        responsejson = response.json()
-        for release in responsejson:
-            if release["name"] == self.release_name:
-                print(f'Release ID: {release["id"]}')
-                return release["id"]
-        return 0
+        release_id = self.get_cached_ID(
+            self.get_scope(),
+            "releases",
+            self.release_name,
+            lambda: self.fetch_IDs(api_url),
+        )
+        if release_id:
+            print(f"Release ID: {release_id}")
+        return release_id
 
-    def get_testSuite_ID(self, test_suite_name):
-        """Get test suite ID with test suite name on releaseName .
+    def fetch_testsuites(self):
+        """Fetch the {name: ID} map of the test suites of the release.
 
         Description:
             API: /api/v3/projects/{Project_ID}/test-suites
-        Returns:
-            test suite ID (int) test suite ID with test suite name
-            0 if otherwise
         """
         api_url = SERVER_URL + f"/api/v3/projects/{self.project_id}/test-suites"
-        params = {"access_token": self.access_token}
+        params = {"pageSize": 100}
         if self.release_id != 0:
             params["parentType"] = "release"
             params["parentId"] = self.release_id
-        headers = {}
-        response = requests.request("GET", api_url, params=params, headers=headers)
-        responsejson = response.json()
-        for testSuite in responsejson:
-            if testSuite["name"] == test_suite_name:
-                print(f'Test suite ID: {testSuite["id"]}')
-                return testSuite["id"]
-        return 0
+        return self.fetch_IDs(api_url, params)
+
+    def get_testsuites(self, refresh=False):
+        """Get the {name: ID} map of the test suites of the release.
+
+        :param refresh: fetch the test suites again instead of the cache
+        """
+        scope = self.get_scope(release=True)
+        if refresh:
+            self.cache.invalidate(scope, "test-suites")
+        return self.cache.get_or_fetch(scope, "test-suites", self.fetch_testsuites)
+
+    def get_testSuite_ID(self, test_suite_name):
+        """Get test suite ID with test suite name on releaseName .
+
+        Returns:
+            test suite ID (int) test suite ID with test suite name
+            0 if otherwise
+        """
+        test_suite_id = self.get_cached_ID(
+            self.get_scope(release=True),
+            "test-suites",
+            test_suite_name,
+            self.fetch_testsuites,
+        )
+        if test_suite_id:
+            print(f"Test suite ID: {test_suite_id}")
+        return test_suite_id
 
     def get_testRun_ID(self, TEST_SUITE_ID):
         """Get test run ID by test name on the test suite.
 
+        The test runs are not cached: the test runs added to the test
+        suite since the last upload must be found.
+
         Description:
             API: /api/v3/projects/{Project_ID}/test-runs
         Returns:
@@ -120,69 +181,53 @@ class QTestAPI:
             "access_token": self.access_token,
             "parentType": "test-suite",
             "parentId": TEST_SUITE_ID,
-            "pageSize": 1000,
         }
-        headers = {}
-        response = requests.request("GET", api_url, params=params, headers=headers)
-        assert response.status_code == 200, (f"{response.status_code} - {response.text}"
-                                             + f"\napi_url: {api_url}")
-        responsejson = response.json()
-        dict_test_cases = {}
-        for testRun in responsejson["items"]:
-            dict_test_cases[testRun["name"]] = testRun["id"]
-        return dict_test_cases
-
-    def get_testsuite_name(self):
+        test_runs = self.client.get_pages(api_url, params)
+        return {testRun["name"]: testRun["id"] for testRun in test_runs["items"]}
+
+    def get_testsuite_name(self, refresh=False):
         """Get all test suite in a release.
 
-        Description:
-            API: /api/v3/projects/{Project_ID}/test-suites
+        :param refresh: fetch the test suites again instead of the cache
+
         Returns:
             all test suite in a release
-            0 if otherwise
         """
-        api_url = SERVER_URL + f"/api/v3/projects/{self.project_id}/test-suites"
-        params = {
-            "access_token": self.access_token,
-            "parentType": "release",
-            "parentId": self.release_id,
-            "pageSize": 100,
-        }
-        headers = {}
-        response = requests.request("GET", api_url, params=params, headers=headers)
-        responsejson = response.json()
-        test_suite_names = []
-        for i in responsejson:
-            test_suite_names.append(i["name"])
-        return test_suite_names
+        return list(self.get_testsuites(refresh))
 
-    def get_field_ID(self, field_name, testRun_id):
-        """Get test field ID by filed name of testcase.
+    def fetch_fields(self, testRun_id):
+        """Get the {name: ID} map of the fields of the test runs.
 
         Description:
             API: /api/v3/projects/{Project_ID}/test-runs/{Test_Run_ID}/properties
-        Returns:
-            test field ID (int) test field ID by filed name of testcase
-            0 if otherwise
         """
         api_url = (
             SERVER_URL
             + f"/api/v3/projects/{self.project_id}/test-runs/{testRun_id}/properties"
         )
-        params = {"access_token": self.access_token}
-        headers = {}
-        response = requests.request("GET", api_url, params=params, headers=headers)
-        responsejson = response.json()
-        for field_count in responsejson:
-            if field_count["name"] == field_name:
-                return field_count["id"]
-        return 0
-
-    def get_properties_info(self, testRun_id):
+        return self.fetch_IDs(api_url)
+
+    def get_field_ID(self, field_name, testRun_id):
+        """Get test field ID by filed name of testcase.
+
+        Returns:
+            test field ID (int) test field ID by filed name of testcase
+            0 if otherwise
+        """
+        return self.get_cached_ID(
+            self.get_scope(),
+            "fields",
+            field_name,
+            lambda: self.fetch_fields(testRun_id),
+        )
+
+    def get_properties_info(self, testRun_id, refresh=False):
         """Get all properties of test run on test suite.
 
         Description:
             API: /api/v3/projects/{Project_ID}/test-runs/{test_run_ID}/properties-info
+        Args:
+            refresh: query the properties again, e.g. after adding a version.
         Returns:
             all properties info (json) properties of test run if successfully
             1 if this failed
@@ -194,13 +239,51 @@ class QTestAPI:
             + f"/test-runs/{testRun_id}/properties-info"
         )
         params = {"access_token": self.access_token}
-        headers = {}
-        response = requests.request("GET", api_url, params=params, headers=headers)
-        responsejson = response.json()
-        if "200" in str(response):
-            return responsejson["metadata"]
-        else:
+
+        def fetch():
+            response = self.client.request("GET", api_url, check=False, params=params)
+            return response.json()["metadata"] if response.status_code == 200 else None
+
+        if refresh:
+            self.cache.invalidate(self.get_scope(), "properties-info")
+        metadata = self.cache.get_or_fetch(self.get_scope(), "properties-info", fetch)
+        if metadata is None:
             return 1
+        return metadata
+
+    def warm_up(self, test_suite_ids=None):
+        """Fetch the metadata of the upload in one batched pass.
+
+        The test runs of the test suites, the fields and the properties
+        are fetched in parallel. The cached fields and properties are not
+        queried again.
+
+        Args:
+            test_suite_ids: IDs of the test suites, all the test suites of
+                the release by default.
+        Returns:
+            {test suite ID: {test run name: test run ID}}
+        """
+        if test_suite_ids is None:
+            test_suite_ids = list(self.get_testsuites().values())
+        test_runs = dict(
+            zip(test_suite_ids, self.client.map(self.get_testRun_ID, test_suite_ids))
+        )
+        sample = next((ids for ids in test_runs.values() if ids), None)
+        if sample:
+            test_run_id = next(iter(sample.values()))
+            self.client.map(
+                lambda fetch: fetch(),
+                [
+                    lambda: self.get_properties_info(test_run_id),
+                    lambda: self.cache.get_or_fetch(
+                        self.get_scope(),
+                        "fields",
+                        lambda: self.fetch_fields(test_run_id),
+                    ),
+                ],
+            )
+        return test_runs
 
     def fill_field_ID(self, properties, test_run_id):
         """Get all field of a test case."""
@@ -234,12 +317,34 @@ class QTestAPI:
                         read_test_config(f"{field.tag}/value_id") is not None
                     ), f'Cannot get ID of Field: {field.find("name").text}'
 
-    def post_result_qtest(self, test_run_id, status):
+    @staticmethod
+    def get_result_properties():
+        """Get the properties of the test logs, from test_data.xml."""
+        properties = [
+            {
+                "field_id": read_test_config(f"{field}/id"),
+                "field_name": read_test_config(f"{field}/name"),
+                "field_value": read_test_config(f"{field}/value_id"),
+                "field_value_name": read_test_config(f"{field}/value"),
+            }
+            for field in RESULT_FIELDS
+        ]
+        properties.append(
+            {
+                "field_id": read_test_config("Comment/id"),
+                "field_name": read_test_config("Comment/name"),
+                "field_value": read_test_config("Comment/value"),
+                "field_value_name": read_test_config("Comment/value_id"),
+            }
+        )
+        return properties
+
+    def post_result_qtest(self, test_run_id, status, properties=None):
         """Post a result of test case to qTest.
 
         Returns:
-        0 if uploading successfully
-        1 if this failed.
+        True if uploading successfully
+        False if this failed.
         """
         api_url = (
             SERVER_URL
@@ -259,71 +364,40 @@ class QTestAPI:
             payload["status"] = {"id": 602, "name": "Failed"}
         else:
             payload["status"] = {"id": 2435513, "name": "Incomplete"}
-        payload["properties"] = [
-            {
-                "field_id": read_test_config("Legato_Version/id"),
-                "field_name": read_test_config("Legato_Version/name"),
-                "field_value": read_test_config("Legato_Version/value_id"),
-                "field_value_name": read_test_config("Legato_Version/value"),
-            },
-            {
-                "field_id": read_test_config("LXSWI_Version/id"),
-                "field_name": read_test_config("LXSWI_Version/name"),
-                "field_value": read_test_config("LXSWI_Version/value_id"),
-                "field_value_name": read_test_config("LXSWI_Version/value"),
-            },
-            {
-                "field_id": read_test_config("FW_Version_WP76/id"),
-                "field_name": read_test_config("FW_Version_WP76/name"),
-                "field_value": read_test_config("FW_Version_WP76/value_id"),
-                "field_value_name": read_test_config("FW_Version_WP76/value"),
-            },
-            {
-                "field_id": read_test_config("FW_Version_WP77/id"),
-                "field_name": read_test_config("FW_Version_WP77/name"),
-                "field_value": read_test_config("FW_Version_WP77/value_id"),
-                "field_value_name": read_test_config("FW_Version_WP77/value"),
-            },
-            {
-                "field_id": read_test_config("FW_Version_HL78/id"),
-                "field_name": read_test_config("FW_Version_HL78/name"),
-                "field_value": read_test_config("FW_Version_HL78/value_id"),
-                "field_value_name": read_test_config("FW_Version_HL78/value"),
-            },
-            {
-                "field_id": read_test_config("FW_Version_RC76/id"),
-                "field_name": read_test_config("FW_Version_RC76/name"),
-                "field_value": read_test_config("FW_Version_RC76/value_id"),
-                "field_value_name": read_test_config("FW_Version_RC76/value"),
-            },
-            {
-                "field_id": read_test_config("Module_Ref/id"),
-                "field_name": read_test_config("Module_Ref/name"),
-                "field_value": read_test_config("Module_Ref/value_id"),
-                "field_value_name": read_test_config("Module_Ref/value"),
-            },
-            {
-                "field_id": read_test_config("Comment/id"),
-                "field_name": read_test_config("Comment/name"),
-                "field_value": read_test_config("Comment/value"),
-                "field_value_name": read_test_config("Comment/value_id"),
-            },
-        ]
-        response = requests.request(
+        if properties is None:
+            properties = self.get_result_properties()
+        payload["properties"] = properties
+        response = self.client.request(
             "POST",
-            url=api_url,
+            api_url,
+            check=False,
             params=params,
             headers=headers,
             data=json.dumps(payload),
         )
-        if "201" in str(response):
-            return True
-        return False
+        return response.status_code == 201
+
+    def post_results_qtest(self, results):
+        """Post results of test cases to qTest in parallel.
+
+        The properties are read once for all the results.
+
+        Args:
+            results: list of (test run ID, status).
+
+        Returns:
+            List of the results of post_result_qtest, in the same order.
+        """
+        properties = self.get_result_properties()
+        return self.client.map(
+            lambda result: self.post_result_qtest(*result, properties=properties),
+            results,
+        )
 
 
 class UploadNightly(QTestAPI):
     """Class for upload Nightly Legato-QA results to qTest."""
 
-    def __init__(self, accessToken):
-        super().__init__(accessToken)
+    def __init__(self, accessToken, cache=None):
+        super().__init__(accessToken, cache=cache)
         self.project_id = "99501"  # Legato project
@@ -6,7 +6,7 @@ import json
 import getopt
 import re
 from lxml import etree
-from qTest_lib import QTestAPI, UploadNightly, write_config
+from qTest_lib import QTestAPI, QTestCache, UploadNightly, write_config
 
 
 # ====================================================================================
@@ -30,12 +30,20 @@ def get_param():
     Returns:
         json path for get data.
         html path for get data.
+        wipe value.
+        True to query again the cached qTest metadata.
     """
     JSON_PATH = HTML_PATH = wipe = ""
+    refresh = False
     try:
-        opts = getopt.getopt(sys.argv[1:], "", ["json=", "html=", "wipe="])[0]
+        opts = getopt.getopt(
+            sys.argv[1:], "", ["json=", "html=", "wipe=", "refresh"]
+        )[0]
     except getopt.GetoptError:
-        print("python3 qTest_upload.py --json <json path> --html <html path>")
+        print(
+            "python3 qTest_upload.py --json <json path> --html <html path>"
+            + " [--refresh]"
+        )
     for opt, arg in opts:
         if opt == "--json":
             JSON_PATH = arg
@@ -43,9 +51,11 @@ def get_param():
             HTML_PATH = arg
         elif opt == "--wipe":
             wipe = arg
+        elif opt == "--refresh":
+            refresh = True
         else:
             assert False, "Unhandled option"
-    return JSON_PATH, HTML_PATH, wipe
+    return JSON_PATH, HTML_PATH, wipe, refresh
 
 
 def get_data_from_json():
@@ -121,6 +131,9 @@ def get_status_from_json():
 def pre_upload(test_run_id, versions):
     """Pre-upload test result."""
     property_info = REST_api.get_properties_info(test_run_id)
+    if not all(version in str(property_info) for version in versions):
+        # The version may have been added after the properties were cached
+        property_info = REST_api.get_properties_info(test_run_id, refresh=True)
     for version in versions:
         assert (version in str(property_info)
                 ), f"ERROR: {version} had not been added to qTest"
@@ -143,25 +156,22 @@ def check_duplicate(release_data, test_case_name):
     return False
 
 
-def upload_qtest(release_data, test_case_name, status):
-    """Upload test result to qTest.
+def get_test_run_id(release_data, test_case_name):
+    """Get the test run ID of a test case.
 
     Returns:
-        True if upload successfully.
-        False if upload failed.
+        test run ID of the test case.
     """
     for test_cases in release_data.values():
         if test_case_name in test_cases:
-            is_upload_success = REST_api.post_result_qtest(
-                test_cases[test_case_name], status
-            )
-    return is_upload_success
+            test_run_id = test_cases[test_case_name]
+    return test_run_id
 
 
 # ====================================================================================
 # Main
 # ====================================================================================
-JSON_PATH, HTML_PATH, wipe = get_param()
+JSON_PATH, HTML_PATH, wipe, refresh = get_param()
 QTEST_INFO = os.getenv("QTEST_INFO")
 ACCESS_TOKEN = os.getenv("ACCESS_TOKEN")
 pattern = r"(Bearer\s)?(?P<token>.*)"
@@ -196,6 +206,11 @@ else:
     # Load data from json file
     dict_test_cases = get_status_from_json()
 
+# Cached IDs of the projects, releases, test suites and fields
+cache = QTestCache()
+if refresh:
+    cache.invalidate()
+
 list_test_case_campaign = {}
 if "Nightly-master" in QTEST_INFO:  # Upload Nightly Legato-QA results to qTest
     Legato_version = "Master"
@@ -211,8 +226,8 @@ if "Nightly-master" in QTEST_INFO:  # Upload Nightly Legato-QA results to qTest
     if not campaign_id:
         campaign_id = tree.findtext("campaign_id")
     print(f"campaign_id: {campaign_id}")
-    REST_api = UploadNightly(ACCESS_TOKEN)
-    list_test_cases = REST_api.get_testRun_ID(campaign_id)
+    REST_api = UploadNightly(ACCESS_TOKEN, cache=cache)
+    list_test_cases = REST_api.warm_up([campaign_id])[campaign_id]
     list_test_case_campaign[campaign_id] = list_test_cases
     assert list_test_cases, "There are no test cases in the test campaign"
     SAMPLE_TEST_CASE_ID = list(list_test_cases.values())[0]
@@ -226,7 +241,7 @@ else:
     print(f"RELEASE_NAME: {RELEASE_NAME}")
     print(f"TEST_SUITE_NAME: {TEST_SUITE_NAME}")
 
-    REST_api = QTestAPI(ACCESS_TOKEN, PROJECT_NAME, RELEASE_NAME)
+    REST_api = QTestAPI(ACCESS_TOKEN, PROJECT_NAME, RELEASE_NAME, cache=cache)
 
 # Write data to test_data.xml file
 write_config("Module_Ref/value_id", TestbedID)
@@ -249,32 +264,46 @@ if "Nightly-master" not in QTEST_INFO:
     if TEST_SUITE_NAME != "":
         print(f"Upload test result for test suite: {TEST_SUITE_NAME}")
         TEST_SUITE_ID = REST_api.get_testSuite_ID(TEST_SUITE_NAME)
-        list_test_cases = REST_api.get_testRun_ID(TEST_SUITE_ID)
+        assert TEST_SUITE_ID, f"No test suite {TEST_SUITE_NAME} in {RELEASE_NAME}"
+        list_test_cases = REST_api.warm_up([TEST_SUITE_ID])[TEST_SUITE_ID]
         list_test_case_campaign[TEST_SUITE_NAME] = list_test_cases
+        assert list_test_cases, f"There are no test cases in {TEST_SUITE_NAME}"
         SAMPLE_TEST_CASE_ID = list(list_test_cases.values())[0]
     else:
         print(f"Test suites of {RELEASE_NAME}: {REST_api.test_suite_names}")
-        for test_suite_name in REST_api.test_suite_names:
+        # Get the test runs of all the test suites in one batch
+        test_runs = REST_api.warm_up()
+        for test_suite_name, TEST_SUITE_ID in REST_api.get_testsuites().items():
             print(f"test_suite_name: {test_suite_name}")
-            TEST_SUITE_ID = REST_api.get_testSuite_ID(test_suite_name)
-            list_test_cases = REST_api.get_testRun_ID(TEST_SUITE_ID)
+            list_test_cases = test_runs[TEST_SUITE_ID]
             list_test_case_campaign[test_suite_name] = list_test_cases
-            SAMPLE_TEST_CASE_ID = list(list_test_cases.values())[0]
+            if list_test_cases:
+                SAMPLE_TEST_CASE_ID = list(list_test_cases.values())[0]
+        assert any(
+            list_test_case_campaign.values()
+        ), f"There are no test cases in {RELEASE_NAME}"
 pre_upload(SAMPLE_TEST_CASE_ID, versions)
 Uploaded_test_cases = []
 Need_to_reupload_test_cases = []
 Remaining_test_cases = []
 if wipe:
     status = "Unexecuted"
-    for test_cases in list_test_case_campaign.values():
-        for test_case_name, test_id in test_cases.items():
-            upload_result = REST_api.post_result_qtest(test_id, status)
-            if upload_result:
-                # Add test case to list of uploaded test cases successfully
-                Uploaded_test_cases.append(test_case_name)
-            else:
-                # Add test case to list of uploaded test cases unsuccessfully
-                Need_to_reupload_test_cases.append(test_case_name)
+    uploads = [
+        (test_case_name, test_id)
+        for test_cases in list_test_case_campaign.values()
+        for test_case_name, test_id in test_cases.items()
+    ]
+    # Upload the results in parallel
+    upload_results = REST_api.post_results_qtest(
+        [(test_id, status) for _, test_id in uploads]
+    )
+    for (test_case_name, _), upload_result in zip(uploads, upload_results):
+        if upload_result:
+            # Add test case to list of uploaded test cases successfully
+            Uploaded_test_cases.append(test_case_name)
+        else:
+            # Add test case to list of uploaded test cases unsuccessfully
+            Need_to_reupload_test_cases.append(test_case_name)
     if Need_to_reupload_test_cases:
         print(f"===> List of {len(Need_to_reupload_test_cases)}"
               + " test cases whose old status has not been deleted")
@@ -283,24 +312,26 @@ if wipe:
 
 else:
     print(f"===> Uploading test result for {len(dict_test_cases)} test cases .... ")
+    uploads = []
     for test_case_name, result in dict_test_cases.items():
         # Check if test case is duplicated
-        up_qtest = check_duplicate(list_test_case_campaign, test_case_name)
-        upload_result = False
-        if up_qtest:
-            # Upload test result to qTest
-            upload_result = upload_qtest(
-                list_test_case_campaign, test_case_name, result
-            )
-            if upload_result:
-                # Add test case to list of uploaded test cases successfully
-                Uploaded_test_cases.append(test_case_name)
-            else:
-                # Add test case to list of uploaded test cases unsuccessfully
-                Need_to_reupload_test_cases.append(test_case_name)
+        if check_duplicate(list_test_case_campaign, test_case_name):
+            test_run_id = get_test_run_id(list_test_case_campaign, test_case_name)
+            uploads.append((test_case_name, test_run_id, result))
         else:
             # Add test case to list duplicated
             Remaining_test_cases.append(test_case_name)
+    # Upload the test results to qTest in parallel
+    upload_results = REST_api.post_results_qtest(
+        [(test_run_id, result) for _, test_run_id, result in uploads]
+    )
+    for (test_case_name, _, _), upload_result in zip(uploads, upload_results):
+        if upload_result:
+            # Add test case to list of uploaded test cases successfully
+            Uploaded_test_cases.append(test_case_name)
+        else:
+            # Add test case to list of uploaded test cases unsuccessfully
+            Need_to_reupload_test_cases.append(test_case_name)
     print(f"===> List of {len(Uploaded_test_cases)}"
           + " test cases are uploaded successfully")
     for i in Uploaded_test_cases:
@@ -0,0 +1,248 @@
+"""Client of the qTest REST API, without the LeTP dependencies.
+
+It is shared by pytest_qTest and the qTest_upload tool.
+
+QTestSession sends the requests through a pooled keep-alive session,
+retries the failed requests with a jittered exponential backoff, and
+runs independent requests in parallel.
+
+QTestCache keeps the IDs of the projects, releases, test suites and
+fields on disk, so that they are not queried again at each upload.
+"""
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+# Retries of a failed request, after backoffs of up to
+# BACKOFF * 2 ** retry seconds, at most MAX_BACKOFF.
+RETRIES = 8
+BACKOFF = 5.0
+MAX_BACKOFF = 600.0
+# HTTP status of the transient errors, retried.
+RETRY_STATUS = (429, 500, 502, 503, 504)
+# Methods retried on any transient error. The other ones (POST) may have been
+# applied by the server: only retry them if the request was not sent, or on 429.
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+# Concurrent requests, and size of the connection pool.
+MAX_WORKERS = 8
+# Persistent cache of the qTest metadata, and lifetime of its entries.
+CACHE_PATH = os.path.join("~", ".cache", "letp", "qtest_metadata.json")
+CACHE_TTL = 24 * 3600
+
+
+class QTestSession:
+    """Pooled session to qTest, with retries and parallel requests.
+
+    Args:
+        access_token: qTest access token.
+        max_workers: maximum number of concurrent requests.
+        retries: retries of a failed request.
+        backoff: first backoff in seconds.
+        max_backoff: maximum backoff in seconds.
+        timeout: timeout of a request in seconds.
+    """
+
+    def __init__(
+        self,
+        access_token,
+        max_workers=MAX_WORKERS,
+        retries=RETRIES,
+        backoff=BACKOFF,
+        max_backoff=MAX_BACKOFF,
+        timeout=120,
+    ):
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.params = {"access_token": access_token}
+
+    def get_backoff(self, retry, retry_after=None):
+        """Get the backoff before a retry: full jitter, or Retry-After."""
+        if retry_after and retry_after.isdigit():
+            return min(self.max_backoff, float(retry_after))
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**retry))
+
+    @staticmethod
+    def is_connect_error(error):
+        """Check if a request failed before being sent to the server."""
+        if isinstance(error, requests.ConnectTimeout):
+            return True
+        reason = getattr(error.args[0] if error.args else None, "reason", None)
+        return isinstance(reason, NewConnectionError)
+
+    def request(self, method, url, check=True, **kwargs):
+        """Send a request, retried on the transient errors.
+
+        The non idempotent requests are only retried on the connection
+        errors and on 429, so that they are not applied twice.
+
+        Args:
+            method: HTTP method.
+            url: URL of the request.
+            check: assert that the response is a success.
+            kwargs: arguments of requests.request.
+
+        Returns:
+            The response.
+        """
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        retry_status = RETRY_STATUS if idempotent else (429,)
+        for retry in range(self.retries + 1):
+            retry_after = None
+            try:
+                response = self.session.request(
+                    method, url, timeout=self.timeout, **kwargs
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if retry == self.retries or not (
+                    idempotent or self.is_connect_error(e)
+                ):
+                    raise
+                error = str(e)
+            else:
+                if response.status_code not in retry_status or retry == self.retries:
+                    break
+                error = response.status_code
+                retry_after = response.headers.get("Retry-After")
+            delay = self.get_backoff(retry, retry_after)
+            print(f"qTest request failed ({error}): try again after {delay:.1f}s")
+            time.sleep(delay)
+        if check:
+            assert response.ok, f"{response.status_code} - {response.text}"
+        return response
+
+    def get_json(self, url, params=None):
+        """Get the JSON content of a URL."""
+        return self.request("GET", url, params=params).json()
+
+    def get_pages(self, url, params, page_size=1000):
+        """Get all the items of a paginated URL.
+
+        Returns:
+            The JSON content of the first page, with the items of all the
+            pages.
+        """
+        params = dict(params, pageSize=page_size, page=1)
+        response_json = self.get_json(url, params)
+        items = response_json["items"]
+        total = response_json.get("total", len(items))
+        while len(items) < total and response_json["items"]:
+            params["page"] += 1
+            response_json = self.get_json(url, params)
+            items += response_json["items"]
+        response_json["items"] = items
+        return response_json
+
+    def map(self, func, *iterables):
+        """Call func in parallel, at most max_workers at once.
+
+        Returns:
+            List of the results, in the order of the arguments.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(func, *iterables))
+
+    def close(self):
+        """Close the connections."""
+        self.session.close()
+
+
+class QTestCache:
+    """Persistent cache of the qTest metadata.
+
+    The entries are grouped by scope, a (server, project, release) key,
+    and expire after ttl seconds.
+
+    Args:
+        path: JSON file of the cache.
+        ttl: lifetime of the entries in seconds.
+    """
+
+    def __init__(self, path=CACHE_PATH, ttl=CACHE_TTL):
+        self.path = os.path.expanduser(path)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data = self._load()
+
+    @staticmethod
+    def make_scope(server, project="", release=""):
+        """Get the scope of the entries of a server, project and release."""
+        return f"{server}|{project}|{release}"
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        """Atomically write the cache file."""
+        with self._lock:
+            content = json.dumps(self._data)
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            fd, tmp_file = tempfile.mkstemp(
+                dir=os.path.dirname(self.path), suffix=".tmp"
+            )
+            with os.fdopen(fd, "w", encoding="utf8") as f:
+                f.write(content)
+            os.replace(tmp_file, self.path)
+        except OSError as e:
+            print(f"Unable to save the qTest cache in {self.path}: {e}")
+
+    def get(self, scope, name):
+        """Get an entry, or None if it is missing or expired."""
+        with self._lock:
+            entry = self._data.get(scope, {}).get(name)
+        if entry is None or time.time() - entry["time"] > self.ttl:
+            return None
+        return entry["value"]
+
+    def set(self, scope, name, value):
+        """Set an entry, saved by the next save."""
+        with self._lock:
+            self._data.setdefault(scope, {})[name] = {
+                "time": time.time(),
+                "value": value,
+            }
+
+    def get_or_fetch(self, scope, name, fetch):
+        """Get an entry, fetched and saved if it is missing or expired.
+
+        A fetch returning None is not cached.
+        """
+        value = self.get(scope, name)
+        if value is None:
+            value = fetch()
+            if value is not None:
+                self.set(scope, name, value)
+                self.save()
+        return value
+
+    def invalidate(self, scope=None, name=None):
+        """Remove an entry, the entries of a scope, or all the entries."""
+        with self._lock:
+            if scope is None:
+                self._data = {}
+            elif name is None:
+                self._data.pop(scope, None)
+            else:
+                self._data.get(scope, {}).pop(name, None)
+        self.save()
@@ -0,0 +1,31 @@
+"""Test device pool stub.
+
+The tests record the device of the worker which runs them.
+
+The stub will be used by LeTP unit tests.
+"""
+import os
+
+import pytest
+from pytest_letp.lib import device_pool
+
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+
+@pytest.fixture
+def target2(read_config):
+    """Stub of the second target of a paired device."""
+    return read_config.findtext("module/name")
+
+
+@pytest.mark.parametrize("index", range(4))
+def test_device(read_config, index):
+    """Run on any device of the pool."""
+    assert os.environ[device_pool.DEVICE_ENV]
+    assert read_config.findtext("module/name")
+
+
+def test_paired_device(target2):
+    """Run on the paired device of the pool only."""
+    assert os.environ[device_pool.DEVICE_ENV] == "bench2"
+    assert target2 == "wp77xx"
@@ -0,0 +1,8 @@
+"""Test stub rebooting a simulated target."""
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+
+def test_simulated_reboot(target):
+    """Reboot the simulated target and run a command again."""
+    target.reboot()
+    assert target.run("uname") == "Linux"
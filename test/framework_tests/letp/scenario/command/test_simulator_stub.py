@@ -0,0 +1,8 @@
+"""Test stub run on a simulated target."""
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+
+def test_simulated_target(target):
+    """Run Linux and AT commands on the simulated target."""
+    assert target.run("uname") == "Linux"
+    assert "WP7607" in target.run_at_cmd("ATI")
@@ -0,0 +1,60 @@
+"""Test the concurrent AT command dispatcher with simulated modems."""
+import time
+
+import pytest
+
+from pytest_letp.lib import at_dispatcher
+from pytest_letp.lib import com
+from pytest_letp.lib.com_exceptions import ComException
+from pytest_letp.lib.simulator import FakeModem
+
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+
+@pytest.fixture
+def links(tmp_path):
+    """Three simulated AT ports with 200 ms of latency."""
+    modems = [
+        FakeModem("at{}".format(i), link_dir=str(tmp_path), latency=0.2)
+        for i in range(3)
+    ]
+    for modem in modems:
+        modem.start()
+    ports = [com.target_serial_at(modem.link_path, 115200) for modem in modems]
+    yield ports
+    for port in ports:
+        port.close()
+    for modem in modems:
+        modem.stop()
+
+
+def test_concurrent_commands(links):
+    """Wait for the answers of all the links at once."""
+    start = time.perf_counter()
+    responses = at_dispatcher.run_at_cmds([(link, "AT+CSQ") for link in links])
+    elapsed = time.perf_counter() - start
+    # Sequentially: 3 links * 200 ms.
+    assert elapsed < 0.5
+    for rsp in responses:
+        assert "+CSQ: 20,99" in rsp
+
+
+def test_errors_and_order(links):
+    """Keep the run_at_cmd_and_check semantics and the order of a link."""
+    with at_dispatcher.AtDispatcher() as dispatcher:
+        error = dispatcher.submit(links[0], "AT+UNKNOWN")
+        unchecked = dispatcher.submit(links[0], "AT+UNKNOWN", check=False)
+        expected = dispatcher.submit(links[0], "ATI", expect_rsp=["WP7607"])
+        timeout = dispatcher.submit(links[1], "AT+CSQ", timeout=0.05)
+        csq = dispatcher.submit(links[2], "AT+CSQ")
+        missing = dispatcher.submit(
+            links[2], "ATI", expect_rsp=["WP7607", "UNKNOWN"], timeout=0.3, check=False
+        )
+        with pytest.raises(ComException):
+            error.result()
+        assert unchecked.result() is None
+        assert "WP7607" in expected.result()
+        with pytest.raises(ComException):
+            timeout.result()
+        assert "+CSQ: 20,99" in csq.result()
+        assert missing.result() is None
@@ -0,0 +1,130 @@
+"""Test the application build cache."""
+import os
+
+import pytest
+
+from pytest_letp.lib import app
+from pytest_letp.pytest_test_config import TestConfig
+
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+# Fake mkapp: count the builds and write the .update artifact.
+MKAPP = """#!/bin/sh
+echo "$1" >> {calls}
+name=$(basename "$1" .adef)
+echo "update $name" > "$name.wp76xx.update"
+echo "built $name"
+"""
+
+
+@pytest.fixture
+def legato_env(tmp_path, monkeypatch):
+    """Fake Legato environment with a cache in tmp_path."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    calls = tmp_path / "calls"
+    mkapp = bin_dir / "mkapp"
+    mkapp.write_text(MKAPP.format(calls=calls))
+    mkapp.chmod(0o755)
+    legato_root = tmp_path / "legato"
+    legato_root.mkdir()
+    (legato_root / "version").write_text("21.05.0")
+    monkeypatch.setenv("PATH", "{}:{}".format(bin_dir, os.environ["PATH"]))
+    monkeypatch.setenv("LEGATO_ROOT", str(legato_root))
+    monkeypatch.setattr(TestConfig, "build_cache_dir", str(tmp_path / "cache"))
+    for name in ("app1", "app2"):
+        app_dir = tmp_path / "apps" / name
+        app_dir.mkdir(parents=True)
+        (app_dir / "{}.adef".format(name)).write_text("executables: { x = (comp) }")
+        (app_dir / "comp.c").write_text("int main() {}")
+    build_dir = tmp_path / "build"
+    build_dir.mkdir()
+    monkeypatch.chdir(build_dir)
+    return tmp_path
+
+
+def _calls(tmp_path):
+    calls = tmp_path / "calls"
+    return len(calls.read_text().splitlines()) if calls.exists() else 0
+
+
+def test_build_cache(legato_env):
+    """Reuse the build until the sources or the flags change."""
+    app_dir = str(legato_env / "apps" / "app1")
+    assert "built app1" in app.make("wp76xx", "app1", app_dir)
+    os.remove("app1.wp76xx.update")
+    assert "built app1" in app.make("wp76xx", "app1", app_dir)
+    assert os.path.isfile("app1.wp76xx.update")
+    assert _calls(legato_env) == 1
+
+    (legato_env / "apps" / "app1" / "comp.c").write_text("int main() { return 1; }")
+    app.make("wp76xx", "app1", app_dir)
+    assert _calls(legato_env) == 2
+    app.make("wp76xx", "app1", app_dir, option="-g")
+    assert _calls(legato_env) == 3
+    (legato_env / "legato" / "version").write_text("21.05.1")
+    app.make("wp76xx", "app1", app_dir)
+    assert _calls(legato_env) == 4
+
+
+def test_build_cache_search_dirs(legato_env):
+    """Build again when the content of a search directory changes."""
+    app_dir = str(legato_env / "apps" / "app1")
+    interfaces = legato_env / "legato" / "interfaces" / "audio"
+    interfaces.mkdir(parents=True)
+    (interfaces / "le_audio.api").write_text("FUNCTION Open();")
+    components = legato_env / "components"
+    components.mkdir()
+    (components / "comp.c").write_text("int f() {}")
+    option = "-c {}".format(components)
+    app.make("wp76xx", "app1", app_dir, option=option)
+    app.make("wp76xx", "app1", app_dir, option=option)
+    assert _calls(legato_env) == 1
+
+    (interfaces / "le_audio.api").write_text("FUNCTION Close();")
+    app.make("wp76xx", "app1", app_dir, option=option)
+    assert _calls(legato_env) == 2
+    (components / "comp.c").write_text("int f() { return 1; }")
+    app.make("wp76xx", "app1", app_dir, option=option)
+    assert _calls(legato_env) == 3
+
+
+def test_build_cache_adefs_of_a_directory(legato_env):
+    """Cache the builds of two adefs of the same directory separately."""
+    app_dir = legato_env / "apps" / "app1"
+    (app_dir / "app1b.adef").write_text("executables: { x = (comp) }")
+    app.make("wp76xx", "app1", str(app_dir))
+    assert "built app1b" in app.make("wp76xx", "app1b", str(app_dir))
+    assert _calls(legato_env) == 2
+    os.remove("app1.wp76xx.update")
+    os.remove("app1b.wp76xx.update")
+    assert "built app1b" in app.make("wp76xx", "app1b", str(app_dir))
+    assert "built app1" in app.make("wp76xx", "app1", str(app_dir))
+    assert _calls(legato_env) == 2
+    with open("app1b.wp76xx.update") as f:
+        assert f.read() == "update app1b\n"
+
+
+def test_build_cache_disabled(legato_env, monkeypatch):
+    """Always run mkapp when the cache is not enabled."""
+    monkeypatch.setattr(TestConfig, "build_cache_dir", None)
+    app_dir = str(legato_env / "apps" / "app1")
+    app.make("wp76xx", "app1", app_dir)
+    app.make("wp76xx", "app1", app_dir)
+    assert _calls(legato_env) == 2
+
+
+def test_make_parallel(legato_env):
+    """Build different applications in parallel, then from the cache."""
+    apps = [
+        (name, str(legato_env / "apps" / name)) for name in ("app1", "app2", "app1")
+    ]
+    outputs = app.make_parallel("wp76xx", apps)
+    assert [output.strip() for output in outputs] == [
+        "built app1",
+        "built app2",
+        "built app1",
+    ]
+    assert _calls(legato_env) == 2
+    app.make_parallel("wp76xx", apps)
+    assert _calls(legato_env) == 2
@@ -0,0 +1,107 @@
+"""Test the CMUX channel manager with simulated channels."""
+import time
+
+import pytest
+
+from pytest_letp.lib import cmux
+from pytest_letp.lib.simulator import FakeModem
+
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+
+class _FakeMuxer(cmux.CmuxManager):
+    """Muxer whose channels are simulated modems.
+
+    The channels stay present when their modem is powered off, like the
+    channels of gsmMuxd when the module reboots.
+    """
+
+    def __init__(self, tmp_path, latency=0.0):
+        super().__init__(prefix=str(tmp_path / "cmux"), probe_timeout=0.2)
+        self.link_dir = str(tmp_path)
+        self.latency = latency
+        self.modems = []
+
+    def _start_muxer(self):
+        self.modems = [
+            FakeModem(
+                "cmux{}".format(i),
+                link_dir=self.link_dir,
+                latency=self.latency,
+                persistent=True,
+            )
+            for i in range(self.count)
+        ]
+        for modem in self.modems:
+            modem.start()
+
+    def _stop_muxer(self):
+        for modem in self.modems:
+            modem.stop()
+        self.modems = []
+
+    def _muxer_running(self):
+        return bool(self.modems)
+
+
+@pytest.fixture
+def muxer(tmp_path):
+    """Simulated muxer, stopped after the test."""
+    manager = _FakeMuxer(tmp_path)
+    yield manager
+    manager.stop()
+
+
+def test_lease_and_restart(muxer):
+    """Keep the muxer across the leases, restart it when it is dead."""
+    channels = muxer.lease("/dev/ttyUSB2", 115200, 2)
+    assert len(channels) == 2
+    assert "WP7607" in cmux.com.run_at_cmd_and_check(channels[0], "ATI")
+    modems = muxer.modems
+    muxer.release(channels)
+
+    assert muxer.lease("/dev/ttyUSB2", 115200, 2) == channels
+    assert muxer.modems is modems
+    assert modems[0].commands == ["ATZ", "ATE1", "ATI", "AT", "ATZ", "ATE1"]
+    with pytest.raises(AssertionError):
+        muxer.lease("/dev/ttyUSB2", 115200, 1)
+    muxer.release(channels)
+
+    modems[1].stop()
+    channels = muxer.lease("/dev/ttyUSB2", 115200, 2)
+    assert muxer.restarts == 1
+    assert muxer.modems is not modems
+    assert "WP7607" in cmux.com.run_at_cmd_and_check(channels[1], "ATI")
+
+
+def test_restart_after_module_reboot(muxer):
+    """Restart the muxer when its channels do not answer anymore."""
+    channels = muxer.lease("/dev/ttyUSB2", 115200, 1)
+    muxer.release(channels)
+    modems = muxer.modems
+    for modem in modems:
+        modem.power_off()
+    assert muxer.is_alive()
+    channels = muxer.lease("/dev/ttyUSB2", 115200, 1)
+    assert muxer.restarts == 1
+    assert muxer.modems is not modems
+    assert "WP7607" in cmux.com.run_at_cmd_and_check(channels[0], "ATI")
+
+
+def test_run_parallel(tmp_path):
+    """Run AT commands on the channels at once, with their throughput."""
+    muxer = _FakeMuxer(tmp_path, latency=0.05)
+    try:
+        channels = muxer.lease("/dev/ttyUSB2", 115200, 3)
+        start = time.perf_counter()
+        results = muxer.run_parallel(channels, ["AT+CSQ"] * 4)
+        elapsed = time.perf_counter() - start
+    finally:
+        muxer.stop()
+    # Sequentially: 3 channels * 4 commands * 50 ms.
+    assert elapsed < 0.5
+    for stats in results:
+        assert stats.commands == 4
+        assert "+CSQ: 20,99" in stats.responses[0]
+        assert stats.throughput > 0
+        assert stats.to_dict()["bytes_sent"] == 4 * len("AT+CSQ\r")
@@ -1,11 +1,13 @@
 """Test com module.
 
-Using mock module to simulate com connections.
+Using mock module and simulated devices to simulate com connections.
 """
+import time
 from unittest.mock import Mock, patch
 
 from pytest_letp.lib import com
 from pytest_letp.lib import swilog
+from pytest_letp.lib.simulator import SimulatedDevice
 
 __copyright__ = "Copyright (C) Sierra Wireless Inc."
 
@@ -25,3 +27,66 @@ def test_run_at_cmd_and_check():
         rsp = com.run_at_cmd_and_check(target, "ATI", 1, [r"once", r"twice"])
         swilog.info(repr(list(rsp)))
         assert rsp == "ATIOKATIOK"
+
+
+def test_port_registry(tmp_path, monkeypatch):
+    """Scan the serial ports only on hotplug or after the TTL."""
+    comports = Mock(return_value=[Mock(device="/dev/ttyUSB0")])
+    monkeypatch.setattr(com.ser_lst, "comports", comports)
+    registry = com.PortRegistry(ttl=60)
+    monkeypatch.setattr(registry, "DEV_DIR", str(tmp_path))
+    monkeypatch.setattr(com, "port_registry", registry)
+
+    assert com.SerialPort.is_valid_port("/dev/ttyUSB0")
+    assert not com.SerialPort.is_valid_port("/dev/ttyUSB1")
+    assert comports.call_count == 1
+    (tmp_path / "ttyUSB1").touch()
+    comports.return_value.append(Mock(device="/dev/ttyUSB1"))
+    assert com.SerialPort.is_valid_port("/dev/ttyUSB1")
+    assert comports.call_count == 2
+
+    # A character device is valid without scanning.
+    assert com.SerialPort.is_valid_port("/dev/null")
+    assert comports.call_count == 2
+    with open("/dev/null") as null:
+        assert com.SerialPort.is_same_device("/dev/null", null.fileno())
+        assert not com.SerialPort.is_same_device("/dev/zero", null.fileno())
+
+
+class _RawDevice(SimulatedDevice):
+    """Device sending its data in two writes, on a carriage return."""
+
+    def __init__(self, chunks, **kwargs):
+        super().__init__("raw", **kwargs)
+        self.chunks = chunks
+
+    def handle_input(self, data):
+        for chunk in self.chunks:
+            self.write(chunk)
+            time.sleep(0.05)
+
+
+def test_high_speed_read(tmp_path):
+    """Decode the characters split between reads, or read raw bytes."""
+    eacute = "é".encode("utf-8")
+    chunks = [b"caf" + eacute[:1], eacute[1:] + b" OK\r\n"]
+    with _RawDevice(chunks, link_dir=str(tmp_path)) as device:
+        link = com.target_serial_at(device.link_path, 921600)
+        try:
+            link.set_high_speed(vmin=1, vtime=1)
+            assert link.maxread == com.HIGH_SPEED_MAXREAD
+            link.send("\r")
+            link.expect("OK", 5)
+            assert link.before == "café "
+
+            link.send("\r")
+            link.expect("caf", 5)
+            data = b""
+            while not data.endswith(b"OK\r\n"):
+                data += link.read_raw(timeout=5)
+            assert data == eacute + b" OK\r\n"
+            assert link.read_raw(timeout=0.1) == b""
+            link.set_high_speed(False)
+            assert link.maxread == com.PEXPECT_MAXREAD
+        finally:
+            link.close()
@@ -0,0 +1,98 @@
+"""Test the device pool scheduler."""
+import json
+import os
+import xml.etree.ElementTree as ET
+
+import pytest
+from pytest_letp.lib import device_pool
+
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+POOL_XML = """<?xml version="1.0" encoding="utf-8"?>
+<device_pool>
+    <device name="bench1">
+        <config>module/name=wp76xx</config>
+    </device>
+    <device name="bench2" paired="1">
+        <config>module/name=wp77xx</config>
+    </device>
+</device_pool>
+"""
+
+
+def test_pool_scheduler_paired_tests():
+    """Paired tests only run on the paired devices, which run them first."""
+    devices = [
+        device_pool.Device("bench1", []),
+        device_pool.Device("bench2", [], paired=True),
+    ]
+    scheduler = device_pool.PoolScheduler(devices)
+    tests = [("a", False), ("b", True), ("c", False), ("d", True)]
+    scheduler.collect("bench1", tests)
+    scheduler.collect("bench2", tests)
+    assert scheduler.next_test("bench1") == "a"
+    assert scheduler.next_test("bench2") == "b"
+    assert scheduler.next_test("bench1") == "c"
+    assert scheduler.next_test("bench1") is None
+    assert scheduler.next_test("bench2") == "d"
+    assert scheduler.next_test("bench2") is None
+    assert scheduler.get_unscheduled() == []
+
+
+def test_pool_scheduler_lost_tests():
+    """Run the union of the collections, report the tests of a crash."""
+    devices = [device_pool.Device("bench1", []), device_pool.Device("bench2", [])]
+    scheduler = device_pool.PoolScheduler(devices)
+    scheduler.collect("bench1", [("a", False), ("b", False)])
+    scheduler.collect("bench2", [("b", False), ("c", False)])
+    assert scheduler.pending == ["a", "b", "c"]
+    assert scheduler.next_test("bench2") == "b"
+    scheduler.release("bench2", "b")
+    assert scheduler.next_test("bench2") == "b"
+    assert scheduler.next_test("bench1") == "a"
+    scheduler.finish("bench1", "a", "passed")
+    assert scheduler.abandon("bench1") == []
+    assert scheduler.abandon("bench2") == ["b"]
+    assert scheduler.results["b"] == ("bench2", "error")
+    assert scheduler.next_test("bench1") is None
+    assert scheduler.get_unscheduled() == ["c"]
+    assert scheduler.get_total() == 3
+
+
+def test_run_pool(tmp_path):
+    """Run a session on a pool of 2 devices and merge the reports."""
+    pool_file = tmp_path / "pool.xml"
+    pool_file.write_text(POOL_XML)
+    letp_tests = os.environ["LETP_TESTS"]
+    junit_file = str(tmp_path / "junit.xml")
+    json_file = str(tmp_path / "report.json")
+    exit_code = device_pool.run_pool(
+        str(pool_file),
+        [
+            "--rootdir",
+            letp_tests,
+            "-c",
+            os.path.join(letp_tests, "pytest.ini"),
+            "-p",
+            "pytest_letp",
+            "scenario/command/test_device_pool_stub.py",
+            "--junitxml",
+            junit_file,
+            "--json-report-file",
+            json_file,
+        ],
+        log_dir=str(tmp_path / "pool"),
+    )
+    assert exit_code == pytest.ExitCode.OK
+    suite = ET.parse(junit_file).getroot().find("testsuite")
+    assert suite.get("tests") == "5"
+    assert suite.get("failures") == "0"
+    with open(json_file, encoding="utf8") as f:
+        report = json.load(f)
+    assert report["summary"]["passed"] == 5
+    assert report["summary"]["collected"] == 5
+    devices = {
+        test["nodeid"].split("::")[-1]: test["device"] for test in report["tests"]
+    }
+    assert devices["test_paired_device"] == "bench2"
+    assert set(devices.values()) == {"bench1", "bench2"}
@@ -0,0 +1,79 @@
+"""Test the test duration history."""
+import json
+from collections import namedtuple
+from pytest_letp.lib import durations
+
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+Item = namedtuple("Item", "nodeid")
+
+
+def _items(*nodeids):
+    return [Item(nodeid) for nodeid in nodeids]
+
+
+def test_duration_db_json_report(tmp_path):
+    """Record a JSON report and read the durations per target."""
+    json_file = tmp_path / "report.json"
+    json_file.write_text(
+        json.dumps(
+            {
+                "created": 100.0,
+                "tests": [
+                    {
+                        "nodeid": "a",
+                        "outcome": "passed",
+                        "setup": {"duration": 1.0},
+                        "call": {"duration": 2.0},
+                        "teardown": {"duration": 1.0},
+                    },
+                    {"nodeid": "b", "outcome": "failed", "setup": {"duration": 3.0}},
+                ],
+            }
+        )
+    )
+    with durations.DurationDB(str(tmp_path / "db" / "durations.db")) as db:
+        assert db.record_json_report(str(json_file), "wp76xx", "nightly") == 2
+        db.record([("a", 6.0, "failed")], "wp76xx", "nightly", created=200.0)
+        db.record([("a", 50.0, "passed")], "wp77xx", "nightly", created=300.0)
+        assert db.get_durations("wp76xx", "nightly") == {"a": 5.0, "b": 3.0}
+        assert db.get_durations("wp76xx", "nightly", last=1) == {"a": 6.0, "b": 3.0}
+        assert db.get_failures("wp76xx", "nightly") == {
+            "a": (1, 200.0),
+            "b": (1, 100.0),
+        }
+
+
+def test_order_strategies():
+    """Order the tests from their history."""
+    items = _items("a", "b", "c", "d")
+    history = {"a": 1.0, "b": 5.0, "d": 3.0}
+    ordered = durations.order_longest_first(items, history)
+    assert [item.nodeid for item in ordered] == ["b", "d", "a", "c"]
+    failures = {"c": (1, 200.0), "d": (3, 100.0)}
+    ordered = durations.order_fail_fast(items, failures)
+    assert [item.nodeid for item in ordered] == ["c", "d", "a", "b"]
+
+
+def test_shard_items():
+    """Split the tests into shards of balanced durations."""
+    items = _items("a", "b", "c", "d", "e")
+    estimated = durations.estimate_durations(
+        [item.nodeid for item in items], {"a": 8.0, "b": 4.0, "c": 4.0, "d": 2.0}
+    )
+    assert estimated["e"] == 4.0
+    shards = [durations.shard_items(items, estimated, i, 2) for i in (1, 2)]
+    assert sorted(item.nodeid for shard in shards for item in shard) == list("abcde")
+    loads = [sum(estimated[item.nodeid] for item in shard) for shard in shards]
+    assert sorted(loads) == [10.0, 12.0]
+    # The same partition whatever the order of the items.
+    assert [item.nodeid for item in shards[0]] == [
+        item.nodeid
+        for item in durations.shard_items(items[::-1], estimated, 1, 2)[::-1]
+    ]
+    shards = [durations.shard_items(items, {}, i, 2) for i in (1, 2)]
+    assert sorted(item.nodeid for shard in shards for item in shard) == list("abcde")
+    assert durations.shard_items(items[::-1], {}, 1, 2) == shards[0][::-1]
+    estimate = durations.SessionEstimate(estimated)
+    assert estimate.finish("a") == 14.0
+    assert durations.SessionEstimate.format(3725) == "1:02:05"
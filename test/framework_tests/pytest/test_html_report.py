@@ -1,7 +1,25 @@
 """Test html report functionality via LeTP."""
 
+import datetime
+import gzip
+import json
 import os
 import re
+from collections import OrderedDict
+from pytest_letp.tools.html_report import report_loader
+from pytest_letp.tools.html_report.differential_report import (
+    LegatoQaJSONParser,
+    ResultComparison,
+    load_report,
+)
+from pytest_letp.tools.html_report.gen_json import AutoTestPlus, Swilib, open_log
+from pytest_letp.tools.html_report.report_loader import ReportLoader
+from pytest_letp.tools.html_report.report_template import HTMLLogConverter
+from pytest_letp.tools.html_report.test_report import (
+    BuildConfiguration,
+    TestCaseResult,
+    TestReportHTMLBuilder,
+)
 from testlib import run_python_with_command
 from testlib.util import get_log_file_name
 
@@ -50,3 +68,462 @@ def test_debug_log(letp_cmd):
     )
     assert run_python_with_command(cmd)
     assert os.path.isfile(temp_log), "{} file does not exists".format(temp_log)
+
+
+def _write_build_json(tmp_path, tests, name="build.json"):
+    """Write a minimal build configuration json file."""
+    json_file = tmp_path / name
+    json_file.write_text(json.dumps({"target_name": "wp76xx", "tests": tests}))
+    return str(json_file)
+
+
+def _pytest_result(nodeid, outcome, stdout=""):
+    """Build a minimal pytest json result."""
+    return {
+        "nodeid": nodeid,
+        "outcome": outcome,
+        "call": {"outcome": outcome, "stdout": stdout},
+    }
+
+
+def test_build_configuration_index(tmp_path):
+    """Look up pytest results through the per-build index."""
+    tests = [
+        _pytest_result("scenario/test_a.py::test_one", "failed"),
+        _pytest_result("scenario/test_a.py::test_two", "passed"),
+        _pytest_result("scenario/test_a.py::test_one", "passed"),
+    ]
+    build_cfg = BuildConfiguration(_write_build_json(tmp_path, tests))
+    assert build_cfg._lookup_pytest_json_result("scenario.test_a.test_one") == tests[0]
+    assert build_cfg._lookup_pytest_json_result("scenario.test_a.test_two") == tests[1]
+    assert build_cfg._lookup_pytest_json_result("scenario.test_a.unknown") == {}
+    assert build_cfg._test_name_index["scenario.test_a.test_one"] == [0, 2]
+
+
+def test_build_configuration_duplicates(tmp_path):
+    """Keep the passing re-run of a duplicated test."""
+    tests = [
+        _pytest_result("scenario/test_a.py::test_one", "failed", "first run"),
+        _pytest_result("scenario/test_a.py::test_one", "passed", "second run"),
+    ]
+    build_cfg = BuildConfiguration(_write_build_json(tmp_path, tests))
+    global_test_data = OrderedDict()
+    summary = build_cfg.process_test_data(global_test_data)
+    assert summary.stat_passed == 1
+    assert summary.stat_failures == 0
+    test_result = global_test_data["scenario.test_a.test_one"].results["wp76xx"]
+    assert test_result.pytest_json_result == tests[1]
+    assert "second run" in test_result.system_out
+
+
+def test_build_configuration_consolidate(tmp_path):
+    """Index the results of a consolidated build configuration."""
+    build_cfg = BuildConfiguration(
+        _write_build_json(
+            tmp_path, [_pytest_result("scenario/test_a.py::test_one", "passed")]
+        )
+    )
+    other_tests = [_pytest_result("scenario/test_b.py::test_two", "failed")]
+    other_cfg = BuildConfiguration(
+        _write_build_json(tmp_path, other_tests, name="other.json")
+    )
+    build_cfg.consolidate(other_cfg)
+    assert (
+        build_cfg._lookup_pytest_json_result("scenario.test_b.test_two")
+        == other_tests[0]
+    )
+
+
+def test_report_loader_read_keys(tmp_path, monkeypatch):
+    """Read the sort keys from the beginning of the report."""
+    monkeypatch.setattr(report_loader, "READ_CHUNK_SIZE", 7)
+    json_file = tmp_path / "report.json"
+    json_file.write_text(
+        '{"created": 1697011234.5678, "info": {"a": [1, 2]},'
+        ' "tests": [' + ", ".join(['{"nodeid": "x"}'] * 100) + "]}"
+    )
+    loader = ReportLoader()
+    assert loader.read_keys(str(json_file), ["created"]) == {"created": 1697011234.5678}
+    assert not loader._parsed
+    assert loader.read_keys(str(json_file), ["created", "info"])["info"] == {
+        "a": [1, 2]
+    }
+
+
+def test_report_loader_parse_once(tmp_path, monkeypatch):
+    """Keep the document parsed for missing sort keys for the next load."""
+    monkeypatch.setattr(report_loader, "READ_PREFIX_SIZE", 16)
+    monkeypatch.setattr(report_loader, "READ_CHUNK_SIZE", 8)
+    json_file = str(tmp_path / "report.json")
+    with open(json_file, "w", encoding="utf8") as f:
+        json.dump({"tests": [{"nodeid": "x" * 32}], "created": 12.5}, f)
+    loader = ReportLoader()
+    assert loader.read_keys(json_file, ["created"]) == {"created": 12.5}
+    json_data = loader._parsed[json_file]
+    assert loader.load(json_file) is json_data
+    assert not loader._parsed
+
+
+def test_report_loader_cache(tmp_path):
+    """Reuse the parsed report from the cache while the file is unchanged."""
+    cache_dir = tmp_path / "cache"
+    json_file = str(tmp_path / "report.json")
+    with open(json_file, "w", encoding="utf8") as f:
+        json.dump({"created": 1.0}, f)
+    assert ReportLoader(str(cache_dir)).load(json_file) == {"created": 1.0}
+    assert len(os.listdir(cache_dir)) == 1
+    assert ReportLoader(str(cache_dir)).load(json_file) == {"created": 1.0}
+    with open(json_file, "w", encoding="utf8") as f:
+        json.dump({"created": 2.0}, f)
+    assert ReportLoader(str(cache_dir)).load(json_file) == {"created": 2.0}
+    assert len(os.listdir(cache_dir)) == 2
+
+
+def _prepare_html_builder(tmp_path):
+    """Prepare a html report builder up to the results tables."""
+    tests = [
+        _pytest_result("scenario/test_a.py::test_one", "passed", "one log"),
+        _pytest_result("scenario/test_a.py::test_two", "failed", "two log"),
+    ]
+    tests[1]["call"]["crash"] = {"message": "boom"}
+    builder = TestReportHTMLBuilder()
+    builder._add_build_cfgs([_write_build_json(tmp_path, tests)])
+    builder._process_all_build_cfgs()
+    builder._add_results_headers()
+    status = builder._add_summary_section()
+    builder._add_env_list_header()
+    return builder, status
+
+
+def test_results_tables_one_pass(tmp_path):
+    """Build the filtered results tables in the same pass."""
+    builder, _ = _prepare_html_builder(tmp_path)
+    results_all, filtered_results = builder.gen_results_tables()
+    assert len(results_all) == 2
+    failed = [row[0].test_name for row in filtered_results["failed"]]
+    assert failed == ["scenario.test_a.test_two"]
+    assert filtered_results["xfailed"] == []
+
+
+def test_html_report_log_pages(tmp_path):
+    """Write the test logs into their own pages."""
+    builder, status = _prepare_html_builder(tmp_path)
+    results_all, builder.filtered_results = builder.gen_results_tables()
+    other_contents = {"title": "Test", "section": "all"}
+    embedded = str(tmp_path / "embedded.html")
+    builder.write_report(embedded, results_all, status, other_contents)
+    with open(embedded, encoding="utf8") as f:
+        assert "two log" in f.read()
+
+    builder, status = _prepare_html_builder(tmp_path)
+    other_contents["log_pages"] = True
+    report = str(tmp_path / "report.html")
+    builder._prepare_log_pages(report, other_contents)
+    results_all, builder.filtered_results = builder.gen_results_tables()
+    # The log pages are written with the results tables.
+    log_page = tmp_path / "report_logs" / "info-scenario_test_a_test_two_wp76xx.html"
+    assert "two log" in log_page.read_text()
+    row = builder.filtered_results["failed"][0][0]
+    assert row.link == "report_logs/info-scenario_test_a_test_two_wp76xx.html"
+    assert row.result == "failed"
+    builder.write_report(report, results_all, status, other_contents)
+    with open(report, encoding="utf8") as f:
+        content = f.read()
+    assert "two log" not in content
+    assert 'href="report_logs/info-scenario_test_a_test_two_wp76xx.html"' in content
+
+
+def test_test_case_result_spool_logs(tmp_path):
+    """Read the spooled test logs back from the spool file."""
+    result = TestCaseResult()
+    result.system_out = "out \u00e9\ud800"
+    result.system_err = "err"
+    with open(tmp_path / "spool.log", "wb") as spool:
+        spool.write(b"previous logs")
+        result.spool_logs(spool)
+    assert result._system_out is None
+    assert result.system_out == "\nout \u00e9\ud800"
+    assert result.system_err == "\nerr"
+
+
+def test_report_loader_load_all(tmp_path):
+    """Load several reports in the order of the inputs."""
+    json_files = []
+    for idx in range(4):
+        json_file = str(tmp_path / f"report_{idx}.json")
+        with open(json_file, "w", encoding="utf8") as f:
+            json.dump({"created": idx}, f)
+        json_files.append(json_file)
+    loader = ReportLoader()
+    all_json_data = loader.load_all(json_files + json_files[:1])
+    assert [json_data["created"] for json_data in all_json_data] == [0, 1, 2, 3, 0]
+
+
+def test_report_loader_map(tmp_path):
+    """Process several reports in worker processes, in the order of the inputs."""
+    json_files = []
+    for idx in range(4):
+        json_file = str(tmp_path / f"report_{idx}.json")
+        with open(json_file, "w", encoding="utf8") as f:
+            json.dump({"tests": [{"nodeid": str(idx)}]}, f)
+        json_files.append(json_file)
+    loader = ReportLoader(jobs=2)
+    reports = loader.map(load_report, json_files + json_files[:1])
+    assert [report["tests"][0]["nodeid"] for report in reports] == list("01230")
+
+
+def _write_report_json(tmp_path, name, target_name, tests, build_number):
+    """Write a build configuration json file of a jenkins build."""
+    json_file = tmp_path / name
+    json_data = {
+        "target_name": target_name,
+        "tests": tests,
+        "info": {"jenkins.build_number": build_number},
+    }
+    json_file.write_text(json.dumps(json_data))
+    return str(json_file)
+
+
+def test_parallel_report_builder(tmp_path):
+    """Process the build configurations in workers as in a single process."""
+    memory_test = _pytest_result(
+        "scenario/test_a.py::test_idle_memory",
+        "passed",
+        "Final Free: 10.50\nFinal Used: 20.25\nFinal Total: 30.75",
+    )
+    memory_test["teardown"] = {"outcome": "passed", "stdout": ""}
+    json_files = [
+        _write_report_json(
+            tmp_path,
+            "hl7812.json",
+            "hl7812",
+            [memory_test, _pytest_result("scenario/test_a.py::test_one", "failed")],
+            "1",
+        ),
+        _write_report_json(
+            tmp_path,
+            "wp76xx.json",
+            "wp76xx",
+            [_pytest_result("scenario/test_a.py::test_one", "passed", "b")],
+            "2",
+        ),
+        # Consolidated with the first report.
+        _write_report_json(
+            tmp_path,
+            "hl7812_2.json",
+            "hl7812",
+            [
+                _pytest_result("scenario/test_a.py::test_one", "passed", "c"),
+                _pytest_result("scenario/test_b.py::test_two", "passed", "d"),
+            ],
+            "1",
+        ),
+    ]
+    reports = []
+    for jobs in (1, 2):
+        builder = TestReportHTMLBuilder(ReportLoader(jobs=jobs))
+        builder._add_build_cfgs(json_files)
+        builder._process_all_build_cfgs()
+        builder._add_results_headers()
+        builder._add_summary_section()
+        results_all, _ = builder.gen_results_tables()
+        reports.append(
+            (
+                [build_cfg.name for build_cfg in builder.build_cfg_list],
+                [[(tc.test_name, tc.result) for tc in row] for row in results_all],
+                {
+                    name: (summary.stat_passed, summary.stat_failures)
+                    for name, summary in builder.test_summary.sub_summary.items()
+                },
+                builder.get_today_data(results_all)["Memory"]["Free"],
+            )
+        )
+    assert reports[0] == reports[1]
+    names, results, summaries, memory_free = reports[0]
+    assert names == ["hl7812", "wp76xx"]
+    assert [row[0][0] for row in results] == [
+        "scenario.test_a.test_idle_memory",
+        "scenario.test_a.test_one",
+        "scenario.test_b.test_two",
+    ]
+    # wp76xx, hl7812 and Jira ID results: the failed test passed on re-run.
+    assert [tc_result for _, tc_result in results[1]] == ["passed", "passed", "N/A"]
+    assert summaries == {"hl7812": (3, 0), "wp76xx": (1, 0)}
+    assert memory_free["RTOS"] == 10.5
+
+
+def test_test_case_result_images(tmp_path, monkeypatch):
+    """Test that images are inserted in the runtime logs in time order."""
+    monkeypatch.chdir(tmp_path)
+    img_dir = tmp_path / "log" / "images"
+    img_dir.mkdir(parents=True)
+    base = datetime.datetime(2024, 1, 1, 10, 0, 0)
+    images = []
+    for seconds in (5, 2):
+        timestamp = (base + datetime.timedelta(seconds=seconds)).timestamp()
+        image = img_dir / f"test_a(1)-{timestamp}.png"
+        image.touch()
+        images.append(os.path.relpath(str(image), str(tmp_path / "log")))
+    logs = [
+        "10:00:00 INFO ===== Begin of test_a[1] =====",
+        "header",
+        "",
+        "10:00:01 INFO step 1",
+        "10:00:03 INFO step 2",
+        "10:00:06 INFO step 3",
+        "10:00:07 INFO ===== End of test_a[1] =====",
+    ]
+    result = TestCaseResult()
+    result.add_pytest_json_result(
+        _pytest_result("test_a.py::test_a[1]", "passed", "\n".join(logs))
+    )
+    result.update_pytest_logs(result.pytest_json_result)
+    system_out = result.system_out.split("\n")
+    # The logs of the call phase start after an empty line.
+    assert system_out[4] == logs[3]
+    assert system_out[5].startswith(f'<img src="{images[1]}"')
+    assert system_out[6] == logs[4]
+    assert system_out[7].startswith(f'<img src="{images[0]}"')
+    assert system_out[8] == logs[5]
+
+
+def test_merge_images():
+    """Insert each image once, in the window of its log lines."""
+    logs = ["10:00:01 a", "10:00:03 b", "no time", "10:00:06 c"]
+    log_times = [datetime.time(10, 0, s) if s else None for s in (1, 3, 0, 6)]
+    images = [(datetime.time(10, 0, s), s, f"log/img{s}.png") for s in (0, 2, 4, 5, 9)]
+    merged, not_inserted = TestCaseResult._merge_images(logs, log_times, 0, images)
+    assert [line[:16] for line in merged] == [
+        "10:00:01 a",
+        '<img src="img2.p',
+        "10:00:03 b",
+        "no time",
+        '<img src="img4.p',
+        '<img src="img5.p',
+        "10:00:06 c",
+    ]
+    assert not_inserted == ["log/img0.png", "log/img9.png"]
+
+
+def test_html_log_converter():
+    """Test the conversion of colored logs to HTML."""
+    log = "\x1b[01;33mWARNING\x1b[0m <a> & \x1b[94m'b'\x1b[m \x1b[4mc\x1b[01m"
+    expected = (
+        '<font class="yellow bold">WARNING</font> &lt;a&gt; &amp; '
+        '<font class="blue">&apos;b&apos;</font> c<font class="bold">'
+    )
+    converter = HTMLLogConverter()
+    assert converter.convert(log) == expected
+    # Escape sequences split across chunks.
+    for size in range(1, len(log)):
+        chunks = [log[i : i + size] for i in range(0, len(log), size)]
+        assert "".join(converter.convert_chunks(chunks)) == expected
+    assert HTMLLogConverter(escape=False).convert("\x1b[32m<img>\x1b[0m") == (
+        '<font class="green"><img></font>'
+    )
+
+
+def test_gen_json_streaming(tmp_path, monkeypatch):
+    """Test the conversion of a gzip AutoTestPlus log read by blocks."""
+    log = (
+        "Session header\n"
+        "== Start the Test ==\nFILE: test_a.py\nOS info : Linux\n"
+        "Python ver. : 3.8\nAutoTestPlus version : 4.2\n"
+        "Start Time: 2024-01-01 23:59:50\n"
+        "23:59:55:1 AT+CGMR HL7802.5.4<CR>\nStatus test_a: passed\n"
+        "== Start the Test ==\nFILE: test_b.py\nStart Time: 2024-01-02 00:00:00\n"
+        "00:00:30:2 <send> AT\nStatus test_b: failed\n00:01:00:3 end\n"
+    )
+    expected = AutoTestPlus(log).run()
+    assert [test["Test Name"] for test in expected["Tests"]] == ["test_a", "test_b"]
+    assert [test["Duration(secs)"] for test in expected["Tests"]] == [5.0, 60.0]
+    assert [test["Result"] for test in expected["Tests"]] == ["Passed", "Failed"]
+    assert expected["Execution"]["FW Version"] == "HL7802.5.4"
+    assert expected["Execution"]["Tool Version"] == "AutoTestPlus: 4.2"
+    assert expected["Tests"][1]["raw_log"].startswith(
+        "Start the Test ==<br/>FILE: test_b.py<br/>"
+    )
+    assert "&lt;send&gt; AT" in expected["Tests"][1]["raw_log"]
+
+    log_file = tmp_path / "log.gz"
+    with gzip.open(log_file, "wt") as f:
+        f.write(log)
+    # Blocks shorter than a line.
+    monkeypatch.setattr(AutoTestPlus, "READ_SIZE", 7)
+    output = tmp_path / "log.json"
+    with open_log(str(log_file)) as f:
+        AutoTestPlus(f).write(str(output))
+    assert json.loads(output.read_text()) == expected
+
+    # Windows logs: the CRLF line ends are translated.
+    log_file = tmp_path / "crlf.log"
+    log_file.write_bytes(log.replace("\n", "\r\n").encode())
+    with open_log(str(log_file)) as f:
+        assert AutoTestPlus(f).run() == expected
+
+
+def test_gen_json_swilib_streaming(tmp_path, monkeypatch):
+    """Test the conversion of a Swilib json log read by blocks."""
+    logs = [
+        " 10:00:00 Running Test Name: test_{0} \nOperating System: Linux\n"
+        "Tool Version: 1.2\n test_{0}:passed\n 10:00:{0}2 end".format(i)
+        for i in range(3)
+    ]
+    data = {"Version": [1, {"Test_log": "x"}], "Test_log": logs, "End": 12345}
+    expected = Swilib(data).run()
+    assert [test["Test Name"] for test in expected["Tests"]] == [
+        "test_0",
+        "test_1",
+        "test_2",
+    ]
+    assert expected["Execution"]["Tool Version"] == "Swilib: 1.2"
+
+    log_file = tmp_path / "log.json"
+    log_file.write_text(json.dumps(data, indent=1))
+    monkeypatch.setattr(Swilib, "READ_SIZE", 5)
+    with open_log(str(log_file)) as f:
+        assert Swilib(f).run() == expected
+
+
+def test_result_comparison():
+    """Compare results with several previous runs."""
+    results = {
+        ("wp76", "a"): "failed",
+        ("wp76", "b"): "passed",
+        ("wp76", "c"): "failed",
+    }
+    previous_runs = [
+        {("wp76", "a"): "passed", ("wp76", "d"): "passed"},
+        {("wp76", "a"): "failed", ("wp76", "b"): "failed"},
+    ]
+    comparison = ResultComparison(results, previous_runs)
+    # The most recent previous run with the result is used.
+    assert comparison.get_new_status("failed") == {
+        ("wp76", "a"): "passed",
+        ("wp76", "c"): None,
+    }
+    assert comparison.get_new_failures() == {("wp76", "a"): "passed"}
+    assert comparison.get_fixes() == {("wp76", "b"): "failed"}
+    assert comparison.get_added() == [("wp76", "c")]
+    assert comparison.get_missing() == [("wp76", "d")]
+
+
+def test_differential_report_legato_qa():
+    """Compare Legato QA reports per target."""
+    result_data = {
+        "stats": {"global": {}, "wp76": {}, "wp77": {}},
+        "tests": [
+            {"name": "a", "wp76": {"result": "failed"}, "wp77": {"result": "failed"}},
+            {"name": "b", "wp76": {"result": "passed"}},
+        ],
+    }
+    pre_result_data = {
+        "tests": [
+            {"name": "a", "wp76": {"result": "passed"}},
+            {"name": "b", "wp76": {"result": "passed"}, "wp77": {"result": "passed"}},
+        ]
+    }
+    parser = LegatoQaJSONParser(result_data, pre_result_data)
+    assert parser.get_test("failed") == {"a": ["failed", "new-failed"]}
+    assert parser.get_test("passed") == {}
+    assert parser.get_miss_tests() == {"b": ["N/A", "miss"]}
@@ -0,0 +1,113 @@
+"""Test the operation metrics."""
+import json
+import os
+
+import pexpect
+import pytest
+
+from pytest_letp.lib import metrics
+from pytest_letp.lib.com_exceptions import ComException
+from pytest_letp.lib.simulator import SimulatedTarget
+from testlib import run_python_with_command
+
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+
+class _Link:
+    metrics_link = "slink1"
+
+    def __init__(self):
+        self.after = None
+
+    @metrics.timed("expect", check_after=True)
+    def expect(self, timeout):
+        self.after = pexpect.TIMEOUT if timeout else "prompt"
+
+    @metrics.timed("run")
+    def run(self, exc=None):
+        if exc:
+            raise exc
+
+    @metrics.timed("run")
+    def run_timeout(self):
+        try:
+            raise pexpect.TIMEOUT("Timeout exceeded")
+        except pexpect.TIMEOUT as e:
+            raise ComException(e)
+
+
+@pytest.fixture
+def registry():
+    """Clean registry, restored after the test."""
+    enabled = metrics.registry.enabled
+    metrics.registry.reset()
+    metrics.registry.enabled = True
+    yield metrics.registry
+    metrics.registry.reset()
+    metrics.registry.enabled = enabled
+
+
+def test_timed_operations(registry):
+    """Count the operations and their timeouts per test and link."""
+    link = _Link()
+    registry.test = "test_a"
+    link.expect(timeout=False)
+    link.expect(timeout=True)
+    link.run()
+    with pytest.raises(ComException):
+        link.run_timeout()
+    with pytest.raises(AssertionError):
+        link.run(AssertionError())
+    registry.test = "test_b"
+    link.run()
+
+    stats = registry.get_test_stats("test_a")
+    assert stats["expect"]["slink1"]["count"] == 2
+    assert stats["expect"]["slink1"]["timeouts"] == 1
+    assert stats["run"]["slink1"]["count"] == 3
+    assert stats["run"]["slink1"]["timeouts"] == 1
+    assert registry.to_dict()["run"]["slink1"]["count"] == 4
+
+    registry.enabled = False
+    link.run()
+    assert registry.to_dict()["run"]["slink1"]["count"] == 4
+
+
+def test_prometheus_format(registry):
+    """Export cumulative histograms and the counts per test."""
+    registry.record("run", "slink1", 0.003, test="test_a")
+    registry.record("run", "slink1", 2.5, timeout=True, test='test_"b"')
+    prom = registry.to_prometheus()
+    labels = 'operation="run",link="slink1"'
+    assert 'letp_operation_duration_seconds_bucket{%s,le="0.005"} 1' % labels in prom
+    assert 'letp_operation_duration_seconds_bucket{%s,le="+Inf"} 2' % labels in prom
+    assert "letp_operation_duration_seconds_count{%s} 2" % labels in prom
+    assert "letp_operation_timeouts_total{%s} 1" % labels in prom
+    assert "letp_operation_timeout_seconds_total{%s} 2.5" % labels in prom
+    assert 'letp_test_operations_total{test="test_\\"b\\"",%s} 1' % labels in prom
+
+
+def test_metrics_report(letp_cmd, tmp_path, monkeypatch):
+    """Report the metrics of a session on a simulated target."""
+    monkeypatch.chdir(os.environ["LETP_TESTS"])
+    json_file = tmp_path / "report.json"
+    prom_file = tmp_path / "metrics.prom"
+    with SimulatedTarget() as sim:
+        config_file = sim.write_config(str(tmp_path / "sim.xml"))
+        cmd = "{} run --dbg-lvl 0 ".format(
+            letp_cmd
+        ) + "scenario/command/test_simulator_stub.py " "--config {} ".format(
+            config_file
+        ) + "--config test_run/metrics_file={} ".format(
+            prom_file
+        ) + "--json-report --json-report-file={}".format(
+            json_file
+        )
+        run_python_with_command(cmd)
+    report = json.loads(json_file.read_text())
+    assert report["metrics"]["run"]["slink1"]["count"] >= 1
+    assert report["metrics"]["run_at_cmd"]["slink2"]["count"] == 1
+    test_metrics = report["tests"][0]["metadata"]["metrics"]
+    assert "target" in test_metrics["fixture_setup"]
+    assert "target" in test_metrics["fixture_teardown"]
+    assert 'operation="login",link="slink1"' in prom_file.read_text()
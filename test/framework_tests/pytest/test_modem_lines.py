@@ -0,0 +1,79 @@
+"""Test the monitor of the modem control lines with simulated lines."""
+import threading
+import time
+
+from pytest_letp.lib import modem_lines
+
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+
+class _FakeLines(modem_lines.ModemLineMonitor):
+    """Monitor of simulated lines, with the interrupt counters of a UART."""
+
+    def __init__(self, **kwargs):
+        super().__init__(fd=None, **kwargs)
+        self.line_state = {name: False for name in modem_lines.LINES}
+        self.counts = {name: 0 for name in modem_lines.LINES}
+        self.changed = threading.Event()
+
+    def set_line(self, name, state, wake_up=True):
+        """Change a line, as the interrupt handler of the UART."""
+        if state != self.line_state[name] and (name != "ri" or not state):
+            self.counts[name] += 1
+        self.line_state[name] = state
+        if wake_up:
+            self.changed.set()
+
+    def stop(self):
+        self._stop.set()
+        self.changed.set()
+        super().stop()
+
+    def _get_lines(self):
+        return {name: self.line_state[name] for name in self.lines}
+
+    def _wait_change(self):
+        self.changed.wait()
+        self.changed.clear()
+
+    def _get_counts(self):
+        return {name: self.counts[name] for name in self.lines}
+
+
+def test_ri_pulses():
+    """Record the RI pulses with their width, even when too short."""
+    with _FakeLines() as monitor:
+        threading.Timer(0.05, monitor.set_line, ("ri", True)).start()
+        edge = monitor.wait_for_edge(["ri"], state=True, timeout=5)
+        assert edge.line == "ri" and not edge.missed
+        time.sleep(0.1)
+        monitor.set_line("ri", False)
+        edge = monitor.wait_for_edge(["ri"], state=False, timeout=5)
+        assert edge
+
+        # Pulse shorter than the wake up of the monitor.
+        monitor.set_line("ri", True, wake_up=False)
+        monitor.set_line("ri", False)
+        assert monitor.wait_for_edge(["ri"], timeout=5, since=edge.time).missed
+
+        pulses = monitor.pulses("ri")
+        assert len(pulses) == 2
+        assert 0.08 < pulses[0][1] < 1
+        assert pulses[1][1] == 0
+        assert monitor.wait_for_edge(["cd"], timeout=0.1) is None
+
+
+def test_cd_changes():
+    """Count both edges of CD and wait for a given state."""
+    with _FakeLines(lines=("cd", "dsr")) as monitor:
+        start = time.monotonic()
+        monitor.set_line("dsr", True)
+        monitor.set_line("cd", True)
+        assert monitor.wait_for_edge(["cd"], state=True, timeout=5, since=start)
+        monitor.set_line("cd", False, wake_up=False)
+        monitor.set_line("cd", True)
+        time.sleep(0.1)
+        assert [edge.state for edge in monitor.edges(["cd"])] == [True, False, True]
+        assert monitor.state == {"cd": True, "dsr": True}
+        monitor.clear()
+        assert monitor.edges() == []
@@ -0,0 +1,111 @@
+"""Test the numato relay session against a simulated board."""
+import threading
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from pytest_letp.lib import controller
+from pytest_letp.lib.simulator import FakeNumato
+
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+CONFIG = """
+<power_supply>
+    <type>numato</type>
+    <port_nb>0</port_nb>
+    <inverted>0</inverted>
+    <com>
+        <port>{port}</port>
+        <speed>115200</speed>
+    </com>
+    <ports>
+        <power inverted="0">0</power>
+        <sim inverted="1" debounce="10">1</sim>
+        <usb inverted="0">2</usb>
+    </ports>
+    <gpio used="1">
+        <ports>
+            <gpio1 inverted="0">3</gpio1>
+        </ports>
+    </gpio>
+</power_supply>
+"""
+
+
+@pytest.fixture
+def board():
+    """Simulated Numato board."""
+    with FakeNumato() as fake:
+        yield fake
+
+
+@pytest.fixture
+def relay(board):
+    """Numato controller of the simulated board."""
+    numato = controller.numato(ET.fromstring(CONFIG.format(port=board.link_path)))
+    writes = []
+    send = numato.io.send
+    numato.io.send = lambda data: writes.append(data) or send(data)
+    numato.writes = writes
+    yield numato
+    numato.io.close()
+
+
+def test_relay_ports(board, relay):
+    """Set and read the ports one by one."""
+    relay.power.on()
+    relay.sim.on()
+    relay.gpio1.on()
+    assert board.relays[:2] == [True, False]
+    assert board.gpios[3]
+    assert relay.power.state() == "on"
+    assert relay.sim.state() == "on"
+    relay.off()
+    assert relay.state() == "off"
+    assert relay.writes[0] == "relay on 0\r"
+
+
+def test_batch_and_readall(board, relay):
+    """Send the commands of a batch in one write, read all the ports at once."""
+    with relay.batch():
+        relay.power.on()
+        relay.usb.on()
+        relay.sim.off()
+        assert board.relays == [False] * 8
+    assert relay.writes == ["relay on 0\rrelay on 2\rrelay on 1\r"]
+    assert board.relays[:3] == [True, True, True]
+    assert relay.port_states() == {"power": "on", "sim": "off", "usb": "on"}
+    assert board.commands[-1] == "relay readall"
+
+    relay.cycle_ports(["power", "usb"], delay=0)
+    assert board.commands[-4:] == [
+        "relay off 0",
+        "relay off 2",
+        "relay on 0",
+        "relay on 2",
+    ]
+
+
+def test_concurrent_users(board, relay):
+    """Serialize the threads sharing the board."""
+    errors = []
+
+    def toggle(port):
+        for _ in range(10):
+            port.on()
+            if port.state() != "on":
+                errors.append(port.port_nb)
+            port.off()
+            if port.state() != "off":
+                errors.append(port.port_nb)
+
+    threads = [
+        threading.Thread(target=toggle, args=(port,))
+        for port in (relay.power, relay.sim, relay.usb)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert len(board.commands) == 3 * 40
@@ -0,0 +1,225 @@
+"""Test the qTest client against a local fake qTest server."""
+import importlib
+import json
+import os
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from pytest_letp.lib import pytest_qTest
+from pytest_letp.tools.qTest_upload import qtest_client
+
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+TEST_CASES = 24
+
+
+class _FakeQTest(socketserver.ThreadingMixIn, HTTPServer):
+    """qTest server with a project of TEST_CASES test runs."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.url = "http://127.0.0.1:{}/".format(self.server_address[1])
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = []
+        # Number of error answers before the next success.
+        self.failures = 0
+        self.failure_status = 503
+        self.latency = 0.0
+
+    def answer(self, method, path, query):
+        """Get (status, JSON content) of a request."""
+        with self.lock:
+            self.requests.append((method, path))
+            if self.failures:
+                self.failures -= 1
+                return self.failure_status, {"message": "Service unavailable"}
+        if query.get("access_token") != ["token"]:
+            return 401, {"message": "Unauthorized"}
+        time.sleep(self.latency)
+        parts = path.strip("/").split("/")
+        if parts[-1] == "test-runs":
+            page, size = int(query["page"][0]), int(query["pageSize"][0])
+            runs = [{"name": "L_ReinitTest", "id": 100, "testCaseId": 0}]
+            runs += [
+                {"name": "L_Test_{}".format(i), "id": 100 + i, "testCaseId": i}
+                for i in range(1, TEST_CASES + 1)
+            ]
+            items = runs[(page - 1) * size : page * size]
+            return 200, {"items": items, "total": len(runs), "page": page}
+        if parts[-2] == "test-cases":
+            value = "test_{}.py".format(parts[-1])
+            properties = [{"field_name": "Script Name", "field_value": value}]
+            return 200, {"id": int(parts[-1]), "properties": properties}
+        if parts[-2] == "test-cycles" and method == "PUT":
+            return 200, {"id": int(parts[-1])}
+        if parts[-1] == "test-logs" and method == "POST":
+            return 201, {"id": 1}
+        return 404, {"message": "Not found"}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def _answer(self):
+        url = urlparse(self.path)
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        status, content = self.server.answer(
+            self.command, url.path, parse_qs(url.query)
+        )
+        body = json.dumps(content).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_PUT = do_POST = _answer
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def qtest():
+    """Fake qTest server."""
+    server = _FakeQTest()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _api(qtest):
+    api = pytest_qTest.QTestAPI("token", project_id=1, server_url=qtest.url)
+    api.client.backoff = 0.01
+    return api
+
+
+def test_retry_and_keep_alive(qtest):
+    """Retry the transient errors, on one kept alive connection."""
+    api = _api(qtest)
+    qtest.failures = 2
+    assert api.get_test_cases(3)["id"] == 3
+    for i in range(10):
+        assert api.get_test_cases(i)["id"] == i
+    assert len(qtest.requests) == 13
+    assert qtest.connections == 1
+    # No retry of the client errors.
+    with pytest.raises(AssertionError, match="401"):
+        qtest_client.QTestSession("bad").get_json(qtest.url + "api/v3/projects")
+    assert len(qtest.requests) == 14
+    api.update_cycle_name(7, {"name": "cycle"})
+    assert qtest.requests[-1] == ("PUT", "/api/v3/projects/1/test-cycles/7")
+
+
+def test_no_retry_of_post(qtest):
+    """Only retry a POST which was not applied by the server."""
+    api = _api(qtest)
+    url = api.api_v3 + "/1/test-runs/101/test-logs"
+    qtest.failures = 1
+    with pytest.raises(AssertionError, match="503"):
+        api.client.request("POST", url, json={"status": "PASSED"})
+    assert len(qtest.requests) == 1
+    qtest.failures, qtest.failure_status = 2, 429
+    assert api.client.request("POST", url, json={"status": "PASSED"}).status_code == 201
+    assert len(qtest.requests) == 4
+
+
+def test_get_pages(qtest):
+    """Get all the pages of the test runs."""
+    api = _api(qtest)
+    url = api.api_v3 + "/1/test-runs"
+    test_runs = api.client.get_pages(url, {}, page_size=10)
+    assert [test_run["testCaseId"] for test_run in test_runs["items"]] == list(
+        range(TEST_CASES + 1)
+    )
+    assert len(qtest.requests) == 3
+
+
+def test_get_test_script(qtest):
+    """Get the pages of test runs, and the test cases in parallel."""
+    api = _api(qtest)
+    qtest.latency = 0.05
+    start = time.perf_counter()
+    scripts = api.get_test_script()
+    elapsed = time.perf_counter() - start
+    assert scripts == {
+        "L_Test_{}".format(i): "test_{}.py".format(i) for i in range(1, TEST_CASES + 1)
+    }
+    assert len(qtest.requests) == 1 + TEST_CASES
+    # Sequentially: 25 requests * 50 ms.
+    assert elapsed < 0.8
+    assert qtest.connections <= qtest_client.MAX_WORKERS
+
+
+def test_metadata_cache(tmp_path, monkeypatch):
+    """Keep the metadata on disk until it expires or is invalidated."""
+    path = str(tmp_path / "qtest" / "metadata.json")
+    cache = qtest_client.QTestCache(path, ttl=60)
+    scope = cache.make_scope("https://qtest/", 1, 2)
+    fetches = []
+
+    def fetch():
+        fetches.append(1)
+        return {"Suite": 10}
+
+    assert cache.get_or_fetch(scope, "test-suites", fetch) == {"Suite": 10}
+    cache = qtest_client.QTestCache(path, ttl=60)
+    assert cache.get_or_fetch(scope, "test-suites", fetch) == {"Suite": 10}
+    assert len(fetches) == 1
+    assert cache.get(cache.make_scope("https://qtest/", 1), "test-suites") is None
+
+    now = time.time()
+    monkeypatch.setattr(qtest_client.time, "time", lambda: now + 61)
+    assert cache.get(scope, "test-suites") is None
+    cache.get_or_fetch(scope, "test-suites", fetch)
+    assert len(fetches) == 2
+
+    cache.invalidate(scope, "test-suites")
+    assert cache.get(scope, "test-suites") is None
+    cache.set(scope, "releases", {"R1": 2})
+    cache.invalidate()
+    assert qtest_client.QTestCache(path).get(scope, "releases") is None
+
+
+def test_new_test_suite(tmp_path, monkeypatch):
+    """Fetch the test suites again when a test suite is missing."""
+    monkeypatch.syspath_prepend(os.path.dirname(qtest_client.__file__))
+    qTest_lib = importlib.import_module("qTest_lib")
+    suites = {"Suite": 10}
+    fetches = []
+
+    def fetch_IDs(api_url, params=None):
+        fetches.append(params)
+        return dict(suites)
+
+    cache = qtest_client.QTestCache(str(tmp_path / "metadata.json"))
+    api = qTest_lib.QTestAPI("token", cache=cache)
+    api.project_id, api.release_id = 1, 2
+    monkeypatch.setattr(api, "fetch_IDs", fetch_IDs)
+    assert api.get_testSuite_ID("Suite") == 10
+    assert api.get_testSuite_ID("Suite") == 10
+    assert len(fetches) == 1
+    suites["New suite"] = 11
+    assert api.get_testSuite_ID("New suite") == 11
+    assert api.get_testSuite_ID("Unknown suite") == 0
+    assert len(fetches) == 3
+    assert fetches[0]["parentId"] == 2
+    suites["Other suite"] = 12
+    assert api.get_testsuite_name() == ["Suite", "New suite"]
+    assert api.get_testsuite_name(refresh=True)[-1] == "Other suite"
@@ -0,0 +1,118 @@
+"""Test the event-driven reboot detection."""
+import os
+import threading
+import time
+
+from pytest_letp.lib import com
+from pytest_letp.lib.reboot_tracker import RebootTracker
+from pytest_letp.lib.simulator import SimulatedTarget
+from testlib import run_python_with_command
+from testlib.util import check_letp_nb_tests
+
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+
+class _SSHLink:
+    """SSH link reachable before and after the down period."""
+
+    def __init__(self, down_at, up_at):
+        self.start = time.monotonic()
+        self.down_at = down_at
+        self.up_at = up_at
+
+    def check_communication(self, timeout=1):
+        elapsed = time.monotonic() - self.start
+        return 1 if self.down_at <= elapsed < self.up_at else 0
+
+
+class _ConsoleLink:
+    """Console link receiving patterns at given times."""
+
+    LOGIN = "login:"
+    PROMPT = "# "
+
+    def __init__(self, output):
+        self.start = time.monotonic()
+        # List of (time, pattern).
+        self.output = output
+
+    def send(self, data):
+        pass
+
+    def expect(self, patterns, timeout):
+        time.sleep(timeout)
+        if self.output and self.output[0][0] <= time.monotonic() - self.start:
+            return patterns.index(self.output.pop(0)[1])
+        return len(patterns) - 1
+
+
+def test_console_silence():
+    """A prompt after a silence is the target back only after a boot banner."""
+    tracker = RebootTracker(poll_interval=0.05, silence=0.2)
+    tracker.watch_console(_ConsoleLink([(0.5, "# ")]))
+    assert tracker.wait(timeout=1) is None
+    assert not tracker.down.is_set()
+    events = [event for _, _, event in tracker.events]
+    assert events[:2] == ["silent", "answer"]
+    assert "down" not in events
+
+    tracker = RebootTracker(poll_interval=0.05, silence=0.2)
+    tracker.watch_console(_ConsoleLink([(0.5, "U-Boot"), (0.7, "login:")]))
+    assert tracker.wait(timeout=5) == "console"
+    assert [event for _, _, event in tracker.events] == ["silent", "down", "up"]
+
+
+def test_console_reboot():
+    """Wake on the login prompt after the boot banner."""
+    with SimulatedTarget(boot_time=1) as sim:
+        cli = com.target_serial_qct(sim.cli.link_path, 115200)
+        try:
+            cli.login()
+            cli.sendline("reboot")
+            start = time.monotonic()
+            tracker = RebootTracker()
+            tracker.watch_console(cli)
+            assert tracker.wait(timeout=30) == "console"
+            assert time.monotonic() - start < 5
+            assert sim.cli.boot_count == 2
+            cli.login()
+            assert cli.run("uname") == "Linux"
+        finally:
+            cli.close()
+
+
+def test_tcp_and_usb(tmp_path):
+    """Wake on the SSH port, the USB port only reports the shutdown."""
+    usb_tty = tmp_path / "ttyUSB0"
+    usb_tty.write_text("")
+    threading.Timer(0.1, usb_tty.unlink).start()
+    tracker = RebootTracker(poll_interval=0.05)
+    tracker.watch_tcp(_SSHLink(down_at=0.3, up_at=0.8))
+    tracker.watch_usb(str(usb_tty))
+    assert tracker.wait(timeout=10) == "tcp"
+    assert [(source, event) for _, source, event in tracker.events] == [
+        ("usb", "down"),
+        ("tcp", "down"),
+        ("tcp", "up"),
+    ]
+    assert tracker.events[-1][0] < 2
+
+    tracker = RebootTracker(poll_interval=0.05)
+    tracker.watch_tcp(_SSHLink(down_at=10, up_at=20))
+    assert tracker.wait(timeout=0.3) is None
+    assert not tracker.down.is_set()
+
+
+def test_module_reboot(letp_cmd, tmp_path, monkeypatch):
+    """Reboot a simulated module through the target fixture."""
+    monkeypatch.chdir(os.environ["LETP_TESTS"])
+    with SimulatedTarget(boot_time=1) as sim:
+        config_file = sim.write_config(str(tmp_path / "sim_target.xml"))
+        cmd = "{} run --dbg-lvl 0 ".format(
+            letp_cmd
+        ) + "scenario/command/test_simulator_reboot_stub.py --config {}".format(
+            config_file
+        )
+        output = run_python_with_command(cmd)
+        assert sim.cli.boot_count == 2
+    check_letp_nb_tests(output, number_of_passed=1)
@@ -0,0 +1,78 @@
+"""Test the simulated target and its benchmarks."""
+import os
+
+import pytest
+
+from pytest_letp.lib import com
+from pytest_letp.lib.simulator import SimulatedTarget, benchmark
+from testlib import run_python_with_command
+from testlib.util import check_letp_nb_tests
+
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+
+@pytest.fixture
+def sim():
+    """Simulated target with a short boot."""
+    with SimulatedTarget(boot_time=3) as sim_target:
+        yield sim_target
+
+
+def test_simulated_shell(sim):
+    """Login and run commands on the simulated console."""
+    cli = com.target_serial_qct(sim.cli.link_path, 115200)
+    try:
+        cli.login()
+        assert cli.run("uname") == "Linux"
+        exit_status, output = cli.run("unknown_cmd", withexitstatus=True, check=False)
+        assert exit_status == 1
+        assert "not found" in output
+        cli.sendline("reboot")
+        cli.wait_for_reboot(timeout=30)
+        assert sim.cli.boot_count == 2
+        assert cli.run("hostname") == "swi-mdm9x28-wp"
+    finally:
+        cli.close()
+
+
+def test_simulated_modem(sim):
+    """Run AT commands on the simulated modem."""
+    at_port = com.target_serial_at(sim.at.link_path, 115200)
+    try:
+        rsp = com.run_at_cmd_and_check(at_port, "ATI", expect_rsp=["WP7607"])
+        assert "Sierra Wireless" in rsp
+        assert com.run_at_cmd_and_check(at_port, "AT+UNKNOWN", check=False) is None
+        assert sim.at.commands == ["ATI", "AT+UNKNOWN"]
+    finally:
+        at_port.close()
+
+
+def test_simulated_target_config(letp_cmd, sim, tmp_path, monkeypatch):
+    """Run a test on the simulated target with its xml configuration."""
+    monkeypatch.chdir(os.environ["LETP_TESTS"])
+    config_file = sim.write_config(str(tmp_path / "sim_target.xml"))
+    cmd = "{} run --dbg-lvl 0 ".format(
+        letp_cmd
+    ) + "scenario/command/test_simulator_stub.py " "--config {} ".format(config_file)
+    output = run_python_with_command(cmd)
+    check_letp_nb_tests(output, number_of_passed=1)
+
+
+def test_benchmark_history(tmp_path):
+    """Record the benchmark results and find the regressions."""
+    history_file = str(tmp_path / "history.jsonl")
+    for mean_ms in (1.0, 1.2, 0.9):
+        benchmark.record(history_file, {"run": {"mean_ms": mean_ms}}, revision="")
+    history = benchmark.load_history(history_file)
+    assert len(history) == 3
+    results = {"run": {"mean_ms": 1.1}, "login": {"mean_ms": 5.0}}
+    assert benchmark.find_regressions(history, results) == {}
+    results["run"]["mean_ms"] = 1.5
+    assert benchmark.find_regressions(history, results) == {"run": (1.5, 1.0)}
+
+
+def test_benchmark_run():
+    """Run the fast benchmarks."""
+    results = benchmark.run_benchmarks(iterations=5, names=["run", "at_cmd"])
+    assert set(results) == {"run", "at_cmd"}
+    assert all(result["ops_per_s"] > 0 for result in results.values())
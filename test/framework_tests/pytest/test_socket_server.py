@@ -0,0 +1,151 @@
+"""Test the asyncio TCP and UDP servers."""
+import socket
+import threading
+
+import pytest
+
+from pytest_letp.lib import socket_server
+
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+
+@pytest.fixture
+def tcp_echo():
+    """TCP echo server on a free port."""
+    server = socket_server.get_async_tcp_server("127.0.0.1", 0, keep_data=True)
+    yield server
+    server.shutdown()
+
+
+def _recv_all(sock):
+    data = bytearray()
+    while True:
+        chunk = sock.recv(65536)
+        if not chunk:
+            return bytes(data)
+        data += chunk
+
+
+def test_tcp_echo_concurrent(tcp_echo):
+    """Echo the data of many concurrent connections."""
+    clients = [
+        socket.create_connection(tcp_echo.server_address, timeout=10)
+        for _ in range(400)
+    ]
+    for i, client in enumerate(clients):
+        client.sendall(b"client %d" % i)
+        client.shutdown(socket.SHUT_WR)
+    for i, client in enumerate(clients):
+        assert _recv_all(client) == b"client %d" % i
+        client.close()
+    assert tcp_echo.wait_for_connections(400, timeout=10)
+    stats = tcp_echo.get_stats()
+    assert stats["connections"] == 400
+    assert stats["bytes_sent"] == stats["bytes_received"] == tcp_echo.bytes_received
+    assert b"client 399" in tcp_echo.cur_data
+    assert tcp_echo.active == 0
+
+
+def test_tcp_sink_and_source():
+    """Count the data of a sink, send the data of a source."""
+    sink = socket_server.get_async_tcp_server("127.0.0.1", 0, mode="sink")
+    source = socket_server.get_async_tcp_server(
+        "127.0.0.1", 0, mode="source", source_size=4 * 1024 * 1024
+    )
+    try:
+        with socket.create_connection(sink.server_address, timeout=10) as client:
+            client.sendall(bytes(1024 * 1024))
+            assert sink.wait_for_bytes(1024 * 1024, timeout=10)
+        with socket.create_connection(source.server_address, timeout=10) as client:
+            assert len(_recv_all(client)) == 4 * 1024 * 1024
+        assert sink.wait_for_connections(1) and source.wait_for_connections(1)
+        assert sink.connections[0].bytes_sent == 0
+        assert source.connections[0].to_dict()["bytes_sent"] == 4 * 1024 * 1024
+        assert source.connections[0].throughput > 0
+    finally:
+        sink.shutdown()
+        source.shutdown()
+
+
+def test_udp_echo():
+    """Echo the datagrams, the peer is done when idle."""
+    server = socket_server.get_async_udp_server(
+        "127.0.0.1", 0, keep_data=True, idle_timeout=0.2
+    )
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as client:
+            client.settimeout(5)
+            for i in range(10):
+                client.sendto(b"datagram %d" % i, server.server_address)
+                assert client.recv(1024) == b"datagram %d" % i
+        assert server.wait_for_connections(1, timeout=5)
+        assert server.connections[0].bytes_received == len(server.cur_data)
+    finally:
+        server.shutdown()
+
+
+def test_udp_measure():
+    """Count the losses and reorders, measure the round trip time."""
+    server = socket_server.get_async_udp_server("127.0.0.1", 0, mode="measure")
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as client:
+            client.settimeout(5)
+            for seq in (0, 1, 3, 2, 5, 5):
+                packet = socket_server.make_packet(seq, 100)
+                client.sendto(packet, server.server_address)
+                assert client.recv(1024) == packet
+
+            def echo_probes():
+                for _ in range(5):
+                    data, addr = client.recvfrom(1024)
+                    client.sendto(data, addr)
+
+            echo = threading.Thread(target=echo_probes)
+            echo.start()
+            rtt = server.probe(count=5, interval=0.001)
+            echo.join()
+        assert rtt.count == 5 and 0 < rtt.min <= rtt.max < 1
+        stats = server.get_stats()
+        peer = stats["per_connection"][0]
+        assert peer["sequence"] == {
+            "packets": 6,
+            "lost": 1,
+            "reordered": 1,
+            "duplicates": 1,
+            "loss_ratio": 0.166667,
+        }
+        assert peer["packets_received"] == 11
+        assert peer["rtt"]["count"] == 5
+        assert stats["packets_lost"] == 1
+    finally:
+        server.shutdown()
+
+
+def test_tcp_measure():
+    """Reassemble the packets of the stream."""
+    server = socket_server.get_async_tcp_server("127.0.0.1", 0, mode="measure")
+    try:
+        packets = b"".join(socket_server.make_packet(seq, 1000) for seq in range(50))
+        with socket.create_connection(server.server_address, timeout=10) as client:
+            # Split the packets between the writes.
+            for offset in range(0, len(packets), 333):
+                client.sendall(packets[offset : offset + 333])
+            client.shutdown(socket.SHUT_WR)
+            assert _recv_all(client) == packets
+        assert server.wait_for_connections(1)
+        connection = server.connections[0]
+        assert connection.packets_received == connection.packets_sent == 50
+        assert connection.sequence.lost == 0
+
+        # Resynchronize on the next packet after invalid data.
+        garbage = b"xxLETxx" + socket_server.MEASURE_MAGIC + bytes(30)
+        with socket.create_connection(server.server_address, timeout=10) as client:
+            client.sendall(garbage + packets[:2000])
+            client.shutdown(socket.SHUT_WR)
+            assert _recv_all(client) == packets[:2000]
+        assert server.wait_for_connections(2)
+        connection = server.connections[1]
+        assert connection.packets_received == 2
+        assert connection.invalid_bytes == len(garbage)
+    finally:
+        server.shutdown()
@@ -0,0 +1,76 @@
+"""Test the condition waits."""
+import time
+
+import pexpect
+import pytest
+
+from pytest_letp.lib import metrics, wait
+
+__copyright__ = "Copyright (C) Sierra Wireless Inc."
+
+
+class _Target:
+    """Link receiving a pattern after a number of probes."""
+
+    def __init__(self, probes):
+        self.probes = probes
+        self.sent = []
+
+    def send(self, data):
+        self.sent.append(data)
+
+    def expect(self, patterns, timeout):
+        if len(self.sent) >= self.probes:
+            return 0
+        time.sleep(timeout)
+        return patterns.index(pexpect.TIMEOUT)
+
+
+@pytest.fixture
+def registry():
+    """Clean registry, restored after the test."""
+    enabled = metrics.registry.enabled
+    metrics.registry.reset()
+    metrics.registry.enabled = True
+    yield metrics.registry
+    metrics.registry.reset()
+    metrics.registry.enabled = enabled
+
+
+def test_wait_until(registry):
+    """Return as soon as the condition holds, or its last value at timeout."""
+    calls = []
+
+    def ready():
+        calls.append(time.monotonic())
+        return len(calls) == 4 and "ready"
+
+    start = time.monotonic()
+    assert wait.wait_until(ready, timeout=5, interval=0.01) == "ready"
+    # Backoff: 0.01 + 0.02 + 0.04.
+    assert time.monotonic() - start < 1
+    assert calls[3] - calls[2] > calls[2] - calls[1]
+
+    start = time.monotonic()
+    assert wait.wait_until(lambda: 0, timeout=0.2, interval=0.05) == 0
+    assert 0.2 <= time.monotonic() - start < 0.5
+
+    sleeps = registry.to_dict()["sleep"]
+    assert sleeps["test_wait_until"]["count"] >= 5
+
+
+def test_sleep_metric(registry):
+    """Record the fixed sleeps per reason."""
+    wait.sleep(0.01, "power_off")
+    wait.sleep(0)
+    assert registry.to_dict()["sleep"]["power_off"]["count"] == 1
+    assert registry.to_dict()["sleep"]["power_off"]["total_s"] >= 0.01
+
+
+def test_wait_for_pattern():
+    """Probe the link until it answers."""
+    target = _Target(probes=3)
+    assert wait.wait_for_pattern(target, "OK", 5, probe="AT\r", interval=0.01) == 0
+    assert target.sent == ["AT\r"] * 3
+    target = _Target(probes=100)
+    assert wait.wait_for_pattern(target, ["OK"], 0.1, interval=0.05) is None